@@ -0,0 +1,521 @@
+#!/usr/bin/python3 -Es
+#
+# Copyright (C) 2026 Red Hat, Inc.
+#
+# This program is free software; you can redistribute it and/or
+# modify it under the terms of the GNU General Public License
+# as published by the Free Software Foundation; either version 2
+# of the License, or (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+
+"""
+Offline benchmark of the shipped profiles.
+
+Builds a synthetic /sys and /proc tree with the requested number of CPUs,
+IRQs, tasks, block devices and NICs in a temporary directory, points TuneD to it
+(commands.set_root_prefix) and for every profile measures the load of the
+profile and the create/start_tuning/verify_tuning/stop_tuning phases of
+the units manager. Besides the wall time, the numbers of files read and
+written through tuned.utils.commands and of the executed commands are
+reported, so the scaling regressions (e.g. work growing with CPUs x
+options) are visible without root or real hardware.
+
+The commands run through commands.execute are not executed, they fail
+as if the tool was not installed. The scheduling syscalls of the scheduler
+plugin (sched_setaffinity, sched_setscheduler, ...) work on a table of the
+fake tasks instead of the host processes and the runtime tuning is off.
+The plugins touching the configuration of the host outside /sys and /proc
+(bootloader, services, ...) are skipped.
+
+The verified column reflects the fidelity of the fake tree too: the
+files the kernel derives from the written ones (e.g. smp_affinity_list
+from smp_affinity) do not change.
+
+The profiles isolating CPUs get the isolated_cores variable from the
+--isolated-cores option, as from their variables file on a real system.
+The run fails if any profile cannot be loaded or tuned.
+
+Usage: python3 tests/benchmark/profiles_benchmark.py [--cpus N] [profile ...]
+"""
+
+import argparse
+import errno
+import fnmatch
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+import tuned.logs
+import tuned.consts as consts
+from tuned import storage, units, monitors, plugins, profiles, hardware
+from tuned.plugins import plugin_scheduler
+from tuned.utils.commands import commands
+from tuned.utils import proc_scanner
+from tuned.utils.global_config import GlobalConfig
+
+log = tuned.logs.get()
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+
+# plugins which change the configuration of the host outside /sys and /proc
+# or run arbitrary programs
+SKIPPED_PLUGINS = ["script", "bootloader", "irqbalance", "systemd",
+		"service", "modules", "selinux", "mounts", "rtentsk"]
+
+class FakeEnumerator(list):
+	def match_sys_name(self, pattern):
+		return FakeEnumerator(d for d in self if fnmatch.fnmatch(d.sys_name, pattern))
+
+	def match_property(self, name, value):
+		return FakeEnumerator(d for d in self if d.properties.get(name) == value)
+
+class FakeDevice(object):
+	def __init__(self, subsystem, sys_name, device_path, device_type = None,
+			attributes = None, parent = None, driver = None):
+		self.subsystem = subsystem
+		self.sys_name = sys_name
+		self.device_path = device_path
+		self.device_type = device_type
+		self.attributes = attributes or {}
+		self.parent = parent
+		self.driver = driver
+		self.properties = {"SUBSYSTEM": subsystem, "DEVPATH": device_path}
+		if device_type is not None:
+			self.properties["DEVTYPE"] = device_type
+
+class FakeInventory(object):
+	"""Hardware inventory serving the devices of the fake tree."""
+
+	def __init__(self):
+		self._devices = {}
+
+	def add(self, device):
+		self._devices.setdefault(device.subsystem, FakeEnumerator()).append(device)
+
+	def get_device(self, subsystem, sys_name):
+		for device in self._devices.get(subsystem, []):
+			if device.sys_name == sys_name:
+				return device
+		raise LookupError("no device '%s' in subsystem '%s'" % (sys_name, subsystem))
+
+	def get_devices(self, subsystem):
+		return FakeEnumerator(self._devices.get(subsystem, []))
+
+	def subscribe(self, plugin, subsystem, callback):
+		pass
+
+	def unsubscribe(self, plugin, subsystem = None):
+		pass
+
+	def start_processing_events(self):
+		pass
+
+	def stop_processing_events(self):
+		pass
+
+class FakeSystem(object):
+	"""Synthetic /sys, /proc and /dev tree under the root directory."""
+
+	def __init__(self, root, cpus, irqs, tasks, disks, nics):
+		self.root = root
+		self.inventory = FakeInventory()
+		# pid -> [policy, priority, affinity] of the fake tasks
+		self.tasks = {}
+		self._build_cpus(cpus)
+		self._build_irqs(irqs, cpus)
+		self._build_tasks(tasks, cpus)
+		self._build_disks(disks)
+		self._build_nics(nics)
+		self._build_misc()
+
+	def write(self, path, data):
+		path = self.root + path
+		dir_name = os.path.dirname(path)
+		if not os.path.isdir(dir_name):
+			os.makedirs(dir_name)
+		with open(path, "w") as f:
+			f.write(data)
+
+	def ensure(self, path, data = "0"):
+		if not os.path.exists(self.root + path):
+			self.write(path, data + "\n")
+
+	def _build_cpus(self, cpus):
+		cpu_dir = "/sys/devices/system/cpu"
+		cpu_list = "0-%d\n" % (cpus - 1)
+		for name in ["online", "present", "possible"]:
+			self.write("%s/%s" % (cpu_dir, name), cpu_list)
+		for name, value in [("status", "active"), ("min_perf_pct", "10"),
+				("max_perf_pct", "100"), ("no_turbo", "0")]:
+			self.write("%s/intel_pstate/%s" % (cpu_dir, name), value + "\n")
+		cpuinfo = []
+		for cpu in range(cpus):
+			d = "%s/cpu%d" % (cpu_dir, cpu)
+			self.write(d + "/online", "1\n")
+			for name, value in [
+					("scaling_governor", "powersave"),
+					("scaling_available_governors", "performance powersave"),
+					("scaling_driver", "intel_pstate"),
+					("energy_performance_preference", "balance_performance"),
+					("energy_performance_available_preferences",
+						"default performance balance_performance balance_power power"),
+					("scaling_min_freq", "800000"), ("scaling_max_freq", "3000000"),
+					("cpuinfo_min_freq", "800000"), ("cpuinfo_max_freq", "3000000")]:
+				self.write("%s/cpufreq/%s" % (d, name), value + "\n")
+			self.write(d + "/power/energy_perf_bias", "6\n")
+			self.write(d + "/power/pm_qos_resume_latency_us", "0\n")
+			self.write(d + "/topology/physical_package_id", "0\n")
+			self.write(d + "/topology/die_id", "0\n")
+			self.write(d + "/topology/core_id", "%d\n" % cpu)
+			self.write(d + "/topology/thread_siblings_list", "%d\n" % cpu)
+			cpuinfo.append("processor\t: %d\nvendor_id\t: GenuineIntel\n"
+					"model name\t: Fake CPU\nphysical id\t: 0\ncore id\t\t: %d\n"
+					"flags\t\t: fpu vme de pse tsc msr pae mce cx8 apic sep mtrr\n" % (cpu, cpu))
+			self.inventory.add(FakeDevice("cpu", "cpu%d" % cpu, "/devices/system/cpu/cpu%d" % cpu))
+		for state, (name, latency) in enumerate([("POLL", 0), ("C1", 2), ("C1E", 10), ("C6", 133)]):
+			d = "%s/cpu0/cpuidle/state%d" % (cpu_dir, state)
+			self.write(d + "/name", name + "\n")
+			self.write(d + "/latency", "%d\n" % latency)
+			self.write(d + "/disable", "0\n")
+		self.write("/proc/cpuinfo", "\n".join(cpuinfo))
+		self._cpus = cpus
+
+	def _build_irqs(self, irqs, cpus):
+		mask = commands().cpulist2hex(list(range(cpus)))
+		self.write("/proc/irq/default_smp_affinity", mask + "\n")
+		lines = ["    " + " ".join("CPU%d" % cpu for cpu in range(cpus))]
+		for irq in range(irqs):
+			self.write("/proc/irq/%d/smp_affinity" % irq, mask + "\n")
+			self.write("/proc/irq/%d/smp_affinity_list" % irq, "0-%d\n" % (cpus - 1))
+			lines.append("%3d: %s IR-IO-APIC %d-edge fake%d"
+					% (irq, " ".join("0" for cpu in range(cpus)), irq, irq))
+		self.write("/proc/interrupts", "\n".join(lines) + "\n")
+
+	def _add_task(self, pid, comm, flags, cmdline = "", process = None):
+		if process is None:
+			d = "/proc/%d" % pid
+		else:
+			d = "/proc/%d/task/%d" % (process, pid)
+		# state, ppid, pgrp, session, tty_nr, tpgid, flags, ..., starttime (22nd field)
+		fields = ["S", "1", str(pid), str(pid), "0", "-1", str(flags)] + ["0"] * 12 \
+				+ [str(1000 + pid)] + ["0"] * 24
+		self.write(d + "/stat", "%d (%s) %s\n" % (pid, comm, " ".join(fields)))
+		self.write(d + "/cmdline", cmdline.replace(" ", "\0") + ("\0" if cmdline else ""))
+		self.write(d + "/cgroup", "0::/%s\n" % ("" if flags & proc_scanner.PF_KTHREAD else "system.slice"))
+		self.tasks[pid] = [os.SCHED_OTHER, 0, set(range(self._cpus))]
+
+	def _build_tasks(self, tasks, cpus):
+		pid = 1
+		# per-CPU kernel threads, bound to their CPUs
+		for cpu in range(cpus):
+			for comm in ["cpuhp/%d", "migration/%d", "ksoftirqd/%d", "kworker/%d:0"]:
+				pid += 1
+				self._add_task(pid, comm % cpu, proc_scanner.PF_KTHREAD | proc_scanner.PF_NO_SETAFFINITY)
+		for i in range(16):
+			pid += 1
+			self._add_task(pid, "kworker/u%d:%d" % (cpus * 2, i), proc_scanner.PF_KTHREAD)
+		# user processes, every fourth one with two more threads
+		for i in range(tasks):
+			pid += 1
+			process = pid
+			comm = "app%d" % i
+			self._add_task(process, comm, 0, "/usr/bin/%s --option %d" % (comm, i))
+			self.write("/proc/%d/task/%d/stat" % (process, process), self._read("/proc/%d/stat" % process))
+			if i % 4 == 0:
+				for thread in range(2):
+					pid += 1
+					self._add_task(pid, comm, 0, process = process)
+
+	def _read(self, path):
+		with open(self.root + path) as f:
+			return f.read()
+
+	def _build_disks(self, disks):
+		scsi = FakeDevice("scsi", "host0", "/devices/pci0000:00/0000:00:17.0/ata1/host0")
+		for i in range(disks):
+			name = "sd" + (chr(ord("a") + i) if i < 26 else "a" + chr(ord("a") + i - 26))
+			d = "/sys/block/" + name
+			for attr, value in [("scheduler", "[mq-deadline] kyber bfq none"),
+					("read_ahead_kb", "128"), ("nr_requests", "64"),
+					("rotational", "1"), ("max_sectors_kb", "1280")]:
+				self.write("%s/queue/%s" % (d, attr), value + "\n")
+			self.write(d + "/device/vendor", "ATA\n")
+			self.write(d + "/device/timeout", "30\n")
+			self.write(d + "/stat", " ".join(["0"] * 17) + "\n")
+			self.inventory.add(FakeDevice("block", name, "/devices/pci0000:00/0000:00:17.0/ata1/host0/block/" + name,
+					device_type = "disk", attributes = {"removable": b"0"}, parent = scsi))
+
+	def _build_nics(self, nics):
+		for i in range(nics):
+			name = "eth%d" % i
+			device_path = "/devices/pci0000:00/0000:00:%02x.0/net/%s" % (i + 1, name)
+			for attr, value in [("mtu", "1500"), ("tx_queue_len", "1000"), ("speed", "10000")]:
+				self.write("/sys%s/%s" % (device_path, attr), value + "\n")
+			for counter in ["rx_bytes", "rx_packets", "tx_bytes", "tx_packets"]:
+				self.write("/sys%s/statistics/%s" % (device_path, counter), "0\n")
+			class_dir = self.root + "/sys/class/net"
+			if not os.path.isdir(class_dir):
+				os.makedirs(class_dir)
+			os.symlink("../../.." + device_path, os.path.join(class_dir, name))
+			self.inventory.add(FakeDevice("net", name, device_path))
+
+	def _build_misc(self):
+		for name in ["enabled", "defrag"]:
+			self.write("/sys/kernel/mm/transparent_hugepage/" + name, "always [madvise] never\n")
+		for name, value in [("dirty_bytes", "0"), ("dirty_ratio", "20"),
+				("dirty_background_bytes", "0"), ("dirty_background_ratio", "10"),
+				("swappiness", "60")]:
+			self.write("/proc/sys/vm/" + name, value + "\n")
+		self.write("/sys/module/nf_conntrack/parameters/hashsize", "65536\n")
+		self.write("/sys/module/snd_hda_intel/parameters/power_save", "1\n")
+		self.write("/sys/module/snd_hda_intel/parameters/power_save_controller", "Y\n")
+		# scheduler knobs of kernel 6.6+
+		for name, value in [("base_slice_ns", "3000000"), ("migration_cost_ns", "500000"),
+				("nr_migrate", "32"), ("tunable_scaling", "1"),
+				("numa_balancing/scan_delay_ms", "1000"), ("numa_balancing/scan_period_min_ms", "1000"),
+				("numa_balancing/scan_period_max_ms", "60000"), ("numa_balancing/scan_size_mb", "256")]:
+			self.write("/sys/kernel/debug/sched/" + name, value + "\n")
+		mask = commands().cpulist2hex(list(range(self._cpus)))
+		for name in ["/sys/devices/virtual/workqueue/cpumask",
+				"/sys/devices/virtual/workqueue/writeback/cpumask",
+				"/sys/bus/workqueue/devices/writeback/cpumask"]:
+			self.write(name, mask + "\n")
+		self.write("/proc/loadavg", "0.00 0.00 0.00 1/100 1\n")
+		self.write("/proc/cmdline", "BOOT_IMAGE=/vmlinuz root=/dev/sda1 ro\n")
+		self.write("/dev/cpu_dma_latency", "")
+
+	def add_sysctls(self, profile):
+		for unit in profile.units.values():
+			if unit.type != "sysctl":
+				continue
+			for option in unit.options:
+				self.ensure("/proc/sys/%s" % commands().tr(option, "./", "/."))
+
+class FakeScheduler(object):
+	"""Scheduling syscalls of the scheduler plugin working on the fake tasks."""
+
+	def __init__(self, tasks):
+		self._tasks = tasks
+
+	def _task(self, pid):
+		try:
+			return self._tasks[pid]
+		except KeyError:
+			raise OSError(errno.ESRCH, os.strerror(errno.ESRCH))
+
+	def install(self):
+		scheduler = self
+
+		def get_scheduler(self, pid):
+			return scheduler._task(pid)[0]
+
+		def set_scheduler(self, pid, sched, prio):
+			scheduler._task(pid)[:2] = [sched, prio]
+
+		def get_affinity(self, pid):
+			return set(scheduler._task(pid)[2])
+
+		def set_affinity(self, pid, affinity):
+			scheduler._task(pid)[2] = set(affinity)
+
+		def get_priority(self, pid):
+			return scheduler._task(pid)[1]
+
+		plugin_scheduler.SchedulerUtils.get_scheduler = get_scheduler
+		plugin_scheduler.SchedulerUtils.set_scheduler = set_scheduler
+		plugin_scheduler.SchedulerUtils.get_affinity = get_affinity
+		plugin_scheduler.SchedulerUtils.set_affinity = set_affinity
+		plugin_scheduler.SchedulerUtils.get_priority = get_priority
+
+class Counters(object):
+	"""Counts the file operations and commands done through tuned.utils.commands."""
+
+	def __init__(self):
+		self.reads = 0
+		self.writes = 0
+		self.execs = 0
+		self.spawns = 0
+
+	def snapshot(self):
+		return (self.reads, self.writes, self.execs + self.spawns)
+
+	def install(self):
+		counters = self
+		read_file = commands._read_file
+		write_to_file = commands._write_to_file
+		popen_init = subprocess.Popen.__init__
+
+		def counting_read_file(self, f, *args, **kwargs):
+			counters.reads += 1
+			return read_file(self, f, *args, **kwargs)
+
+		def counting_write_to_file(self, f, *args, **kwargs):
+			counters.writes += 1
+			return write_to_file(self, f, *args, **kwargs)
+
+		def fake_execute(self, args, shell = False, cwd = None, env = {}, no_errors = [], return_err = False):
+			counters.execs += 1
+			if return_err:
+				return -errno.ENOENT, "", "fake system, '%s' not executed" % args[0]
+			return -errno.ENOENT, ""
+
+		def counting_popen_init(self, *args, **kwargs):
+			counters.spawns += 1
+			popen_init(self, *args, **kwargs)
+
+		commands._read_file = counting_read_file
+		commands._write_to_file = counting_write_to_file
+		commands.execute = fake_execute
+		subprocess.Popen.__init__ = counting_popen_init
+
+class Benchmark(object):
+	def __init__(self, system, work_dir, counters, isolated_cores):
+		self._system = system
+		self._work_dir = work_dir
+		self._counters = counters
+		self._isolated_cores = isolated_cores
+		self._config = GlobalConfig(os.path.join(REPO_DIR, "tuned-main.conf"))
+		self._config.set(consts.CFG_DYNAMIC_TUNING, False)
+		# no runtime tuning of the scheduler plugin, it listens to the host processes
+		self._config.set(consts.CFG_DAEMON, False)
+		self._locator = profiles.Locator([os.path.join(REPO_DIR, "profiles")])
+
+	def _create_manager(self, variables, storage_file):
+		storage_factory = storage.Factory(storage.PickleProvider(storage_file))
+		plugins_repository = plugins.Repository(monitors.Repository(), storage_factory,
+				self._system.inventory, hardware.DeviceMatcher(), hardware.DeviceMatcherUdev(),
+				plugins.instance.Factory(), self._config, variables)
+		return units.Manager(plugins_repository, monitors.Repository(),
+				int(self._config.get(consts.CFG_DEFAULT_INSTANCE_PRIORITY, consts.CFG_DEF_DEFAULT_INSTANCE_PRIORITY)),
+				self._system.inventory, self._config)
+
+	def _phase(self, results, name, function, *args):
+		counts = self._counters.snapshot()
+		start = time.perf_counter()
+		ret = function(*args)
+		results[name] = time.perf_counter() - start
+		for key, before, after in zip(["reads", "writes", "commands"], counts, self._counters.snapshot()):
+			results[key] = results.get(key, 0) + after - before
+		return ret
+
+	def run(self, profile_name):
+		results = {"profile": profile_name}
+		variables = profiles.variables.Variables()
+		variables.add_variable("isolated_cores", self._isolated_cores)
+		loader = profiles.Loader(self._locator, profiles.Factory(), profiles.Merger(),
+				self._config, variables)
+		profile = self._phase(results, "load", loader.load, [profile_name])
+		for name, unit in list(profile.units.items()):
+			if unit.type in SKIPPED_PLUGINS:
+				del profile.units[name]
+			else:
+				unit.script_pre = None
+				unit.script_post = None
+		self._system.add_sysctls(profile)
+		manager = self._create_manager(variables,
+				os.path.join(self._work_dir, "save-%s.pickle" % profile_name))
+		self._phase(results, "create", manager.create, profile.units)
+		self._phase(results, "start", manager.start_tuning)
+		results["verified"] = self._phase(results, "verify", manager.verify_tuning, False)
+		self._phase(results, "stop", manager.stop_tuning, consts.ROLLBACK_FULL)
+		manager.destroy_all()
+		return results
+
+def list_profiles():
+	profiles_dir = os.path.join(REPO_DIR, "profiles")
+	return sorted(name for name in os.listdir(profiles_dir)
+			if os.path.isfile(os.path.join(profiles_dir, name, "tuned.conf")))
+
+def print_table(all_results):
+	header = "%-32s %8s %8s %8s %8s %8s %7s %7s %8s %s" % ("profile", "load", "create",
+			"start", "verify", "stop", "reads", "writes", "commands", "verified")
+	print(header)
+	print("-" * len(header))
+	for r in all_results:
+		if "error" in r:
+			print("%-32s error: %s" % (r["profile"], r["error"]))
+			continue
+		print("%-32s %7.1fm %7.1fm %7.1fm %7.1fm %7.1fm %7d %7d %8d %s" % (r["profile"],
+				r["load"] * 1000, r["create"] * 1000, r["start"] * 1000,
+				r["verify"] * 1000, r["stop"] * 1000, r["reads"], r["writes"],
+				r["commands"], r["verified"]))
+
+def main():
+	parser = argparse.ArgumentParser(description = "Benchmark the shipped profiles against a fake sysfs/procfs tree.")
+	parser.add_argument("profiles", nargs = "*", help = "profiles to benchmark, all shipped profiles by default")
+	parser.add_argument("--cpus", type = int, default = 64, help = "number of CPUs")
+	parser.add_argument("--irqs", type = int, default = 256, help = "number of IRQs")
+	parser.add_argument("--tasks", type = int, default = 1024, help = "number of user processes")
+	parser.add_argument("--isolated-cores", help = "isolated_cores of the profiles isolating CPUs, all CPUs but the first quarter by default")
+	parser.add_argument("--disks", type = int, default = 8, help = "number of block devices")
+	parser.add_argument("--nics", type = int, default = 4, help = "number of network interfaces")
+	parser.add_argument("--json", action = "store_true", help = "print the results as JSON")
+	parser.add_argument("--keep", action = "store_true", help = "do not remove the fake tree")
+	parser.add_argument("--log-level", default = "CRITICAL", help = "TuneD log level")
+	parser.add_argument("--allow-root", action = "store_true",
+			help = "run even as root (the skipped plugins and unconverted code paths may touch the host)")
+	args = parser.parse_args()
+
+	if os.geteuid() == 0 and not args.allow_root:
+		print("Refusing to run as root, use --allow-root to override.", file = sys.stderr)
+		return 1
+
+	if args.cpus < 2:
+		print("At least 2 CPUs are needed.", file = sys.stderr)
+		return 1
+	isolated_cores = args.isolated_cores or "%d-%d" % (max(1, args.cpus // 4), args.cpus - 1)
+
+	log.setLevel(args.log_level)
+	work_dir = tempfile.mkdtemp(prefix = "tuned-benchmark-")
+	counters = Counters()
+	counters.install()
+	try:
+		root = os.path.join(work_dir, "root")
+		system = FakeSystem(root, args.cpus, args.irqs, args.tasks, args.disks, args.nics)
+		FakeScheduler(system.tasks).install()
+		commands.set_root_prefix(root)
+		benchmark = Benchmark(system, work_dir, counters, isolated_cores)
+		all_results = []
+		for profile_name in args.profiles or list_profiles():
+			try:
+				all_results.append(benchmark.run(profile_name))
+			except Exception as e:
+				all_results.append({"profile": profile_name, "error": str(e)})
+		if args.json:
+			json.dump({"cpus": args.cpus, "irqs": args.irqs, "tasks": args.tasks,
+					"isolated_cores": isolated_cores, "disks": args.disks,
+					"nics": args.nics, "results": all_results}, sys.stdout, indent = 1)
+			print()
+		else:
+			print("%d CPUs (isolated %s), %d IRQs, %d tasks, %d block devices, %d NICs"
+					% (args.cpus, isolated_cores, args.irqs, args.tasks, args.disks, args.nics))
+			print_table(all_results)
+	finally:
+		commands.set_root_prefix("")
+		if args.keep:
+			print("Fake tree kept in '%s'." % work_dir, file = sys.stderr)
+		else:
+			shutil.rmtree(work_dir)
+	failed = [r["profile"] for r in all_results if "error" in r]
+	if failed:
+		print("Failed to benchmark profiles: %s" % ", ".join(failed), file = sys.stderr)
+		return 1
+	return 0
+
+if __name__ == "__main__":
+	sys.exit(main())
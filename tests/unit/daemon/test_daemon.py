@@ -0,0 +1,99 @@
+import collections
+import unittest
+
+import tuned.consts as consts
+from tuned.daemon.daemon import Daemon
+from tuned.profiles.unit import Unit
+
+class DummyConfig(object):
+	def __init__(self, values):
+		self._values = values
+
+	def get(self, key, default = None):
+		return self._values.get(key, default)
+
+	def get_bool(self, key, default = None):
+		return self._values.get(key, default)
+
+class DummyProfile(object):
+	def __init__(self, name):
+		self.name = name
+		# the bootloader unit keeps the daemon from probing bootc
+		self.units = collections.OrderedDict([("bootloader", Unit("bootloader", {}))])
+
+class DummyLocator(object):
+	def get_known_names(self):
+		return ["old", "new"]
+
+class DummyLoader(object):
+	profile_locator = DummyLocator()
+
+	def load(self, profile_names):
+		return DummyProfile(" ".join(profile_names))
+
+class DummyManager(object):
+	def __init__(self):
+		self.calls = []
+		self.instances = []
+
+	def set_event_notifier(self, notifier):
+		pass
+
+	def create(self, units):
+		self.calls.append("create")
+		self.instances = list(units)
+
+	def switch(self, units, rollback):
+		self.calls.append(("switch", rollback))
+		self.instances = list(units)
+
+	def start_tuning(self):
+		self.calls.append("start_tuning")
+
+	def stop_tuning(self, rollback):
+		self.calls.append(("stop_tuning", rollback))
+
+	def destroy_all(self):
+		self.calls.append("destroy_all")
+		self.instances = []
+
+class TestDaemon(Daemon):
+	def _save_active_profile(self, profile_names, manual):
+		pass
+
+	def _save_post_loaded_profile(self, profile_name):
+		pass
+
+	def _full_rollback_required(self):
+		return True
+
+class DaemonSwitchTestCase(unittest.TestCase):
+	def _daemon(self, differential_switch):
+		self._manager = DummyManager()
+		config = DummyConfig({consts.CFG_DAEMON: True, consts.CFG_DYNAMIC_TUNING: False,
+				consts.CFG_DIFFERENTIAL_SWITCH: differential_switch})
+		return TestDaemon(self._manager, DummyLoader(), "old", config)
+
+	def _switch(self, daemon):
+		self.assertTrue(daemon.start())
+		daemon._profile_applied.wait(5)
+		daemon.stop(profile_switch = True)
+		daemon.set_profile("new", True)
+		self.assertTrue(daemon.start())
+		daemon._profile_applied.wait(5)
+		daemon.stop()
+
+	def test_differential_switch_keeps_tuning(self):
+		daemon = self._daemon(True)
+		self._switch(daemon)
+		self.assertEqual(self._manager.calls, ["create", "start_tuning",
+				("switch", consts.ROLLBACK_FULL),
+				("stop_tuning", consts.ROLLBACK_FULL), "destroy_all"])
+
+	def test_full_switch(self):
+		daemon = self._daemon(False)
+		self._switch(daemon)
+		self.assertEqual(self._manager.calls, ["create", "start_tuning",
+				("stop_tuning", consts.ROLLBACK_FULL), "destroy_all",
+				"create", "start_tuning",
+				("stop_tuning", consts.ROLLBACK_FULL), "destroy_all"])
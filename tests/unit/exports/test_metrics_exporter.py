@@ -0,0 +1,113 @@
+import os
+import shutil
+import socket
+import tempfile
+import unittest
+
+from tuned.exports.metrics_exporter import MetricsExporter, escape_label
+
+class DummyController(object):
+	def __init__(self):
+		self.verified = 0
+
+	def is_running(self):
+		return True
+
+	def active_profile(self):
+		return "balanced"
+
+	def profile_mode(self):
+		return ("manual", "")
+
+	def verify_profile_ignore_missing(self):
+		self.verified += 1
+		return True
+
+	def get_verify_results(self):
+		return [("cpu", "governor", "cpu0", False)]
+
+	def get_timings(self):
+		return [("cpu", "apply", "governor", "cpu0", 2.0, 0.5, 0.3, 0.2)]
+
+	def get_update_stats(self):
+		return {"monitor:load": {"runs": 3.0}}
+
+	def get_monitor_data(self):
+		return [("disk", "sd\"a", "read", 10.0)]
+
+	def get_dynamic_changes(self):
+		return [("disk", "level", "sda", 4.0)]
+
+	def profile_changed(self, profile_name, result, errstr):
+		pass
+
+class MetricsExporterTestCase(unittest.TestCase):
+	def setUp(self):
+		self._controller = DummyController()
+		self._exporter = MetricsExporter("/nonexistent/metrics.sock", 0, 300)
+		for name in ["is_running", "active_profile", "profile_mode",
+				"verify_profile_ignore_missing", "get_verify_results",
+				"get_timings", "get_update_stats", "get_monitor_data",
+				"get_dynamic_changes"]:
+			self._exporter.export(getattr(self._controller, name), "", "")
+		self._exporter.signal(self._controller.profile_changed, "sbs")
+
+	def test_escape_label(self):
+		self.assertEqual(escape_label('a"b\\c\nd'), 'a\\"b\\\\c\\nd')
+
+	def test_render(self):
+		self._exporter.send_signal("profile_changed", "balanced", True, "OK")
+		lines = self._exporter.render().splitlines()
+		self.assertEqual(lines[-1], "# EOF")
+		self.assertIn("tuned_up 1.0", lines)
+		self.assertIn('tuned_active_profile_info{profile="balanced",mode="manual"} 1.0', lines)
+		self.assertIn("tuned_profile_changes_total 1.0", lines)
+		self.assertIn("tuned_profile_verified 1.0", lines)
+		self.assertIn('tuned_verify_result{instance="cpu",option="governor",device="cpu0"} 0.0', lines)
+		self.assertIn('tuned_operation_duration_seconds_count{instance="cpu",operation="apply",command="governor",device="cpu0"} 2.0', lines)
+		self.assertIn('tuned_operation_duration_max_seconds{instance="cpu",operation="apply",command="governor",device="cpu0"} 0.3', lines)
+		self.assertIn('tuned_update{job="monitor:load",stat="runs"} 3.0', lines)
+		self.assertIn('tuned_monitor_value{monitor="disk",device="sd\\"a",field="read"} 10.0', lines)
+		self.assertIn('tuned_dynamic_changes_total{instance="disk",change="level",device="sda"} 4.0', lines)
+		# each family has its metadata exactly once
+		self.assertEqual(lines.count("# TYPE tuned_operation_duration_seconds summary"), 1)
+
+	def test_verify_interval(self):
+		self._exporter.render()
+		self._exporter.render()
+		self.assertEqual(self._controller.verified, 1)
+		exporter = MetricsExporter("/nonexistent/metrics.sock", 0, 0)
+		exporter.export(self._controller.verify_profile_ignore_missing, "", "")
+		self.assertNotIn("tuned_profile_verified", exporter.render())
+		self.assertEqual(self._controller.verified, 1)
+
+	def test_serve(self):
+		tmp_dir = tempfile.mkdtemp()
+		path = os.path.join(tmp_dir, "metrics.sock")
+		exporter = MetricsExporter(path, 0o600, 0)
+		exporter.export(self._controller.active_profile, "", "")
+		exporter.start()
+		try:
+			self.assertTrue(exporter.running())
+			# an idle client must not block the others
+			idle = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+			idle.connect(path)
+			s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+			s.settimeout(0.5)
+			s.connect(path)
+			s.sendall(b"GET /metrics HTTP/1.0\r\n\r\n")
+			data = b""
+			while True:
+				chunk = s.recv(4096)
+				if not chunk:
+					break
+				data += chunk
+			s.close()
+			idle.close()
+			self.assertTrue(data.startswith(b"HTTP/1.0 200"))
+			self.assertIn(b'tuned_active_profile_info{profile="balanced",mode=""} 1.0', data)
+		finally:
+			exporter.stop()
+			shutil.rmtree(tmp_dir)
+		self.assertFalse(exporter.running())
+		self.assertFalse(os.path.exists(path))
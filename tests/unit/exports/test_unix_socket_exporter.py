@@ -0,0 +1,122 @@
+import json
+import os
+import shutil
+import socket
+import tempfile
+import unittest
+
+from tuned import exports
+from tuned.exports.unix_socket_exporter import UnixSocketExporter
+
+class DummyController(object):
+	def active_profile(self):
+		return "balanced"
+
+	def add(self, a, b):
+		return a + b
+
+	@exports.subscription()
+	def subscribe(self, signals):
+		return (True, "OK")
+
+	def changed(self, name):
+		pass
+
+class UnixSocketExporterTestCase(unittest.TestCase):
+	def setUp(self):
+		self._dir = tempfile.mkdtemp()
+		self._path = os.path.join(self._dir, "tuned.sock")
+		self._exporter = UnixSocketExporter(self._path, [], None, 0o600, 16)
+		controller = DummyController()
+		self._exporter.export(controller.active_profile, "", "s")
+		self._exporter.export(controller.add, "ii", "i")
+		self._exporter.export(controller.subscribe, "as", "(bs)")
+		self._exporter.signal(controller.changed, "s")
+		self._exporter.start()
+
+	def tearDown(self):
+		self._exporter.stop()
+		shutil.rmtree(self._dir)
+
+	def _connect(self):
+		s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+		s.settimeout(5)
+		s.connect(self._path)
+		return s
+
+	def _read_line(self, f):
+		return json.loads(f.readline())
+
+	def test_persistent_connection(self):
+		s = self._connect()
+		f = s.makefile("r")
+		# two pipelined requests, the second one spans more lines
+		s.sendall(b'{"jsonrpc": "2.0", "method": "active_profile", "id": 1}\n'
+				b'{"jsonrpc": "2.0", "method": "add",\n "params": [1, 2], "id": 2}\n')
+		self.assertEqual(self._read_line(f)["result"], "balanced")
+		self.assertEqual(self._read_line(f)["result"], 3)
+		# notifications are not answered
+		s.sendall(b'{"jsonrpc": "2.0", "method": "add", "params": [1, 2]}\n'
+				b'[{"jsonrpc": "2.0", "method": "add", "params": [2, 2], "id": 3},'
+				b' {"jsonrpc": "2.0", "method": "missing", "id": 4}]\n')
+		res = self._read_line(f)
+		self.assertEqual(res[0]["result"], 4)
+		self.assertEqual(res[1]["error"]["code"], -32601)
+		s.sendall(b'{"jsonrpc": \n}\n')
+		self.assertEqual(self._read_line(f)["error"]["code"], -32700)
+		f.close()
+		s.close()
+
+	def test_invalid_message(self):
+		s = self._connect()
+		f = s.makefile("r")
+		s.sendall(b'null\n')
+		res = self._read_line(f)
+		self.assertEqual(res["error"]["code"], -32600)
+		self.assertIsNone(res["id"])
+		s.sendall(b'{"jsonrpc": "2.0", "method": "active_profile", "id": 1}\n')
+		self.assertEqual(self._read_line(f)["result"], "balanced")
+		# the previous response must not be sent again
+		s.sendall(b'null\n"active_profile"\n42\n')
+		for i in range(3):
+			res = self._read_line(f)
+			self.assertEqual(res["error"]["code"], -32600)
+			self.assertIsNone(res["id"])
+		s.sendall(b'{"jsonrpc": "2.0", "method": "add", "params": [1, 2], "id": 2}\n')
+		self.assertEqual(self._read_line(f)["result"], 3)
+		f.close()
+		s.close()
+
+	def test_concurrent_clients(self):
+		first = self._connect()
+		second = self._connect()
+		# the idle first client must not block the second one
+		second.sendall(b'{"jsonrpc": "2.0", "method": "active_profile", "id": 1}\n')
+		with second.makefile("r") as f:
+			self.assertEqual(self._read_line(f)["result"], "balanced")
+		first.close()
+		second.close()
+
+	def test_request_until_eof(self):
+		s = self._connect()
+		s.sendall(b'{"jsonrpc": "2.0", "method": "active_profile", "id": 1}')
+		s.shutdown(socket.SHUT_WR)
+		with s.makefile("r") as f:
+			self.assertEqual(json.loads(f.read())["result"], "balanced")
+		s.close()
+
+	def test_subscribe(self):
+		s = self._connect()
+		f = s.makefile("r")
+		s.sendall(b'{"jsonrpc": "2.0", "method": "subscribe", "params": [["changed"]], "id": 1}\n')
+		self.assertEqual(self._read_line(f)["result"], [True, "OK"])
+		self._exporter.send_signal("changed", "balanced")
+		self.assertEqual(self._read_line(f), {"jsonrpc": "2.0", "method": "changed", "params": ["balanced"]})
+		# the connection stays usable for the calls
+		s.sendall(b'{"jsonrpc": "2.0", "method": "subscribe", "params": {"signals": []}, "id": 2}\n')
+		self.assertEqual(self._read_line(f)["id"], 2)
+		self._exporter.send_signal("changed", "powersave")
+		s.sendall(b'{"jsonrpc": "2.0", "method": "active_profile", "id": 3}\n')
+		self.assertEqual(self._read_line(f)["id"], 3)
+		f.close()
+		s.close()
@@ -96,3 +96,13 @@ class MonitorBaseClassTestCase(unittest.TestCase):
 		self.assertSetEqual(set(["a", "b"]), MockMonitor._updating_devices)
 		monitor2.cleanup()
 		self.assertSetEqual(set(), MockMonitor._updating_devices)
+
+	def test_history(self):
+		monitor = MockMonitor()
+		start = monitor.get_device_load("a")
+		monitor.sample()
+		history = monitor.get_history("a")
+		self.assertEqual(history.last(), start + 1)
+		self.assertEqual(history.delta(), 1)
+		self.assertIsNone(monitor.get_history("c"))
+		monitor.cleanup()
@@ -0,0 +1,76 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from tuned.utils.commands import commands
+from tuned.monitors.monitor_cpu import CPUMonitor
+
+STAT = """cpu  %(total)s
+cpu0 %(cpu0)s 0 0 0 0 0
+cpu1 %(cpu1)s 0 0 0 0 0
+intr 12345
+"""
+
+class CPUMonitorTestCase(unittest.TestCase):
+	def setUp(self):
+		self._root = tempfile.mkdtemp()
+		os.makedirs(os.path.join(self._root, "proc"))
+		for cpu in ["cpu0", "cpu1"]:
+			for (state, name) in enumerate(["POLL", "C1", "C6"]):
+				state_dir = os.path.join(self._root, "sys/devices/system/cpu", cpu, "cpuidle/state%d" % state)
+				os.makedirs(state_dir)
+				with open(os.path.join(state_dir, "name"), "w") as f:
+					f.write(name + "\n")
+				self._write_state(cpu, state, 0)
+		# user nice system idle
+		self._write_stat("0 0 0 0", "0 0 0 0")
+		commands.set_root_prefix(self._root)
+		class TestCPUMonitor(CPUMonitor):
+			pass
+		TestCPUMonitor._init_class()
+		self._monitor_class = TestCPUMonitor
+
+	def tearDown(self):
+		commands.set_root_prefix("")
+		shutil.rmtree(self._root)
+
+	def _write_stat(self, cpu0, cpu1):
+		with open(os.path.join(self._root, "proc/stat"), "w") as f:
+			f.write(STAT % {"total": "0 0 0 0", "cpu0": cpu0, "cpu1": cpu1})
+
+	def _write_state(self, cpu, state, value):
+		path = os.path.join(self._root, "sys/devices/system/cpu", cpu, "cpuidle/state%d/time" % state)
+		with open(path, "w") as f:
+			f.write("%d\n" % value)
+
+	def test_available_devices(self):
+		monitor = self._monitor_class()
+		self.assertEqual(monitor.get_available_devices(), set(["cpu0", "cpu1"]))
+		self.assertEqual(monitor.get_state_names(), ["POLL", "C1", "C6"])
+		monitor.cleanup()
+
+	def test_utilization(self):
+		monitor = self._monitor_class(["cpu0", "cpu1"])
+		# cpu0 busy 90 of 100 ticks, cpu1 busy 10 of 100 ticks
+		self._write_stat("80 0 10 10", "5 0 5 90")
+		self._write_state("cpu1", 2, 800000)
+		monitor.sample()
+		self.assertAlmostEqual(monitor.get_utilization("cpu0"), 90.0)
+		self.assertAlmostEqual(monitor.get_utilization("cpu1"), 10.0)
+		self.assertEqual(monitor.get_device_load("cpu1"), [10.0, 10, 90, 0, 0, 800000])
+		self._write_stat("80 0 10 110", "105 0 5 90")
+		monitor.sample()
+		self.assertAlmostEqual(monitor.get_utilization("cpu0"), 0.0)
+		self.assertAlmostEqual(monitor.get_utilization("cpu1"), 100.0)
+		self.assertEqual(monitor.get_history("cpu1").values(), [0.0, 10.0, 100.0])
+		monitor.cleanup()
+
+	def test_only_updating_devices(self):
+		monitor = self._monitor_class(["cpu0"])
+		self._write_stat("50 0 0 50", "50 0 0 50")
+		monitor.sample()
+		self.assertAlmostEqual(monitor.get_utilization("cpu0"), 50.0)
+		self.assertAlmostEqual(monitor.get_utilization("cpu1"), 0.0)
+		self.assertEqual(set(monitor.get_load()), set(["cpu0"]))
+		monitor.cleanup()
@@ -0,0 +1,65 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from tuned.utils.commands import commands
+from tuned.monitors.monitor_disk import DiskMonitor
+
+DISKSTATS = """ 259       0 nvme0n1 %d 0 %d 0 10 0 20 0 0 0 0 0 0 0 0 0 0
+ 259       1 nvme0n1p1 1 0 2 0 0 0 0 0 0 0 0 0 0 0 0 0 0
+   8       0 sda 5 0 6 0 7 0 8 0 0 0 0
+"""
+
+class DiskMonitorTestCase(unittest.TestCase):
+	def setUp(self):
+		self._root = tempfile.mkdtemp()
+		for device in ["nvme0n1", "sda"]:
+			os.makedirs(os.path.join(self._root, "sys/block", device))
+		os.makedirs(os.path.join(self._root, "proc"))
+		self._write_stats(1, 2)
+		commands.set_root_prefix(self._root)
+		# fresh class state for every test
+		class TestDiskMonitor(DiskMonitor):
+			pass
+		TestDiskMonitor._init_class()
+		self._monitor_class = TestDiskMonitor
+
+	def tearDown(self):
+		commands.set_root_prefix("")
+		shutil.rmtree(self._root)
+
+	def _write_stats(self, reads, sectors):
+		with open(os.path.join(self._root, "proc/diskstats"), "w") as f:
+			f.write(DISKSTATS % (reads, sectors))
+
+	def test_available_devices(self):
+		monitor = self._monitor_class()
+		self.assertEqual(monitor.get_available_devices(), set(["nvme0n1", "sda"]))
+		monitor.cleanup()
+
+	def test_update(self):
+		monitor = self._monitor_class(["nvme0n1", "sda"])
+		load = monitor.get_device_load("nvme0n1")
+		self.assertEqual(load[:6], [1, 0, 2, 0, 10, 0])
+		self.assertEqual(len(load), 17)
+		self.assertEqual(monitor.get_device_load("sda")[:4], [5, 0, 6, 0])
+		self._write_stats(3, 4)
+		monitor.update()
+		self.assertEqual(monitor.get_load()["nvme0n1"][:3], [3, 0, 4])
+		monitor.cleanup()
+
+	def test_added_device(self):
+		monitor = self._monitor_class(["sda"])
+		self.assertEqual(set(monitor.get_load()), set(["sda"]))
+		monitor.add_device("missing")
+		self.assertNotIn("missing", monitor.devices)
+		os.makedirs(os.path.join(self._root, "sys/block/sdb"))
+		with open(os.path.join(self._root, "proc/diskstats"), "a") as f:
+			f.write("   8      16 sdb 9 0 9 0 0 0 0 0 0 0 0\n")
+		monitor.add_device("sdb")
+		monitor.update()
+		self.assertEqual(monitor.get_device_load("sdb")[:3], [9, 0, 9])
+		monitor.remove_device("sdb")
+		self.assertEqual(set(monitor.get_load()), set(["sda"]))
+		monitor.cleanup()
@@ -0,0 +1,52 @@
+import unittest
+
+from tuned.monitors.history import History
+
+class HistoryTestCase(unittest.TestCase):
+	def test_empty(self):
+		history = History(4)
+		self.assertEqual(len(history), 0)
+		self.assertIsNone(history.last())
+		self.assertIsNone(history.ewma())
+		self.assertIsNone(history.delta())
+		self.assertIsNone(history.rate())
+		self.assertIsNone(history.percentile(50))
+		with self.assertRaises(ValueError):
+			History(1)
+
+	def test_ring(self):
+		history = History(3)
+		for i in range(5):
+			history.push(i, float(i))
+		self.assertEqual(len(history), 3)
+		self.assertEqual(history.values(), [2.0, 3.0, 4.0])
+		self.assertEqual(history.values(window = 2), [3.0, 4.0])
+		self.assertEqual(history.last(), 4.0)
+		self.assertEqual(history.delta(), 1.0)
+
+	def test_ewma(self):
+		history = History(8, alpha = 0.5)
+		history.push(4, 0.0)
+		self.assertEqual(history.ewma(), 4.0)
+		history.push(8, 1.0)
+		self.assertEqual(history.ewma(), 6.0)
+		history.push(0, 2.0)
+		self.assertEqual(history.ewma(), 3.0)
+
+	def test_rate(self):
+		history = History(4, width = 2)
+		history.push([100, 10], 10.0)
+		history.push([400, 10], 12.0)
+		self.assertEqual(history.rate(0), 150.0)
+		self.assertEqual(history.rate(1), 0.0)
+		history.push([500, 20], 12.0)
+		self.assertIsNone(history.rate())
+
+	def test_percentile(self):
+		history = History(16)
+		for i, value in enumerate([5, 1, 4, 2, 3]):
+			history.push(value, float(i))
+		self.assertEqual(history.percentile(0), 1.0)
+		self.assertEqual(history.percentile(50), 3.0)
+		self.assertEqual(history.percentile(100), 5.0)
+		self.assertEqual(history.percentile(100, window = 2), 3.0)
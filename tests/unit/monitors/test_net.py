@@ -0,0 +1,40 @@
+import unittest
+import os
+import shutil
+import tempfile
+
+from tuned.utils.commands import commands
+from tuned.monitors.monitor_net import NetMonitor
+
+class NetMonitorTestCase(unittest.TestCase):
+	def setUp(self):
+		self._root = tempfile.mkdtemp()
+		class_dir = os.path.join(self._root, "sys/class/net")
+		os.makedirs(class_dir)
+		for path in ["pci0000:00/0000:00:03.0/net/eth0", "virtual/net/lo"]:
+			dev_dir = os.path.join(self._root, "sys/devices", path)
+			os.makedirs(os.path.join(dev_dir, "statistics"))
+			for i, name in enumerate(["rx_bytes", "rx_packets", "tx_bytes", "tx_packets"]):
+				with open(os.path.join(dev_dir, "statistics", name), "w") as f:
+					f.write("%d\n" % (i + 1))
+			os.symlink("../../devices/" + path, os.path.join(class_dir, os.path.basename(path)))
+		commands.set_root_prefix(self._root)
+		# fresh class state for every test
+		class TestNetMonitor(NetMonitor):
+			pass
+		TestNetMonitor._init_class()
+		self._monitor_class = TestNetMonitor
+
+	def tearDown(self):
+		commands.set_root_prefix("")
+		shutil.rmtree(self._root)
+
+	def test_available_devices(self):
+		monitor = self._monitor_class()
+		self.assertEqual(monitor.get_available_devices(), set(["eth0"]))
+		monitor.cleanup()
+
+	def test_sysfs_counters(self):
+		monitor = self._monitor_class(["eth0"])
+		self.assertEqual(monitor.get_device_load("eth0"), [1, 2, 3, 4])
+		monitor.cleanup()
@@ -0,0 +1,82 @@
+import unittest
+import os
+import select
+import shutil
+import tempfile
+import threading
+
+from tuned.utils.commands import commands
+from tuned.monitors.monitor_psi import PSIMonitor, parse_pressure, _TriggerWatcher
+
+PRESSURE = """some avg10=%s avg60=1.50 avg300=0.25 total=123456
+full avg10=0.00 avg60=0.00 avg300=0.00 total=42
+"""
+
+class PSIMonitorTestCase(unittest.TestCase):
+	def setUp(self):
+		self._root = tempfile.mkdtemp()
+		os.makedirs(os.path.join(self._root, "proc/pressure"))
+		os.makedirs(os.path.join(self._root, "sys/fs/cgroup/system.slice"))
+		for resource in ["cpu", "io", "memory"]:
+			self._write("proc/pressure/" + resource, "1.00")
+		self._write("sys/fs/cgroup/system.slice/io.pressure", "7.25")
+		commands.set_root_prefix(self._root)
+		class TestPSIMonitor(PSIMonitor):
+			pass
+		TestPSIMonitor._init_class()
+		self._monitor_class = TestPSIMonitor
+
+	def tearDown(self):
+		commands.set_root_prefix("")
+		shutil.rmtree(self._root)
+
+	def _write(self, path, avg10):
+		with open(os.path.join(self._root, path), "w") as f:
+			f.write(PRESSURE % avg10)
+
+	def test_parse_pressure(self):
+		self.assertEqual(parse_pressure(PRESSURE % "3.00"),
+				[3.0, 1.5, 0.25, 123456.0, 0.0, 0.0, 0.0, 42.0])
+		self.assertEqual(parse_pressure("some avg10=1.00 avg60=2.00 avg300=3.00 total=4\n"),
+				[1.0, 2.0, 3.0, 4.0, 0.0, 0.0, 0.0, 0.0])
+
+	def test_system_devices(self):
+		monitor = self._monitor_class(["cpu", "io"])
+		self.assertEqual(monitor.get_available_devices(), set(["cpu", "io", "memory"]))
+		self.assertEqual(monitor.get_device_load("cpu")[0], 1.0)
+		self._write("proc/pressure/cpu", "55.50")
+		monitor.sample()
+		self.assertEqual(monitor.get_device_load("cpu")[0], 55.5)
+		self.assertEqual(monitor.get_history("cpu").last(), 55.5)
+		monitor.cleanup()
+
+	def test_cgroup_devices(self):
+		monitor = self._monitor_class(["system.slice/io", "missing.slice/io"])
+		self.assertEqual(monitor.devices, set(["system.slice/io"]))
+		self.assertEqual(monitor.get_device_load("system.slice/io")[0], 7.25)
+		os.makedirs(os.path.join(self._root, "sys/fs/cgroup/user.slice"))
+		self._write("sys/fs/cgroup/user.slice/memory.pressure", "2.00")
+		monitor.add_device("user.slice/memory")
+		monitor.sample()
+		self.assertEqual(monitor.get_device_load("user.slice/memory")[0], 2.0)
+		monitor.cleanup()
+
+	def test_no_trigger_with_root_prefix(self):
+		monitor = self._monitor_class(["cpu"])
+		self.assertIsNone(monitor.add_trigger("cpu", 100000, 1000000, lambda: None))
+		monitor.cleanup()
+
+class TriggerWatcherTestCase(unittest.TestCase):
+	def test_callbacks(self):
+		watcher = _TriggerWatcher(events = select.POLLIN)
+		(r, w) = os.pipe()
+		fired = threading.Event()
+		def callback():
+			os.read(r, 1)
+			fired.set()
+		watcher.add(r, callback)
+		os.write(w, b"x")
+		self.assertTrue(fired.wait(5))
+		watcher.remove(r)
+		os.close(r)
+		os.close(w)
@@ -15,6 +15,7 @@ import tuned.plugins as plugins
 import tuned.consts as consts
 from tuned import storage
 import tuned.plugins.base
+from tuned.utils.timings import Timings
 
 temp_storage_file = tempfile.TemporaryFile(mode = 'r')
 consts.DEFAULT_STORAGE_FILE = temp_storage_file.name
@@ -124,6 +125,69 @@ class PluginBaseTestCase(unittest.TestCase):
 		self.assertEqual(device1.setting,'010')
 		self.assertEqual(device2.setting,'010')
 
+	def test_update_options(self):
+		instance = self._commands_plugin.create_instance('test_instance',0,'',\
+			'','','',{'size':'XL'})
+		instance._has_static_tuning = True
+		self._commands_plugin._execute_all_non_device_commands(instance)
+		self.assertEqual(self._commands_plugin._size,'XL')
+
+		changes = {'size':('XL','XXL')}
+		self.assertTrue(self._commands_plugin.supports_options_update(\
+			instance,changes))
+		self._commands_plugin.instance_update_options(instance,changes,\
+			{'size':'XXL'})
+		self.assertEqual(self._commands_plugin._size,'XXL')
+		self.assertEqual(instance.options['size'],'XXL')
+
+		# the original value is kept for the rollback
+		self._commands_plugin._cleanup_all_non_device_commands(instance)
+		self.assertEqual(self._commands_plugin._size,'S')
+
+	def test_timings(self):
+		timings = Timings()
+		plugin = CommandsPlugin(monitors_repository,storage_factory,\
+			hardware_inventory,device_matcher,device_matcher_udev,\
+			plugin_instance_factory,None,profiles.variables.Variables(),\
+			timings)
+		instance = plugin.create_instance('test_instance',0,'',\
+			'','','',{'size':'XL'})
+		plugin._execute_all_non_device_commands(instance)
+		plugin._verify_all_non_device_commands(instance,False)
+		plugin._cleanup_all_non_device_commands(instance)
+		self.assertEqual([t[:5] for t in timings.get()],\
+			[('test_instance','apply','size','',1.0),\
+			('test_instance','verify','size','',1.0),\
+			('test_instance','unapply','size','',1.0)])
+
+	def test_verify_results(self):
+		plugin = CommandsPlugin(monitors_repository,storage_factory,\
+			hardware_inventory,device_matcher,device_matcher_udev,\
+			plugin_instance_factory,None,profiles.variables.Variables())
+		instance = plugin.create_instance('test_instance',0,'',\
+			'','','',{'size':'XL'})
+		plugin._execute_all_non_device_commands(instance)
+		plugin._verify_all_non_device_commands(instance,False)
+		self.assertEqual(plugin.get_verify_results(),\
+			[('test_instance','size','',True)])
+		events = []
+		plugin.event_notifier = lambda *args: events.append(args)
+		plugin._record_dynamic_change(instance,'level','sda')
+		plugin._record_dynamic_change(instance,'level','sda')
+		self.assertEqual(plugin.get_dynamic_changes(),\
+			[('test_instance','level','sda',2.0)])
+		self.assertEqual(events,\
+			[('dynamic_change','test_instance','sda','level')] * 2)
+		plugin._cleanup_all_non_device_commands(instance)
+
+	def test_update_options_unsupported(self):
+		instance = self._commands_plugin.create_instance('test_instance',0,'',\
+			'','','',{})
+		self.assertFalse(self._commands_plugin.supports_options_update(\
+			instance,{'custom_name':(None,'1')}))
+		self.assertFalse(self._commands_plugin.supports_options_update(\
+			instance,{'unknown':(None,'1')}))
+
 	def test_process_assignment_modifiers(self):
 		self.assertEqual(self._plugin._process_assignment_modifiers('100',None)\
 			,'100')
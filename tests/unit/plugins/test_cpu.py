@@ -0,0 +1,146 @@
+import os
+import shutil
+import struct
+import tempfile
+import unittest
+try:
+	from unittest import mock
+except ImportError:
+	import mock
+
+import tuned.consts as consts
+import tuned.hardware as hardware
+import tuned.monitors as monitors
+import tuned.plugins as plugins
+import tuned.profiles as profiles
+from tuned import storage
+from tuned.utils.commands import commands
+from tuned.plugins.plugin_cpu import CPULatencyPlugin
+
+monitors_repository = monitors.Repository()
+hardware_inventory = hardware.Inventory(set_receive_buffer_size=False)
+device_matcher = hardware.DeviceMatcher()
+device_matcher_udev = hardware.DeviceMatcherUdev()
+plugin_instance_factory = plugins.instance.Factory()
+
+class CPULatencyPluginTestCase(unittest.TestCase):
+	def setUp(self):
+		self._root = tempfile.mkdtemp()
+		commands.set_root_prefix(self._root)
+		os.makedirs(os.path.join(self._root, "dev"))
+		self._latency_file = os.path.join(self._root, consts.PATH_CPU_DMA_LATENCY.lstrip("/"))
+		open(self._latency_file, "w").close()
+		# shared by the plugins created by a test, it survives a "crash"
+		self._storage_factory = storage.Factory(storage.PickleProvider())
+		self._pressure = False
+		self._cpu_class = None
+		self._plugins = []
+
+	def tearDown(self):
+		for (plugin, instance) in self._plugins:
+			plugin._instance_cleanup(instance)
+		commands.set_root_prefix("")
+		shutil.rmtree(self._root)
+
+	def _write(self, path, value):
+		path = os.path.join(self._root, path)
+		if not os.path.isdir(os.path.dirname(path)):
+			os.makedirs(os.path.dirname(path))
+		with open(path, "w") as f:
+			f.write("%s\n" % value)
+
+	def _read(self, path):
+		with open(os.path.join(self._root, path)) as f:
+			return f.read().strip()
+
+	def _create(self, options, devices = ()):
+		plugin = CPULatencyPlugin(mock.Mock(), self._storage_factory,
+				hardware_inventory, device_matcher, device_matcher_udev,
+				plugin_instance_factory, None, profiles.variables.Variables())
+		plugin._check_arch = mock.Mock()
+		plugin._pressure_watch = mock.Mock(return_value = True)
+		plugin._under_pressure = lambda instance, resource, threshold: self._pressure
+		plugin._cpu_class = lambda instance, device: self._cpu_class
+		instance = plugin.create_instance("test", 0, None, None, None, None, options)
+		instance.assigned_devices.update(devices)
+		plugin._instance_init(instance)
+		self._plugins.append((plugin, instance))
+		plugin._instance_init_dynamic(instance)
+		return (plugin, instance)
+
+	def _latency(self):
+		with open(self._latency_file, "rb") as f:
+			data = f.read()
+		return struct.unpack("i", data[-4:])[0]
+
+	def test_pressure_latency(self):
+		(plugin, instance) = self._create({"cpu_pressure_threshold": "20",
+				"latency_low": "2", "latency_high": "1000"})
+		self.assertEqual(instance._pressure_threshold, 20)
+		plugin._instance_apply_dynamic(instance, None)
+		self.assertEqual(self._latency(), 1000)
+
+		self._pressure = True
+		plugin._instance_update_dynamic(instance, None)
+		self.assertEqual(self._latency(), 2)
+		self.assertEqual(plugin.get_dynamic_changes(), [("test", "latency", "", 1.0)])
+
+		self._pressure = False
+		plugin._instance_update_dynamic(instance, None)
+		self.assertEqual(self._latency(), 1000)
+		self.assertEqual(plugin.get_dynamic_changes(), [("test", "latency", "", 2.0)])
+
+	def _setup_cpu0(self):
+		cpufreq = "sys/devices/system/cpu/cpu0/cpufreq/"
+		self._write(cpufreq + "scaling_available_governors", "performance powersave schedutil")
+		self._write(cpufreq + "scaling_governor", "schedutil")
+		policy = "sys/devices/system/cpu/cpufreq/policy0/"
+		self._write(policy + "energy_performance_available_preferences",
+				"default performance balance_performance power")
+		self._write(policy + "energy_performance_preference", "balance_performance")
+
+	def _create_per_cpu(self):
+		# the latency is not switched dynamically
+		return self._create({"force_latency": "none", "cpu_utilization_threshold": "50",
+				"busy_governor": "performance",
+				"busy_energy_performance_preference": "performance",
+				"idle_governor": "powersave"}, ["cpu0"])
+
+	def _state(self):
+		return (self._read("sys/devices/system/cpu/cpu0/cpufreq/scaling_governor"),
+				self._read("sys/devices/system/cpu/cpufreq/policy0/energy_performance_preference"))
+
+	def _stored(self, plugin, instance):
+		return [plugin._storage_get(instance, plugin._commands[option], "cpu0")
+				for option in ["governor", "energy_performance_preference"]]
+
+	def test_per_cpu(self):
+		self._setup_cpu0()
+		(plugin, instance) = self._create_per_cpu()
+		plugin._instance_apply_dynamic(instance, "cpu0")
+		self.assertEqual(self._state(), ("schedutil", "balance_performance"))
+
+		self._cpu_class = "busy"
+		plugin._instance_update_dynamic(instance, "cpu0")
+		self.assertEqual(self._state(), ("performance", "performance"))
+		self.assertEqual(self._stored(plugin, instance), ["schedutil", "balance_performance"])
+
+		self._cpu_class = "idle"
+		plugin._instance_update_dynamic(instance, "cpu0")
+		self.assertEqual(self._state(), ("powersave", "performance"))
+		self.assertEqual(self._stored(plugin, instance), ["schedutil", "balance_performance"])
+
+		plugin._instance_unapply_dynamic(instance, "cpu0")
+		self.assertEqual(self._state(), ("schedutil", "balance_performance"))
+		self.assertEqual(self._stored(plugin, instance), [None, None])
+
+	def test_per_cpu_crash_recovery(self):
+		self._setup_cpu0()
+		(plugin, instance) = self._create_per_cpu()
+		self._cpu_class = "busy"
+		plugin._instance_apply_dynamic(instance, "cpu0")
+		self.assertEqual(self._state(), ("performance", "performance"))
+		# restarted without unapplying the tuning
+		(plugin, instance) = self._create_per_cpu()
+		self.assertEqual(self._state(), ("schedutil", "balance_performance"))
+		self.assertEqual(self._stored(plugin, instance), [None, None])
@@ -0,0 +1,40 @@
+import unittest
+import tempfile
+import shutil
+import json
+import os
+
+import tuned.version
+from tuned.plugins.manifest import Manifest
+
+class ManifestTestCase(unittest.TestCase):
+	def setUp(self):
+		self._test_dir = tempfile.mkdtemp()
+		self._path = os.path.join(self._test_dir, "manifest.json")
+
+	def tearDown(self):
+		shutil.rmtree(self._test_dir)
+
+	def _write(self, version, plugins):
+		with open(self._path, "w") as f:
+			json.dump({"version": version, "plugins": plugins}, f)
+
+	def test_generate(self):
+		plugins = Manifest(self._path).generate()
+		self.assertIn("vm", plugins)
+		self.assertIn("transparent_hugepages", plugins["vm"]["options"])
+		self.assertEqual(Manifest(self._path).get_plugin("vm"), plugins["vm"])
+
+	def test_plugin_from_manifest(self):
+		description = {"options": {"fake_option": "1"}, "hints": {}, "documentation": "doc"}
+		self._write(tuned.version.TUNED_VERSION_STR, {"vm": description})
+		manifest = Manifest(self._path)
+		self.assertEqual(manifest.get_plugin("vm"), description)
+		# plugins missing in the manifest are imported
+		self.assertIn("elevator", manifest.get_plugin("disk")["options"])
+		with self.assertRaises(ImportError):
+			manifest.get_plugin("nonexistent")
+
+	def test_outdated_manifest(self):
+		self._write("0.0.0", {"vm": {"options": {"fake_option": "1"}, "hints": {}, "documentation": ""}})
+		self.assertNotIn("fake_option", Manifest(self._path).get_plugin("vm")["options"])
@@ -0,0 +1,154 @@
+import os
+import shutil
+import tempfile
+import unittest
+try:
+	from unittest import mock
+except ImportError:
+	import mock
+
+import tuned.hardware as hardware
+import tuned.monitors as monitors
+import tuned.plugins as plugins
+import tuned.profiles as profiles
+from tuned import storage
+from tuned.utils.commands import commands
+from tuned.plugins.plugin_vm import VMPlugin
+from tuned.plugins.plugin_disk import DiskPlugin
+
+monitors_repository = monitors.Repository()
+hardware_inventory = hardware.Inventory(set_receive_buffer_size=False)
+device_matcher = hardware.DeviceMatcher()
+device_matcher_udev = hardware.DeviceMatcherUdev()
+plugin_instance_factory = plugins.instance.Factory()
+
+class PressureTestCase(unittest.TestCase):
+	"""Apply/restore transitions of the pressure driven dynamic tuning."""
+
+	def setUp(self):
+		self._root = tempfile.mkdtemp()
+		commands.set_root_prefix(self._root)
+		# shared by the plugins created by a test, it survives a "crash"
+		self._storage_factory = storage.Factory(storage.PickleProvider())
+		self._pressure = False
+
+	def tearDown(self):
+		commands.set_root_prefix("")
+		shutil.rmtree(self._root)
+
+	def _write(self, path, value):
+		path = os.path.join(self._root, path)
+		if not os.path.isdir(os.path.dirname(path)):
+			os.makedirs(os.path.dirname(path))
+		with open(path, "w") as f:
+			f.write("%s\n" % value)
+
+	def _read(self, path):
+		with open(os.path.join(self._root, path)) as f:
+			return f.read().strip()
+
+	def _create(self, plugin_class, options):
+		plugin = plugin_class(monitors_repository, self._storage_factory,
+				hardware_inventory, device_matcher, device_matcher_udev,
+				plugin_instance_factory, None, profiles.variables.Variables())
+		instance = plugin.create_instance("test", 0, None, None, None, None, options)
+		plugin._pressure_watch = mock.Mock(return_value = True)
+		plugin._under_pressure = lambda instance, resource, threshold: self._pressure
+		plugin._instance_init(instance)
+		plugin._instance_init_dynamic(instance)
+		return (plugin, instance)
+
+	def _create_vm(self):
+		return self._create(VMPlugin, {"memory_pressure_threshold": "10",
+				"pressure_dirty_bytes": "5%", "pressure_dirty_background_bytes": "4096"})
+
+	def _setup_vm(self):
+		for (option, value) in [("dirty_bytes", 0), ("dirty_ratio", 20),
+				("dirty_background_bytes", 0), ("dirty_background_ratio", 10)]:
+			self._write("proc/sys/vm/" + option, value)
+
+	def _vm_stored(self, plugin):
+		return plugin._storage.get(plugin._pressure_storage_key(plugin._instances["test"]))
+
+	def test_vm(self):
+		self._setup_vm()
+		(plugin, instance) = self._create_vm()
+		plugin._instance_apply_dynamic(instance, None)
+		self.assertEqual(self._read("proc/sys/vm/dirty_ratio"), "20")
+		self.assertIsNone(self._vm_stored(plugin))
+
+		self._pressure = True
+		plugin._instance_update_dynamic(instance, None)
+		self.assertEqual(self._read("proc/sys/vm/dirty_ratio"), "5")
+		self.assertEqual(self._read("proc/sys/vm/dirty_background_bytes"), "4096")
+		self.assertEqual(self._vm_stored(plugin)["dirty_ratio"].strip(), "20")
+
+		self._pressure = False
+		plugin._instance_update_dynamic(instance, None)
+		self.assertEqual(self._read("proc/sys/vm/dirty_ratio"), "20")
+		self.assertEqual(self._read("proc/sys/vm/dirty_background_ratio"), "10")
+		self.assertIsNone(self._vm_stored(plugin))
+
+	def test_vm_unapply(self):
+		self._setup_vm()
+		(plugin, instance) = self._create_vm()
+		self._pressure = True
+		plugin._instance_apply_dynamic(instance, None)
+		self.assertEqual(self._read("proc/sys/vm/dirty_ratio"), "5")
+		plugin._instance_unapply_dynamic(instance, None)
+		self.assertEqual(self._read("proc/sys/vm/dirty_ratio"), "20")
+		self.assertIsNone(self._vm_stored(plugin))
+
+	def test_vm_crash_recovery(self):
+		self._setup_vm()
+		(plugin, instance) = self._create_vm()
+		self._pressure = True
+		plugin._instance_apply_dynamic(instance, None)
+		self.assertEqual(self._read("proc/sys/vm/dirty_ratio"), "5")
+		# restarted without unapplying the tuning
+		self._pressure = False
+		(plugin, instance) = self._create_vm()
+		self.assertEqual(self._read("proc/sys/vm/dirty_ratio"), "20")
+		self.assertEqual(self._read("proc/sys/vm/dirty_background_ratio"), "10")
+		self.assertIsNone(self._vm_stored(plugin))
+
+	def _create_disk(self):
+		return self._create(DiskPlugin, {"io_pressure_threshold": "30",
+				"pressure_readahead": "128"})
+
+	def _disk_stored(self, plugin):
+		return plugin._storage.get(plugin._pressure_storage_key(plugin._instances["test"]))
+
+	def test_disk(self):
+		self._write("sys/block/sda/queue/read_ahead_kb", 4096)
+		(plugin, instance) = self._create_disk()
+		plugin._update_pressure_readahead(instance, "sda")
+		self.assertEqual(self._read("sys/block/sda/queue/read_ahead_kb"), "4096")
+
+		self._pressure = True
+		plugin._update_pressure_readahead(instance, "sda")
+		self.assertEqual(self._read("sys/block/sda/queue/read_ahead_kb"), "128")
+		self.assertEqual(self._disk_stored(plugin), {"sda": 4096})
+
+		self._pressure = False
+		plugin._update_pressure_readahead(instance, "sda")
+		self.assertEqual(self._read("sys/block/sda/queue/read_ahead_kb"), "4096")
+		self.assertEqual(self._disk_stored(plugin), {})
+
+		self._pressure = True
+		plugin._update_pressure_readahead(instance, "sda")
+		plugin._instance_unapply_dynamic(instance, "sda")
+		self.assertEqual(self._read("sys/block/sda/queue/read_ahead_kb"), "4096")
+		self.assertEqual(self._disk_stored(plugin), {})
+
+	def test_disk_crash_recovery(self):
+		self._write("sys/block/sda/queue/read_ahead_kb", 4096)
+		(plugin, instance) = self._create_disk()
+		self._pressure = True
+		plugin._update_pressure_readahead(instance, "sda")
+		self.assertEqual(self._read("sys/block/sda/queue/read_ahead_kb"), "128")
+		# restarted without unapplying the tuning
+		self._pressure = False
+		(plugin, instance) = self._create_disk()
+		self.assertEqual(self._read("sys/block/sda/queue/read_ahead_kb"), "4096")
+		self.assertIsNone(self._disk_stored(plugin))
@@ -0,0 +1,99 @@
+import unittest
+import tempfile
+import shutil
+import os
+
+import tuned.profiles as profiles
+from tuned.utils.commands import commands
+
+class FailingFactory(profiles.Factory):
+	def create(self, name, config):
+		raise AssertionError("profile '%s' was parsed" % name)
+
+class CacheTestCase(unittest.TestCase):
+	def setUp(self):
+		self._test_dir = tempfile.mkdtemp()
+		self._system_dir = os.path.join(self._test_dir, "system")
+		self._user_dir = os.path.join(self._test_dir, "user")
+		self._cache_file = os.path.join(self._test_dir, "cache", "profile_cache.pickle")
+		os.mkdir(self._system_dir)
+		os.mkdir(self._user_dir)
+		self._write_profile(self._system_dir, "base", "[main]\nsummary=base\n[sysctl]\nvm.swappiness=${swappiness}\n[variables]\nswappiness=10\n")
+		self._write_profile(self._system_dir, "child", "[main]\ninclude=base\n[disk]\ndevices=${f:strip: sda }\n")
+
+	def tearDown(self):
+		shutil.rmtree(self._test_dir)
+
+	def _write_profile(self, dir_name, name, content):
+		profile_dir = os.path.join(dir_name, name)
+		if not os.path.isdir(profile_dir):
+			os.mkdir(profile_dir)
+		with open(os.path.join(profile_dir, "tuned.conf"), "w") as f:
+			f.write(content)
+
+	def _loader(self, factory = None):
+		locator = profiles.Locator([self._system_dir, self._user_dir])
+		return profiles.Loader(locator, factory or profiles.Factory(), profiles.Merger(), None,
+				profiles.variables.Variables(), profiles.Cache(self._cache_file))
+
+	def test_cached_profile_used(self):
+		profile = self._loader().load("child")
+		self.assertEqual(profile.units["disk"].devices, "sda")
+		loader = self._loader(FailingFactory())
+		cached = loader.load("child")
+		self.assertEqual(cached.name, "child")
+		self.assertEqual(cached.units["disk"].devices, "sda")
+		self.assertEqual(cached.units["sysctl"].options["vm.swappiness"], "${swappiness}")
+		# variables defined by the profile are restored
+		self.assertEqual(loader._variables.expand("${swappiness}"), "10")
+
+	def test_changed_file(self):
+		self._loader().load("child")
+		self._write_profile(self._system_dir, "base", "[main]\nsummary=changed\n")
+		profile = self._loader().load("child")
+		self.assertEqual(profile.options["summary"], "changed")
+
+	def test_shadowing_profile(self):
+		self._loader().load("child")
+		self._write_profile(self._user_dir, "base", "[main]\nsummary=user\n")
+		profile = self._loader().load("child")
+		self.assertEqual(profile.options["summary"], "user")
+
+	def test_uncacheable_function(self):
+		self._write_profile(self._system_dir, "exec", "[main]\nsummary=x\n[variables]\nv=${f:exec:echo:-n:hello}\n")
+		self._loader().load("exec")
+		self.assertFalse(os.path.exists(self._cache_file))
+
+	def test_changed_function_input(self):
+		self._loader().load("child")
+		cache = profiles.Cache(self._cache_file)
+		entries = cache._load()
+		(key, (files, calls, data)), = entries.items()
+		self.assertEqual(calls, [("strip", (" sda ", ), "")])
+		entries[key] = (files, [("strip", (" sda ", ), "other")], data)
+		cache._save(entries)
+		self.assertIsNone(cache.get(key, profiles.functions.Repository()))
+
+	def test_changed_online_cpus(self):
+		online = os.path.join(self._test_dir, "sys", "devices", "system", "cpu", "online")
+		os.makedirs(os.path.dirname(online))
+		with open(online, "w") as f:
+			f.write("0-3\n")
+		self._write_profile(self._system_dir, "invert", "[main]\nsummary=x\n[variables]\n"
+				"housekeeping=${f:cpulist_invert:1-2}\nmask=${f:cpulist2hex_invert:1-2}\n"
+				"[sysctl]\nhousekeeping=${housekeeping}\nmask=${mask}\n")
+		commands.set_root_prefix(self._test_dir)
+		try:
+			loader = self._loader()
+			loader.load("invert")
+			self.assertEqual(loader._variables.expand("${housekeeping} ${mask}"), "0,3 00000009")
+			loader = self._loader(FailingFactory())
+			loader.load("invert")
+			self.assertEqual(loader._variables.expand("${housekeeping} ${mask}"), "0,3 00000009")
+			with open(online, "w") as f:
+				f.write("0-5\n")
+			loader = self._loader()
+			loader.load("invert")
+			self.assertEqual(loader._variables.expand("${housekeeping} ${mask}"), "0,3,4,5 00000039")
+		finally:
+			commands.set_root_prefix("")
@@ -0,0 +1,106 @@
+import unittest
+from unittest import mock
+import os
+import shutil
+import stat
+import tempfile
+
+import tuned.storage
+
+class StorageJournalProviderTestCase(unittest.TestCase):
+	def setUp(self):
+		self._test_dir = tempfile.mkdtemp()
+		self._path = os.path.join(self._test_dir, "run", "save.journal")
+		self._providers = []
+
+	def tearDown(self):
+		for provider in self._providers:
+			provider.close()
+		shutil.rmtree(self._test_dir)
+
+	def _provider(self, **kwargs):
+		provider = tuned.storage.JournalProvider(self._path, **kwargs)
+		self._providers.append(provider)
+		provider.load()
+		return provider
+
+	def test_memory_persistence(self):
+		provider = self._provider()
+		self.assertEqual("default", provider.get("ns1", "opt1", "default"))
+		provider.set("ns1", "opt1", "value1")
+		provider.set("ns2", "opt1", "value2")
+		provider.unset("ns1", "opt1")
+		self.assertIsNone(provider.get("ns1", "opt1"))
+		self.assertEqual("value2", provider.get("ns2", "opt1"))
+
+	def test_replay(self):
+		provider = self._provider()
+		provider.set("ns1", "opt1", "value1")
+		provider.set("ns1", "opt2", "value2")
+		provider.unset("ns1", "opt2")
+		provider.set_item("ns2", "pids", 10, ("cmd", 1))
+		provider.set_item("ns2", "pids", 20, ("cmd", 2))
+		provider.unset_item("ns2", "pids", 10)
+		# no save(), the records are already written
+		provider = self._provider()
+		self.assertEqual("value1", provider.get("ns1", "opt1"))
+		self.assertIsNone(provider.get("ns1", "opt2"))
+		self.assertEqual({20: ("cmd", 2)}, provider.get("ns2", "pids"))
+
+	def test_update_items(self):
+		provider = self._provider()
+		provider.set_item("ns", "pids", 10, ("cmd", 1))
+		provider.update_items("ns", "pids", {20: ("cmd", 2), 30: ("cmd", 3)}, [10, 40])
+		provider.update_items("ns", "pids", {}, [])
+		self.assertEqual(2, provider._records)
+		provider = self._provider()
+		self.assertEqual({20: ("cmd", 2), 30: ("cmd", 3)}, provider.get("ns", "pids"))
+
+	def test_corrupted_tail(self):
+		provider = self._provider()
+		provider.set("ns1", "opt1", "value1")
+		provider.set("ns1", "opt2", "value2")
+		provider.close()
+		size = os.path.getsize(self._path)
+		with open(self._path, "r+b") as f:
+			f.truncate(size - 3)
+		provider = self._provider()
+		self.assertEqual("value1", provider.get("ns1", "opt1"))
+		self.assertIsNone(provider.get("ns1", "opt2"))
+		provider.set("ns1", "opt3", "value3")
+		provider = self._provider()
+		self.assertEqual("value3", provider.get("ns1", "opt3"))
+
+	def test_compaction(self):
+		provider = self._provider(sync_interval = 0.01, compact_records = 10)
+		for i in range(100):
+			provider.set_item("ns", "pids", i % 5, i)
+		provider.close()
+		self.assertLess(os.path.getsize(self._path), 1000)
+		provider = self._provider()
+		self.assertEqual({0: 95, 1: 96, 2: 97, 3: 98, 4: 99}, provider.get("ns", "pids"))
+
+	def test_compaction_syncs_directory(self):
+		provider = self._provider(sync_interval = 3600, compact_records = 10)
+		synced = []
+		fsync = os.fsync
+		def record_fsync(fd):
+			synced.append(stat.S_ISDIR(os.fstat(fd).st_mode))
+			fsync(fd)
+		# the background thread may compact the journal before close()
+		with mock.patch("os.fsync", record_fsync):
+			for i in range(20):
+				provider.set("ns", "opt", i)
+			provider.close()
+		# the snapshot and the directory holding the renamed journal
+		self.assertIn(True, synced)
+		self.assertIn(False, synced)
+
+	def test_clear(self):
+		provider = self._provider()
+		provider.set("ns1", "opt1", "value1")
+		provider.clear()
+		self.assertFalse(os.path.exists(self._path))
+		self.assertIsNone(provider.get("ns1", "opt1"))
+		provider = self._provider()
+		self.assertIsNone(provider.get("ns1", "opt1"))
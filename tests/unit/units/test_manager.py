@@ -0,0 +1,256 @@
+import collections
+import unittest
+
+import tuned.consts as consts
+from tuned.profiles.unit import Unit
+from tuned.profiles.variables import Variables
+from tuned.units import Manager
+from tuned.utils.timings import Timings
+
+class DummyConfig(object):
+	def __init__(self, threads):
+		self._threads = threads
+
+	def get(self, key, default = None):
+		return default
+
+	def get_int(self, key, default = 0):
+		return self._threads
+
+class DummyPlugin(object):
+	def __init__(self, name, dependencies = None):
+		self.name = name
+		self._dependencies = dependencies or []
+
+	def get_dependencies(self):
+		return self._dependencies
+
+class DummyInstance(object):
+	def __init__(self, name, plugin, calls):
+		self.name = name
+		self.plugin = plugin
+		self._calls = calls
+
+	def apply_tuning(self):
+		self._calls.append(self.name)
+		return self.name
+
+	def verify_tuning(self, ignore_missing):
+		if self.name == "broken":
+			raise Exception("failure")
+		return True
+
+class ManagerStagesTestCase(unittest.TestCase):
+	def setUp(self):
+		self._calls = []
+		self._disk = DummyPlugin("disk")
+		self._net = DummyPlugin("net")
+		self._script = DummyPlugin("script", ["*"])
+		self._sysctl = DummyPlugin("sysctl", ["vm"])
+		self._vm = DummyPlugin("vm")
+
+	def _instance(self, name, plugin):
+		return DummyInstance(name, plugin, self._calls)
+
+	def _names(self, stages):
+		return [[[i.name for i in group] for group in stage] for stage in stages]
+
+	def test_independent_plugins_share_stage(self):
+		manager = Manager(None, None, 0, None, DummyConfig(4))
+		instances = [self._instance("disk1", self._disk),
+				self._instance("net", self._net),
+				self._instance("disk2", self._disk)]
+		self.assertEqual(self._names(manager._split_stages(instances)),
+				[[["disk1", "disk2"], ["net"]]])
+
+	def test_dependencies_keep_priority_order(self):
+		manager = Manager(None, None, 0, None, DummyConfig(4))
+		instances = [self._instance("disk", self._disk),
+				self._instance("vm", self._vm),
+				self._instance("sysctl", self._sysctl),
+				self._instance("net", self._net),
+				self._instance("script", self._script),
+				self._instance("disk2", self._disk)]
+		self.assertEqual(self._names(manager._split_stages(instances)),
+				[[["disk"], ["vm"]], [["sysctl"], ["net"]], [["script"]], [["disk2"]]])
+
+	def test_irq_plugins_conflict(self):
+		from tuned.plugins.plugin_acpi import ACPIPlugin
+		from tuned.plugins.plugin_irq import IrqPlugin
+		from tuned.plugins.plugin_irqbalance import IrqbalancePlugin
+		from tuned.plugins.plugin_net import NetTuningPlugin
+		from tuned.plugins.plugin_scheduler import SchedulerPlugin
+		manager = Manager(None, None, 0, None, DummyConfig(4))
+		plugins = dict((name, DummyPlugin(name, cls.get_dependencies())) for (name, cls) in
+				[("acpi", ACPIPlugin), ("irq", IrqPlugin), ("irqbalance", IrqbalancePlugin),
+				("net", NetTuningPlugin), ("scheduler", SchedulerPlugin)])
+		plugins["cpu"] = DummyPlugin("cpu")
+		# the net channels recreate the IRQs whose affinities the others set
+		for name in ["irq", "irqbalance", "scheduler"]:
+			self.assertTrue(manager._plugins_conflict(plugins["net"], plugins[name]), name)
+			self.assertTrue(manager._plugins_conflict(plugins[name], plugins["net"]), name)
+		# the platform profile can change the EPP
+		self.assertTrue(manager._plugins_conflict(plugins["cpu"], plugins["acpi"]))
+		self.assertFalse(manager._plugins_conflict(plugins["cpu"], plugins["net"]))
+
+	def test_call_instances(self):
+		manager = Manager(None, None, 0, None, DummyConfig(4))
+		instances = [self._instance("disk1", self._disk),
+				self._instance("net", self._net),
+				self._instance("disk2", self._disk)]
+		res = manager._call_instances("test", None, "apply_tuning", instances)
+		self.assertEqual(res, ["disk1", "net", "disk2"])
+		self.assertLess(self._calls.index("disk1"), self._calls.index("disk2"))
+
+	def test_errors_are_collected(self):
+		manager = Manager(None, None, 0, None, DummyConfig(1))
+		instances = [self._instance("broken", self._disk),
+				self._instance("net", self._net)]
+		res = manager._call_instances("test", False, "verify_tuning", instances, False)
+		self.assertEqual(res, [False, True])
+
+	def test_timings(self):
+		manager = Manager(None, None, 0, None, DummyConfig(4), Timings())
+		instances = [self._instance("broken", self._disk),
+				self._instance("net", self._net)]
+		manager._call_instances("verify_tuning", False, "verify_tuning", instances, False)
+		self.assertEqual(sorted(t[:5] for t in manager.get_timings()),
+				[("broken", "verify_tuning", "", "", 1.0), ("net", "verify_tuning", "", "", 1.0)])
+
+class DummyInventory(object):
+	def start_processing_events(self):
+		pass
+
+	def stop_processing_events(self):
+		pass
+
+class DummyRepository(object):
+	def __init__(self, calls, updatable = ()):
+		self.variables = Variables()
+		self._calls = calls
+		self._updatable = updatable
+		self._plugins = {}
+
+	def create(self, name):
+		plugin = SwitchPlugin(name, self._calls, name in self._updatable)
+		self._plugins[name] = plugin
+		return plugin
+
+	def delete(self, plugin):
+		self._calls.append(("delete", plugin.name))
+
+class SwitchInstance(object):
+	def __init__(self, name, plugin, priority, options, calls):
+		self.name = name
+		self.plugin = plugin
+		self.priority = priority
+		self.options = options
+		self.has_dynamic_tuning = False
+		self._calls = calls
+
+	def apply_tuning(self):
+		self._calls.append(("apply", self.name))
+
+	def unapply_tuning(self, rollback):
+		self._calls.append(("unapply", self.name, rollback))
+
+class SwitchPlugin(object):
+	_devices_supported = False
+
+	def __init__(self, name, calls, updatable):
+		self.name = name
+		self._calls = calls
+		self._updatable = updatable
+
+	def get_dependencies(self):
+		return []
+
+	def create_instance(self, name, priority, devices_expression, devices_udev_regex,
+			script_pre, script_post, options, update_interval = None):
+		self._calls.append(("create", name))
+		return SwitchInstance(name, self, priority, dict(options), self._calls)
+
+	def init_devices(self):
+		pass
+
+	def assign_free_devices(self, instance):
+		pass
+
+	def initialize_instance(self, instance):
+		pass
+
+	def destroy_instance(self, instance):
+		self._calls.append(("destroy", instance.name))
+
+	def supports_options_update(self, instance, changes):
+		return self._updatable
+
+	def instance_update_options(self, instance, changes, options):
+		self._calls.append(("update", instance.name, changes))
+		instance.options = dict(options)
+
+class ManagerSwitchTestCase(unittest.TestCase):
+	def setUp(self):
+		self._calls = []
+
+	def _units(self, config):
+		units = collections.OrderedDict()
+		for (name, options) in config:
+			units[name] = Unit(name, collections.OrderedDict(options))
+		return units
+
+	def _manager(self, config, updatable = ()):
+		manager = Manager(DummyRepository(self._calls, updatable), None, 50,
+				DummyInventory(), DummyConfig(1))
+		manager.create(self._units(config))
+		manager.start_tuning()
+		del self._calls[:]
+		return manager
+
+	def test_unchanged_instances_kept(self):
+		config = [("sysctl", {"vm.swappiness": "10"}), ("vm", {"transparent_hugepages": "never"})]
+		manager = self._manager(config)
+		instances = list(manager.instances)
+		manager.switch(self._units(config))
+		self.assertEqual(self._calls, [])
+		self.assertEqual(manager.instances, instances)
+
+	def test_changed_options_updated(self):
+		manager = self._manager([("sysctl", {"vm.swappiness": "10", "vm.dirty_ratio": "20"})],
+				updatable = ["sysctl"])
+		instance = manager.instances[0]
+		manager.switch(self._units([("sysctl", {"vm.swappiness": "30", "vm.dirty_ratio": "20"})]))
+		self.assertEqual(self._calls, [("update", "sysctl", {"vm.swappiness": ("10", "30")})])
+		self.assertEqual(manager.instances, [instance])
+		self.assertEqual(instance.options, {"vm.swappiness": "30", "vm.dirty_ratio": "20"})
+		# the new options are the base of the next switch
+		del self._calls[:]
+		manager.switch(self._units([("sysctl", {"vm.swappiness": "30", "vm.dirty_ratio": "20"})]))
+		self.assertEqual(self._calls, [])
+
+	def test_changed_options_recreated(self):
+		manager = self._manager([("sysctl", {"vm.swappiness": "10"})])
+		old = manager.instances[0]
+		manager.switch(self._units([("sysctl", {"vm.swappiness": "30"})]))
+		self.assertEqual(self._calls, [("unapply", "sysctl", consts.ROLLBACK_FULL),
+				("destroy", "sysctl"), ("create", "sysctl"), ("apply", "sysctl")])
+		self.assertEqual(len(manager.instances), 1)
+		self.assertIsNot(manager.instances[0], old)
+		self.assertEqual(manager.instances[0].options, {"vm.swappiness": "30"})
+
+	def test_changed_unit_attributes_recreated(self):
+		manager = self._manager([("sysctl", {"vm.swappiness": "10"})], updatable = ["sysctl"])
+		manager.switch(self._units([("sysctl", {"vm.swappiness": "10", "priority": "10"})]))
+		self.assertEqual(self._calls, [("unapply", "sysctl", consts.ROLLBACK_FULL),
+				("destroy", "sysctl"), ("create", "sysctl"), ("apply", "sysctl")])
+
+	def test_removed_and_new_units(self):
+		manager = self._manager([("sysctl", {"vm.swappiness": "10"}),
+				("vm", {"transparent_hugepages": "never"})])
+		kept = manager.instances[0]
+		manager.switch(self._units([("sysctl", {"vm.swappiness": "10"}),
+				("audio", {"timeout": "10"})]))
+		self.assertEqual(self._calls, [("unapply", "vm", consts.ROLLBACK_FULL),
+				("destroy", "vm"), ("delete", "vm"), ("create", "audio"), ("apply", "audio")])
+		self.assertEqual([i.name for i in manager.instances], ["sysctl", "audio"])
+		self.assertIs(manager.instances[0], kept)
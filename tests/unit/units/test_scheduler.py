@@ -0,0 +1,67 @@
+import unittest
+
+from tuned.units.scheduler import UpdateScheduler
+
+class FakeClock(object):
+	def __init__(self):
+		self.now = 0.0
+
+	def __call__(self):
+		return self.now
+
+class UpdateSchedulerTestCase(unittest.TestCase):
+	def setUp(self):
+		self._clock = FakeClock()
+		self._scheduler = UpdateScheduler(clock = self._clock)
+		self._calls = []
+
+	def _job(self, name):
+		return lambda: self._calls.append(name)
+
+	def test_empty(self):
+		self.assertIsNone(self._scheduler.next_deadline())
+		self.assertIsNone(self._scheduler.time_to_next())
+		self.assertEqual(self._scheduler.run_due(), 0)
+
+	def test_per_job_period(self):
+		self._scheduler.add("fast", 0.1, self._job("fast"))
+		self._scheduler.add("slow", 30, self._job("slow"))
+		self.assertAlmostEqual(self._scheduler.time_to_next(), 0.1)
+		self._clock.now = 0.1
+		self.assertEqual(self._scheduler.run_due(), 1)
+		self.assertEqual(self._calls, ["fast"])
+		self._clock.now = 30
+		self._scheduler.run_due()
+		self.assertEqual(self._calls[-1], "slow")
+		stats = self._scheduler.stats()
+		self.assertEqual(stats["slow"]["runs"], 1)
+		self.assertEqual(stats["fast"]["runs"], 2)
+		self.assertGreater(stats["fast"]["missed"], 0)
+
+	def test_order_of_simultaneous_jobs(self):
+		self._scheduler.add("instance", 10, self._job("instance"), order = 1)
+		self._scheduler.add("monitor", 10, self._job("monitor"), order = 0)
+		self._clock.now = 10
+		self._scheduler.run_due()
+		self.assertEqual(self._calls, ["monitor", "instance"])
+
+	def test_change_interval_and_remove(self):
+		self._scheduler.add("job", 10, self._job("job"))
+		self._scheduler.add("job", 5, self._job("job"))
+		self.assertAlmostEqual(self._scheduler.time_to_next(), 5)
+		self._scheduler.remove("job")
+		self.assertIsNone(self._scheduler.next_deadline())
+		self._clock.now = 10
+		self.assertEqual(self._scheduler.run_due(), 0)
+
+	def test_expedite(self):
+		self._scheduler.add("monitor", 10, self._job("monitor"), order = 0)
+		self._scheduler.add("instance", 10, self._job("instance"), order = 1)
+		self._clock.now = 2
+		self.assertFalse(self._scheduler.expedite("missing"))
+		self.assertTrue(self._scheduler.expedite("instance"))
+		self.assertEqual(self._scheduler.time_to_next(), 0)
+		self.assertEqual(self._scheduler.run_due(), 1)
+		self.assertEqual(self._calls, ["instance"])
+		# the period continues from the expedited run
+		self.assertEqual(self._scheduler.stats()["instance"]["next_due"], 10)
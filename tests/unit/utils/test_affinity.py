@@ -0,0 +1,40 @@
+import errno
+import unittest
+
+from tuned.utils.affinity import set_affinities
+
+class SetAffinitiesTestCase(unittest.TestCase):
+	def setUp(self):
+		self._masks = {1: {0, 1, 2, 3}, 2: {0, 1}, 3: {2, 3}, 5: {2}}
+		self._set = []
+
+	def _get_affinity(self, pid):
+		if pid not in self._masks:
+			raise OSError(errno.ESRCH, "No such process")
+		return self._masks[pid]
+
+	def _set_affinity(self, pid, affinity):
+		if pid == 5:
+			raise OSError(errno.EINVAL, "Invalid argument")
+		self._set.append(pid)
+		self._masks[pid] = set(affinity)
+
+	def _apply(self, targets, intersect):
+		return set_affinities(targets, intersect = intersect,
+				get_affinity = self._get_affinity, set_affinity = self._set_affinity)
+
+	def test_intersect(self):
+		summary = self._apply([(pid, [0, 1]) for pid in [1, 2, 3, 4, 5]], True)
+		self.assertEqual((summary.applied, summary.skipped, summary.vanished, summary.failed), (2, 1, 1, 1))
+		self.assertEqual(self._set, [1, 3])
+		self.assertEqual(self._masks[1], {0, 1})
+		# no intersection, the requested affinity is used
+		self.assertEqual(self._masks[3], {0, 1})
+		self.assertEqual(summary.previous, {1: {0, 1, 2, 3}, 3: {2, 3}})
+		self.assertEqual([(pid, e.errno) for (pid, e) in summary.errors], [(5, errno.EINVAL)])
+		self.assertEqual(str(summary), "applied 2, skipped 1, vanished 1, failed 1")
+
+	def test_restore(self):
+		summary = self._apply([(1, [3]), (2, [0, 1])], False)
+		self.assertEqual((summary.applied, summary.skipped), (1, 1))
+		self.assertEqual(self._masks[1], {3})
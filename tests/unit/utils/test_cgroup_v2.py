@@ -0,0 +1,70 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from tuned.utils.commands import commands
+from tuned.utils.cgroup_v2 import CpusetIsolation
+
+class CpusetIsolationTestCase(unittest.TestCase):
+	def setUp(self):
+		self._root = tempfile.mkdtemp()
+		self._cgroup = os.path.join(self._root, "sys", "fs", "cgroup")
+		self._write("cgroup.controllers", "cpuset cpu io memory pids\n")
+		self._write("cgroup.subtree_control", "cpu memory\n")
+		self._write("system.slice/cpuset.cpus", "\n")
+		self._write("user.slice/cpuset.cpus", "0-3\n")
+		commands.set_root_prefix(self._root)
+
+	def tearDown(self):
+		commands.set_root_prefix("")
+		shutil.rmtree(self._root)
+
+	def _write(self, name, data):
+		path = os.path.join(self._cgroup, name)
+		if not os.path.isdir(os.path.dirname(path)):
+			os.makedirs(os.path.dirname(path))
+		with open(path, "w") as f:
+			f.write(data)
+
+	def _read(self, name):
+		with open(os.path.join(self._cgroup, name)) as f:
+			return f.read()
+
+	def test_apply_restore(self):
+		isolation = CpusetIsolation(slices = ["system.slice", "user.slice", "machine.slice"])
+		self.assertTrue(isolation.available())
+		original = isolation.apply("0,1", "2,3")
+		self.assertEqual(original, {"subtree_control": True,
+				"slices": {"system.slice": "", "user.slice": "0-3"},
+				"partition": "tuned-isolated"})
+		self.assertEqual(self._read("system.slice/cpuset.cpus"), "0,1")
+		self.assertEqual(self._read("user.slice/cpuset.cpus"), "0,1")
+		self.assertEqual(self._read("tuned-isolated/cpuset.cpus"), "2,3")
+		self.assertEqual(self._read("tuned-isolated/cpuset.cpus.partition"), "isolated")
+		self.assertFalse(os.path.exists(os.path.join(self._cgroup, "machine.slice")))
+		checks = isolation.verify("0-1", "2-3")
+		self.assertEqual(len(checks), 4)
+		for (description, current, expected) in checks:
+			self.assertEqual(current, expected, description)
+
+		CpusetIsolation().restore(original)
+		self.assertEqual(self._read("tuned-isolated/cpuset.cpus.partition"), "member")
+		self.assertEqual(self._read("system.slice/cpuset.cpus"), "")
+		self.assertEqual(self._read("user.slice/cpuset.cpus"), "0-3")
+		self.assertEqual(self._read("cgroup.subtree_control"), "-cpuset")
+
+	def test_machine_slice_not_restricted(self):
+		# the vCPUs of the VMs are pinned to the isolated CPUs
+		self._write("machine.slice/cpuset.cpus", "\n")
+		original = CpusetIsolation(partition = None).apply("0,1", "2,3")
+		self.assertNotIn("machine.slice", original["slices"])
+		self.assertEqual(self._read("machine.slice/cpuset.cpus"), "\n")
+
+	def test_verify_mismatch(self):
+		isolation = CpusetIsolation(slices = ["user.slice"], partition = None)
+		self.assertEqual(isolation.verify("0,1", "2,3"), [("cpuset of 'user.slice'", "0-3", "0-1")])
+
+	def test_unavailable(self):
+		self._write("cgroup.controllers", "cpu io memory\n")
+		self.assertFalse(CpusetIsolation().available())
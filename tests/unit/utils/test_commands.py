@@ -104,6 +104,26 @@ class CommandsTestCase(unittest.TestCase):
 		self.assertEqual(self._commands.read_file('/bad_name','error'),\
 			'error')
 
+	def test_root_prefix(self):
+		os.makedirs(self._test_dir + '/proc/sys/vm')
+		try:
+			commands.set_root_prefix(self._test_dir)
+			self.assertEqual(self._commands.root_path('/proc/loadavg'),\
+				self._test_dir + '/proc/loadavg')
+			self.assertEqual(self._commands.root_path(self._test_dir + '/x'),\
+				self._test_dir + '/x')
+			self.assertEqual(self._commands.root_path('relative'), 'relative')
+			self.assertTrue(self._commands.write_to_file(\
+				'/proc/sys/vm/swappiness', '10'))
+			self.assertEqual(self._commands.read_file(\
+				'/proc/sys/vm/swappiness'), '10')
+		finally:
+			commands.set_root_prefix('')
+		self.assertEqual(self._commands.root_path('/proc/loadavg'),\
+			'/proc/loadavg')
+		with open(self._test_dir + '/proc/sys/vm/swappiness','r') as f:
+			self.assertEqual(f.read(),'10')
+
 	def test_rmtree(self):
 		test_tree = self._test_dir + '/one/two'
 		os.makedirs(test_tree)
@@ -0,0 +1,86 @@
+import unittest
+import tempfile
+import shutil
+import os
+
+from tuned.utils.commands import commands
+
+class FileTransactionTestCase(unittest.TestCase):
+	def setUp(self):
+		self._commands = commands()
+		self._test_dir = tempfile.mkdtemp()
+		self._file_a = os.path.join(self._test_dir, 'a')
+		self._file_b = os.path.join(self._test_dir, 'b')
+		self._other_file = os.path.join(self._test_dir, 'sub', 'c')
+		os.mkdir(os.path.dirname(self._other_file))
+		for f in [self._file_a, self._file_b, self._other_file]:
+			with open(f, 'w') as fd:
+				fd.write('0\n')
+
+	def tearDown(self):
+		shutil.rmtree(self._test_dir)
+
+	def _set(self, f, value):
+		with open(f, 'w') as fd:
+			fd.write(value)
+
+	def test_read_once(self):
+		with self._commands.transaction() as transaction:
+			self.assertEqual(self._commands.read_file(self._file_a), '0\n')
+			self._set(self._file_a, '1\n')
+			self.assertEqual(self._commands.read_file(self._file_a), '0\n')
+			self.assertEqual(transaction.stats['reads'], 1)
+			self.assertEqual(transaction.stats['cached_reads'], 1)
+		self.assertIsNone(self._commands.get_transaction())
+		self.assertEqual(self._commands.read_file(self._file_a), '1\n')
+
+	def test_failed_read_not_cached(self):
+		missing = os.path.join(self._test_dir, 'missing')
+		with self._commands.transaction():
+			self.assertEqual(self._commands.read_file(missing, 'err', no_error = True), 'err')
+			self._set(missing, 'x')
+			self.assertEqual(self._commands.read_file(missing, 'err', no_error = True), 'x')
+
+	def test_write_invalidates_directory(self):
+		with self._commands.transaction():
+			self._commands.read_file(self._file_b)
+			self._commands.read_file(self._other_file)
+			self._set(self._file_b, '2\n')
+			self._set(self._other_file, '2\n')
+			self.assertTrue(self._commands.write_to_file(self._file_a, '1'))
+			self.assertEqual(self._commands.read_file(self._file_a), '1')
+			self.assertEqual(self._commands.read_file(self._file_b), '2\n')
+			self.assertEqual(self._commands.read_file(self._other_file), '0\n')
+
+	def test_ignore_same(self):
+		with self._commands.transaction() as transaction:
+			self._commands.read_file(self._file_a)
+			self.assertTrue(self._commands.write_to_file(self._file_a, '0', ignore_same = True))
+			self.assertEqual(transaction.stats['reads'], 1)
+			self.assertEqual(transaction.stats['writes'], 0)
+			self.assertEqual(transaction.stats['skipped_writes'], 1)
+			self.assertTrue(self._commands.write_to_file(self._file_a, '5', ignore_same = True))
+			self.assertTrue(self._commands.write_to_file(self._file_a, '5', ignore_same = True))
+			self.assertEqual(transaction.stats['writes'], 1)
+			self.assertEqual(transaction.stats['skipped_writes'], 2)
+		with open(self._file_a) as f:
+			self.assertEqual(f.read(), '5')
+
+	def test_deferred(self):
+		written = []
+		write_to_file = self._commands._write_to_file
+		def record(f, data, *args):
+			written.append((f, data))
+			return write_to_file(f, data, *args)
+		self._commands._write_to_file = record
+		with self._commands.transaction(deferred = True):
+			self.assertTrue(self._commands.write_to_file(self._file_b, '1'))
+			self.assertTrue(self._commands.write_to_file(self._file_a, '1'))
+			self.assertTrue(self._commands.write_to_file(self._file_b, '2'))
+			self.assertEqual(self._commands.read_file(self._file_b), '2')
+			with self._commands.transaction():
+				pass
+			self.assertEqual(written, [])
+		self.assertEqual(written, [(self._file_a, '1'), (self._file_b, '2')])
+		with open(self._file_b) as f:
+			self.assertEqual(f.read(), '2')
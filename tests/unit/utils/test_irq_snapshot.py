@@ -0,0 +1,68 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from tuned.utils import irq_snapshot
+
+INTERRUPTS = """           CPU0       CPU1       CPU2       CPU3
+  0:         30          0          0          0  IO-APIC   2-edge      timer
+  9:          0          4          0          0  IO-APIC   9-fasteoi   acpi
+ 24:        100        200          0          0  PCI-MSIX-0000:01:00.0 0-edge      eth0-TxRx-0
+NMI:          0          0          0          0   Non-maskable interrupts
+"""
+
+class IrqSnapshotTestCase(unittest.TestCase):
+	def setUp(self):
+		self._dir = tempfile.mkdtemp()
+		self._add_irq("0", "0-3", "0")
+		self._add_irq("9", "0,2", None)
+		self._add_irq("24", "1", "1")
+		# no handler, not in /proc/interrupts
+		self._add_irq("30", "0-3", None)
+		with open(os.path.join(self._dir, "irq", "default_smp_affinity"), "w") as f:
+			f.write("f\n")
+		with open(os.path.join(self._dir, "interrupts"), "w") as f:
+			f.write(INTERRUPTS)
+
+	def tearDown(self):
+		shutil.rmtree(self._dir)
+
+	def _add_irq(self, irq, affinity, effective):
+		path = os.path.join(self._dir, "irq", irq)
+		os.makedirs(path)
+		with open(os.path.join(path, "smp_affinity_list"), "w") as f:
+			f.write(affinity + "\n")
+		if effective is not None:
+			with open(os.path.join(path, "effective_affinity_list"), "w") as f:
+				f.write(effective + "\n")
+
+	def test_masks(self):
+		self.assertEqual(irq_snapshot.cpulist_to_mask("0-3,8\n"), 0x10f)
+		self.assertEqual(irq_snapshot.cpulist_to_mask(""), 0)
+		self.assertEqual(irq_snapshot.mask_to_cpulist(0x10f), "0-3,8")
+		self.assertEqual(irq_snapshot.mask_to_cpus(0x5), [0, 2])
+		self.assertEqual(irq_snapshot.cpus_to_mask([0, "2"]), 0x5)
+
+	def test_read(self):
+		snapshot = irq_snapshot.IrqSnapshot.read(self._dir)
+		self.assertEqual(snapshot.affinity, {"0": 0xf, "9": 0x5, "24": 0x2, "30": 0xf})
+		self.assertEqual(snapshot.effective, {"0": 0x1, "24": 0x2})
+		self.assertEqual(snapshot.default, 0xf)
+		self.assertEqual(snapshot.owners["24"], "PCI-MSIX-0000:01:00.0 0-edge eth0-TxRx-0")
+		self.assertEqual(sorted(snapshot.active_irqs(), key = int), ["0", "9", "24"])
+
+	def test_diff(self):
+		snapshot = irq_snapshot.IrqSnapshot.read(self._dir)
+		self.assertEqual(snapshot.diff(0x3, intersect = True, irqs = snapshot.active_irqs()),
+				{"0": 0x3, "9": 0x1})
+		self.assertEqual(snapshot.diff(0x3), {"0": 0x3, "9": 0x3, "24": 0x3, "30": 0x3})
+
+	def test_verify(self):
+		snapshot = irq_snapshot.IrqSnapshot.read(self._dir)
+		report = snapshot.verify(0x3, irqs = snapshot.active_irqs(), skip = ["9"])
+		self.assertFalse(report)
+		self.assertEqual(report.passed, ["24"])
+		self.assertEqual(report.failed, [("0", 0xf, 0x3)])
+		self.assertEqual(report.skipped, ["9"])
+		self.assertTrue(snapshot.verify(0xf, subset = False, irqs = ["0", "30"]))
@@ -0,0 +1,15 @@
+import unittest
+import sys
+
+from tuned.utils.lazy_import import lazy_import
+
+class LazyImportTestCase(unittest.TestCase):
+	def test_lazy_import(self):
+		sys.modules.pop("colorsys", None)
+		module = lazy_import("colorsys")
+		self.assertIs(sys.modules["colorsys"], module)
+		self.assertEqual(module.rgb_to_hsv(0.0, 0.0, 0.0), (0.0, 0.0, 0.0))
+
+	def test_missing_module(self):
+		with self.assertRaises(ImportError):
+			lazy_import("tuned_nonexistent_module")
@@ -0,0 +1,48 @@
+import unittest
+
+from tuned.utils.pid_batch import PidBatch
+
+class PidBatchTestCase(unittest.TestCase):
+	def test_dedup(self):
+		batch = PidBatch()
+		batch.add(10)
+		batch.add(11)
+		batch.add(10)
+		self.assertEqual(batch.new_pids, [10, 11])
+		self.assertEqual(batch.exited_pids, [])
+		self.assertEqual(len(batch), 3)
+		self.assertIsNotNone(batch.started)
+
+	def test_exited_before_tuning(self):
+		batch = PidBatch()
+		batch.add(10)
+		batch.exit(10)
+		batch.exit(12)
+		self.assertEqual(batch.new_pids, [])
+		self.assertEqual(sorted(batch.exited_pids), [10, 12])
+		self.assertEqual(batch.skipped, 1)
+
+	def test_reused_pid(self):
+		batch = PidBatch()
+		batch.exit(10)
+		batch.add(10)
+		self.assertEqual(batch.new_pids, [10])
+		self.assertEqual(batch.exited_pids, [10])
+		self.assertEqual(batch.skipped, 0)
+
+	def test_limit(self):
+		batch = PidBatch(limit = 3)
+		batch.add(1)
+		batch.add(1)
+		batch.exit(2)
+		self.assertFalse(batch.full())
+		self.assertEqual(batch.remaining(), 1)
+		batch.add(3)
+		self.assertTrue(batch.full())
+		self.assertEqual(batch.remaining(), 0)
+		batch.clear()
+		self.assertFalse(batch.full())
+		self.assertEqual(batch.remaining(), 3)
+		self.assertEqual(len(batch), 0)
+		self.assertIsNone(batch.started)
+		self.assertEqual(batch.new_pids, [])
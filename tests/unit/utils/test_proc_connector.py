@@ -0,0 +1,27 @@
+import struct
+import unittest
+
+from tuned.utils import proc_connector
+
+def message(what, data):
+	payload = struct.pack("=IIQ", what, 0, 0) + data
+	cn_msg = struct.pack("=IIIIHH", proc_connector.CN_IDX_PROC,
+			proc_connector.CN_VAL_PROC, 0, 0, len(payload), 0) + payload
+	msg = struct.pack("=IHHII", 16 + len(cn_msg), proc_connector.NLMSG_DONE, 0, 0, 0) + cn_msg
+	return msg + b"\0" * (-len(msg) % 4)
+
+class ProcConnectorTestCase(unittest.TestCase):
+	def test_parse_events(self):
+		data = message(proc_connector.PROC_EVENT_FORK, struct.pack("=IIII", 1, 1, 11, 10)) \
+				+ message(proc_connector.PROC_EVENT_COMM, struct.pack("=II", 11, 10) + b"worker\0".ljust(16, b"\0")) \
+				+ message(0x00000004, struct.pack("=IIII", 11, 10, 0, 0)) \
+				+ message(proc_connector.PROC_EVENT_EXIT, struct.pack("=IIII", 11, 10, 0, 17))
+		self.assertEqual(proc_connector.parse_events(data),
+				[(proc_connector.PROC_EVENT_FORK, 11, 10),
+				(proc_connector.PROC_EVENT_COMM, 11, 10),
+				(proc_connector.PROC_EVENT_EXIT, 11, 10)])
+
+	def test_parse_truncated(self):
+		data = message(proc_connector.PROC_EVENT_EXEC, struct.pack("=II", 5, 5))
+		self.assertEqual(proc_connector.parse_events(data[:-8]), [])
+		self.assertEqual(proc_connector.parse_events(b""), [])
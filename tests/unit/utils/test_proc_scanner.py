@@ -0,0 +1,84 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from tuned.utils import proc_scanner
+
+class ProcScannerTestCase(unittest.TestCase):
+	def setUp(self):
+		self._dir = tempfile.mkdtemp()
+		self._add_task(1, 1, "systemd", 0x400100, b"/usr/lib/systemd/systemd\0--switched-root\0")
+		self._add_task(1, 2, "sd (worker)", 0x400040, None)
+		self._add_task(10, 10, "kworker/0:1", 0x04208060, b"")
+		os.makedirs(os.path.join(self._dir, "self"))
+
+	def tearDown(self):
+		shutil.rmtree(self._dir)
+
+	def _add_task(self, pid, tid, comm, flags, cmdline, starttime = 100):
+		paths = [os.path.join(self._dir, str(pid), "task", str(tid))]
+		if pid == tid:
+			paths.append(os.path.join(self._dir, str(pid)))
+		stat = "%d (%s) S 0 1 1 0 -1 %d 0 0 0 0 0 0 0 0 20 0 1 0 %d 0\n" % (tid, comm, flags, starttime)
+		for path in paths:
+			os.makedirs(path, exist_ok = True)
+			with open(os.path.join(path, "stat"), "w") as f:
+				f.write(stat)
+			if cmdline is not None:
+				with open(os.path.join(path, "cmdline"), "wb") as f:
+					f.write(cmdline)
+			with open(os.path.join(path, "cgroup"), "w") as f:
+				f.write("1:cpuset:/\n0::/system.slice\n")
+
+	def test_scan(self):
+		tasks = sorted(proc_scanner.scan(self._dir), key = lambda t: t.pid)
+		self.assertEqual([t.pid for t in tasks], [1, 2, 10])
+		(init, thread, kthread) = tasks
+		self.assertIs(thread.process, init)
+		self.assertIs(init.process, init)
+		self.assertEqual(thread.comm, "sd (worker)")
+		self.assertEqual(thread.state, "S")
+		# the thread shares the command line of its process
+		self.assertEqual(thread.cmdline, "/usr/lib/systemd/systemd --switched-root")
+		self.assertFalse(init.is_kthread)
+		self.assertTrue(kthread.is_kthread)
+		self.assertTrue(kthread.is_bound_to_cpu)
+		self.assertEqual(kthread.cmdline, "kworker/0:1")
+		self.assertEqual(init.cgroups, "0::/system.slice,1:cpuset:/")
+		self.assertEqual(init.starttime, 100)
+
+	def test_scan_processes(self):
+		self.assertEqual(sorted(t.pid for t in proc_scanner.scan(self._dir, threads = False)), [1, 10])
+
+	def test_vanished(self):
+		task = proc_scanner.Task(99, self._dir)
+		self.assertRaises((OSError, IOError), lambda: task.comm)
+
+	def test_cache(self):
+		cache = proc_scanner.TaskCache(size = 3)
+		tasks = list(proc_scanner.scan(self._dir))
+		infos = dict((task.pid, cache.get(task)) for task in tasks)
+		self.assertEqual((cache.hits, cache.misses), (1, 3))
+		self.assertIs(infos[2].process, infos[1])
+		# the command line is read once, the stat on every lookup
+		self.assertEqual(infos[2].cmdline, "/usr/lib/systemd/systemd --switched-root")
+		os.unlink(os.path.join(self._dir, "1", "cmdline"))
+		info = cache.get(proc_scanner.Task(1, self._dir))
+		self.assertIs(info, infos[1])
+		self.assertEqual(info.cmdline, "/usr/lib/systemd/systemd --switched-root")
+		# the PID was reused
+		self._add_task(1, 1, "bash", 0x400100, b"bash\0", starttime = 200)
+		info = cache.get(proc_scanner.Task(1, self._dir))
+		self.assertIsNot(info, infos[1])
+		self.assertEqual((info.comm, info.cmdline, info.starttime), ("bash", "bash", 200))
+		cache.invalidate(1)
+		self.assertIsNone(cache.peek(1))
+
+	def test_cache_eviction(self):
+		cache = proc_scanner.TaskCache(size = 1)
+		cache.get(proc_scanner.Task(1, self._dir))
+		cache.get(proc_scanner.Task(10, self._dir))
+		self.assertEqual(len(cache), 1)
+		self.assertIsNone(cache.peek(1))
+		self.assertIsNotNone(cache.peek(10))
@@ -0,0 +1,46 @@
+import unittest
+import struct
+
+from tuned.utils import rtnetlink
+
+def rtattr(attr_type, data):
+	attr = struct.pack("=HH", 4 + len(data), attr_type) + data
+	return attr + b"\0" * (-len(attr) % 4)
+
+def nlmsg(msg_type, payload, seq = 1):
+	return struct.pack("=IHHII", 16 + len(payload), msg_type, 2, seq, 0) + payload
+
+def newlink(name, stats, attr_type = rtnetlink.IFLA_STATS64, fmt = "=4Q"):
+	payload = struct.pack("=BxHiII", 0, 1, 2, 0, 0)
+	payload += rtattr(rtnetlink.IFLA_IFNAME, name.encode() + b"\0")
+	payload += rtattr(attr_type, struct.pack(fmt, *stats) + b"\0" * 8)
+	return nlmsg(rtnetlink.RTM_NEWLINK, payload)
+
+class FakeSocket(object):
+	def __init__(self, messages):
+		self.messages = list(messages)
+		self.sent = []
+
+	def sendto(self, data, address):
+		self.sent.append(data)
+
+	def recv(self, size):
+		return self.messages.pop(0)
+
+class RtnetlinkTestCase(unittest.TestCase):
+	def test_link_stats(self):
+		sock = FakeSocket([
+			newlink("eth0", (1, 2, 3, 4)) + newlink("eth1", (5, 6, 7, 8), rtnetlink.IFLA_STATS, "=4I"),
+			nlmsg(rtnetlink.NLMSG_DONE, struct.pack("=i", 0)),
+		])
+		stats = rtnetlink.link_stats(sock)
+		# (rx_bytes, rx_packets, tx_bytes, tx_packets)
+		self.assertEqual(stats, {"eth0": (3, 1, 4, 2), "eth1": (7, 5, 8, 6)})
+		(length, msg_type, flags, seq, pid) = struct.unpack_from("=IHHII", sock.sent[0])
+		self.assertEqual(msg_type, rtnetlink.RTM_GETLINK)
+		self.assertEqual(flags, rtnetlink.NLM_F_REQUEST | rtnetlink.NLM_F_DUMP)
+
+	def test_error(self):
+		sock = FakeSocket([nlmsg(rtnetlink.NLMSG_ERROR, struct.pack("=i", -1) + b"\0" * 16)])
+		with self.assertRaises(OSError):
+			rtnetlink.link_stats(sock)
@@ -0,0 +1,56 @@
+import re
+import unittest
+
+from tuned.utils.rule_matcher import RuleMatcher
+
+class RuleMatcherTestCase(unittest.TestCase):
+	def test_last_rule_wins(self):
+		matcher = RuleMatcher([(r"\[.*\]$", "kthreads"), (r"\[watchdog.*\]", "watchdog"),
+				(r"java", "java")])
+		self.assertEqual(matcher.match("[ksoftirqd/0]"), "kthreads")
+		self.assertEqual(matcher.match("[watchdog/1]"), "watchdog")
+		self.assertEqual(matcher.match("/usr/bin/java -jar x"), "java")
+		# the match position does not matter, only the order of the rules
+		self.assertEqual(matcher.match("java [watchdog]"), "java")
+		self.assertIsNone(matcher.match("bash"))
+		self.assertIsNone(matcher.match(None))
+
+	def test_equal_to_search(self):
+		rules = [(r"^a", 1), (r"(b+)c", 2), (r"(?P<x>d)$", 3), (r"^$", 4), (r"\bfoo", 5)]
+		matcher = RuleMatcher(rules)
+		for s in ["a", "abc", "xbbc", "ad", "", "x foo", "afoo", "bbc d", "a\nbc"]:
+			expected = None
+			for (regex, value) in rules:
+				if re.search(regex, s):
+					expected = value
+			self.assertEqual(matcher.match(s), expected, s)
+
+	def test_not_combinable(self):
+		# backreference and a global inline flag are searched one by one
+		matcher = RuleMatcher([(r"(a)\1", "double"), (r"(?i)JAVA", "java")])
+		self.assertEqual(matcher.match("xaa"), "double")
+		self.assertEqual(matcher.match("aa java"), "java")
+		self.assertIsNone(matcher.match("a"))
+
+	def test_global_flags(self):
+		# the flag must not leak to the other rules on any Python version
+		matcher = RuleMatcher([(r"java", "java"), (r"(?i)FOO", "foo"), (r"(?i:BAR)", "bar")])
+		self.assertIsNone(matcher._combined)
+		self.assertIsNone(matcher.match("JAVA"))
+		self.assertEqual(matcher.match("java"), "java")
+		self.assertEqual(matcher.match("java foo"), "foo")
+		# scoped flags can be combined
+		matcher = RuleMatcher([(r"java", "java"), (r"(?i:BAR)", "bar")])
+		self.assertIsNotNone(matcher._combined)
+		self.assertIsNone(matcher.match("JAVA"))
+		self.assertEqual(matcher.match("java bar"), "bar")
+
+	def test_cache(self):
+		matcher = RuleMatcher([(r"a", 1)], cache_size = 2)
+		for s in ["a", "b", "ca", "a"]:
+			matcher.match(s)
+		self.assertLessEqual(len(matcher._cache), 2)
+		self.assertEqual(matcher.match("ca"), 1)
+
+	def test_invalid(self):
+		self.assertRaises(re.error, RuleMatcher, [(r"(", 1)])
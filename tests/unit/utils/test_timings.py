@@ -0,0 +1,31 @@
+import unittest
+
+from tuned.utils.timings import Timings
+
+class TimingsTestCase(unittest.TestCase):
+	def setUp(self):
+		self._time = 0.0
+		self._timings = Timings(max_entries = 2, clock = lambda: self._time)
+
+	def test_measure(self):
+		with self._timings.measure("cpu", "apply", "governor"):
+			self._time += 2.0
+		with self._timings.measure("cpu", "apply", "governor"):
+			self._time += 1.0
+		self.assertEqual(self._timings.get(),
+				[("cpu", "apply", "governor", "", 2.0, 3.0, 2.0, 1.0)])
+
+	def test_measure_exception(self):
+		with self.assertRaises(ValueError):
+			with self._timings.measure("cpu", "apply"):
+				self._time += 1.0
+				raise ValueError()
+		self.assertEqual(self._timings.get(), [("cpu", "apply", "", "", 1.0, 1.0, 1.0, 1.0)])
+
+	def test_bounded(self):
+		self._timings.record("disk", "apply", "readahead", "sda", 1.0)
+		self._timings.record("disk", "apply", "readahead", "sdb", 1.0)
+		# the least recently updated entry is dropped
+		self._timings.record("disk", "apply", "readahead", "sda", 1.0)
+		self._timings.record("disk", "apply", "readahead", "sdc", 1.0)
+		self.assertEqual([t[3] for t in self._timings.get()], ["sda", "sdc"])
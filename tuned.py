@@ -78,13 +78,20 @@ if __name__ == "__main__":
 				or not config.get_bool(consts.CFG_ENABLE_UNIX_SOCKET, consts.CFG_DEF_ENABLE_UNIX_SOCKET):
 			args.no_socket = True
 
+		# the metrics are served only by the daemon and if enabled in config
+		enable_metrics = config.get(consts.CFG_DAEMON, consts.CFG_DEF_DAEMON) \
+				and config.get_bool(consts.CFG_ENABLE_METRICS, consts.CFG_DEF_ENABLE_METRICS)
+
 		if not args.no_dbus:
 			app.attach_to_dbus(consts.DBUS_BUS, consts.DBUS_OBJECT, consts.DBUS_INTERFACE, consts.NAMESPACE)
 
 		if not args.no_socket:
 			app.attach_to_unix_socket()
 
-		if not args.no_dbus or not args.no_socket:
+		if enable_metrics:
+			app.attach_to_metrics()
+
+		if not args.no_dbus or not args.no_socket or enable_metrics:
 			app.register_controller()
 
 		# always write PID file
@@ -17,9 +17,11 @@ DBUS_INTERFACE = "com.redhat.tuned.control"
 DBUS_OBJECT = "/Tuned"
 DEFAULT_PROFILE = "balanced"
 DEFAULT_STORAGE_FILE = "/run/tuned/save.pickle"
+DEFAULT_STORAGE_JOURNAL_FILE = "/run/tuned/save.journal"
 USER_PROFILES_DIR = "/etc/tuned/profiles"
 SYSTEM_PROFILES_DIR = "/usr/lib/tuned/profiles"
 PERSISTENT_STORAGE_DIR = "/var/lib/tuned"
+PROFILE_CACHE_FILE = "/var/lib/tuned/profile_cache.pickle"
 PLUGIN_MAIN_UNIT_NAME = "main"
 PLUGIN_VARIABLES_UNIT_NAME = "variables"
 # Magic section header because ConfigParser does not support "headerless" config
@@ -57,6 +59,12 @@ CGROUP_CLEANUP_TASKS_RETRY = 10
 PROCFS_MOUNT_POINT = "/proc"
 DEF_CGROUP_MOUNT_POINT = "/sys/fs/cgroup/cpuset"
 DEF_CGROUP_MODE = 0o770
+DEF_CGROUP_V2_MOUNT_POINT = "/sys/fs/cgroup"
+# top-level cgroups restricted to the housekeeping CPUs by the cgroup v2 isolation,
+# machine.slice is left out, the vCPUs of the VMs are pinned to the isolated CPUs
+DEF_CGROUP_V2_SLICES = ["init.scope", "system.slice", "user.slice"]
+# cgroup holding the partition of the isolated CPUs
+CGROUP_V2_ISOLATED_GROUP = "tuned-isolated"
 
 # systemd paths used by multiple plugins
 SYSTEMD_CFG_PATH = "/etc/systemd"
@@ -153,6 +161,14 @@ CFG_CPU_EPP_FLAG = "hwp_epp"
 CFG_ROLLBACK = "rollback"
 CFG_PROFILE_DIRS = "profile_dirs"
 CFG_STARTUP_UDEV_SETTLE_WAIT = "startup_udev_settle_wait"
+CFG_DIFFERENTIAL_SWITCH = "differential_switch"
+CFG_TUNING_THREADS = "tuning_threads"
+CFG_PROFILE_CACHE = "profile_cache"
+CFG_STORAGE_JOURNAL = "storage_journal"
+CFG_ENABLE_METRICS = "enable_metrics"
+CFG_METRICS_ADDRESS = "metrics_address"
+CFG_METRICS_PERMISSIONS = "metrics_permissions"
+CFG_METRICS_VERIFY_INTERVAL = "metrics_verify_interval"
 
 # no_daemon mode
 CFG_DEF_DAEMON = True
@@ -208,6 +224,28 @@ CFG_DEF_ROLLBACK = "auto"
 CFG_DEF_PROFILE_DIRS = [SYSTEM_PROFILES_DIR, USER_PROFILES_DIR]
 # default startup udev settle wait
 CFG_DEF_STARTUP_UDEV_SETTLE_WAIT = 0
+# keep instances unchanged by the profile switch applied
+CFG_DEF_DIFFERENTIAL_SWITCH = True
+CFG_FUNC_DIFFERENTIAL_SWITCH = "getboolean"
+# number of threads processing independent plugin instances, 0 means automatic
+CFG_DEF_TUNING_THREADS = 0
+CFG_FUNC_TUNING_THREADS = "getint"
+# cache loaded profiles on disk
+CFG_DEF_PROFILE_CACHE = True
+CFG_FUNC_PROFILE_CACHE = "getboolean"
+# persist the rollback data in a journal
+CFG_DEF_STORAGE_JOURNAL = True
+CFG_FUNC_STORAGE_JOURNAL = "getboolean"
+# serve OpenMetrics text with the daemon state, disabled by default
+CFG_DEF_ENABLE_METRICS = False
+CFG_FUNC_ENABLE_METRICS = "getboolean"
+# Unix socket path (absolute) or TCP address (host:port) of the metrics
+CFG_DEF_METRICS_ADDRESS = "/run/tuned/metrics.sock"
+# permissions of the metrics Unix socket
+CFG_DEF_METRICS_PERMISSIONS = "0o600"
+# verify the profile for the metrics at most once per this number of seconds, 0 disables it
+CFG_DEF_METRICS_VERIFY_INTERVAL = 300
+CFG_FUNC_METRICS_VERIFY_INTERVAL = "getint"
 
 PATH_CPU_DMA_LATENCY = "/dev/cpu_dma_latency"
 
@@ -216,6 +254,16 @@ PROFILE_ATTR_SUMMARY = "summary"
 PROFILE_ATTR_DESCRIPTION = "description"
 
 SIGNAL_PROFILE_CHANGED = "profile_changed"
+SIGNAL_TUNING_EVENT = "tuning_event"
+SIGNALS = [SIGNAL_PROFILE_CHANGED, SIGNAL_TUNING_EVENT]
+
+# events sent by the tuning_event signal
+EVENT_INSTANCE_CREATED = "instance_created"
+EVENT_INSTANCE_DESTROYED = "instance_destroyed"
+EVENT_DEVICE_ASSIGNED = "device_assigned"
+EVENT_DEVICE_RELEASED = "device_released"
+EVENT_DYNAMIC_CHANGE = "dynamic_change"
+EVENT_VERIFY_FAILED = "verify_failed"
 
 STR_HINT_REBOOT = "you need to reboot for changes to take effect"
 
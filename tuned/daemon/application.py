@@ -11,6 +11,7 @@ import select
 import struct
 import tuned.consts as consts
 from tuned.utils.global_config import GlobalConfig
+from tuned.utils.timings import Timings
 
 log = tuned.logs.get()
 
@@ -23,11 +24,17 @@ class Application(object):
 		log.info("TuneD: %s, kernel: %s" % (tuned.version.TUNED_VERSION_STR, os.uname()[2]))
 		self._dbus_exporter = None
 		self._unix_socket_exporter = None
-
-		storage_provider = storage.PickleProvider()
-		storage_factory = storage.Factory(storage_provider)
+		self._metrics_exporter = None
 
 		self.config = GlobalConfig() if config is None else config
+
+		if self.config.get_bool(consts.CFG_STORAGE_JOURNAL):
+			self._storage_provider = storage.JournalProvider()
+			self._storage_provider.load()
+		else:
+			self._storage_provider = storage.PickleProvider()
+		storage_factory = storage.Factory(self._storage_provider)
+
 		if self.config.get_bool(consts.CFG_DYNAMIC_TUNING):
 			log.info("dynamic tuning is enabled (can be overridden in plugins)")
 		else:
@@ -40,18 +47,22 @@ class Application(object):
 		device_matcher_udev = hardware.DeviceMatcherUdev()
 		plugin_instance_factory = plugins.instance.Factory()
 		self.variables = profiles.variables.Variables()
+		timings = Timings()
 
 		plugins_repository = plugins.Repository(monitors_repository, storage_factory, hardware_inventory,\
-			device_matcher, device_matcher_udev, plugin_instance_factory, self.config, self.variables)
+			device_matcher, device_matcher_udev, plugin_instance_factory, self.config, self.variables, timings)
 		def_instance_priority = int(self.config.get(consts.CFG_DEFAULT_INSTANCE_PRIORITY, consts.CFG_DEF_DEFAULT_INSTANCE_PRIORITY))
 		unit_manager = units.Manager(
 				plugins_repository, monitors_repository,
-				def_instance_priority, hardware_inventory, self.config)
+				def_instance_priority, hardware_inventory, self.config, timings)
 
 		profile_factory = profiles.Factory()
 		profile_merger = profiles.Merger()
 		profile_locator = profiles.Locator(self.config.get_list(consts.CFG_PROFILE_DIRS, consts.CFG_DEF_PROFILE_DIRS))
-		profile_loader = profiles.Loader(profile_locator, profile_factory, profile_merger, self.config, self.variables)
+		profile_cache = None
+		if self.config.get_bool(consts.CFG_PROFILE_CACHE):
+			profile_cache = profiles.Cache(consts.PROFILE_CACHE_FILE)
+		profile_loader = profiles.Loader(profile_locator, profile_factory, profile_merger, self.config, self.variables, profile_cache)
 
 		self._daemon = daemon.Daemon(unit_manager, profile_loader, profile_name, self.config, self)
 		self._controller = controller.Controller(self._daemon, self.config)
@@ -89,6 +100,15 @@ class Application(object):
 																			self.config.get_int(consts.CFG_UNIX_SOCKET_CONNECTIONS_BACKLOG))
 		exports.register_exporter(self._unix_socket_exporter)
 
+	def attach_to_metrics(self):
+		if self._metrics_exporter is not None:
+			raise TunedException("Metrics interface is already initialized.")
+
+		self._metrics_exporter = exports.metrics.MetricsExporter(self.config.get(consts.CFG_METRICS_ADDRESS),
+				self.config.get_int(consts.CFG_METRICS_PERMISSIONS),
+				self.config.get_int(consts.CFG_METRICS_VERIFY_INTERVAL))
+		exports.register_exporter(self._metrics_exporter)
+
 	def register_controller(self):
 		exports.register_object(self._controller)
 
@@ -219,4 +239,8 @@ class Application(object):
 		if self._pid_file is not None:
 			self._delete_pid_file()
 
+		# the journal keeps the rollback data for the next start, the
+		# other providers only hold them in memory
+		if isinstance(self._storage_provider, storage.JournalProvider):
+			self._storage_provider.close()
 		return result
@@ -6,8 +6,10 @@ import threading
 import tuned.consts as consts
 from tuned.utils.commands import commands
 from tuned.plugins import hotplug
-import pyudev
 import time
+from tuned.utils.lazy_import import lazy_import
+
+pyudev = lazy_import("pyudev")
 
 __all__ = ["Controller"]
 
@@ -115,6 +117,18 @@ class Controller(tuned.exports.interfaces.ExportableInterface):
 	def profile_changed(self, profile_name, result, errstr):
 		pass
 
+	@exports.signal("ssss")
+	def tuning_event(self, event, instance_name, device, detail):
+		"""Event of the tuning
+
+		event is one of instance_created, instance_destroyed (detail is
+		the plugin name), device_assigned, device_released (of a hotplugged
+		device), dynamic_change (detail names what was changed, e.g. level)
+		and verify_failed (detail is the option name), device is empty if
+		the event is not related to a device
+		"""
+		pass
+
 	# exports decorator checks the authorization (currently through polkit), caller is None if
 	# no authorization was performed (i.e. the call should process as authorized), string
 	# identifying caller (with DBus it's the caller bus name) if authorized and empty
@@ -183,6 +197,7 @@ class Controller(tuned.exports.interfaces.ExportableInterface):
 			self._daemon.reload_profile_config()
 		except TunedException as e:
 			log.error("Failed to reload TuneD: %s" % e)
+			self._daemon.abort_profile_switch()
 			return False
 		return self.start()
 
@@ -325,14 +340,7 @@ class Controller(tuned.exports.interfaces.ExportableInterface):
 		"""
 		if caller == "":
 			return {}
-		plugins = {}
-		for plugin_class in self._daemon.get_all_plugins():
-			plugin_name = plugin_class.__module__.split(".")[-1].split("_", 1)[1]
-			conf_options = plugin_class._get_config_options()
-			plugins[plugin_name] = {}
-			for key, val in conf_options.items():
-				plugins[plugin_name][key] = str(val)
-		return plugins
+		return self._daemon.get_all_plugins()
 
 	@exports.export("s","s")
 	def get_plugin_documentation(self, plugin_name, caller = None):
@@ -355,6 +363,96 @@ class Controller(tuned.exports.interfaces.ExportableInterface):
 			return {}
 		return self._daemon.get_plugin_hints(str(plugin_name))
 
+	@exports.export("", "a{sa{sd}}")
+	def get_update_stats(self, caller = None):
+		"""Return scheduling statistics of the dynamic tuning updates
+
+		Return:
+		dictionary -- {job_name: {statistic_name: value}}, job_name is
+		"monitor:NAME" or "instance:NAME", statistics are interval, runs,
+		late, missed, last_duration, max_duration, avg_duration and next_due
+		(all in seconds or counts)
+		"""
+		if caller == "":
+			return {}
+		return self._daemon.get_update_stats()
+
+	@exports.export("", "a(ssssdddd)")
+	def get_timings(self, caller = None):
+		"""Return durations of the tuning operations
+
+		Return:
+		list -- [(instance, operation, command, device, count, total, max, last)],
+		operation is the unit manager operation (e.g. start_tuning,
+		verify_tuning, update_tuning, stop_tuning) with empty command and
+		device, or apply, verify, update or unapply of a single plugin
+		command (the device is empty for non-device commands), durations
+		are in seconds
+		"""
+		if caller == "":
+			return []
+		return self._daemon.get_timings()
+
+	@exports.export("", "a(sssb)")
+	def get_verify_results(self, caller = None):
+		"""Return results of the last verification of the profile
+
+		Return:
+		list -- [(instance, option, device, passed)], device is empty
+		for the non-device options
+		"""
+		if caller == "":
+			return []
+		return self._daemon.get_verify_results()
+
+	@exports.export("", "a(sssd)")
+	def get_dynamic_changes(self, caller = None):
+		"""Return counts of the changes made by the dynamic tuning
+
+		Return:
+		list -- [(instance, change, device, count)], change names what
+		was changed (e.g. level, latency), device is empty if the change
+		is not related to a device
+		"""
+		if caller == "":
+			return []
+		return self._daemon.get_dynamic_changes()
+
+	@exports.export("", "a(sssd)")
+	def get_monitor_data(self, caller = None):
+		"""Return the last samples of the monitors used by the dynamic tuning
+
+		Return:
+		list -- [(monitor, device, field, value)]
+		"""
+		if caller == "":
+			return []
+		return self._daemon.get_monitor_data()
+
+	@exports.subscription()
+	@exports.export("as", "(bs)")
+	def subscribe(self, signals, caller = None):
+		"""Subscribe the connection to the signals
+
+		The Unix socket then sends the signals (profile_changed,
+		tuning_event) as JSON-RPC notifications over the connection the
+		call was made on, an empty list cancels the subscription. D-Bus
+		clients receive the signals by a match rule, the call only checks
+		the names for them.
+
+		Parameters:
+		signals -- list of the signal names
+
+		Return:
+		(bool, string) -- (True, "OK") on success, else (False, error message)
+		"""
+		if caller == "":
+			return (False, "Unauthorized")
+		unknown = [signal for signal in signals if signal not in consts.SIGNALS]
+		if unknown:
+			return (False, "Unknown signals: %s" % ", ".join(unknown))
+		return (True, "OK")
+
 	@exports.export("s", "b")
 	def register_socket_signal_path(self, path, caller = None):
 		"""Allows to dynamically add sockets to send signals to
@@ -504,8 +602,9 @@ class Controller(tuned.exports.interfaces.ExportableInterface):
 		script_pre = options.pop("script_pre", None)
 		script_post = options.pop("script_post", None)
 		priority = int(options.pop("priority", self._daemon._unit_manager._def_instance_priority))
+		update_interval = self._daemon._unit_manager._parse_update_interval(instance_name, options.pop("update_interval", None))
 		try:
-			instance = plugin.create_instance(instance_name, priority, devices, devices_udev_regex, script_pre, script_post, options)
+			instance = plugin.create_instance(instance_name, priority, devices, devices_udev_regex, script_pre, script_post, options, update_interval = update_interval)
 			plugin.initialize_instance(instance)
 			self._daemon._unit_manager.instances.append(instance)
 		except Exception as e:
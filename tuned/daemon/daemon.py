@@ -9,6 +9,7 @@ import tuned.consts as consts
 from tuned.utils.commands import commands
 from tuned import exports
 from tuned.utils.profile_recommender import ProfileRecommender
+from tuned.plugins.manifest import Manifest
 import re
 
 log = tuned.logs.get()
@@ -23,6 +24,7 @@ class Daemon(object):
 		self._dynamic_tuning = consts.CFG_DEF_DYNAMIC_TUNING
 		self._recommend_command = True
 		self._rollback = consts.CFG_DEF_ROLLBACK
+		self._differential_switch = consts.CFG_DEF_DIFFERENTIAL_SWITCH
 		if config is not None:
 			self._daemon = config.get_bool(consts.CFG_DAEMON, consts.CFG_DEF_DAEMON)
 			self._sleep_interval = int(config.get(consts.CFG_SLEEP_INTERVAL, consts.CFG_DEF_SLEEP_INTERVAL))
@@ -30,22 +32,22 @@ class Daemon(object):
 			self._dynamic_tuning = config.get_bool(consts.CFG_DYNAMIC_TUNING, consts.CFG_DEF_DYNAMIC_TUNING)
 			self._recommend_command = config.get_bool(consts.CFG_RECOMMEND_COMMAND, consts.CFG_DEF_RECOMMEND_COMMAND)
 			self._rollback = config.get(consts.CFG_ROLLBACK, consts.CFG_DEF_ROLLBACK)
+			self._differential_switch = config.get_bool(consts.CFG_DIFFERENTIAL_SWITCH, consts.CFG_DEF_DIFFERENTIAL_SWITCH)
 		self._application = application
+		self._plugins_manifest = Manifest()
 		if self._sleep_interval <= 0:
 			self._sleep_interval = int(consts.CFG_DEF_SLEEP_INTERVAL)
-		if self._update_interval == 0:
+		if self._update_interval <= 0:
 			self._dynamic_tuning = False
-		elif self._update_interval < self._sleep_interval:
-			self._update_interval = self._sleep_interval
-		self._sleep_cycles = self._update_interval // self._sleep_interval
 		log.info("using sleep interval of %d second(s)" % self._sleep_interval)
 		if self._dynamic_tuning:
 			log.info("dynamic tuning is enabled (can be overridden by plugins)")
-			log.info("using update interval of %d second(s) (%d times of the sleep interval)" % (self._sleep_cycles * self._sleep_interval, self._sleep_cycles))
+			log.info("using default update interval of %d second(s)" % self._update_interval)
 
 		self._profile_recommender = ProfileRecommender(is_hardcoded = not self._recommend_command)
 		self._unit_manager = unit_manager
 		self._profile_loader = profile_loader
+		self._unit_manager.set_event_notifier(self._notify_tuning_event)
 		self._init_threads()
 		self._cmd = commands()
 		try:
@@ -58,6 +60,9 @@ class Daemon(object):
 	def _init_threads(self):
 		self._thread = None
 		self._terminate = threading.Event()
+		# Flag which is set to run the due updates before the planned time,
+		# e.g. on a pressure stall event, or to notice the termination
+		self._wakeup = threading.Event()
 		# Flag which is set if terminating due to profile_switch
 		self._terminate_profile_switch = threading.Event()
 		# Flag which is set if there is no operation in progress
@@ -186,6 +191,17 @@ class Daemon(object):
 			exports.send_signal(consts.SIGNAL_PROFILE_CHANGED, profile_names, result, errstr)
 		return errstr
 
+	# send notification about an event of the tuning, e.g. the dynamic tuning
+	# changed a setting or a hotplugged device was assigned to an instance
+	def _notify_tuning_event(self, event, instance, device, detail):
+		if self._application is None:
+			return
+		try:
+			exports.send_signal(consts.SIGNAL_TUNING_EVENT, event, instance, device, detail)
+		except Exception as e:
+			# the exports are not started yet, e.g. when applying the initial profile
+			log.debug("cannot send tuning event '%s': %s" % (event, e))
+
 	def _full_rollback_required(self):
 		retcode, out = self._cmd.execute(["systemctl", "is-system-running"], no_errors = [0])
 		if retcode < 0:
@@ -222,11 +238,17 @@ class Daemon(object):
 			raise TunedException("Cannot start the daemon without setting a profile.")
 
 		self._ensure_bootloader_unit()
-		self._unit_manager.create(self._profile.units)
+		# instances kept from the previous profile, switch only the difference
+		switching = len(self._unit_manager.instances) > 0
+		if switching:
+			self._unit_manager.switch(self._profile.units, consts.ROLLBACK_FULL)
+		else:
+			self._unit_manager.create(self._profile.units)
 		self._save_active_profile(" ".join(self._active_profiles),
 					  self._manual)
 		self._save_post_loaded_profile(self._post_loaded_profile)
-		self._unit_manager.start_tuning()
+		if not switching:
+			self._unit_manager.start_tuning()
 		self._profile_applied.set()
 		log.info("static tuning from profile '%s' applied" % self._profile.name)
 		if self._daemon:
@@ -236,21 +258,22 @@ class Daemon(object):
 		self._sighup_processing.clear()
 
 		if self._daemon:
-			# In python 2 interpreter with applied patch for rhbz#917709 we need to periodically
-			# poll, otherwise the python will not have chance to update events / locks (due to GIL)
-			# and e.g. DBus control will not work. The polling interval of 1 seconds (which is
-			# the default) is still much better than 50 ms polling with unpatched interpreter.
-			# For more details see TuneD rhbz#917587.
-			_sleep_cnt = self._sleep_cycles
-			while not self._cmd.wait(self._terminate, self._sleep_interval):
+			# Sleep until the next monitor / instance update is due. Every
+			# monitor and instance can have its own update period, the default
+			# one is the global update_interval. Without dynamic tuning there
+			# is nothing to do periodically, so just wait for the termination.
+			if self._dynamic_tuning:
+				self._unit_manager.set_update_waker(self._wakeup.set)
+				self._unit_manager.schedule_updates(self._update_interval)
+			while not self._terminate.is_set():
+				self._cmd.wait(self._wakeup, self._get_sleep_time())
+				self._wakeup.clear()
+				if self._terminate.is_set():
+					break
 				if self._dynamic_tuning:
-					_sleep_cnt -= 1
-					if _sleep_cnt <= 0:
-						_sleep_cnt = self._sleep_cycles
-						log.debug("updating monitors")
-						self._unit_manager.update_monitors()
-						log.debug("performing tunings")
-						self._unit_manager.update_tuning()
+					# instances may have been created or destroyed meanwhile
+					self._unit_manager.schedule_updates(self._update_interval)
+					self._unit_manager.run_due_updates()
 
 		self._profile_applied.clear()
 
@@ -262,6 +285,11 @@ class Daemon(object):
 
 		# if terminating due to profile switch
 		if self._terminate_profile_switch.is_set():
+			if self._daemon and self._differential_switch:
+				# keep the tuning applied, the next start only applies
+				# the difference to the new profile
+				log.info("keeping tuning applied for the profile switch")
+				return
 			rollback = consts.ROLLBACK_FULL
 		else:
 			# Assume only soft rollback is needed. Soft rollback means reverting all
@@ -289,6 +317,43 @@ class Daemon(object):
 			self._unit_manager.stop_tuning(rollback)
 		self._unit_manager.destroy_all()
 
+	def abort_profile_switch(self):
+		"""Roll back the tuning kept for the profile switch which will not happen"""
+		if self.is_running() or len(self._unit_manager.instances) == 0:
+			return
+		log.info("profile switch aborted, rolling back all changes")
+		self._unit_manager.stop_tuning(consts.ROLLBACK_FULL)
+		self._unit_manager.destroy_all()
+
+	def _get_sleep_time(self):
+		if not self._dynamic_tuning:
+			return None
+		# wake up at least once per update_interval to pick up new instances
+		next_update = self._unit_manager.time_to_next_update()
+		if next_update is None:
+			return self._update_interval
+		return min(next_update, self._update_interval)
+
+	def get_update_stats(self):
+		"""Return scheduling statistics of the dynamic tuning updates"""
+		return self._unit_manager.update_stats()
+
+	def get_timings(self):
+		"""Return durations of the tuning operations"""
+		return self._unit_manager.get_timings()
+
+	def get_verify_results(self):
+		"""Return results of the last verification per option"""
+		return self._unit_manager.get_verify_results()
+
+	def get_dynamic_changes(self):
+		"""Return counts of the changes made by the dynamic tuning"""
+		return self._unit_manager.get_dynamic_changes()
+
+	def get_monitor_data(self):
+		"""Return the last samples of the monitors"""
+		return self._unit_manager.get_monitor_data()
+
 	def _save_active_profile(self, profile_names, manual):
 		try:
 			self._cmd.save_active_profile(profile_names, manual)
@@ -316,18 +381,19 @@ class Daemon(object):
 		return profile, manual
 
 	def get_all_plugins(self):
-		"""Return all accessible plugin classes"""
-		return self._unit_manager.plugins_repository.load_all_classes()
+		"""Return all accessible plugins and their options
+
+		Return:
+		dictionary -- {plugin_name: {parameter_name: default_value}}
+		"""
+		return dict((name, plugin["options"]) for name, plugin in self._plugins_manifest.get_plugins().items())
 
 	def get_plugin_documentation(self, plugin_name):
 		"""Return plugin class docstring"""
 		try:
-			plugin_class = self._unit_manager.plugins_repository.load_class(
-				plugin_name
-			)
+			return self._plugins_manifest.get_plugin(plugin_name)["documentation"]
 		except ImportError:
 			return ""
-		return plugin_class.__doc__
 
 	def get_plugin_hints(self, plugin_name):
 		"""Return plugin's parameters and their hints
@@ -339,12 +405,9 @@ class Daemon(object):
 		dictionary -- {parameter_name: hint}
 		"""
 		try:
-			plugin_class = self._unit_manager.plugins_repository.load_class(
-				plugin_name
-			)
+			return self._plugins_manifest.get_plugin(plugin_name)["hints"]
 		except ImportError:
 			return {}
-		return plugin_class.get_config_options_hints()
 
 	def is_enabled(self):
 		return self._profile is not None
@@ -357,6 +420,7 @@ class Daemon(object):
 			return False
 
 		if self._profile is None:
+			self.abort_profile_switch()
 			return False
 
 		log.info("starting tuning")
@@ -364,6 +428,7 @@ class Daemon(object):
 		self._thread = threading.Thread(target=self._thread_code)
 		self._terminate_profile_switch.clear()
 		self._terminate.clear()
+		self._wakeup.clear()
 		self._thread.start()
 		return True
 
@@ -396,6 +461,7 @@ class Daemon(object):
 		if profile_switch:
 			self._terminate_profile_switch.set()
 		self._terminate.set()
+		self._wakeup.set()
 		self._thread.join()
 		self._thread = None
 
@@ -3,6 +3,7 @@ from . import controller
 from . import dbus_exporter as dbus
 from . import dbus_exporter_with_properties as dbus_with_properties
 from . import unix_socket_exporter as unix_socket
+from . import metrics_exporter as metrics
 
 def export(*args, **kwargs):
 	"""Decorator, use to mark exportable methods."""
@@ -18,6 +19,13 @@ def signal(*args, **kwargs):
 		return method
 	return wrapper
 
+def subscription(*args, **kwargs):
+	"""Decorator, use to mark exported methods subscribing the caller to signals."""
+	def wrapper(method):
+		method.subscription_params = [ args, kwargs ]
+		return method
+	return wrapper
+
 def property_setter(*args, **kwargs):
 	"""Decorator, use to mark setters of exportable properties."""
 	def wrapper(method):
@@ -0,0 +1,239 @@
+import os
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler
+from inspect import ismethod
+
+from . import interfaces
+import tuned.logs
+import tuned.consts as consts
+
+log = tuned.logs.get()
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+def escape_label(value):
+	return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def format_sample(name, labels, value):
+	if labels:
+		name += "{%s}" % ",".join("%s=\"%s\"" % (key, escape_label(label))
+				for (key, label) in labels)
+	return "%s %s\n" % (name, repr(float(value)))
+
+class _MetricsWriter(object):
+	"""Collects the metric families, each one is written with its metadata once."""
+
+	def __init__(self):
+		self._families = []
+		self._samples = {}
+
+	def add(self, family, metric_type, help, name, labels, value):
+		if family not in self._samples:
+			self._families.append((family, metric_type, help))
+			self._samples[family] = []
+		self._samples[family].append(format_sample(name, labels, value))
+
+	def declare(self, family, metric_type, help):
+		if family not in self._samples:
+			self._families.append((family, metric_type, help))
+			self._samples[family] = []
+
+	def render(self):
+		out = []
+		for (family, metric_type, help) in self._families:
+			out.append("# TYPE %s %s\n" % (family, metric_type))
+			out.append("# HELP %s %s\n" % (family, help))
+			out.extend(self._samples[family])
+		out.append("# EOF\n")
+		return "".join(out)
+
+class _UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+	daemon_threads = True
+
+	def get_request(self):
+		(request, address) = self.socket.accept()
+		# BaseHTTPRequestHandler expects (host, port)
+		return (request, ("local", 0))
+
+class _TCPHTTPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+	allow_reuse_address = True
+	daemon_threads = True
+
+class MetricsExporter(interfaces.ExporterInterface):
+	"""
+	Export the state of the daemon as OpenMetrics text on GET /metrics.
+
+	The exported methods (see tuned.exports.export) providing the state
+	are called on every scrape. The requests are served by a thread of
+	their own, each connection in a separate thread, so slow clients do not
+	stall the daemon. The exported methods are called from these threads
+	as from the threads of the other exporters, the scrapes themselves are
+	rendered one at a time. The profile verification is expensive, it is
+	run at most once per verify_interval seconds.
+	"""
+
+	def __init__(self, address = consts.CFG_DEF_METRICS_ADDRESS,
+				permissions = consts.CFG_DEF_METRICS_PERMISSIONS,
+				verify_interval = consts.CFG_DEF_METRICS_VERIFY_INTERVAL):
+		self._address = address
+		self._permissions = permissions
+		self._verify_interval = verify_interval
+		self._methods = {}
+		self._signals = set()
+		self._server = None
+		self._thread = None
+		self._render_lock = threading.Lock()
+		self._profile_changes = 0
+		self._last_verify = None
+		self._verify_result = None
+
+	def running(self):
+		return self._server is not None
+
+	def export(self, method, in_signature, out_signature):
+		if not ismethod(method):
+			raise Exception("Only bound methods can be exported.")
+		self._methods[method.__name__] = method
+
+	def signal(self, method, out_signature):
+		if not ismethod(method):
+			raise Exception("Only bound methods can be exported.")
+		self._signals.add(method.__name__)
+
+	def send_signal(self, signal, *args, **kwargs):
+		if not signal in self._signals:
+			raise Exception("Signal '%s' doesn't exist." % signal)
+		if signal == "profile_changed":
+			self._profile_changes += 1
+
+	def _call(self, name, default):
+		method = self._methods.get(name)
+		if method is None:
+			return default
+		try:
+			return method()
+		except Exception as e:
+			log.error("cannot get '%s' for the metrics: %s" % (name, e))
+			return default
+
+	def _verify(self):
+		if not self._verify_interval or self._verify_interval <= 0:
+			return None
+		now = time.monotonic()
+		if self._last_verify is None or now - self._last_verify >= self._verify_interval:
+			self._last_verify = now
+			self._verify_result = self._call("verify_profile_ignore_missing", None)
+		return self._verify_result
+
+	def render(self):
+		with self._render_lock:
+			return self._render()
+
+	def _render(self):
+		w = _MetricsWriter()
+		w.add("tuned_up", "gauge", "Whether the tuning is running.",
+				"tuned_up", [], 1 if self._call("is_running", False) else 0)
+		profile = self._call("active_profile", "")
+		mode = self._call("profile_mode", ("", ""))
+		w.add("tuned_active_profile", "info", "The active profile.",
+				"tuned_active_profile_info", [("profile", profile), ("mode", mode[0])], 1)
+		w.add("tuned_profile_changes", "counter", "Profile changes since the start of the daemon.",
+				"tuned_profile_changes_total", [], self._profile_changes)
+
+		verified = self._verify()
+		if verified is not None:
+			w.add("tuned_profile_verified", "gauge", "Result of the last verification of the profile.",
+					"tuned_profile_verified", [], 1 if verified else 0)
+		w.declare("tuned_verify_result", "gauge", "Result of the last verification of an option.")
+		for (instance, option, device, passed) in self._call("get_verify_results", []):
+			w.add("tuned_verify_result", "gauge", None, "tuned_verify_result",
+					[("instance", instance), ("option", option), ("device", device)], 1 if passed else 0)
+
+		w.declare("tuned_operation_duration_seconds", "summary", "Duration of the tuning operations.")
+		w.declare("tuned_operation_duration_max_seconds", "gauge", "Maximal duration of the tuning operations.")
+		for (instance, operation, command, device, count, total, maximum, last) in self._call("get_timings", []):
+			labels = [("instance", instance), ("operation", operation), ("command", command), ("device", device)]
+			w.add("tuned_operation_duration_seconds", "summary", None,
+					"tuned_operation_duration_seconds_count", labels, count)
+			w.add("tuned_operation_duration_seconds", "summary", None,
+					"tuned_operation_duration_seconds_sum", labels, total)
+			w.add("tuned_operation_duration_max_seconds", "gauge", None,
+					"tuned_operation_duration_max_seconds", labels, maximum)
+
+		w.declare("tuned_update", "gauge", "Statistics of the periodic updates of the monitors and instances.")
+		for (job, stats) in sorted(self._call("get_update_stats", {}).items()):
+			for (stat, value) in sorted(stats.items()):
+				w.add("tuned_update", "gauge", None, "tuned_update",
+						[("job", job), ("stat", stat)], value)
+
+		w.declare("tuned_monitor_value", "gauge", "Last sample of a monitor.")
+		for (monitor, device, field, value) in self._call("get_monitor_data", []):
+			w.add("tuned_monitor_value", "gauge", None, "tuned_monitor_value",
+					[("monitor", monitor), ("device", device), ("field", field)], value)
+
+		w.declare("tuned_dynamic_changes", "counter", "Changes made by the dynamic tuning.")
+		for (instance, change, device, count) in self._call("get_dynamic_changes", []):
+			w.add("tuned_dynamic_changes", "counter", None, "tuned_dynamic_changes_total",
+					[("instance", instance), ("change", change), ("device", device)], count)
+		return w.render()
+
+	def _handler_class(self):
+		exporter = self
+
+		class Handler(BaseHTTPRequestHandler):
+			# a stuck client must not keep its thread for long
+			timeout = 1
+
+			def do_GET(self):
+				if self.path.split("?", 1)[0] != "/metrics":
+					self.send_error(404)
+					return
+				body = exporter.render().encode("utf-8")
+				self.send_response(200)
+				self.send_header("Content-Type", CONTENT_TYPE)
+				self.send_header("Content-Length", str(len(body)))
+				self.end_headers()
+				self.wfile.write(body)
+
+			def log_message(self, format, *args):
+				log.debug("metrics: " + format % args)
+
+		return Handler
+
+	def _construct_server(self):
+		if self._address.startswith("/"):
+			if os.path.exists(self._address):
+				os.unlink(self._address)
+			server = _UnixHTTPServer(self._address, self._handler_class())
+			if self._permissions:
+				os.chmod(self._address, self._permissions)
+		else:
+			(host, sep, port) = self._address.rpartition(":")
+			server = _TCPHTTPServer((host, int(port)), self._handler_class())
+		return server
+
+	def start(self):
+		if self.running():
+			return
+		try:
+			self._server = self._construct_server()
+		except (OSError, ValueError) as e:
+			log.error("cannot serve the metrics on '%s': %s" % (self._address, e))
+			self._server = None
+			return
+		self._thread = threading.Thread(target = self._server.serve_forever,
+				name = "tuned-metrics")
+		self._thread.daemon = True
+		self._thread.start()
+
+	def stop(self):
+		if self._server is not None:
+			self._server.shutdown()
+			self._thread.join()
+			self._thread = None
+			self._server.server_close()
+			self._server = None
+			if self._address.startswith("/") and os.path.exists(self._address):
+				os.unlink(self._address)
@@ -8,10 +8,21 @@ import tuned.consts as consts
 from inspect import ismethod
 import socket
 import json
-import select
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 log = tuned.logs.get()
 
+# maximal size of a single request and of the signals not read by a client
+MAX_MESSAGE_SIZE = 1024 * 1024
+
+class _Connection(object):
+	def __init__(self, writer):
+		self.writer = writer
+		# signals the client subscribed to
+		self.signals = set()
+
 class UnixSocketExporter(interfaces.ExporterInterface):
 	"""
 	Export method calls through Unix Domain Socket Interface.
@@ -20,6 +31,26 @@ class UnixSocketExporter(interfaces.ExporterInterface):
 	to call it. This is required as we need the original function to be
 	bound to the original object instance. While the wrapper will be bound
 	to an object we dynamically construct.
+
+	The socket is served by an asyncio event loop in its own thread, so
+	the requests are handled as soon as they arrive, independently of the
+	main loop of the daemon. Interface is according JSON-RPC 2.0
+	Specification (see https://www.jsonrpc.org/specification). Any number
+	of clients can stay connected and send requests (or batches of them)
+	each terminated by a newline, the responses are sent in the order of
+	the requests, each one terminated by a newline. A request without the
+	newline is handled when the client shuts down its side of the
+	connection. The exported methods are called one at a time in a worker
+	thread, so a slow call does not block reading the other requests.
+
+	A method marked by tuned.exports.subscription (e.g. subscribe) makes
+	the connection receive the given signals as JSON-RPC notifications,
+	interleaved with the responses.
+
+	Example calls:
+
+	printf '[{"jsonrpc": "2.0", "method": "active_profile", "id": 1}, {"jsonrpc": "2.0", "method": "profiles", "id": 2}]' | nc -U /run/tuned/tuned.sock
+	printf '{"jsonrpc": "2.0", "method": "switch_profile", "params": {"profile_name": "balanced"}, "id": 1}\n' | nc -U /run/tuned/tuned.sock
 	"""
 
 	def __init__(self, socket_path=consts.CFG_DEF_UNIX_SOCKET_PATH,
@@ -53,8 +84,10 @@ class UnixSocketExporter(interfaces.ExporterInterface):
 
 		self._unix_socket_methods = {}
 		self._signals = set()
-		self._conn = None
-		self._channel = None
+		self._loop = None
+		self._thread = None
+		self._executor = None
+		self._connections = set()
 
 	def running(self):
 		return self._socket_object is not None
@@ -71,6 +104,7 @@ class UnixSocketExporter(interfaces.ExporterInterface):
 			def __init__(self, in_signature, out_signature):
 				self._in_signature = in_signature
 				self._out_signature = out_signature
+				self._subscription = hasattr(method, "subscription_params")
 				
 			def __call__(self, *args, **kwargs):
 				return method(*args, **kwargs)
@@ -108,6 +142,28 @@ class UnixSocketExporter(interfaces.ExporterInterface):
 				s.close()
 			except OSError as e:
 				log.warning("Error while sending signal '%s' to socket '%s': %s" % (signal, p, e))
+		loop = self._loop
+		if loop is not None:
+			message = {"jsonrpc": "2.0", "method": signal, "params": args}
+			try:
+				loop.call_soon_threadsafe(self._broadcast, signal, message)
+			except RuntimeError:
+				# the loop was closed meanwhile
+				pass
+
+	def _broadcast(self, signal, message):
+		data = None
+		for conn in list(self._connections):
+			if signal not in conn.signals:
+				continue
+			if conn.writer.transport.get_write_buffer_size() > MAX_MESSAGE_SIZE:
+				log.warning("Client does not read the signals, closing its connection")
+				self._connections.discard(conn)
+				conn.writer.close()
+				continue
+			if data is None:
+				data = json.dumps(message).encode("utf-8") + b"\n"
+			conn.writer.write(data)
 
 	def register_signal_path(self, path):
 		self._socket_signal_paths.append(path)
@@ -129,10 +185,99 @@ class UnixSocketExporter(interfaces.ExporterInterface):
 
 		self.stop()
 		self._construct_socket_object()
+		if self._socket_object is None:
+			return
+		self._executor = ThreadPoolExecutor(max_workers = 1)
+		self._loop = asyncio.new_event_loop()
+		started = threading.Event()
+		self._thread = threading.Thread(target = self._thread_code, args = (started, ),
+				name = "tuned-unix-socket")
+		self._thread.daemon = True
+		self._thread.start()
+		started.wait()
 
 	def stop(self):
+		if self._thread is not None:
+			self._loop.call_soon_threadsafe(self._loop.stop)
+			self._thread.join()
+			self._thread = None
+			self._loop.close()
+			self._loop = None
+		if self._executor is not None:
+			self._executor.shutdown(wait = False)
+			self._executor = None
 		if self._socket_object:
 			self._socket_object.close()
+			self._socket_object = None
+
+	def _thread_code(self, started):
+		asyncio.set_event_loop(self._loop)
+		try:
+			server = self._loop.run_until_complete(asyncio.start_unix_server(
+					self._handle_connection, sock = self._socket_object, limit = MAX_MESSAGE_SIZE))
+		except Exception as e:
+			log.error("Failed to serve the Unix socket '%s': %s" % (self._socket_path, e))
+			started.set()
+			return
+		started.set()
+		try:
+			self._loop.run_forever()
+		finally:
+			server.close()
+			# asyncio.all_tasks is new in Python 3.7
+			all_tasks = getattr(asyncio, "all_tasks", None) or asyncio.Task.all_tasks
+			tasks = [t for t in all_tasks(self._loop) if not t.done()]
+			for task in tasks:
+				task.cancel()
+			if tasks:
+				self._loop.run_until_complete(asyncio.gather(*tasks, return_exceptions = True))
+
+	async def _handle_connection(self, reader, writer):
+		data = b""
+		connection = _Connection(writer)
+		self._connections.add(connection)
+		try:
+			while True:
+				try:
+					data += await reader.readuntil(b"\n")
+					eof = False
+				except asyncio.IncompleteReadError as e:
+					data += e.partial
+					eof = True
+				except asyncio.LimitOverrunError:
+					await self._write(writer, self._create_error_responce(-32600, "Invalid Request",
+							data = "Message is longer than %d bytes" % MAX_MESSAGE_SIZE))
+					break
+				if data.strip():
+					res = None
+					try:
+						message = json.loads(data.decode())
+					except json.JSONDecodeError as e:
+						# a message spanning several lines, wait for the rest of it
+						if not eof and e.pos >= len(e.doc.rstrip()) and len(data) < MAX_MESSAGE_SIZE:
+							continue
+						log.error("Failed to load json data '%s': %s" % (data, e))
+						res = self._create_error_responce(-32700, "Parse error", data = str(e))
+					except ValueError as e:
+						log.error("Failed to load json data '%s': %s" % (data, e))
+						res = self._create_error_responce(-32700, "Parse error", data = str(e))
+					else:
+						res = await self._loop.run_in_executor(self._executor, self._process_message, message, connection)
+					if res:
+						await self._write(writer, res)
+				data = b""
+				if eof:
+					break
+		except (OSError, asyncio.CancelledError):
+			pass
+		finally:
+			self._connections.discard(connection)
+			writer.close()
+
+	async def _write(self, writer, data):
+		log.debug("Sending socket data: %s" % data)
+		writer.write(json.dumps(data).encode("utf-8") + b"\n")
+		await writer.drain()
 
 	def _send_data(self, s, data):
 		log.debug("Sending socket data: %s)" % data)
@@ -167,7 +312,7 @@ class UnixSocketExporter(interfaces.ExporterInterface):
 			return data
 		return None
 
-	def _process_request(self, req):
+	def _process_request(self, req, connection = None):
 		if type(req) != dict or req.get("jsonrpc") != "2.0" or not req.get("method"):
 			return self._create_error_responce(-32600, "Invalid Request")
 		id = req.get("id")
@@ -187,60 +332,38 @@ class UnixSocketExporter(interfaces.ExporterInterface):
 			return self._check_id(self._create_error_responce(-32602, "Invalid params", id, str(e)))
 		except Exception as e:
 			return self._check_id(self._create_error_responce(1, "Error", id, str(e)))
+		if connection is not None and getattr(self._unix_socket_methods[req["method"]], "_subscription", False) \
+				and ret and ret[0]:
+			self._subscribe(connection, req.get("params"))
 		return self._check_id(self._create_result_response(ret, id))
 
-	def period_check(self):
+	def _subscribe(self, connection, params):
+		if type(params) in (list, tuple):
+			signals = params[0] if params else []
+		elif type(params) == dict:
+			signals = params.get("signals", [])
+		else:
+			signals = []
+		connection.signals = set(signals)
+
+	def _process_message(self, data, connection = None):
 		"""
-		Periodically checks socket object for new calls. This allows to function without special thread.
-		Interface is according JSON-RPC 2.0 Specification (see https://www.jsonrpc.org/specification)
-		
-		Example calls:
-		
-		printf '[{"jsonrpc": "2.0", "method": "active_profile", "id": 1}, {"jsonrpc": "2.0", "method": "profiles", "id": 2}]' | nc -U /run/tuned/tuned.sock
-		printf '{"jsonrpc": "2.0", "method": "switch_profile", "params": {"profile_name": "balanced"}, "id": 1}' | nc -U /run/tuned/tuned.sock
+		Process a request or a batch of requests.
+
+		Return:
+		response, list of responses or None if there is nothing to respond
+		(notifications only)
 		"""
-		if not self.running():
-			return
-		while True:
-			r, _, _ = select.select([self._socket_object], (), (), 0)
+		if type(data) not in (tuple, list, dict):
+			log.error("Wrong format of call")
+			return self._create_error_responce(-32600, "Invalid Request")
+		if type(data) == dict:
+			return self._process_request(data, connection)
+		if len(data) == 0:
+			return self._create_error_responce(-32600, "Invalid Request")
+		res = []
+		for req in data:
+			r = self._process_request(req, connection)
 			if r:
-				conn, _ = self._socket_object.accept()
-				try:
-					data = ""
-					while True:
-						rec_data = conn.recv(4096).decode()
-						if not rec_data:
-							break
-						data += rec_data
-				except Exception as e:
-					log.error("Failed to load data of message: %s" % e)
-					continue
-				if data:
-					try:
-						data = json.loads(data)
-					except Exception as e:
-						log.error("Failed to load json data '%s': %s" % (data, e))
-						self._send_data(conn, self._create_error_responce(-32700, "Parse error", str(e)))
-						continue
-					if type(data) not in (tuple, list, dict):
-						log.error("Wrong format of call")
-						self._send_data(conn, self._create_error_responce(-32700, "Parse error", str(e)))
-						continue
-					if type(data) in (tuple, list):
-						if len(data) == 0:
-							self._send_data(conn, self._create_error_responce(-32600, "Invalid Request", str(e)))
-							continue
-						res = []
-						for req in data:
-							r = self._process_request(req)
-							if r:
-								res.append(r)
-						if res:
-							self._send_data(conn, res)
-					else:
-						res = self._process_request(data)
-						if r:
-							self._send_data(conn, res)
-			else:
-				return
-		
+				res.append(r)
+		return res or None
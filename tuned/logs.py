@@ -1,13 +1,13 @@
 import atexit
 import logging
-import logging.handlers
 import os
 import os.path
-import inspect
+import sys
 import tuned.consts as consts
 import random
 import string
 import threading
+from tuned.utils.lazy_import import lazy_import
 try:
 	from StringIO import StringIO
 except:
@@ -15,6 +15,9 @@ except:
 
 __all__ = ["get"]
 
+# only the daemon logs to file
+logging_handlers = lazy_import("logging.handlers")
+
 root_logger = None
 
 log_handlers = {}
@@ -71,7 +74,7 @@ def get():
 	if root_logger is None:
 		root_logger = logging.getLogger("tuned")
 
-	calling_module = inspect.currentframe().f_back
+	calling_module = sys._getframe(1)
 	name = calling_module.f_locals["__name__"]
 	if name == "__main__":
 		name = "tuned"
@@ -135,7 +138,7 @@ class TunedLogger(logging.getLoggerClass()):
 		if not os.path.exists(log_directory):
 			os.makedirs(log_directory)
 
-		cls._file_handler = logging.handlers.RotatingFileHandler(
+		cls._file_handler = logging_handlers.RotatingFileHandler(
 			filename, maxBytes = int(maxBytes), backupCount = int(backupCount))
 		cls._file_handler.setFormatter(cls._formatter)
 
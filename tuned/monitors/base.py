@@ -1,4 +1,6 @@
+import time
 import tuned.logs
+from tuned.monitors.history import History
 log = tuned.logs.get()
 
 __all__ = ["Monitor"]
@@ -13,8 +15,19 @@ class Monitor(object):
 	Following methods require reimplementation:
 	  - _init_available_devices(cls)
 	  - update(cls)
+
+	Every sample() (update of the data) is also recorded in the per-device
+	History, so the plugins can base their decisions on the smoothed load
+	(see get_history).
 	"""
 
+	# number of samples kept in the history of each device
+	_history_size = 64
+	# smoothing factor of the exponentially weighted moving average
+	_history_alpha = 0.3
+	# names of the values in the load of a device, None if unnamed
+	_fields = None
+
 	# class properties
 
 	@classmethod
@@ -24,6 +37,7 @@ class Monitor(object):
 		cls._available_devices = set()
 		cls._updating_devices = set()
 		cls._load = {}
+		cls._history = {}
 
 		cls._init_available_devices()
 		assert isinstance(cls._available_devices, set)
@@ -44,6 +58,11 @@ class Monitor(object):
 	def get_available_devices(cls):
 		return cls._available_devices
 
+	@classmethod
+	def get_fields(cls):
+		"""Return names of the values in the load of a device, None if they are not named."""
+		return cls._fields
+
 	@classmethod
 	def update(cls):
 		raise NotImplementedError()
@@ -70,19 +89,20 @@ class Monitor(object):
 
 	# instance properties
 
-	def __init__(self, devices = None):
+	def __init__(self, devices = None, update_interval = None):
 		if not hasattr(self, "_class_initialized"):
 			self._init_class()
 			assert hasattr(self, "_class_initialized")
 
 		self._register_instance(self)
+		self._update_interval = update_interval
 
 		if devices is not None:
 			self.devices = devices
 		else:
 			self.devices = self.get_available_devices()
 
-		self.update()
+		self.sample()
 
 	def __del__(self):
 		try:
@@ -94,6 +114,11 @@ class Monitor(object):
 		self._deregister_instance(self)
 		self._refresh_updating_devices()
 
+	@property
+	def update_interval(self):
+		"""Requested update period in seconds, None means the global update_interval."""
+		return self._update_interval
+
 	@property
 	def devices(self):
 		return self._devices
@@ -117,6 +142,27 @@ class Monitor(object):
 			self._devices.remove(device)
 			self._updating_devices.remove(device)
 
+	def sample(self):
+		"""Update the data and record them in the history of the updated devices."""
+		self.update()
+		now = time.monotonic()
+		for device in list(self._updating_devices):
+			load = self.get_device_load(device)
+			if load is None:
+				continue
+			history = self._history.get(device)
+			if history is None:
+				width = len(load) if isinstance(load, (list, tuple)) else 1
+				history = self._history[device] = History(self._history_size, width, self._history_alpha)
+			try:
+				history.push(load, now)
+			except (ValueError, TypeError, IndexError) as e:
+				log.debug("cannot record load of device '%s' in history: %s" % (device, e))
+
+	def get_history(self, device):
+		"""Return History of the device load, None if it has not been sampled yet."""
+		return self._history.get(device)
+
 	def get_load(self):
 		return dict([dev_load for dev_load in list(self._load.items()) if dev_load[0] in self._devices])
 
@@ -0,0 +1,104 @@
+import array
+
+__all__ = ["History"]
+
+class History(object):
+	"""
+	Ring buffer of the last 'size' samples of a device load.
+
+	A sample is a number or a list of 'width' numbers (e.g. the fields of
+	the disk statistics), the queries take the index of the field. The
+	samples and their timestamps are kept in flat arrays, the exponentially
+	weighted moving average is updated on every push, so push, ewma, delta
+	and rate are O(1), percentile is O(window * log(window)).
+	"""
+
+	__slots__ = ["_size", "_width", "_alpha", "_values", "_times", "_ewma", "_pos", "_count"]
+
+	def __init__(self, size = 64, width = 1, alpha = 0.3):
+		if size < 2:
+			raise ValueError("history size must be at least 2")
+		self._size = size
+		self._width = width
+		self._alpha = alpha
+		self._values = array.array("d", bytes(8 * size * width))
+		self._times = array.array("d", bytes(8 * size))
+		self._ewma = array.array("d", bytes(8 * width))
+		# index of the next sample to write
+		self._pos = 0
+		self._count = 0
+
+	@property
+	def size(self):
+		return self._size
+
+	@property
+	def width(self):
+		return self._width
+
+	def __len__(self):
+		return self._count
+
+	def push(self, value, timestamp):
+		if self._width == 1 and not isinstance(value, (list, tuple)):
+			value = (value, )
+		start = self._pos * self._width
+		first = self._count == 0
+		for field in range(self._width):
+			v = float(value[field])
+			self._values[start + field] = v
+			if first:
+				self._ewma[field] = v
+			else:
+				self._ewma[field] += self._alpha * (v - self._ewma[field])
+		self._times[self._pos] = timestamp
+		self._pos = (self._pos + 1) % self._size
+		if self._count < self._size:
+			self._count += 1
+
+	def _index(self, age):
+		"""Position of the sample 'age' samples older than the last one."""
+		return (self._pos - 1 - age) % self._size
+
+	def last(self, field = 0):
+		if self._count == 0:
+			return None
+		return self._values[self._index(0) * self._width + field]
+
+	def ewma(self, field = 0):
+		if self._count == 0:
+			return None
+		return self._ewma[field]
+
+	def delta(self, field = 0):
+		"""Difference of the last two samples, None if there are less than two."""
+		if self._count < 2:
+			return None
+		return self._values[self._index(0) * self._width + field] \
+				- self._values[self._index(1) * self._width + field]
+
+	def rate(self, field = 0):
+		"""Change of the field per second between the last two samples."""
+		if self._count < 2:
+			return None
+		elapsed = self._times[self._index(0)] - self._times[self._index(1)]
+		if elapsed <= 0:
+			return None
+		return self.delta(field) / elapsed
+
+	def values(self, field = 0, window = None):
+		"""Samples of the field from the oldest to the newest, at most 'window' last ones."""
+		count = self._count if window is None else min(window, self._count)
+		return [self._values[self._index(age) * self._width + field]
+				for age in range(count - 1, -1, -1)]
+
+	def percentile(self, p, field = 0, window = None):
+		"""
+		Return the p-th (0-100) percentile (nearest rank) of the last
+		'window' samples of the field, None if there are no samples.
+		"""
+		values = sorted(self.values(field, window))
+		if not values:
+			return None
+		rank = int(round(p / 100.0 * (len(values) - 1)))
+		return values[min(max(rank, 0), len(values) - 1)]
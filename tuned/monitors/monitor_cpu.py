@@ -0,0 +1,179 @@
+import tuned.monitors
+import tuned.logs
+import array
+import os
+from tuned.utils.commands import commands
+
+log = tuned.logs.get()
+cmd = commands()
+
+CPUIDLE_PATH = "/sys/devices/system/cpu/%s/cpuidle"
+
+# counters of a CPU preceding the idle state residencies
+_BUSY = 0
+_IDLE = 1
+_COUNTERS = 2
+
+class CPUMonitor(tuned.monitors.Monitor):
+	"""
+	Utilization and idle state residency of the individual CPUs.
+
+	The load of a device (e.g. 'cpu3') is a list
+	[utilization, busy, idle, state0, state1, ...]: the utilization
+	(percent of time the CPU was busy since the previous update), the
+	busy and idle (including iowait) times from /proc/stat in clock ticks
+	and the residencies of the cpuidle states in microseconds.
+
+	All the CPUs are sampled by a single read of /proc/stat, the counters
+	are kept in preallocated arrays so the utilization of all of them is
+	computed in one pass. The cpuidle 'time' attributes are kept open and
+	reread in place.
+	"""
+
+	@classmethod
+	def _init_available_devices(cls):
+		cpus = [line.split(None, 1)[0] for line in cls._read_stat()]
+		cls._available_devices = set(cpus)
+		cls._state_names = cls._read_state_names(sorted(cpus, key = lambda cpu: int(cpu[3:]))[:1])
+		cls._width = _COUNTERS + len(cls._state_names)
+		cls._slots = {}
+		cls._table = array.array("Q")
+		cls._previous = array.array("Q")
+		cls._utilization = array.array("d")
+		cls._state_fds = {}
+		for cpu in cpus:
+			cls._allocate_slot(cpu)
+
+	@classmethod
+	def _read_stat(cls):
+		"""Return the /proc/stat lines of the individual CPUs."""
+		try:
+			with open(cmd.root_path("/proc/stat")) as statfile:
+				lines = statfile.readlines()
+		except (OSError, IOError) as e:
+			log.error("cannot read CPU statistics: %s" % e)
+			return []
+		return [line for line in lines if line.startswith("cpu") and line[3:4].isdigit()]
+
+	@classmethod
+	def _read_state_names(cls, cpus):
+		names = []
+		for cpu in cpus:
+			path = cmd.root_path(CPUIDLE_PATH % cpu)
+			try:
+				states = [d for d in os.listdir(path) if d.startswith("state")]
+			except OSError:
+				states = []
+			for state in sorted(states, key = lambda s: int(s[5:])):
+				try:
+					with open(os.path.join(path, state, "name")) as f:
+						names.append(f.read().strip())
+				except (OSError, IOError):
+					names.append(state)
+		return names
+
+	@classmethod
+	def _allocate_slot(cls, cpu):
+		if cpu not in cls._slots:
+			cls._slots[cpu] = len(cls._utilization)
+			cls._table.extend([0] * cls._width)
+			cls._previous.extend([0] * cls._width)
+			cls._utilization.append(0.0)
+
+	@classmethod
+	def get_fields(cls):
+		return ["utilization", "busy", "idle"] + ["state_%s" % name for name in cls._state_names]
+
+	@classmethod
+	def get_state_names(cls):
+		"""Return names of the cpuidle states in the order of their residencies in the load."""
+		return list(cls._state_names)
+
+	@classmethod
+	def _sync_state_fds(cls):
+		for cpu in list(cls._state_fds):
+			if cpu not in cls._updating_devices:
+				for fd in cls._state_fds.pop(cpu):
+					os.close(fd)
+		for cpu in cls._updating_devices:
+			if cpu in cls._state_fds:
+				continue
+			fds = []
+			for state in range(len(cls._state_names)):
+				try:
+					fds.append(os.open(cmd.root_path(CPUIDLE_PATH % cpu + "/state%d/time" % state), os.O_RDONLY))
+				except OSError:
+					break
+			cls._state_fds[cpu] = fds
+
+	@classmethod
+	def update(cls):
+		if not cls._updating_devices:
+			cls._sync_state_fds()
+			return
+		table = cls._table
+		cls._previous[:] = table
+		width = cls._width
+		slots = cls._slots
+		updating = cls._updating_devices
+		for line in cls._read_stat():
+			fields = line.split()
+			if fields[0] not in updating:
+				continue
+			start = slots[fields[0]] * width
+			# user nice system idle iowait irq softirq steal, guest time is
+			# included in user and nice
+			times = [int(v) for v in fields[1:9]]
+			idle = sum(times[3:5])
+			table[start + _BUSY] = sum(times) - idle
+			table[start + _IDLE] = idle
+		cls._sync_state_fds()
+		for (cpu, fds) in cls._state_fds.items():
+			start = slots[cpu] * width + _COUNTERS
+			for (i, fd) in enumerate(fds):
+				try:
+					table[start + i] = int(os.pread(fd, 32, 0))
+				except (OSError, ValueError):
+					pass
+		previous = cls._previous
+		utilization = cls._utilization
+		for start in range(0, len(table), width):
+			busy = table[start + _BUSY] - previous[start + _BUSY]
+			total = busy + table[start + _IDLE] - previous[start + _IDLE]
+			if total > 0:
+				utilization[start // width] = 100.0 * busy / total
+
+	def add_device(self, device):
+		if device not in self._available_devices:
+			self._update_available_devices()
+		if device in self._available_devices:
+			self._devices.add(device)
+			self._updating_devices.add(device)
+
+	@classmethod
+	def _update_available_devices(cls):
+		# keep the counters of the known CPUs, e.g. of a CPU brought online
+		for line in cls._read_stat():
+			cpu = line.split(None, 1)[0]
+			if cpu not in cls._available_devices:
+				cls._available_devices.add(cpu)
+				cls._allocate_slot(cpu)
+
+	def cleanup(self):
+		super(CPUMonitor, self).cleanup()
+		self._sync_state_fds()
+
+	def get_device_load(self, device):
+		slot = self._slots.get(device)
+		if slot is None:
+			return None
+		start = slot * self._width
+		return [self._utilization[slot]] + self._table[start:start + self._width].tolist()
+
+	def get_load(self):
+		return dict((device, self.get_device_load(device)) for device in self._devices)
+
+	def get_utilization(self, device):
+		"""Return percent of the time the CPU was busy since the previous update."""
+		slot = self._slots.get(device)
+		return None if slot is None else self._utilization[slot]
@@ -1,35 +1,87 @@
 import tuned.monitors
+import array
 import os
+from tuned.utils.commands import commands
+
+cmd = commands()
+
+# number of the I/O statistics fields of a device in /proc/diskstats,
+# older kernels provide only the first 11 or 15 of them
+_FIELDS = 17
 
 class DiskMonitor(tuned.monitors.Monitor):
+	"""
+	I/O statistics of the block devices (the fields of /sys/block/<dev>/stat).
+
+	All the devices are sampled by a single read of /proc/diskstats per
+	update. The counters are stored in a preallocated array, each device
+	owns a slot of _FIELDS counters. Devices appearing later (reported by
+	the disk plugin from the udev events through add_device) get a new
+	slot without rescanning all the devices.
+	"""
 
-	_supported_vendors = ["ATA", "SCSI"]
+	_fields = ["read_ios", "read_merges", "read_sectors", "read_ticks",
+			"write_ios", "write_merges", "write_sectors", "write_ticks",
+			"in_flight", "io_ticks", "time_in_queue",
+			"discard_ios", "discard_merges", "discard_sectors", "discard_ticks",
+			"flush_ios", "flush_ticks"]
 
 	@classmethod
 	def _init_available_devices(cls):
-		block_devices = os.listdir("/sys/block")
-		available = set(filter(cls._is_device_supported, block_devices))
-		cls._available_devices = available
-
-		for d in available:
-			cls._load[d] = [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
+		try:
+			block_devices = os.listdir(cmd.root_path("/sys/block"))
+		except OSError:
+			block_devices = []
+		cls._available_devices = set(block_devices)
+		cls._slots = {}
+		cls._table = array.array("Q")
+		for d in sorted(block_devices):
+			cls._allocate_slot(d)
 
 	@classmethod
-	def _is_device_supported(cls, device):
-		vendor_file = "/sys/block/%s/device/vendor" % device
-		try:
-			vendor = open(vendor_file).read().strip()
-		except IOError:
-			return False
+	def _allocate_slot(cls, device):
+		if device not in cls._slots:
+			cls._slots[device] = len(cls._table) // _FIELDS
+			cls._table.extend([0] * _FIELDS)
 
-		return vendor in cls._supported_vendors
+	@classmethod
+	def _device_exists(cls, device):
+		return os.path.isdir(cmd.root_path("/sys/block/%s" % device))
 
 	@classmethod
 	def update(cls):
-		for device in cls._updating_devices:
-			cls._update_disk(device)
+		if not cls._updating_devices:
+			return
+		try:
+			with open(cmd.root_path("/proc/diskstats")) as statfile:
+				lines = statfile.readlines()
+		except (OSError, IOError):
+			return
+		slots = cls._slots
+		updating = cls._updating_devices
+		table = cls._table
+		for line in lines:
+			fields = line.split()
+			if len(fields) < 4 or fields[2] not in updating:
+				continue
+			start = slots[fields[2]] * _FIELDS
+			values = fields[3:3 + _FIELDS]
+			table[start:start + len(values)] = array.array("Q", map(int, values))
 
-	@classmethod
-	def _update_disk(cls, dev):
-		with open("/sys/block/" + dev + "/stat") as statfile:
-			cls._load[dev] = list(map(int, statfile.read().split()))
+	def add_device(self, device):
+		if device not in self._available_devices:
+			if not self._device_exists(device):
+				return
+			self._available_devices.add(device)
+			self._allocate_slot(device)
+		self._devices.add(device)
+		self._updating_devices.add(device)
+
+	def get_device_load(self, device):
+		if device not in self._slots:
+			return None
+		start = self._slots[device] * _FIELDS
+		return self._table[start:start + _FIELDS].tolist()
+
+	def get_load(self):
+		return dict((device, self.get_device_load(device)) for device in self._devices)
@@ -1,12 +1,17 @@
 import tuned.monitors
+from tuned.utils.commands import commands
+
+cmd = commands()
 
 class LoadMonitor(tuned.monitors.Monitor):
+	_fields = ["loadavg1"]
+
 	@classmethod
 	def _init_available_devices(cls):
 		cls._available_devices = set(["system"])
 
 	@classmethod
 	def update(cls):
-		with open("/proc/loadavg") as statfile:
+		with open(cmd.root_path("/proc/loadavg")) as statfile:
 			data = statfile.read().split()
 		cls._load["system"] = float(data[0])
@@ -1,25 +1,50 @@
 import tuned.monitors
+import tuned.logs
 import os
 import re
 from tuned.utils.nettool import ethcard
 from tuned.utils.commands import commands
+from tuned.utils import rtnetlink
 
+log = tuned.logs.get()
 cmd = commands()
 
 class NetMonitor(tuned.monitors.Monitor):
+	"""
+	Traffic counters of the network interfaces, the load of a device is
+	a list of integers [rx_bytes, rx_packets, tx_bytes, tx_packets].
+
+	The counters of all the interfaces are obtained by a single rtnetlink
+	dump per update. If netlink cannot be used (or a root prefix is set,
+	see commands.set_root_prefix), they are read from
+	/sys/class/net/<dev>/statistics.
+	"""
+
+	_stat_files = ["rx_bytes", "rx_packets", "tx_bytes", "tx_packets"]
+	_fields = _stat_files
+	_use_netlink = True
 
 	@classmethod
 	def _init_available_devices(cls):
 		available = []
-		for root, dirs, files in os.walk("/sys/devices"):
-			if root.endswith("/net") and not root.endswith("/virtual/net"):
-				available += dirs
-		
+		class_dir = cmd.root_path("/sys/class/net")
+		try:
+			devices = os.listdir(class_dir)
+		except OSError:
+			devices = []
+		for dev in devices:
+			try:
+				link = os.readlink(os.path.join(class_dir, dev))
+			except OSError:
+				continue
+			if "/virtual/" not in link:
+				available.append(dev)
+
 		cls._available_devices = set(available)
 
 		for dev in available:
 			#max_speed = cls._calcspeed(ethcard(dev).get_max_speed())
-			cls._load[dev] = ['0', '0', '0', '0']
+			cls._load[dev] = [0, 0, 0, 0]
 
 	@classmethod
 	def _calcspeed(cls, speed):
@@ -39,14 +64,38 @@ class NetMonitor(tuned.monitors.Monitor):
 			return cls.map_fce(dev)
 		except AttributeError:
 			return dev
+
 	@classmethod
 	def _updateStat(cls, dev):
-		files = ["rx_bytes", "rx_packets", "tx_bytes", "tx_packets"]
-		for i,f in enumerate(files):
-			cls._load[dev][i] = cmd.read_file("/sys/class/net/" + cls._dev_map(dev) + "/statistics/" + f, err_ret = "0").strip()
+		load = cls._load.setdefault(dev, [0, 0, 0, 0])
+		for i,f in enumerate(cls._stat_files):
+			value = cmd.read_file("/sys/class/net/" + cls._dev_map(dev) + "/statistics/" + f, err_ret = "0").strip()
+			try:
+				load[i] = int(value)
+			except ValueError:
+				load[i] = 0
+
+	@classmethod
+	def _update_netlink(cls):
+		try:
+			links = rtnetlink.link_stats()
+		except (OSError, IOError) as e:
+			log.info("cannot get network statistics by netlink, falling back to sysfs: %s" % e)
+			cls._use_netlink = False
+			return False
+		for device in cls._updating_devices:
+			stats = links.get(cls._dev_map(device))
+			if stats is not None:
+				cls._load[device] = list(stats)
+			else:
+				cls._load[device] = [0, 0, 0, 0]
+		return True
 
 	@classmethod
 	def update(cls):
+		if not cls._updating_devices:
+			return
+		if cls._use_netlink and not cmd.get_root_prefix() and cls._update_netlink():
+			return
 		for device in cls._updating_devices:
 			cls._updateStat(device)
-
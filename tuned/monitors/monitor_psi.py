@@ -0,0 +1,240 @@
+import tuned.monitors
+import tuned.logs
+import errno
+import os
+import select
+import threading
+from tuned.utils.commands import commands
+
+log = tuned.logs.get()
+cmd = commands()
+
+PRESSURE_DIR = "/proc/pressure"
+CGROUP_DIR = "/sys/fs/cgroup"
+
+# order of the values in the load of a device
+_LINES = ["some", "full"]
+_FIELDS = ["avg10", "avg60", "avg300", "total"]
+
+def parse_pressure(data):
+	"""
+	Parse the content of a PSI file (/proc/pressure/<resource> or
+	<cgroup>/<resource>.pressure).
+
+	Return:
+	list -- [some avg10, some avg60, some avg300, some total,
+	         full avg10, full avg60, full avg300, full total],
+	        the averages are percents, the totals microseconds. The
+	        values of a missing line (e.g. 'full' of the cpu on older
+	        kernels) are zeros.
+	"""
+	load = [0.0] * (len(_LINES) * len(_FIELDS))
+	for line in data.splitlines():
+		items = line.split()
+		if not items or items[0] not in _LINES:
+			continue
+		start = _LINES.index(items[0]) * len(_FIELDS)
+		for item in items[1:]:
+			(key, sep, value) = item.partition("=")
+			if key not in _FIELDS:
+				continue
+			try:
+				load[start + _FIELDS.index(key)] = float(value)
+			except ValueError:
+				pass
+	return load
+
+class _TriggerWatcher(object):
+	"""
+	Waits for the PSI trigger events in a background thread and calls
+	their callbacks. The thread runs only while there are some triggers.
+	"""
+
+	def __init__(self, events = select.POLLPRI):
+		self._events = events
+		self._lock = threading.Lock()
+		self._callbacks = {}
+		self._poll = select.poll()
+		self._thread = None
+		(self._wake_r, self._wake_w) = os.pipe()
+		self._poll.register(self._wake_r, select.POLLIN)
+
+	def add(self, fd, callback):
+		with self._lock:
+			self._callbacks[fd] = callback
+			self._poll.register(fd, self._events)
+			if self._thread is None:
+				self._thread = threading.Thread(target = self._thread_code, name = "tuned-psi")
+				self._thread.daemon = True
+				self._thread.start()
+		self._wake()
+
+	def remove(self, fd):
+		with self._lock:
+			if self._callbacks.pop(fd, None) is None:
+				return
+			self._poll.unregister(fd)
+		self._wake()
+
+	def _wake(self):
+		try:
+			os.write(self._wake_w, b"x")
+		except OSError:
+			pass
+
+	def _thread_code(self):
+		while True:
+			with self._lock:
+				if not self._callbacks:
+					self._thread = None
+					return
+			try:
+				events = self._poll.poll()
+			except (OSError, select.error) as e:
+				if getattr(e, "errno", None) == errno.EINTR:
+					continue
+				raise
+			for (fd, event) in events:
+				if fd == self._wake_r:
+					os.read(self._wake_r, 4096)
+					continue
+				with self._lock:
+					callback = self._callbacks.get(fd)
+				if callback is None:
+					continue
+				if event & (select.POLLERR | select.POLLNVAL):
+					# the trigger was destroyed, e.g. its cgroup was removed
+					log.debug("PSI trigger on fd %d is gone" % fd)
+					self.remove(fd)
+					continue
+				try:
+					callback()
+				except Exception as e:
+					log.error("PSI trigger callback failed: %s" % e)
+
+class PSIMonitor(tuned.monitors.Monitor):
+	"""
+	Pressure Stall Information of the CPU, I/O and memory.
+
+	The system-wide devices are named by the resources ('cpu', 'io',
+	'memory', 'irq') found in /proc/pressure. The pressure of a cgroup v2
+	is a device '<cgroup>/<resource>' where <cgroup> is the path of the
+	cgroup relative to /sys/fs/cgroup, e.g. 'system.slice/io'. The load
+	of a device is the list returned by parse_pressure.
+
+	Besides the periodic sampling, add_trigger registers a kernel PSI
+	trigger: the callback is called (from a background thread) as soon as
+	the stall time exceeds the threshold within the time window, so the
+	caller can react without waiting for the next update.
+	"""
+
+	_watcher = None
+	_fields = ["%s_%s" % (line, field) for line in _LINES for field in _FIELDS]
+
+	@classmethod
+	def _init_available_devices(cls):
+		try:
+			resources = os.listdir(cmd.root_path(PRESSURE_DIR))
+		except OSError:
+			resources = []
+		cls._available_devices = set()
+		for resource in resources:
+			# reading fails if the PSI is disabled (psi=0 on the kernel command line)
+			if cls._read_pressure(resource) is not None:
+				cls._available_devices.add(resource)
+		for device in cls._available_devices:
+			cls._load[device] = [0.0] * (len(_LINES) * len(_FIELDS))
+
+	@staticmethod
+	def _pressure_path(device):
+		(cgroup, sep, resource) = device.rpartition("/")
+		if not sep:
+			return os.path.join(PRESSURE_DIR, resource)
+		return os.path.join(CGROUP_DIR, cgroup.strip("/"), "%s.pressure" % resource)
+
+	@classmethod
+	def _read_pressure(cls, device):
+		try:
+			with open(cmd.root_path(cls._pressure_path(device))) as f:
+				return parse_pressure(f.read())
+		except (OSError, IOError):
+			return None
+
+	@classmethod
+	def _add_cgroup_devices(cls, devices):
+		for device in devices:
+			if "/" in device and device not in cls._available_devices \
+					and os.path.isfile(cmd.root_path(cls._pressure_path(device))):
+				cls._available_devices.add(device)
+
+	@classmethod
+	def update(cls):
+		for device in cls._updating_devices:
+			load = cls._read_pressure(device)
+			if load is not None:
+				cls._load[device] = load
+
+	def __init__(self, devices = None, update_interval = None):
+		if not hasattr(self, "_class_initialized"):
+			self._init_class()
+		if devices is not None:
+			self._add_cgroup_devices(devices)
+		self._triggers = []
+		super(PSIMonitor, self).__init__(devices, update_interval)
+
+	def cleanup(self):
+		for fd in list(getattr(self, "_triggers", [])):
+			self.remove_trigger(fd)
+		super(PSIMonitor, self).cleanup()
+
+	def add_device(self, device):
+		self._add_cgroup_devices([device])
+		if device in self._available_devices:
+			self._devices.add(device)
+			self._updating_devices.add(device)
+
+	@classmethod
+	def _get_watcher(cls):
+		if PSIMonitor._watcher is None:
+			PSIMonitor._watcher = _TriggerWatcher()
+		return PSIMonitor._watcher
+
+	def add_trigger(self, device, stall_us, window_us, callback, kind = "some"):
+		"""
+		Call callback() when the 'some' (or 'full') stall time of the
+		device exceeds stall_us microseconds within window_us microseconds.
+		The kernel accepts windows of 500 ms to 10 s (multiples of 2 s
+		only for the unprivileged users) and reports an event at most once
+		per window.
+
+		Return:
+		int -- trigger handle for remove_trigger, None if the trigger
+		       cannot be created
+		"""
+		if cmd.get_root_prefix():
+			# the triggers of a fake tree would never fire
+			return None
+		path = self._pressure_path(device)
+		try:
+			fd = os.open(path, os.O_RDWR | os.O_NONBLOCK)
+		except OSError as e:
+			log.info("cannot open '%s' for a PSI trigger: %s" % (path, e))
+			return None
+		try:
+			os.write(fd, ("%s %d %d" % (kind, stall_us, window_us)).encode() + b"\0")
+		except OSError as e:
+			log.info("cannot create PSI trigger '%s %d %d' on '%s': %s"
+					% (kind, stall_us, window_us, path, e))
+			os.close(fd)
+			return None
+		self._get_watcher().add(fd, callback)
+		self._triggers.append(fd)
+		log.debug("created PSI trigger '%s %d %d' on '%s'" % (kind, stall_us, window_us, path))
+		return fd
+
+	def remove_trigger(self, fd):
+		if fd not in self._triggers:
+			return
+		self._triggers.remove(fd)
+		self._get_watcher().remove(fd)
+		os.close(fd)
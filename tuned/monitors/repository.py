@@ -21,10 +21,10 @@ class Repository(ClassLoader):
 		self._prefix = "monitor_"
 		self._interface = tuned.monitors.Monitor
 
-	def create(self, plugin_name, devices):
+	def create(self, plugin_name, devices, update_interval = None):
 		log.debug("creating monitor %s" % plugin_name)
 		monitor_cls = self.load_class(plugin_name)
-		monitor_instance = monitor_cls(devices)
+		monitor_instance = monitor_cls(devices, update_interval)
 		self._monitors.add(monitor_instance)
 		return monitor_instance
 
@@ -4,11 +4,18 @@ import tuned.profiles.variables
 import tuned.logs
 import collections
 from tuned.utils.commands import commands
+from tuned.utils.timings import no_measure
 import os
+import threading
+import time
 from subprocess import Popen, PIPE
 
 log = tuned.logs.get()
 
+# seconds a reported pressure stall is considered lasting, the span
+# of the shortest PSI average
+PRESSURE_HOLD = 10.0
+
 class Plugin(object):
 	"""
 	Base class for all plugins.
@@ -19,7 +26,7 @@ class Plugin(object):
 	Intentionally a lot of logic is included in the plugin to increase plugin flexibility.
 	"""
 
-	def __init__(self, monitors_repository, storage_factory, hardware_inventory, device_matcher, device_matcher_udev, instance_factory, global_cfg, variables):
+	def __init__(self, monitors_repository, storage_factory, hardware_inventory, device_matcher, device_matcher_udev, instance_factory, global_cfg, variables, timings = None):
 		"""Plugin constructor."""
 
 		self._storage = storage_factory.create(self.__class__.__name__)
@@ -34,11 +41,22 @@ class Plugin(object):
 
 		self._global_cfg = global_cfg
 		self._variables = variables
+		self._timings = timings
 		self._has_dynamic_options = False
 		self._devices_inited = False
 
 		self._options_used_by_dynamic = self._get_config_options_used_by_dynamic()
 
+		# set by the units manager, see _request_update
+		self.update_requester = None
+		self.event_notifier = None
+
+		# {(instance, option, device): passed} of the last verification
+		self._verify_results = {}
+		# {(instance, change, device): count} of the dynamic tuning changes
+		self._dynamic_changes = {}
+		self._results_lock = threading.Lock()
+
 		self._cmd = commands()
 
 	def cleanup(self):
@@ -67,6 +85,15 @@ class Plugin(object):
 		"""Explanation of each config option function"""
 		return {}
 
+	@classmethod
+	def get_dependencies(cls):
+		"""
+		Names of plugins whose instances must not be processed concurrently
+		with instances of this plugin, they are processed in the order given
+		by the instance priorities instead. "*" means all plugins.
+		"""
+		return []
+
 	@classmethod
 	def _get_config_options_used_by_dynamic(self):
 		"""List of config options used by dynamic tuning. Their previous values will be automatically saved and restored."""
@@ -93,16 +120,17 @@ class Plugin(object):
 	# Interface for manipulation with instances of the plugin.
 	#
 
-	def create_instance(self, name, priority, devices_expression, devices_udev_regex, script_pre, script_post, options):
+	def create_instance(self, name, priority, devices_expression, devices_udev_regex, script_pre, script_post, options, update_interval = None):
 		"""Create new instance of the plugin and seize the devices."""
 		if name in self._instances:
 			raise Exception("Plugin instance with name '%s' already exists." % name)
 
 		effective_options = self._get_effective_options(options)
 		instance = self._instance_factory.create(self, name, priority, devices_expression, devices_udev_regex, \
-			script_pre, script_post, effective_options)
+			script_pre, script_post, effective_options, update_interval = update_interval)
 		self._instances[name] = instance
 		self._instances = collections.OrderedDict(sorted(self._instances.items(), key=lambda x: x[1].priority))
+		self._notify_event(consts.EVENT_INSTANCE_CREATED, instance, detail = self.name)
 
 		return instance
 
@@ -132,6 +160,46 @@ class Plugin(object):
 	def _destroy_instance(self, instance):
 		self.release_devices(instance)
 		self._instance_cleanup(instance)
+		with self._results_lock:
+			for key in [key for key in self._verify_results if key[0] == instance.name]:
+				del self._verify_results[key]
+		self._notify_event(consts.EVENT_INSTANCE_DESTROYED, instance, detail = self.name)
+
+	def get_verify_results(self):
+		"""
+		Return list of tuples (instance, option, device, passed) of the
+		last verification of the options, device is empty for the non-device
+		options.
+		"""
+		with self._results_lock:
+			return [key + (passed,) for key, passed in self._verify_results.items()]
+
+	def get_dynamic_changes(self):
+		"""
+		Return list of tuples (instance, change, device, count) counting the
+		changes made by the dynamic tuning, e.g. of a power level.
+		"""
+		with self._results_lock:
+			return [key + (float(count),) for key, count in self._dynamic_changes.items()]
+
+	def _record_verify_result(self, instance, command, device, result):
+		if result is None:
+			return
+		with self._results_lock:
+			self._verify_results[(instance.name, command["name"], "" if device is None else device)] = bool(result)
+		if not result:
+			self._notify_event(consts.EVENT_VERIFY_FAILED, instance, device, command["name"])
+
+	def _record_dynamic_change(self, instance, change, device = None):
+		key = (instance.name, change, "" if device is None else device)
+		with self._results_lock:
+			self._dynamic_changes[key] = self._dynamic_changes.get(key, 0) + 1
+		self._notify_event(consts.EVENT_DYNAMIC_CHANGE, instance, device, change)
+
+	def _notify_event(self, event, instance, device = None, detail = ""):
+		"""Report a tuning event (one of consts.EVENT_*) to the subscribed clients."""
+		if self.event_notifier is not None:
+			self.event_notifier(event, instance.name, "" if device is None else device, detail)
 
 	def _instance_init(self, instance):
 		raise NotImplementedError()
@@ -278,17 +346,18 @@ class Plugin(object):
 		if not instance.active:
 			return
 
-		if instance.has_static_tuning:
-			self._call_device_script(instance, instance.script_pre,
-					"apply", instance.assigned_devices)
-			self._instance_pre_static(instance, True)
-			self._instance_apply_static(instance)
-			self._instance_post_static(instance, True)
-			self._call_device_script(instance, instance.script_post,
-					"apply", instance.assigned_devices)
-		if instance.has_dynamic_tuning and self._global_cfg.get(consts.CFG_DYNAMIC_TUNING, consts.CFG_DEF_DYNAMIC_TUNING):
-			self._instance_init_dynamic(instance)
-			self._run_for_each_device(instance, self._instance_apply_dynamic, instance.assigned_devices)
+		with self._cmd.transaction():
+			if instance.has_static_tuning:
+				self._call_device_script(instance, instance.script_pre,
+						"apply", instance.assigned_devices)
+				self._instance_pre_static(instance, True)
+				self._instance_apply_static(instance)
+				self._instance_post_static(instance, True)
+				self._call_device_script(instance, instance.script_post,
+						"apply", instance.assigned_devices)
+			if instance.has_dynamic_tuning and self._global_cfg.get(consts.CFG_DYNAMIC_TUNING, consts.CFG_DEF_DYNAMIC_TUNING):
+				self._instance_init_dynamic(instance)
+				self._run_for_each_device(instance, self._instance_apply_dynamic, instance.assigned_devices)
 		instance.processed_devices.update(instance.assigned_devices)
 		instance.assigned_devices.clear()
 
@@ -304,13 +373,14 @@ class Plugin(object):
 					% ", ".join(instance.assigned_devices))
 		devices = instance.processed_devices.copy()
 		if instance.has_static_tuning:
-			if self._call_device_script(instance, instance.script_pre, "verify", devices) == False:
-				return False
-			if self._instance_verify_static(instance, ignore_missing, devices) == False:
-				return False
-			if self._call_device_script(instance, instance.script_post, "verify", devices) == False:
-				return False
-			return True
+			with self._cmd.transaction():
+				if self._call_device_script(instance, instance.script_pre, "verify", devices) == False:
+					return False
+				if self._instance_verify_static(instance, ignore_missing, devices) == False:
+					return False
+				if self._call_device_script(instance, instance.script_post, "verify", devices) == False:
+					return False
+				return True
 		else:
 			return None
 
@@ -320,8 +390,9 @@ class Plugin(object):
 		"""
 		if not instance.active:
 			return
-		if instance.has_dynamic_tuning and self._global_cfg.get(consts.CFG_DYNAMIC_TUNING, consts.CFG_DEF_DYNAMIC_TUNING):
-			self._run_for_each_device(instance, self._instance_update_dynamic, instance.processed_devices.copy())
+		with self._cmd.transaction():
+			if instance.has_dynamic_tuning and self._global_cfg.get(consts.CFG_DYNAMIC_TUNING, consts.CFG_DEF_DYNAMIC_TUNING):
+				self._run_for_each_device(instance, self._instance_update_dynamic, instance.processed_devices.copy())
 
 	def instance_unapply_tuning(self, instance, rollback = consts.ROLLBACK_SOFT):
 		"""
@@ -330,16 +401,106 @@ class Plugin(object):
 		if rollback == consts.ROLLBACK_NONE:
 			return
 
-		if instance.has_dynamic_tuning and self._global_cfg.get(consts.CFG_DYNAMIC_TUNING, consts.CFG_DEF_DYNAMIC_TUNING):
-			self._run_for_each_device(instance, self._instance_unapply_dynamic, instance.processed_devices)
-		if instance.has_static_tuning:
-			self._call_device_script(instance, instance.script_post,
-					"unapply", instance.processed_devices,
-					rollback = rollback)
-			self._instance_pre_static(instance, False)
-			self._instance_unapply_static(instance, rollback)
-			self._instance_post_static(instance, False)
-			self._call_device_script(instance, instance.script_pre, "unapply", instance.processed_devices, rollback = rollback)
+		with self._cmd.transaction():
+			if instance.has_dynamic_tuning and self._global_cfg.get(consts.CFG_DYNAMIC_TUNING, consts.CFG_DEF_DYNAMIC_TUNING):
+				self._run_for_each_device(instance, self._instance_unapply_dynamic, instance.processed_devices)
+			if instance.has_static_tuning:
+				self._call_device_script(instance, instance.script_post,
+						"unapply", instance.processed_devices,
+						rollback = rollback)
+				self._instance_pre_static(instance, False)
+				self._instance_unapply_static(instance, rollback)
+				self._instance_post_static(instance, False)
+				self._call_device_script(instance, instance.script_pre, "unapply", instance.processed_devices, rollback = rollback)
+
+	def _static_tuning_is_generic(self):
+		cls = type(self)
+		return all(getattr(cls, name) is getattr(Plugin, name) for name in
+				["_instance_apply_static", "_instance_unapply_static",
+				"_instance_pre_static", "_instance_post_static"])
+
+	def supports_options_update(self, instance, changes):
+		"""
+		Check whether the changed options can be applied to the running
+		instance in place by instance_update_options(). It is possible only
+		for plugins using the generic static tuning and only if all the
+		changed options are handled by get/set commands.
+
+		changes -- {option_name: (old_value, new_value)}
+		"""
+		if not self._static_tuning_is_generic():
+			return False
+		if instance.script_pre or instance.script_post:
+			return False
+		for name in changes:
+			command = self._commands.get(name)
+			if command is None or command.get("custom") is not None:
+				return False
+		return True
+
+	def instance_update_options(self, instance, changes, options):
+		"""
+		Apply only the changed options to the running instance. Dropped
+		options are rolled back, the original values saved during the
+		previous apply are kept, so the rollback still restores the values
+		from before the first profile was applied.
+
+		changes -- {option_name: (old_value, new_value)} with expanded values
+		options -- new (unexpanded) options of the instance
+		"""
+		if instance.active and instance.has_static_tuning:
+			# options not set in the profile fall back to the plugin defaults
+			defaults = self._get_config_options()
+			new_values = {}
+			for name, (old_value, new_value) in changes.items():
+				old_value = self._variables.expand(defaults.get(name)) if old_value is None else old_value
+				new_value = self._variables.expand(defaults.get(name)) if new_value is None else new_value
+				if old_value != new_value:
+					new_values[name] = new_value
+			commands = [command for command in self._commands.values() if command["name"] in new_values]
+			for command in reversed(commands):
+				if new_values[command["name"]] is None:
+					for device in self._command_devices(instance, command):
+						self._update_command_value(instance, command, device, None)
+			for command in commands:
+				new_value = new_values[command["name"]]
+				if new_value is not None:
+					for device in self._command_devices(instance, command):
+						self._update_command_value(instance, command, device, new_value)
+		instance.options = self._get_effective_options(options)
+
+	def _command_devices(self, instance, command):
+		if command["per_device"]:
+			return list(instance.processed_devices)
+		return [None]
+
+	def _update_command_value(self, instance, command, device, new_value):
+		if new_value is None:
+			if device is None:
+				self._cleanup_non_device_command(instance, command)
+			else:
+				self._cleanup_device_command(instance, command, device)
+			return
+		original = self._storage_get(instance, command, device)
+		current = self._get_current_value(instance, command, device)
+		# assignment modifiers are evaluated against the original value as
+		# it would be done after the full rollback
+		value = self._process_assignment_modifiers(new_value, current if original is None else original)
+		if value is None:
+			if original is not None:
+				self._set_command_value(instance, command, device, original)
+				self._storage_unset(instance, command, device)
+			return
+		if original is None and current is not None:
+			self._storage_set(instance, command, current, device)
+		self._set_command_value(instance, command, device, value)
+
+	def _set_command_value(self, instance, command, device, value):
+		with self._measure(instance, "update", command, device):
+			if device is None:
+				command["set"](value, instance, sim = False, remove = False)
+			else:
+				command["set"](value, device, instance, sim = False, remove = False)
 
 	def _instance_apply_static(self, instance):
 		self._execute_all_non_device_commands(instance)
@@ -373,6 +534,75 @@ class Plugin(object):
 	def _instance_update_dynamic(self, instance, device):
 		raise NotImplementedError()
 
+	def _request_update(self, instance, monitors = ()):
+		"""Run the dynamic tuning of the instance as soon as possible."""
+		if self.update_requester is not None:
+			self.update_requester(instance, monitors)
+
+	def _percentage_option(self, instance, option):
+		"""Return the percentage (greater than 0) set by the option, None if it is not set or invalid."""
+		value = self._variables.expand(instance.options[option])
+		if value is None:
+			return None
+		try:
+			threshold = float(value)
+		except (ValueError, TypeError):
+			log.error("invalid %s value '%s', ignoring it" % (option, value))
+			return None
+		if not 0 < threshold <= 100:
+			log.error("%s must be a percentage greater than 0, ignoring '%s'" % (option, value))
+			return None
+		return threshold
+
+	#
+	# Pressure Stall Information (PSI) helpers of the dynamic tuning.
+	# A plugin using them sets instance._pressure_monitor to None
+	# in _instance_init.
+	#
+
+	def _pressure_watch(self, instance, resource, threshold):
+		"""
+		Watch the pressure of the resource ('cpu', 'io', 'memory' or
+		'<cgroup>/<resource>'). When the 'some' stall time exceeds
+		threshold percent of a second, the dynamic tuning of the instance
+		is run immediately, see _under_pressure.
+		"""
+		if instance._pressure_monitor is None:
+			instance._pressure_monitor = self._monitors_repository.create(
+					"psi", [resource], instance.update_interval)
+			instance._pressure_stalls = {}
+		else:
+			instance._pressure_monitor.add_device(resource)
+		monitor = instance._pressure_monitor
+		if resource not in monitor.devices:
+			log.warning("instance %s: pressure of '%s' is not available" % (instance.name, resource))
+			return False
+
+		def stalled():
+			instance._pressure_stalls[resource] = time.monotonic()
+			self._request_update(instance, [monitor])
+
+		if monitor.add_trigger(resource, int(threshold * 10000), 1000000, stalled) is None:
+			log.info("instance %s: checking pressure of '%s' only periodically"
+					% (instance.name, resource))
+		return True
+
+	def _under_pressure(self, instance, resource, threshold):
+		"""
+		Return True if a stall of the resource was reported within the
+		last PRESSURE_HOLD seconds or its 10 s average exceeds the threshold.
+		"""
+		stalled = instance._pressure_stalls.get(resource)
+		if stalled is not None and time.monotonic() - stalled < PRESSURE_HOLD:
+			return True
+		load = instance._pressure_monitor.get_device_load(resource)
+		return load is not None and load[0] >= threshold
+
+	def _pressure_unwatch(self, instance):
+		if instance._pressure_monitor is not None:
+			self._monitors_repository.delete(instance._pressure_monitor)
+			instance._pressure_monitor = None
+
 	#
 	# Registration of commands for static plugins.
 	#
@@ -457,6 +687,11 @@ class Plugin(object):
 	# Command execution, verification, and cleanup.
 	#
 
+	def _measure(self, instance, operation, command, device = None):
+		if self._timings is None:
+			return no_measure()
+		return self._timings.measure(instance.name, operation, command["name"], "" if device is None else device)
+
 	def _execute_all_non_device_commands(self, instance):
 		for command in [command for command in list(self._commands.values()) if not command["per_device"]]:
 			new_value = self._variables.expand(instance.options.get(command["name"], None))
@@ -529,20 +764,22 @@ class Plugin(object):
 		return new_value
 
 	def _execute_device_command(self, instance, command, device, new_value):
-		if command["custom"] is not None:
-			command["custom"](True, new_value, device, False, False, instance)
-		else:
-			new_value = self._check_and_save_value(instance, command, device, new_value)
-			if new_value is not None:
-				command["set"](new_value, device, instance, sim = False, remove = False)
+		with self._measure(instance, "apply", command, device):
+			if command["custom"] is not None:
+				command["custom"](True, new_value, device, False, False, instance)
+			else:
+				new_value = self._check_and_save_value(instance, command, device, new_value)
+				if new_value is not None:
+					command["set"](new_value, device, instance, sim = False, remove = False)
 
 	def _execute_non_device_command(self, instance, command, new_value):
-		if command["custom"] is not None:
-			command["custom"](True, new_value, False, False, instance)
-		else:
-			new_value = self._check_and_save_value(instance, command, None, new_value)
-			if new_value is not None:
-				command["set"](new_value, instance, sim = False, remove = False)
+		with self._measure(instance, "apply", command):
+			if command["custom"] is not None:
+				command["custom"](True, new_value, False, False, instance)
+			else:
+				new_value = self._check_and_save_value(instance, command, None, new_value)
+				if new_value is not None:
+					command["set"](new_value, instance, sim = False, remove = False)
 
 	def _norm_value(self, value):
 		v = self._cmd.unquote(str(value))
@@ -598,6 +835,12 @@ class Plugin(object):
 			return False
 
 	def _verify_device_command(self, instance, command, device, new_value, ignore_missing):
+		with self._measure(instance, "verify", command, device):
+			result = self._verify_device_command_value(instance, command, device, new_value, ignore_missing)
+		self._record_verify_result(instance, command, device, result)
+		return result
+
+	def _verify_device_command_value(self, instance, command, device, new_value, ignore_missing):
 		if command["custom"] is not None:
 			return command["custom"](True, new_value, device, True, ignore_missing, instance)
 		current_value = self._get_current_value(instance, command, device, ignore_missing=ignore_missing)
@@ -608,6 +851,12 @@ class Plugin(object):
 		return self._verify_value(command["name"], new_value, current_value, ignore_missing, device)
 
 	def _verify_non_device_command(self, instance, command, new_value, ignore_missing):
+		with self._measure(instance, "verify", command):
+			result = self._verify_non_device_command_value(instance, command, new_value, ignore_missing)
+		self._record_verify_result(instance, command, None, result)
+		return result
+
+	def _verify_non_device_command_value(self, instance, command, new_value, ignore_missing):
 		if command["custom"] is not None:
 			return command["custom"](True, new_value, True, ignore_missing, instance)
 		current_value = self._get_current_value(instance, command)
@@ -629,19 +878,21 @@ class Plugin(object):
 					self._cleanup_device_command(instance, command, device, remove)
 
 	def _cleanup_device_command(self, instance, command, device, remove = False):
-		if command["custom"] is not None:
-			command["custom"](False, None, device, False, False, instance)
-		else:
-			old_value = self._storage_get(instance, command, device)
-			if old_value is not None:
-				command["set"](old_value, device, instance, sim = False, remove = remove)
-			self._storage_unset(instance, command, device)
+		with self._measure(instance, "unapply", command, device):
+			if command["custom"] is not None:
+				command["custom"](False, None, device, False, False, instance)
+			else:
+				old_value = self._storage_get(instance, command, device)
+				if old_value is not None:
+					command["set"](old_value, device, instance, sim = False, remove = remove)
+				self._storage_unset(instance, command, device)
 
 	def _cleanup_non_device_command(self, instance, command):
-		if command["custom"] is not None:
-			command["custom"](False, None, False, False, instance)
-		else:
-			old_value = self._storage_get(instance, command)
-			if old_value is not None:
-				command["set"](old_value, instance, sim = False, remove = False)
-			self._storage_unset(instance, command)
+		with self._measure(instance, "unapply", command):
+			if command["custom"] is not None:
+				command["custom"](False, None, False, False, instance)
+			else:
+				old_value = self._storage_get(instance, command)
+				if old_value is not None:
+					command["set"](old_value, instance, sim = False, remove = False)
+				self._storage_unset(instance, command)
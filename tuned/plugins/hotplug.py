@@ -43,6 +43,7 @@ class Plugin(base.Plugin):
 		self._added_device_apply_tuning(instance, device_name)
 		self._call_device_script(instance, instance.script_post, "apply", [device_name])
 		instance.processed_devices.add(device_name)
+		self._notify_event(consts.EVENT_DEVICE_ASSIGNED, instance, device_name)
 
 	def _add_device(self, device_name):
 		if device_name in (self._assigned_devices | self._free_devices):
@@ -79,6 +80,7 @@ class Plugin(base.Plugin):
 			instance.active = len(instance.processed_devices) \
 					+ len(instance.assigned_devices) > 0
 			self._assigned_devices.remove(device_name)
+			self._notify_event(consts.EVENT_DEVICE_RELEASED, instance, device_name)
 			return True
 		return False
 
@@ -4,7 +4,7 @@ class Instance(object):
 	"""
 	"""
 
-	def __init__(self, plugin, name, priority, devices_expression, devices_udev_regex, script_pre, script_post, options):
+	def __init__(self, plugin, name, priority, devices_expression, devices_udev_regex, script_pre, script_post, options, update_interval = None):
 		self._plugin = plugin
 		self._name = name
 		self._devices_expression = devices_expression
@@ -12,6 +12,7 @@ class Instance(object):
 		self._script_pre = script_pre
 		self._script_post = script_post
 		self._options = options
+		self._update_interval = update_interval
 
 		self._active = True
 		self._priority = priority
@@ -71,6 +72,15 @@ class Instance(object):
 	def options(self):
 		return self._options
 
+	@options.setter
+	def options(self, value):
+		self._options = value
+
+	@property
+	def update_interval(self):
+		"""Period of the dynamic tuning in seconds, None means the global update_interval."""
+		return self._update_interval
+
 	@property
 	def has_static_tuning(self):
 		return self._has_static_tuning
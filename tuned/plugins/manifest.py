@@ -0,0 +1,110 @@
+import json
+import os
+import sys
+import tuned.logs
+import tuned.version
+from tuned.utils.class_loader import ClassLoader
+from tuned.plugins.base import Plugin
+
+log = tuned.logs.get()
+
+__all__ = ["Manifest"]
+
+MANIFEST_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "manifest.json")
+
+class Manifest(ClassLoader):
+	"""
+	Static description of the plugins: their names, default values of the
+	options, hints of the options and documentation.
+
+	The manifest is generated at build time (python3 -m tuned.plugins.manifest),
+	so the plugins and the modules they need do not have to be imported
+	just to list them. Plugins missing in the manifest (it is outdated or
+	the plugin could not be imported at build time) are described by
+	importing them.
+	"""
+
+	__slots__ = ["_path", "_plugins"]
+
+	def __init__(self, path = None):
+		super(Manifest, self).__init__()
+		self._path = MANIFEST_FILE if path is None else path
+		self._plugins = None
+
+	def _set_loader_parameters(self):
+		self._namespace = "tuned.plugins"
+		self._prefix = "plugin_"
+		self._interface = Plugin
+
+	@property
+	def path(self):
+		return self._path
+
+	def _load(self):
+		if self._plugins is not None:
+			return self._plugins
+		self._plugins = {}
+		try:
+			with open(self._path) as f:
+				data = json.load(f)
+		except (OSError, IOError) as e:
+			log.debug("Unable to read plugin manifest '%s': %s" % (self._path, e))
+			return self._plugins
+		except ValueError as e:
+			log.warning("Ignoring invalid plugin manifest '%s': %s" % (self._path, e))
+			return self._plugins
+		if data.get("version") != tuned.version.TUNED_VERSION_STR:
+			log.debug("Ignoring plugin manifest '%s' created by different TuneD version" % self._path)
+			return self._plugins
+		self._plugins = data.get("plugins", {})
+		return self._plugins
+
+	@staticmethod
+	def describe(plugin_class):
+		"""Return description of the plugin class as stored in the manifest."""
+		return {
+			"options": dict((key, str(val)) for key, val in plugin_class._get_config_options().items()),
+			"hints": dict(plugin_class.get_config_options_hints()),
+			"documentation": plugin_class.__doc__,
+		}
+
+	def get_plugin(self, plugin_name):
+		"""
+		Return description of the plugin, raise ImportError if there is
+		no such plugin.
+
+		Return:
+		dictionary -- {"options": {option_name: default_value},
+			"hints": {option_name: hint}, "documentation": docstring}
+		"""
+		plugins = self._load()
+		if plugin_name not in plugins:
+			plugins[plugin_name] = self.describe(self.load_class(plugin_name))
+		return plugins[plugin_name]
+
+	def get_plugins(self):
+		"""Return descriptions of all the available plugins, {plugin_name: description}."""
+		plugins = {}
+		for plugin_name in self.get_class_names():
+			try:
+				plugins[plugin_name] = self.get_plugin(plugin_name)
+			except ImportError as e:
+				log.debug("Unable to load plugin '%s': %s" % (plugin_name, e))
+		return plugins
+
+	def generate(self):
+		"""Describe all the plugins by importing them and save the manifest."""
+		plugins = {}
+		for plugin_name in self.get_class_names():
+			try:
+				plugins[plugin_name] = self.describe(self.load_class(plugin_name))
+			except ImportError as e:
+				log.warning("Plugin '%s' omitted from the manifest: %s" % (plugin_name, e))
+		with open(self._path, "w") as f:
+			json.dump({"version": tuned.version.TUNED_VERSION_STR, "plugins": plugins},
+					f, indent = 1, sort_keys = True)
+		self._plugins = plugins
+		return plugins
+
+if __name__ == "__main__":
+	Manifest(sys.argv[1] if len(sys.argv) > 1 else None).generate()
@@ -32,6 +32,12 @@ class ACPIPlugin(base.Plugin):
 	def __init__(self, *args, **kwargs):
 		super(ACPIPlugin, self).__init__(*args, **kwargs)
 
+	@classmethod
+	def get_dependencies(cls):
+		# the platform profile can change the energy performance
+		# preference set by the cpu plugin
+		return ["cpu"]
+
 	@classmethod
 	def _get_config_options(cls):
 		return {"platform_profile": None}
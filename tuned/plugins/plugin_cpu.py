@@ -9,7 +9,9 @@ import errno
 import struct
 import errno
 import platform
-import procfs
+from tuned.utils.lazy_import import lazy_import
+
+procfs = lazy_import("procfs")
 
 log = tuned.logs.get()
 
@@ -106,6 +108,51 @@ class CPULatencyPlugin(hotplug.Plugin):
 	specified either by the [option]`latency_high` option or by the
 	[option]`latency_low` option.
 
+	`cpu_pressure_threshold`:::
+	Instead of the CPU load, the latency can follow the CPU pressure
+	(Pressure Stall Information, the share of time some tasks were
+	waiting for a CPU). If the [option]`cpu_pressure_threshold` option
+	is set to a percentage, the latency is set to
+	[option]`latency_low` as soon as the stall time exceeds the
+	percentage of a second, without waiting for the next update, and
+	back to [option]`latency_high` once the 10 s average of the pressure
+	drops below the percentage.
+	+
+	.Switch to low latency when tasks wait for a CPU 20% of the time
+	====
+	----
+	[cpu]
+	cpu_pressure_threshold=20
+	----
+	====
+
+	`cpu_utilization_threshold`:::
+	On hosts where some cores are saturated while the others idle, a
+	single system-wide decision fits neither of them. If the
+	[option]`cpu_utilization_threshold` option is set to a percentage,
+	every CPU of the instance is classified as busy or idle by its own
+	utilization and gets the values of the `busy_*` or `idle_*` options:
+	[option]`busy_pm_qos_resume_latency_us`,
+	[option]`idle_pm_qos_resume_latency_us`,
+	[option]`busy_governor`, [option]`idle_governor`,
+	[option]`busy_energy_performance_preference` and
+	[option]`idle_energy_performance_preference`. The values use the same
+	syntax as the corresponding static options, the options which are
+	not set are not changed. The values set before the dynamic tuning
+	started are restored when it stops.
+	+
+	.Keep the busy cores responsive and let the idle ones save power
+	====
+	----
+	[cpu]
+	cpu_utilization_threshold=60
+	busy_pm_qos_resume_latency_us=n/a
+	idle_pm_qos_resume_latency_us=100
+	busy_energy_performance_preference=performance
+	idle_energy_performance_preference=balance_power
+	----
+	====
+
 	`force_latency`:::
 	You can also force the latency to a specific value and prevent it from
 	dynamically changing further. To do so, set the [option]`force_latency`
@@ -244,6 +291,14 @@ class CPULatencyPlugin(hotplug.Plugin):
 			"latency_low"          : 100,
 			"latency_high"         : 1000,
 			"force_latency"        : None,
+			"cpu_pressure_threshold" : None,
+			"cpu_utilization_threshold" : None,
+			"busy_pm_qos_resume_latency_us" : None,
+			"idle_pm_qos_resume_latency_us" : None,
+			"busy_governor"        : None,
+			"idle_governor"        : None,
+			"busy_energy_performance_preference" : None,
+			"idle_energy_performance_preference" : None,
 			"governor"             : None,
 			"sampling_down_factor" : None,
 			"energy_perf_bias"     : None,
@@ -305,12 +360,12 @@ class CPULatencyPlugin(hotplug.Plugin):
 			log.warning("your CPU doesn't support MSR_IA32_ENERGY_PERF_BIAS, ignoring CPU energy performance bias")
 
 	def _check_intel_pstate(self):
-		self._has_intel_pstate = os.path.exists("/sys/devices/system/cpu/intel_pstate")
+		self._has_intel_pstate = os.path.exists(self._cmd.root_path("/sys/devices/system/cpu/intel_pstate"))
 		if self._has_intel_pstate:
 			log.info("intel_pstate detected")
 
 	def _check_amd_pstate(self):
-		self._has_amd_pstate = os.path.exists("/sys/devices/system/cpu/amd_pstate")
+		self._has_amd_pstate = os.path.exists(self._cmd.root_path("/sys/devices/system/cpu/amd_pstate"))
 		if self._has_amd_pstate:
 			log.info("amd-pstate detected")
 
@@ -324,7 +379,7 @@ class CPULatencyPlugin(hotplug.Plugin):
 		return self._cmd.is_cpu_online(str(device).replace("cpu", ""))
 
 	def _cpu_has_scaling_governor(self, device):
-		return os.path.exists("/sys/devices/system/cpu/%s/cpufreq/scaling_governor" % device)
+		return os.path.exists(self._cmd.root_path("/sys/devices/system/cpu/%s/cpufreq/scaling_governor" % device))
 
 	def _check_cpu_can_change_governor(self, device):
 		if not self._is_cpu_online(device):
@@ -339,41 +394,135 @@ class CPULatencyPlugin(hotplug.Plugin):
 		instance._has_static_tuning = True
 		instance._has_dynamic_tuning = False
 		instance._load_monitor = None
+		instance._pressure_monitor = None
+		instance._cpu_monitor = None
+		instance._latency_dynamic = False
 
 		# only the first instance of the plugin can control the latency
 		if list(self._instances.values())[0] == instance:
 			instance._first_instance = True
 			try:
-				self._cpu_latency_fd = os.open(consts.PATH_CPU_DMA_LATENCY, os.O_WRONLY)
+				self._cpu_latency_fd = os.open(self._cmd.root_path(consts.PATH_CPU_DMA_LATENCY), os.O_WRONLY)
 			except OSError:
 				log.info("Unable to open '%s', disabling PM_QoS control" % consts.PATH_CPU_DMA_LATENCY)
 				self._has_pm_qos = False
 			self._latency = None
 
 			if instance.options["force_latency"] is None and instance.options["pm_qos_resume_latency_us"] is None:
-				instance._has_dynamic_tuning = True
+				instance._latency_dynamic = True
 
 			self._check_arch()
 		else:
 			instance._first_instance = False
 			log.info("Latency settings from non-first CPU plugin instance '%s' will be ignored." % instance.name)
+		instance._has_dynamic_tuning = instance._latency_dynamic \
+				or instance.options["cpu_utilization_threshold"] is not None
 
 		try:
 			instance._first_device = list(instance.assigned_devices)[0]
 		except IndexError:
 			instance._first_device = None
 
+		# recover the original per-CPU settings in case of crash
+		for device in instance.assigned_devices:
+			self._restore_per_cpu_settings(instance, device,
+					[option for (option, getter, setter) in self._per_cpu_options()])
+
 	def _instance_cleanup(self, instance):
+		if instance._cpu_monitor is not None:
+			self._monitors_repository.delete(instance._cpu_monitor)
+			instance._cpu_monitor = None
 		if instance._first_instance:
 			if self._has_pm_qos:
 				os.close(self._cpu_latency_fd)
 			if instance._load_monitor is not None:
 				self._monitors_repository.delete(instance._load_monitor)
+			self._pressure_unwatch(instance)
 
 	def _instance_init_dynamic(self, instance):
 		super(CPULatencyPlugin, self)._instance_init_dynamic(instance)
-		if instance._first_instance:
-			instance._load_monitor = self._monitors_repository.create("load", None)
+		self._init_per_cpu_dynamic(instance)
+		instance._pressure_threshold = None
+		if instance._latency_dynamic:
+			instance._pressure_threshold = self._percentage_option(instance, "cpu_pressure_threshold")
+			if instance._pressure_threshold is not None \
+					and self._pressure_watch(instance, "cpu", instance._pressure_threshold):
+				return
+			instance._pressure_threshold = None
+			instance._load_monitor = self._monitors_repository.create("load", None,
+					instance.update_interval)
+
+	def _init_per_cpu_dynamic(self, instance):
+		instance._cpu_threshold = None
+		instance._cpu_classes = {}
+		threshold = self._percentage_option(instance, "cpu_utilization_threshold")
+		if threshold is None:
+			return
+		instance._cpu_settings = {}
+		for cpu_class in ["busy", "idle"]:
+			settings = []
+			for (option, getter, setter) in self._per_cpu_options():
+				value = self._variables.expand(instance.options["%s_%s" % (cpu_class, option)])
+				if value is not None:
+					settings.append((option, getter, setter, value))
+			instance._cpu_settings[cpu_class] = settings
+		if not instance._cpu_settings["busy"] and not instance._cpu_settings["idle"]:
+			log.warning("instance %s: no busy_* or idle_* option set, ignoring cpu_utilization_threshold"
+					% instance.name)
+			return
+		instance._cpu_threshold = threshold
+		instance._cpu_monitor = self._monitors_repository.create("cpu",
+				instance.assigned_devices, instance.update_interval)
+
+	def _per_cpu_options(self):
+		return [
+			("pm_qos_resume_latency_us", self._get_pm_qos_resume_latency_us, self._set_pm_qos_resume_latency_us),
+			("governor", self._get_governor, self._set_governor),
+			("energy_performance_preference", self._get_energy_performance_preference, self._set_energy_performance_preference),
+		]
+
+	def _cpu_class(self, instance, device):
+		"""Classify the CPU as 'busy' or 'idle' by its (smoothed) utilization."""
+		history = instance._cpu_monitor.get_history(device)
+		if history is not None and len(history) > 0:
+			utilization = history.ewma()
+		else:
+			utilization = instance._cpu_monitor.get_utilization(device)
+		if utilization is None:
+			return None
+		return "busy" if utilization >= instance._cpu_threshold else "idle"
+
+	def _update_per_cpu_dynamic(self, instance, device):
+		cpu_class = self._cpu_class(instance, device)
+		if cpu_class is None or instance._cpu_classes.get(device) == cpu_class:
+			return
+		log.debug("%s is %s" % (device, cpu_class))
+		instance._cpu_classes[device] = cpu_class
+		self._record_dynamic_change(instance, cpu_class, device)
+		for (option, getter, setter, value) in instance._cpu_settings[cpu_class]:
+			# the original value, it may be already saved by the static tuning
+			command = self._commands[option]
+			if self._storage_get(instance, command, device) is None:
+				original = getter(device, instance, ignore_missing = True)
+				if original is not None:
+					self._storage_set(instance, command, original, device)
+			setter(value, device, instance, False, False)
+
+	def _unapply_per_cpu_dynamic(self, instance, device):
+		instance._cpu_classes.pop(device, None)
+		options = set(option for settings in instance._cpu_settings.values()
+				for (option, getter, setter, value) in settings)
+		self._restore_per_cpu_settings(instance, device, options)
+
+	def _restore_per_cpu_settings(self, instance, device, options):
+		for (option, getter, setter) in self._per_cpu_options():
+			if option not in options:
+				continue
+			command = self._commands[option]
+			value = self._storage_get(instance, command, device)
+			if value is not None:
+				setter(value, device, instance, False, False)
+				self._storage_unset(instance, command, device)
 
 	def _get_intel_pstate_attr(self, attr):
 		return self._cmd.read_file("/sys/devices/system/cpu/intel_pstate/%s" % attr, None).strip()
@@ -425,11 +574,29 @@ class CPULatencyPlugin(hotplug.Plugin):
 		self._instance_update_dynamic(instance, device)
 
 	def _instance_update_dynamic(self, instance, device):
-		assert(instance._first_instance)
-		if device != instance._first_device:
+		if instance._cpu_threshold is not None:
+			self._update_per_cpu_dynamic(instance, device)
+		if not instance._latency_dynamic or device != instance._first_device:
+			return
+		latency = self._latency
+		self._update_dynamic_latency(instance)
+		if latency is not None and self._latency != latency:
+			self._record_dynamic_change(instance, "latency")
+
+	def _update_dynamic_latency(self, instance):
+		if instance._pressure_threshold is not None:
+			if self._under_pressure(instance, "cpu", instance._pressure_threshold):
+				self._set_latency(instance.options["latency_low"])
+			else:
+				self._set_latency(instance.options["latency_high"])
 			return
 
-		load = instance._load_monitor.get_load()["system"]
+		# decide by the smoothed load, not to flap on a single sample
+		history = instance._load_monitor.get_history("system")
+		if history is not None and len(history) > 0:
+			load = history.ewma()
+		else:
+			load = instance._load_monitor.get_load()["system"]
 		try:
 			load_threshold = float(instance.options["load_threshold"])
 		except (ValueError, TypeError):
@@ -442,7 +609,18 @@ class CPULatencyPlugin(hotplug.Plugin):
 			self._set_latency(instance.options["latency_low"])
 
 	def _instance_unapply_dynamic(self, instance, device):
-		pass
+		if instance._cpu_threshold is not None:
+			self._unapply_per_cpu_dynamic(instance, device)
+
+	def _added_device_apply_tuning(self, instance, device_name):
+		if instance._cpu_monitor is not None:
+			instance._cpu_monitor.add_device(device_name)
+		super(CPULatencyPlugin, self)._added_device_apply_tuning(instance, device_name)
+
+	def _removed_device_unapply_tuning(self, instance, device_name):
+		if instance._cpu_monitor is not None:
+			instance._cpu_monitor.remove_device(device_name)
+		super(CPULatencyPlugin, self)._removed_device_unapply_tuning(instance, device_name)
 
 	def _str2int(self, s):
 		try:
@@ -452,7 +630,7 @@ class CPULatencyPlugin(hotplug.Plugin):
 
 	def _read_cstates_latency(self):
 		self.cstates_latency = {}
-		for d in os.listdir(cpuidle_states_path):
+		for d in os.listdir(self._cmd.root_path(cpuidle_states_path)):
 			cstate_path = cpuidle_states_path + "/%s/" % d
 			name = self._cmd.read_file(cstate_path + "name", err_ret = None, no_error = True)
 			latency = self._cmd.read_file(cstate_path + "latency", err_ret = None, no_error = True)
@@ -597,7 +775,7 @@ class CPULatencyPlugin(hotplug.Plugin):
 		if governor not in list(self._governors_map.values()):
 			self._governors_map[device] = governor
 			path = self._sampling_down_factor_path(governor)
-			if not os.path.exists(path):
+			if not os.path.exists(self._cmd.root_path(path)):
 				log.debug("ignoring sampling_down_factor setting for CPU '%s', governor '%s' doesn't support it" % (device, governor))
 				return None
 			val = str(sampling_down_factor)
@@ -612,7 +790,7 @@ class CPULatencyPlugin(hotplug.Plugin):
 		if governor is None:
 			return None
 		path = self._sampling_down_factor_path(governor)
-		if not os.path.exists(path):
+		if not os.path.exists(self._cmd.root_path(path)):
 			return None
 		return self._cmd.read_file(path).strip()
 
@@ -646,7 +824,7 @@ class CPULatencyPlugin(hotplug.Plugin):
 		# see rhbz#2095829
 		if self._has_hwp_epp:
 			energy_perf_bias_path = self._energy_perf_bias_path(cpu_id)
-			if os.path.exists(energy_perf_bias_path):
+			if os.path.exists(self._cmd.root_path(energy_perf_bias_path)):
 				if not sim:
 					for val in vals:
 						val = val.strip()
@@ -722,7 +900,7 @@ class CPULatencyPlugin(hotplug.Plugin):
 		cpu_id = device.lstrip("cpu")
 		if self._has_hwp_epp:
 			energy_perf_bias_path = self._energy_perf_bias_path(cpu_id)
-			if os.path.exists(energy_perf_bias_path):
+			if os.path.exists(self._cmd.root_path(energy_perf_bias_path)):
 				energy_perf_bias = self._energy_perf_policy_to_human_v2(self._cmd.read_file(energy_perf_bias_path))
 		elif self._has_energy_perf_policy_and_bias:
 			retcode, lines = self._cmd.execute(["x86_energy_perf_policy", "-c", cpu_id, "-r"])
@@ -743,7 +921,7 @@ class CPULatencyPlugin(hotplug.Plugin):
 
 	def _check_pm_qos_resume_latency_us(self, device):
 		if self._has_pm_qos_resume_latency_us is None:
-			self._has_pm_qos_resume_latency_us = os.path.exists(self._pm_qos_resume_latency_us_path(device))
+			self._has_pm_qos_resume_latency_us = os.path.exists(self._cmd.root_path(self._pm_qos_resume_latency_us_path(device)))
 			if not self._has_pm_qos_resume_latency_us:
 				log.info("Option 'pm_qos_resume_latency_us' is not supported on current hardware.")
 		return self._has_pm_qos_resume_latency_us
@@ -782,7 +960,7 @@ class CPULatencyPlugin(hotplug.Plugin):
 		boost_set = False
 
 		boost = self._cmd.get_bool(boost)
-		if os.path.exists(self._pstate_boost_path(cpu_id)):
+		if os.path.exists(self._cmd.root_path(self._pstate_boost_path(cpu_id))):
 			if not sim:
 				if boost == "0" or boost == "1":
 					log.info("Setting boost value '%s' for cpu '%s'" % (boost, device))
@@ -824,7 +1002,7 @@ class CPULatencyPlugin(hotplug.Plugin):
 			log.debug("%s is not online, skipping" % device)
 			return None
 		cpu_id = device.lstrip("cpu")
-		if os.path.exists(self._pstate_boost_path(cpu_id)):
+		if os.path.exists(self._cmd.root_path(self._pstate_boost_path(cpu_id))):
 			val = self._cmd.read_file(self._pstate_boost_path(cpu_id)).strip()
 			# write returns EINVAL if boost isn't supported
 			return val if self._cmd.write_to_file(self._pstate_boost_path(cpu_id), val, \
@@ -839,7 +1017,7 @@ class CPULatencyPlugin(hotplug.Plugin):
 			log.debug("%s is not online, skipping" % device)
 			return None
 		cpu_id = device.lstrip("cpu")
-		if os.path.exists(self._pstate_preference_path(cpu_id, True)):
+		if os.path.exists(self._cmd.root_path(self._pstate_preference_path(cpu_id, True))):
 			vals = energy_performance_preference.split('|')
 			if not sim:
 				avail_vals = set(self._cmd.read_file(self._pstate_preference_path(cpu_id, True)).split())
@@ -872,7 +1050,7 @@ class CPULatencyPlugin(hotplug.Plugin):
 			return None
 		cpu_id = device.lstrip("cpu")
 		# read the EPP hint used by the intel_pstate and amd-pstate CPU scaling drivers
-		if os.path.exists(self._pstate_preference_path(cpu_id, True)):
+		if os.path.exists(self._cmd.root_path(self._pstate_preference_path(cpu_id, True))):
 			return self._cmd.read_file(self._pstate_preference_path(cpu_id)).strip()
 		else:
 			log.debug("energy_performance_available_preferences file missing, which can happen if the system is booted without a P-state driver.")
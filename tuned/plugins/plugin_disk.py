@@ -80,6 +80,23 @@ class DiskPlugin(hotplug.Plugin):
 	====
 	The disk readahead value can be multiplied by the constant
 	specified by the [option]`readahead_multiply` option.
+
+	With the dynamic tuning, the readahead can also follow the I/O
+	pressure (Pressure Stall Information). When the stall time of the I/O
+	exceeds [option]`io_pressure_threshold` percent of a second, the
+	readahead of the devices is set to [option]`pressure_readahead`
+	immediately. The previous readahead is restored once the 10 s average
+	of the I/O pressure drops below the threshold (or on the next start of
+	*TuneD* if it crashed meanwhile).
+
+	.Limit the readahead to 128 KiB when tasks wait for I/O 30% of the time
+	====
+	----
+	[disk]
+	io_pressure_threshold=30
+	pressure_readahead=128
+	----
+	====
 	"""
 
 	def __init__(self, *args, **kwargs):
@@ -167,6 +184,8 @@ class DiskPlugin(hotplug.Plugin):
 			"readahead"          : None,
 			"readahead_multiply" : None,
 			"scheduler_quantum"  : None,
+			"io_pressure_threshold" : None,
+			"pressure_readahead" : None,
 		}
 
 	@classmethod
@@ -183,12 +202,27 @@ class DiskPlugin(hotplug.Plugin):
 		self._spindown_errcnt = 0
 
 		instance._load_monitor = None
+		instance._pressure_monitor = None
 		instance._has_dynamic_tuning = self._option_bool(instance.options["dynamic"])
 
+		# recover the readahead changed on I/O pressure in case of crash
+		storage_key = self._pressure_storage_key(instance)
+		saved = self._storage.get(storage_key)
+		if saved:
+			log.info("recovering readahead changed on I/O pressure from previous run")
+			for (device, readahead) in saved.items():
+				self._set_readahead(readahead, device, instance, False, True)
+		if saved is not None:
+			self._storage.unset(storage_key)
+
+	def _pressure_storage_key(self, instance):
+		return self._storage_key(instance.name, "pressure_readahead")
+
 	def _instance_cleanup(self, instance):
 		if instance._load_monitor is not None:
 			self._monitors_repository.delete(instance._load_monitor)
 			instance._load_monitor = None
+		self._pressure_unwatch(instance)
 
 	def _instance_init_dynamic(self, instance):
 		super(DiskPlugin, self)._instance_init_dynamic(instance)
@@ -197,7 +231,51 @@ class DiskPlugin(hotplug.Plugin):
 		instance._idle = {}
 		instance._spindown_change_delayed = {}
 		instance._load_monitor = self._monitors_repository.create(
-						"disk", instance.assigned_devices)
+						"disk", instance.assigned_devices,
+						instance.update_interval)
+		self._init_pressure_readahead(instance)
+
+	def _init_pressure_readahead(self, instance):
+		instance._pressure_threshold = None
+		instance._pressure_saved_readahead = {}
+		value = self._variables.expand(instance.options["pressure_readahead"])
+		threshold = self._percentage_option(instance, "io_pressure_threshold")
+		if value is None or threshold is None:
+			return
+		instance._pressure_readahead = self._parse_ra(value)
+		if instance._pressure_readahead is None:
+			log.error("Invalid pressure_readahead value '%s'" % value)
+			return
+		if self._pressure_watch(instance, "io", threshold):
+			instance._pressure_threshold = threshold
+
+	def _update_pressure_readahead(self, instance, device):
+		if instance._pressure_threshold is None:
+			return
+		saved = instance._pressure_saved_readahead
+		if self._under_pressure(instance, "io", instance._pressure_threshold):
+			if device in saved:
+				return
+			old_readahead = self._get_readahead(device, instance, ignore_missing = True)
+			if old_readahead is None:
+				return
+			log.info("I/O pressure above %s%%, setting readahead of '%s' to %d"
+					% (instance._pressure_threshold, device, instance._pressure_readahead))
+			saved[device] = old_readahead
+			self._storage.set_item(self._pressure_storage_key(instance), device, old_readahead)
+			self._set_readahead(instance._pressure_readahead, device, instance, False, False)
+			self._record_dynamic_change(instance, "readahead", device)
+		elif device in saved:
+			log.info("I/O pressure below %s%%, restoring readahead of '%s'"
+					% (instance._pressure_threshold, device))
+			self._unapply_pressure_readahead(instance, device)
+			self._record_dynamic_change(instance, "readahead", device)
+
+	def _unapply_pressure_readahead(self, instance, device):
+		old_readahead = instance._pressure_saved_readahead.pop(device, None)
+		if old_readahead is not None:
+			self._set_readahead(old_readahead, device, instance, False, False)
+			self._storage.unset_item(self._pressure_storage_key(instance), device)
 
 	def _update_errcnt(self, rc, spindown):
 		if spindown:
@@ -234,6 +312,7 @@ class DiskPlugin(hotplug.Plugin):
 		return not "standby" in out and not "sleeping" in out
 
 	def _instance_update_dynamic(self, instance, device):
+		self._update_pressure_readahead(instance, device)
 		if not self._is_hdparm_apm_supported(device):
 			return
 		load = instance._load_monitor.get_device_load(device)
@@ -266,6 +345,7 @@ class DiskPlugin(hotplug.Plugin):
 			new_spindown_level = self._spindown_levels[idle["level"]]
 
 			log.debug("tuning level changed to %d" % idle["level"])
+			self._record_dynamic_change(instance, "level", device)
 			if self._spindown_errcnt < consts.ERROR_THRESHOLD:
 				if not self._drive_spinning(device) and level_change > 0:
 					log.debug("delaying spindown change to %d, drive has already spun down" % new_spindown_level)
@@ -314,21 +394,22 @@ class DiskPlugin(hotplug.Plugin):
 				instance._idle[device][operation] = 0
 
 	def _instance_apply_dynamic(self, instance, device):
-		# At the moment we support dynamic tuning just for devices compatible with hdparm apm commands
-		# If in future will be added new functionality not connected to this command,
-		# it is needed to change it here
+		# The power management part of the dynamic tuning is supported just for devices
+		# compatible with hdparm apm commands, the pressure driven readahead for all devices
 		if not self._is_hdparm_apm_supported(device):
-			log.info("There is no dynamic tuning available for device '%s' at time" % device)
+			if instance._pressure_threshold is None:
+				log.info("There is no dynamic tuning available for device '%s' at time" % device)
+			self._update_pressure_readahead(instance, device)
 		else:
 			super(DiskPlugin, self)._instance_apply_dynamic(instance, device)
 
 	def _instance_unapply_dynamic(self, instance, device):
-		pass
+		self._unapply_pressure_readahead(instance, device)
 
 	def _sysfs_path(self, device, suffix, prefix = "/sys/block/"):
 		if "/" in device:
 			dev = os.path.join(prefix, device.replace("/", "!"), suffix)
-			if os.path.exists(dev):
+			if os.path.exists(self._cmd.root_path(dev)):
 				return dev
 		return os.path.join(prefix, device, suffix)
 
@@ -56,7 +56,8 @@ class EeePCSHEPlugin(base.Plugin):
 
 	def _instance_init_dynamic(self, instance):
 		super(EeePCSHEPlugin, self)._instance_init_dynamic(instance)
-		instance._load_monitor = self._monitors_repository.create("load", None)
+		instance._load_monitor = self._monitors_repository.create("load", None,
+				instance.update_interval)
 
 	def _instance_update_dynamic(self, instance, device):
 		load = instance._load_monitor.get_load()["system"]
@@ -73,5 +74,6 @@ class EeePCSHEPlugin(base.Plugin):
 		new_mode_numeric = int(instance.options["she_%s" % new_mode])
 		if instance._she_mode != new_mode_numeric:
 			log.info("new eeepc_she mode %s (%d) " % (new_mode, new_mode_numeric))
+			self._record_dynamic_change(instance, "she_mode")
 			self._cmd.write_to_file(self._control_file, "%s" % new_mode_numeric)
 			self._she_mode = new_mode_numeric
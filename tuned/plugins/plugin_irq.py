@@ -2,6 +2,7 @@ from . import hotplug
 from .decorators import *
 import tuned.consts as consts
 import tuned.logs
+from tuned.utils import irq_snapshot
 
 import errno
 import os
@@ -30,6 +31,8 @@ class IrqPlugin(hotplug.Plugin):
 	The device names used by the plugin are `irq<n>`, where `<n>` is the
 	IRQ number. The special device `DEFAULT` controls values written to
 	`/proc/irq/default_smp_affinity`, which applies to all non-active IRQs.
+	The affinities of all the IRQs are read in one pass when an instance
+	is applied or verified, only the changed IRQs are written.
 
 	The option [option]`affinity` controls the IRQ affinity to be set. It is
 	a string in "cpulist" format (such as `1,3-4`). If the configured affinity
@@ -55,9 +58,12 @@ class IrqPlugin(hotplug.Plugin):
 	====
 	"""
 
-	def __init__(self, monitor_repository, storage_factory, hardware_inventory, device_matcher, device_matcher_udev, plugin_instance_factory, global_cfg, variables):
-		super(IrqPlugin, self).__init__(monitor_repository, storage_factory, hardware_inventory, device_matcher, device_matcher_udev, plugin_instance_factory, global_cfg, variables)
+	def __init__(self, monitor_repository, storage_factory, hardware_inventory, device_matcher, device_matcher_udev, plugin_instance_factory, global_cfg, variables, timings = None):
+		super(IrqPlugin, self).__init__(monitor_repository, storage_factory, hardware_inventory, device_matcher, device_matcher_udev, plugin_instance_factory, global_cfg, variables, timings)
 		self._irqs = {}
+		# IrqSnapshot taken for the instance being processed
+		self._snapshot = None
+		self._verify_report = None
 
 	#
 	# plugin-level methods: devices and plugin options
@@ -68,8 +74,9 @@ class IrqPlugin(hotplug.Plugin):
 		self._devices_supported = True
 		self._free_devices = set()
 		self._assigned_devices = set()
-		for i in os.listdir("/proc/irq"):
-			p = os.path.join("/proc/irq", i)
+		irq_dir = self._cmd.root_path("/proc/irq")
+		for i in os.listdir(irq_dir):
+			p = os.path.join(irq_dir, i)
 			if os.path.isdir(p) and i.isdigit():
 				info = IrqInfo(i)
 				self._irqs[i] = info
@@ -80,6 +87,11 @@ class IrqPlugin(hotplug.Plugin):
 		self._irqs["DEFAULT"] = default_info
 		self._free_devices.add(default_info.device)
 
+	@classmethod
+	def get_dependencies(cls):
+		# these plugins set the IRQ affinities too, net recreates the IRQs
+		return ["scheduler", "irqbalance", "net"]
+
 	@classmethod
 	def _get_config_options(cls):
 		return {
@@ -114,9 +126,16 @@ class IrqPlugin(hotplug.Plugin):
 	def _instance_cleanup(self, instance):
 		pass
 
+	def _take_snapshot(self):
+		self._snapshot = irq_snapshot.IrqSnapshot.read(self._cmd.root_path("/proc"), owners = False)
+
 	def _instance_apply_static(self, instance):
 		log.debug("Applying IRQ affinities (%s)" % instance.name)
-		super(IrqPlugin, self)._instance_apply_static(instance)
+		self._take_snapshot()
+		try:
+			super(IrqPlugin, self)._instance_apply_static(instance)
+		finally:
+			self._snapshot = None
 
 	def _instance_unapply_static(self, instance, rollback):
 		log.debug("Unapplying IRQ affinities (%s)" % instance.name)
@@ -124,7 +143,27 @@ class IrqPlugin(hotplug.Plugin):
 
 	def _instance_verify_static(self, instance, ignore_missing, devices):
 		log.debug("Verifying IRQ affinities (%s)" % instance.name)
-		return super(IrqPlugin, self)._instance_verify_static(instance, ignore_missing, devices)
+		self._take_snapshot()
+		self._verify_report = irq_snapshot.IrqVerifyReport()
+		try:
+			return super(IrqPlugin, self)._instance_verify_static(instance, ignore_missing, devices)
+		finally:
+			self._log_verify_report(instance)
+			self._snapshot = None
+			self._verify_report = None
+
+	def _log_verify_report(self, instance):
+		"""Log the verification of the instance, one line for all the IRQs which passed."""
+		report = self._verify_report
+		mode = "subset of " if getattr(self, "_mode_val", None) == "intersect" else ""
+		if report.passed:
+			affinity = self._variables.expand(instance.options.get("affinity"))
+			log.info(consts.STR_VERIFY_PROFILE_VALUE_OK
+					% ("affinity of %d IRQs" % len(report.passed), mode + str(affinity).strip()))
+		for (irq, current, desired) in report.failed:
+			log.error(consts.STR_VERIFY_PROFILE_VALUE_FAIL
+					% ("IRQ %s affinity" % irq, irq_snapshot.mask_to_cpulist(current),
+					mode + irq_snapshot.mask_to_cpulist(desired)))
 
 	#
 	# "low-level" methods to get/set irq affinities
@@ -139,15 +178,26 @@ class IrqPlugin(hotplug.Plugin):
 			affinity (set): set of all CPUs that belong to the IRQ affinity mask,
 				if reading of the affinity fails, an empty set is returned
 		"""
+		mask = self._get_irq_mask(irq)
+		if mask is not None:
+			return set(irq_snapshot.mask_to_cpus(mask))
 		try:
 			filename = "/proc/irq/default_smp_affinity" if irq == "DEFAULT" else "/proc/irq/%s/smp_affinity" % irq
-			with open(filename, "r") as f:
+			with open(self._cmd.root_path(filename), "r") as f:
 				affinity_hex = f.readline().strip()
 			return set(self._cmd.hex2cpulist(affinity_hex))
 		except (OSError, IOError) as e:
 			log.debug("Failed to read SMP affinity of IRQ %s: %s" % (irq, e))
 			return set()
 
+	def _get_irq_mask(self, irq):
+		"""Get IRQ affinity as an integer bitmask from the snapshot, None if it is not there"""
+		if self._snapshot is None:
+			return None
+		if irq == "DEFAULT":
+			return self._snapshot.default
+		return self._snapshot.affinity.get(irq)
+
 	def _set_irq_affinity(self, irq, affinity, restoring):
 		"""Set IRQ affinity in the kernel
 
@@ -164,7 +214,7 @@ class IrqPlugin(hotplug.Plugin):
 			affinity_hex = self._cmd.cpulist2hex(list(affinity))
 			log.debug("Setting SMP affinity of IRQ %s to '%s'" % (irq, affinity_hex))
 			filename = "/proc/irq/default_smp_affinity" if irq == "DEFAULT" else "/proc/irq/%s/smp_affinity" % irq
-			with open(filename, "w") as f:
+			with open(self._cmd.root_path(filename), "w") as f:
 				f.write(affinity_hex)
 			return 0
 		except (OSError, IOError) as e:
@@ -225,6 +275,16 @@ class IrqPlugin(hotplug.Plugin):
 		"""
 		if irqinfo.unchangeable:
 			return True
+		current = self._get_irq_mask(irqinfo.irq)
+		if current is not None and self._verify_report is not None:
+			desired = irq_snapshot.cpus_to_mask(affinity)
+			# in intersect mode it's sufficient if the current affinity is
+			# a subset of the desired one
+			if (current & ~desired == 0) if mode == "intersect" else (current == desired):
+				self._verify_report.passed.append(irqinfo.irq)
+				return True
+			self._verify_report.failed.append((irqinfo.irq, current, desired))
+			return False
 		affinity_description = "IRQ %s affinity" % irqinfo.irq
 		desired_affinity = affinity
 		desired_affinity_string = self._cmd.cpulist2string(self._cmd.cpulist_pack(list(desired_affinity)))
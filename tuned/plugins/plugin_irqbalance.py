@@ -37,6 +37,10 @@ class IrqbalancePlugin(base.Plugin):
 	def _instance_cleanup(self, instance):
 		pass
 
+	@classmethod
+	def get_dependencies(cls):
+		return ["irq", "scheduler", "net"]
+
 	@classmethod
 	def _get_config_options(cls):
 		return {
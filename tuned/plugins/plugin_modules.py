@@ -48,6 +48,11 @@ class ModulesPlugin(base.Plugin):
 	specified parameters.
 	"""
 
+	@classmethod
+	def get_dependencies(cls):
+		# module parameters and loaded modules affect the other plugins
+		return ["*"]
+
 	def __init__(self, *args, **kwargs):
 		super(ModulesPlugin, self).__init__(*args, **kwargs)
 		self._has_dynamic_options = True
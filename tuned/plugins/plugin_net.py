@@ -6,7 +6,9 @@ from tuned.utils.nettool import ethcard
 from tuned.utils.commands import commands
 import os
 import re
-import pyudev
+from tuned.utils.lazy_import import lazy_import
+
+pyudev = lazy_import("pyudev")
 
 log = tuned.logs.get()
 
@@ -276,7 +278,8 @@ class NetTuningPlugin(hotplug.Plugin):
 		super(NetTuningPlugin, self)._instance_init_dynamic(instance)
 		instance._idle = {}
 		instance._stats = {}
-		instance._load_monitor = self._monitors_repository.create("net", instance.assigned_devices)
+		instance._load_monitor = self._monitors_repository.create("net", instance.assigned_devices,
+				instance.update_interval)
 		instance._load_monitor._set_dev_map(instance._get_curr_device)
 
 	def _instance_apply_dynamic(self, instance, device):
@@ -297,10 +300,12 @@ class NetTuningPlugin(hotplug.Plugin):
 
 		if idle["level"] == 0 and idle["read"] >= self._level_steps and idle["write"] >= self._level_steps:
 			idle["level"] = 1
+			self._record_dynamic_change(instance, "level", device)
 			log.info("%s: setting 100Mbps" % device)
 			ethcard(device).set_speed(100)
 		elif idle["level"] == 1 and (idle["read"] == 0 or idle["write"] == 0):
 			idle["level"] = 0
+			self._record_dynamic_change(instance, "level", device)
 			log.info("%s: setting max speed" % device)
 			ethcard(device).set_max_speed()
 
@@ -358,6 +363,12 @@ class NetTuningPlugin(hotplug.Plugin):
 			"other": None,
 			"combined": None }
 
+	@classmethod
+	def get_dependencies(cls):
+		# changing the channels recreates the IRQs of the queues, which
+		# these plugins set the affinities of
+		return ["irq", "scheduler", "irqbalance"]
+
 	@classmethod
 	def _get_config_options(cls):
 		return {
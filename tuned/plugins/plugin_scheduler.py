@@ -9,32 +9,42 @@ import re
 from subprocess import *
 import threading
 # perf is optional
+from tuned.utils.lazy_import import lazy_import
 try:
-	import perf
+	perf = lazy_import("perf")
 except ImportError:
 # if perf is unavailable, it will be disabled later
 	pass
 import select
 import tuned.consts as consts
-import procfs
 from tuned.utils.commands import commands
+from tuned.utils.rule_matcher import RuleMatcher
+from tuned.utils import proc_scanner
+from tuned.utils import proc_connector
+from tuned.utils.pid_batch import PidBatch
+from tuned.utils.cgroup_v2 import CpusetIsolation
+from tuned.utils.affinity import set_affinities
+from tuned.utils import irq_snapshot
 import errno
 import os
 import collections
 import math
+import time
 # Check existence of scheduler API in os module
 try:
 	os.SCHED_FIFO
 except AttributeError:
-	import schedutils
+	schedutils = lazy_import("schedutils")
 
 log = tuned.logs.get()
 
 class SchedulerParams(object):
 	def __init__(self, cmd, cmdline = None, scheduler = None,
-			priority = None, affinity = None, cgroup = None):
+			priority = None, affinity = None, cgroup = None, starttime = None):
 		self._cmd = cmd
 		self.cmdline = cmdline
+		# with the PID identifies the task, see proc_scanner.Task.starttime
+		self.starttime = starttime
 		self.scheduler = scheduler
 		self.priority = priority
 		self.affinity = affinity
@@ -280,6 +290,32 @@ class SchedulerPlugin(base.Plugin):
 	option parameter is set to `false` by default. Due to this, child
 	processes are not processed by the scheduler plug-in.
 
+	The source of the process events is selected by the
+	[option]`runtime_events` option: `perf` for the perf event loop,
+	`proc_connector` for the kernel proc connector or `auto` (the
+	default) for perf if it is available, else the proc connector. The
+	proc connector receives the events of all CPUs by a single netlink
+	socket, so it needs neither python-perf nor the perf ring buffers
+	([option]`perf_mmap_pages` per CPU), which makes it cheaper on
+	systems with many CPUs. Its `exec`, `comm` and `exit` events are
+	processed the same way as the perf ones, `fork` ones if
+	[option]`perf_process_fork` is enabled.
+
+	The events are handled in batches: after a wake up the plug-in waits
+	briefly for more events, drains the pending ones and tunes every new
+	task once, the tasks which already exited are skipped. At most 4096
+	tasks are handled in one pass, the rest of the events stay queued in
+	the kernel. The counts of the handled, lost and late events are
+	logged periodically.
+
+	.Using the proc connector for the runtime tuning
+	====
+	----
+	[scheduler]
+	runtime_events=proc_connector
+	----
+	====
+
 	The CPU overhead of the scheduler plugin can be mitigated by using
 	the scheduler [option]`runtime` option and setting it to `0`. This
 	will completely disable the dynamic scheduler functionality and the
@@ -406,6 +442,40 @@ class SchedulerPlugin(base.Plugin):
 	with hierarchy-ID 8 and controller-list blkio.
 	====
 
+	On systems with the unified cgroup v2 hierarchy, setting the
+	[option]`cgroup_v2_isolation` option to `true` isolates the
+	[option]`isolated_cores` by the cpuset controller instead of
+	changing the affinity of every task. The `cpuset.cpus` of the
+	top-level cgroups listed by [option]`cgroup_v2_slices` (by default
+	`init.scope`, `system.slice` and `user.slice`, the missing ones are
+	skipped) are set to the housekeeping CPUs, so the tasks forked later
+	are confined as well. Unless [option]`cgroup_v2_partition` is
+	`none`, the isolated CPUs are moved to the cgroup `tuned-isolated`
+	whose `cpuset.cpus.partition` is set to `isolated` (the default,
+	the CPUs are also excluded from the scheduler load balancing) or
+	`root`. The original settings are restored when the profile is
+	unloaded and they are verified. If the cpuset controller is not
+	available, the affinity of the tasks is changed as usual.
+
+	Unlike with the affinity of the tasks, the tasks in the listed
+	cgroups cannot be moved to the isolated CPUs by `sched_setaffinity()`
+	(e.g. by `taskset`), it fails with `EINVAL`. The workloads for the
+	isolated CPUs have to be placed into `tuned-isolated` by writing
+	their PIDs to `/sys/fs/cgroup/tuned-isolated/cgroup.procs`, e.g. by
+	the script starting them, their children stay there. `TuneD` does not
+	move any tasks there by itself. `machine.slice` is not listed by
+	default, so the vCPU threads of the virtual machines can be pinned
+	to the isolated CPUs by libvirt as before.
+
+	.Isolating cores by cgroup v2 cpuset
+	====
+	----
+	[scheduler]
+	isolated_cores=2-7
+	cgroup_v2_isolation=true
+	----
+	====
+
 	Kernels 5.13 and newer moved some `sched_` and `numa_balancing_` kernel run-time
 	parameters from `/proc/sys/kernel`, managed by the `sysctl` utility, to
 	`debugfs`, typically mounted under `/sys/kernel/debug`.  TuneD provides an
@@ -447,13 +517,23 @@ class SchedulerPlugin(base.Plugin):
 		"latency_ns": "",
 	}
 
+	_runtime_events_values = ["auto", "perf", "proc_connector"]
+	_cgroup_v2_partition_values = ["isolated", "root", "none"]
+	# seconds to wait for more events after the runtime tuning wakes up
+	_runtime_debounce = 0.05
+	# maximal number of distinct PIDs handled in one pass
+	_runtime_batch_limit = 4096
+	# a task tuned later than this (in seconds) after its event is late
+	_runtime_late = 1.0
+	_runtime_report_interval = 60
+
 	def _disable_perf(self):
-		log.warning("python-perf unavailable, disabling perf support and " \
-			"runtime tuning, you can try to (re)install python(3)-perf package")
+		log.warning("python-perf unavailable, disabling perf support, " \
+			"you can try to (re)install python(3)-perf package")
 		self._perf_available = False
 
-	def __init__(self, monitor_repository, storage_factory, hardware_inventory, device_matcher, device_matcher_udev, plugin_instance_factory, global_cfg, variables):
-		super(SchedulerPlugin, self).__init__(monitor_repository, storage_factory, hardware_inventory, device_matcher, device_matcher_udev, plugin_instance_factory, global_cfg, variables)
+	def __init__(self, monitor_repository, storage_factory, hardware_inventory, device_matcher, device_matcher_udev, plugin_instance_factory, global_cfg, variables, timings = None):
+		super(SchedulerPlugin, self).__init__(monitor_repository, storage_factory, hardware_inventory, device_matcher, device_matcher_udev, plugin_instance_factory, global_cfg, variables, timings)
 		self._has_dynamic_options = True
 		self._daemon = consts.CFG_DEF_DAEMON
 		self._sleep_interval = int(consts.CFG_DEF_SLEEP_INTERVAL)
@@ -485,7 +565,10 @@ class SchedulerPlugin(base.Plugin):
 		self._irq_process = True
 		self._irq_storage_key = self._storage_key(
 				command_name = "irq")
+		self._cpuset_storage_key = self._storage_key(
+				command_name = "cgroup_v2")
 		self._evlist = None
+		self._task_cache = proc_scanner.TaskCache()
 		try:
 			self._scheduler_utils = SchedulerUtils()
 		except AttributeError:
@@ -505,6 +588,10 @@ class SchedulerPlugin(base.Plugin):
 
 	def _instance_init(self, instance):
 		instance._evlist = None
+		instance._proc_connector = None
+		instance._runtime_stats = collections.Counter()
+		instance._runtime_reported = time.monotonic()
+		instance._runtime_reported_problems = (0, 0, 0)
 		instance._has_dynamic_tuning = False
 		instance._has_static_tuning = True
 		# this is hack, runtime_tuning should be covered by dynamic_tuning configuration
@@ -524,6 +611,14 @@ class SchedulerPlugin(base.Plugin):
 
 		self._cgroups_original_affinity = dict()
 
+		cpuset_original = self._storage.get(self._cpuset_storage_key)
+		if cpuset_original is not None:
+			log.info("recovering cgroup v2 cpuset settings from previous run")
+			CpusetIsolation().restore(cpuset_original)
+			self._storage.unset(self._cpuset_storage_key)
+		self._cpuset_isolation = None
+		self._cpuset_original = None
+
 		# calculated by isolated_cores setter
 		self._affinity = None
 
@@ -547,7 +642,12 @@ class SchedulerPlugin(base.Plugin):
 		if self._cmd.get_bool(instance._scheduler.get("runtime", 1)) == "0":
 			instance._runtime_tuning = False
 		instance._terminate = threading.Event()
-		if self._daemon and instance._runtime_tuning and self._perf_available:
+		runtime_events = instance._scheduler.get("runtime_events", "auto")
+		if runtime_events not in self._runtime_events_values:
+			log.error("Invalid 'runtime_events' value specified: '%s', using 'auto'" % runtime_events)
+			runtime_events = "auto"
+		if self._daemon and instance._runtime_tuning and self._perf_available \
+				and runtime_events in ["auto", "perf"]:
 			try:
 				instance._threads = perf.thread_map()
 				evsel = perf.evsel(type = perf.TYPE_SOFTWARE,
@@ -565,13 +665,31 @@ class SchedulerPlugin(base.Plugin):
 			# no perf
 			except:
 				self._disable_perf()
-		if not self._perf_available:
+		if self._daemon and instance._runtime_tuning and instance._evlist is None \
+				and runtime_events in ["auto", "proc_connector"]:
+			instance._proc_connector = proc_connector.ProcConnector()
+			try:
+				instance._proc_connector.open()
+				log.info("using the proc connector for the runtime tuning")
+			except OSError as e:
+				log.warning("cannot use the proc connector: %s" % e)
+				instance._proc_connector = None
+		if instance._evlist is None and instance._proc_connector is None:
+			if self._daemon and instance._runtime_tuning:
+				log.warning("no source of the process events available, disabling runtime tuning")
 			instance._runtime_tuning = False
 
 	def _instance_cleanup(self, instance):
 		if instance._evlist:
 			for fd in instance._evlist.get_pollfd():
 				os.close(fd.name)
+		if instance._proc_connector is not None:
+			instance._proc_connector.close()
+			instance._proc_connector = None
+
+	@classmethod
+	def get_dependencies(cls):
+		return ["irq", "irqbalance", "net", "sysctl"]
 
 	@classmethod
 	def _get_config_options(cls):
@@ -582,6 +700,9 @@ class SchedulerPlugin(base.Plugin):
 			"cgroup_groups_init": True,
 			"cgroup_for_isolated_cores": None,
 			"cgroup_ps_blacklist": None,
+			"cgroup_v2_isolation": False,
+			"cgroup_v2_slices": None,
+			"cgroup_v2_partition": "isolated",
 			"ps_whitelist": None,
 			"ps_blacklist": None,
 			"kthread_process": True,
@@ -589,6 +710,7 @@ class SchedulerPlugin(base.Plugin):
 			"default_irq_smp_affinity": "calc",
 			"perf_mmap_pages": None,
 			"perf_process_fork": "false",
+			"runtime_events": "auto",
 			"sched_min_granularity_ns": None,
 			"sched_base_slice_ns": None,
 			"sched_latency_ns": None,
@@ -605,32 +727,39 @@ class SchedulerPlugin(base.Plugin):
 	def _sanitize_cgroup_path(self, value):
 		return str(value).replace(".", "/") if value is not None else None
 
+	def _get_task(self, pid):
+		return proc_scanner.Task(pid, self._cmd.root_path("/proc"))
+
+	def _scan_tasks(self):
+		return proc_scanner.scan(self._cmd.root_path("/proc"))
+
+	# task is a PID or a proc_scanner.Task object, returns its
+	# proc_scanner.TaskInfo from the cache
+	# Raises OSError, IOError
+	def _task_info(self, task):
+		if not isinstance(task, proc_scanner.Task):
+			task = self._get_task(task)
+		return self._task_cache.get(task)
+
+	# process is a PID or a proc_scanner.Task or TaskInfo object
 	# Raises OSError, IOError
 	def _get_cmdline(self, process):
-		if not isinstance(process, procfs.process):
-			pid = process
-			process = procfs.process(pid)
-		cmdline = procfs.process_cmdline(process)
-		if self._is_kthread(process):
+		if not isinstance(process, proc_scanner.TaskInfo):
+			process = self._task_info(process)
+		cmdline = process.cmdline
+		if self._is_kthread(process.process):
 			cmdline = "[" + cmdline + "]"
 		return cmdline
 
 	# Raises OSError, IOError
 	def get_processes(self):
-		ps = procfs.pidstats()
-		ps.reload_threads()
 		processes = {}
-		for proc in ps.values():
+		for task in self._scan_tasks():
 			try:
-				if not self._kthread_process and self._is_kthread(proc):
+				task = self._task_info(task)
+				if not self._kthread_process and self._is_kthread(task.process):
 					continue
-				cmd = self._get_cmdline(proc)
-				pid = proc["pid"]
-				processes[pid] = cmd
-				if "threads" in proc:
-					for pid in proc["threads"].keys():
-						cmd = self._get_cmdline(proc)
-						processes[pid] = cmd
+				processes[task.pid] = self._get_cmdline(task)
 			except (OSError, IOError) as e:
 				if e.errno == errno.ENOENT \
 						or e.errno == errno.ESRCH:
@@ -677,10 +806,10 @@ class SchedulerPlugin(base.Plugin):
 				log.error("Failed to set scheduling parameters of PID %d: %s"
 						% (pid, e))
 
-	# process is a procfs.process object
+	# process is a proc_scanner.Task object
 	# Raises OSError, IOError
 	def _is_kthread(self, process):
-		return process["stat"]["flags"] & procfs.pidstat.PF_KTHREAD != 0
+		return process.is_kthread
 
 	def _process_in_blacklisted_cgroup(self, process):
 		if self._cgroup_ps_blacklist_re == "":
@@ -692,7 +821,7 @@ class SchedulerPlugin(base.Plugin):
 	def _ignore_set_affinity_error(self, process):
 		pid = process.pid
 		try:
-			if process["stat"]["state"] == "Z":
+			if process.state == "Z":
 				log.debug("Affinity of zombie task with PID %d could not be changed."
 						% pid)
 				return True
@@ -700,7 +829,7 @@ class SchedulerPlugin(base.Plugin):
 				log.debug("Affinity of task with PID %d could not be changed, the task was moved into a blacklisted cgroup."
 						% pid)
 				return True
-			if process["stat"].is_bound_to_cpu():
+			if process.is_bound_to_cpu:
 				if self._is_kthread(process):
 					log.debug("Affinity of kernel thread with PID %d cannot be changed, the task's affinity mask is fixed."
 							% pid)
@@ -835,7 +964,27 @@ class SchedulerPlugin(base.Plugin):
 		cont = self._tune_process_affinity(pid, affinity)
 		if not cont or pid not in self._scheduler_original:
 			return
-		self._scheduler_original[pid].cmdline = cmd
+		self._store_orig_process_identity(pid, cmd)
+
+	# the command line and the start time of the task (if it is in the
+	# cache) are used to recognize it on the rollback
+	def _store_orig_process_identity(self, pid, cmd):
+		params = self._scheduler_original[pid]
+		params.cmdline = cmd
+		info = self._task_cache.peek(pid)
+		params.starttime = info.starttime if info is not None else None
+
+	# the decision is memoized in the TaskInfo, it is valid while the rules
+	# and the command line of the task are the same
+	def _match_task(self, instance, info, cmd):
+		if info is None:
+			return instance._sched_matcher.match(cmd)
+		if info.decision is not None and info.decision[0] is instance._sched_matcher \
+				and info.decision[1] == cmd:
+			return info.decision[2]
+		v = instance._sched_matcher.match(cmd)
+		info.decision = (instance._sched_matcher, cmd, v)
+		return v
 
 	def _convert_sched_params(self, str_scheduler, str_priority):
 		scheduler = self._scheduler_utils.sched_cfg_to_num(str_scheduler)
@@ -965,6 +1114,8 @@ class SchedulerPlugin(base.Plugin):
 		self._cgroup = self._sanitize_cgroup_path(self._variables.expand(
 			instance.options["cgroup_for_isolated_cores"]))
 
+		self._cpuset_isolation = self._cgroup_v2_init(instance)
+
 		if self._cgroup_mount_point_init:
 			self._cgroup_initialize()
 		if self._cgroup_groups_init or self._cgroup_mount_point_init:
@@ -985,45 +1136,52 @@ class SchedulerPlugin(base.Plugin):
 				if re.match(r"group\.", option)
 				and len(vals) == 5]
 		sched_cfg = sorted(buf, key=lambda option_vals: option_vals[1][0])
-		sched_all = dict()
-		# for runtime tuning
-		instance._sched_lookup = {}
+		rules = []
 		for option, (rule_prio, scheduler, priority, affinity, regex) \
 				in sched_cfg:
 			try:
-				r = re.compile(regex)
+				re.compile(regex)
 			except re.error as e:
 				log.error("error compiling regular expression: '%s'" % str(regex))
 				continue
-			processes = [(pid, cmd) for pid, cmd in ps.items() if re.search(r, cmd) is not None]
-			#cmd - process name, option - group name
-			sched = dict([(pid, (cmd, option, scheduler, priority, affinity, regex))
-					for pid, cmd in processes])
-			sched_all.update(sched)
-			# make any contained regexes non-capturing: replace "(" with "(?:",
-			# unless the "(" is preceded by "\" or followed by "?"
-			regex = re.sub(r"(?<!\\)\((?!\?)", "(?:", str(regex))
-			instance._sched_lookup[regex] = [scheduler, priority, affinity]
-		for pid, (cmd, option, scheduler, priority, affinity, regex) \
-				in sched_all.items():
-			self._tune_process(pid, cmd, scheduler,
-					priority, affinity)
+			rules.append((regex, (scheduler, priority, affinity)))
+		# the last matching rule wins, used also for the runtime tuning
+		instance._sched_matcher = RuleMatcher(rules)
+		for pid, cmd in ps.items():
+			v = self._match_task(instance, self._task_cache.peek(pid), cmd)
+			if v is not None:
+				(scheduler, priority, affinity) = v
+				self._tune_process(pid, cmd, scheduler,
+						priority, affinity)
 		self._storage.set(self._scheduler_storage_key,
 				self._scheduler_original)
+		# the runtime tuning fills the cache with the new tasks only
+		self._task_cache.clear()
 		if self._daemon and instance._runtime_tuning:
 			instance._thread = threading.Thread(target = self._thread_code, args = [instance])
 			instance._thread.start()
 
-	def _restore_ps_affinity(self):
+	# Returns the TaskInfo of the task with the PID if it is the one whose
+	# parameters were stored, None otherwise
+	def _get_same_task(self, pid, params):
 		try:
-			ps = self.get_processes()
-		except (OSError, IOError) as e:
-			log.error("error unapplying tuning, cannot get information about running processes: %s"
-					% e)
-			return
+			info = self._task_info(pid)
+			if getattr(params, "starttime", None) is not None:
+				same = info.starttime == params.starttime
+			else:
+				# if command line for the pid didn't change, it's very
+				# probably the same process
+				same = self._get_cmdline(info) == params.cmdline
+		except (OSError, IOError):
+			return None
+		return info if same else None
+
+	def _restore_ps_affinity(self):
+		tasks = {}
+		affinities = []
 		for pid, orig_params in self._scheduler_original.items():
-			# if command line for the pid didn't change, it's very probably the same process
-			if pid not in ps or ps[pid] != orig_params.cmdline:
+			task = self._get_same_task(pid, orig_params)
+			if task is None:
 				continue
 			if orig_params.scheduler is not None \
 					and orig_params.priority is not None:
@@ -1031,8 +1189,14 @@ class SchedulerPlugin(base.Plugin):
 						orig_params.priority)
 			if orig_params.cgroup is not None:
 				self._set_cgroup(pid, orig_params.cgroup)
-			elif orig_params.affinity is not None:
-				self._set_affinity(pid, orig_params.affinity)
+			elif orig_params.affinity is not None \
+					and not self._process_in_blacklisted_cgroup(task):
+				tasks[pid] = task
+				affinities.append((pid, orig_params.affinity))
+		if affinities:
+			summary = self._set_affinities(affinities, tasks.get)
+			log.info("Restoring CPU affinity of %d tasks: %s" % (len(affinities), summary))
+		self._task_cache.clear()
 		self._scheduler_original = {}
 		self._storage.unset(self._scheduler_storage_key)
 
@@ -1055,12 +1219,60 @@ class SchedulerPlugin(base.Plugin):
 		for cg in self._cgroups:
 			self._cgroup_cleanup_tasks_one(cg)
 
+	def _cgroup_v2_init(self, instance):
+		if self._cmd.get_bool(self._variables.expand(
+				instance.options["cgroup_v2_isolation"])) != "1":
+			return None
+		slices = self._variables.expand(instance.options["cgroup_v2_slices"])
+		if slices is None:
+			slices = consts.DEF_CGROUP_V2_SLICES
+		else:
+			slices = [s for s in re.split(r"[\s,;]+", str(slices)) if s]
+		partition = self._variables.expand(instance.options["cgroup_v2_partition"])
+		if partition not in self._cgroup_v2_partition_values:
+			log.error("Invalid 'cgroup_v2_partition' value specified: '%s', using 'isolated'" % partition)
+			partition = "isolated"
+		isolation = CpusetIsolation(slices = slices,
+				partition = None if partition == "none" else partition)
+		if not isolation.available():
+			log.warning("cgroup v2 cpuset controller is not available, isolating cores by the affinity of the tasks")
+			return None
+		return isolation
+
+	def _cgroup_v2_apply(self, isolated):
+		if self._cpuset_original is not None:
+			return
+		isolated = self._cmd.cpulist2string(self._cmd.cpulist_pack(isolated))
+		log.debug("Isolating cores '%s' by cgroup v2 cpuset" % isolated)
+		self._cpuset_original = self._cpuset_isolation.apply(self._affinity, isolated)
+		self._storage.set(self._cpuset_storage_key, self._cpuset_original)
+
+	def _cgroup_v2_restore(self):
+		if self._cpuset_original is None:
+			return
+		log.debug("Restoring cgroup v2 cpuset settings")
+		self._cpuset_isolation.restore(self._cpuset_original)
+		self._cpuset_original = None
+		self._storage.unset(self._cpuset_storage_key)
+
+	def _cgroup_v2_verify(self, isolated):
+		ret = True
+		for (description, current, expected) in self._cpuset_isolation.verify(self._affinity,
+				self._cmd.cpulist2string(self._cmd.cpulist_pack(isolated))):
+			if current == expected:
+				log.info(consts.STR_VERIFY_PROFILE_VALUE_OK % (description, current))
+			else:
+				log.error(consts.STR_VERIFY_PROFILE_VALUE_FAIL % (description, current, expected))
+				ret = False
+		return ret
+
 	def _instance_unapply_static(self, instance, rollback = consts.ROLLBACK_SOFT):
 		super(SchedulerPlugin, self)._instance_unapply_static(instance, rollback)
 		if self._daemon and instance._runtime_tuning:
 			instance._terminate.set()
 			instance._thread.join()
 		self._restore_ps_affinity()
+		self._cgroup_v2_restore()
 		self._cgroup_restore_affinity()
 		self._cgroup_cleanup_tasks()
 		if self._cgroup_groups_init or self._cgroup_mount_point_init:
@@ -1101,12 +1313,18 @@ class SchedulerPlugin(base.Plugin):
 		ret2 = self._cgroup_verify_affinity()
 		return ret1 and ret2
 
-	def _add_pid(self, instance, pid, r):
+	def _add_pid(self, instance, pid):
+		"""
+		Tune a new task if a rule matches it.
+
+		Return:
+		bool -- whether the original parameters of the task were recorded
+		"""
 		try:
-			proc = procfs.process(pid)
+			proc = self._task_info(pid)
 			if not self._kthread_process and self._is_kthread(proc):
-				return
-			cmd = self._get_cmdline(pid)
+				return False
+			cmd = self._get_cmdline(proc)
 		except (OSError, IOError) as e:
 			if e.errno == errno.ENOENT \
 					or e.errno == errno.ESRCH:
@@ -1115,50 +1333,135 @@ class SchedulerPlugin(base.Plugin):
 			else:
 				log.error("Failed to get cmdline of PID %d: %s"
 						% (pid, e))
-			return
-		v = self._cmd.re_lookup(instance._sched_lookup, cmd, r)
+			return False
+		v = self._match_task(instance, proc, cmd)
 		if v is not None and not pid in self._scheduler_original:
 			log.debug("tuning new process '%s' with PID '%d' by '%s'" % (cmd, pid, str(v)))
 			(sched, prio, affinity) = v
 			self._tune_process(pid, cmd, sched, prio,
 					affinity)
-			self._storage.set(self._scheduler_storage_key,
-					self._scheduler_original)
+			return pid in self._scheduler_original
+		return False
 
 	def _remove_pid(self, instance, pid):
 		if pid in self._scheduler_original:
 			del self._scheduler_original[pid]
 			log.debug("removed PID %d from the rollback database" % pid)
-			self._storage.set(self._scheduler_storage_key,
-					self._scheduler_original)
+			return True
+		return False
+
+	def _process_batch(self, instance, batch):
+		"""
+		Apply the runtime tuning to the tasks of the batch in one pass,
+		the rollback data are stored by a single storage update.
+		"""
+		stats = instance._runtime_stats
+		removed = set()
+		for pid in batch.exited_pids:
+			self._task_cache.invalidate(pid)
+			if self._remove_pid(instance, pid):
+				removed.add(pid)
+		stored = {}
+		for pid in batch.new_pids:
+			# the command line changes by exec
+			self._task_cache.invalidate(pid)
+			if self._add_pid(instance, pid):
+				stored[pid] = self._scheduler_original[pid]
+				if time.monotonic() - batch.started > self._runtime_late:
+					stats["late"] += 1
+		removed.difference_update(stored)
+		self._storage.update_items(self._scheduler_storage_key, stored, removed)
+		stats["batches"] += 1
+		stats["events"] += batch.events
+		stats["skipped"] += batch.skipped
+		stats["tuned"] += len(stored)
+		if batch.full():
+			stats["throttled"] += 1
+		log.debug("runtime tuning processed %d events of %d tasks, tuned %d, skipped %d exited"
+				% (batch.events, len(batch.new_pids), len(stored), batch.skipped))
+		batch.clear()
+		self._report_runtime_stats(instance)
+
+	def _report_runtime_stats(self, instance):
+		stats = instance._runtime_stats
+		now = time.monotonic()
+		if now - instance._runtime_reported < self._runtime_report_interval:
+			return
+		problems = (stats["lost"], stats["late"], stats["throttled"])
+		if problems != instance._runtime_reported_problems:
+			log.info("runtime tuning: %d events in %d batches, %d tasks tuned, "
+					"%d exited before tuning, %d events lost, %d tasks tuned late, "
+					"%d batches throttled"
+					% (stats["events"], stats["batches"], stats["tuned"],
+					stats["skipped"], stats["lost"], stats["late"], stats["throttled"]))
+			instance._runtime_reported_problems = problems
+		instance._runtime_reported = now
+
+	def _read_proc_connector_events(self, instance, batch):
+		while not batch.full():
+			events = instance._proc_connector.read_events(batch.remaining())
+			if instance._proc_connector.overflow:
+				log.debug("some process events were lost, the proc connector socket buffer overflowed")
+				instance._runtime_stats["lost"] += 1
+				instance._proc_connector.overflow = False
+			if not events:
+				return
+			for (what, pid, tgid) in events:
+				if what in (proc_connector.PROC_EVENT_EXEC, proc_connector.PROC_EVENT_COMM) \
+						or (self._perf_process_fork_value and what == proc_connector.PROC_EVENT_FORK):
+					batch.add(pid)
+				elif what == proc_connector.PROC_EVENT_EXIT:
+					batch.exit(pid)
+
+	def _read_perf_events(self, instance, batch):
+		lost_event = getattr(perf, "lost_event", None)
+		read_events = True
+		while read_events and not batch.full():
+			read_events = False
+			for cpu in self._cpus:
+				event = instance._evlist.read_on_cpu(cpu)
+				if event:
+					read_events = True
+					if isinstance(event, perf.comm_event) or (
+						self._perf_process_fork_value
+						and isinstance(event, perf.task_event)
+						and event.type == perf.RECORD_FORK
+					):
+						batch.add(int(event.tid))
+					elif isinstance(event, perf.task_event) and event.type == perf.RECORD_EXIT:
+						batch.exit(int(event.tid))
+					elif lost_event is not None and isinstance(event, lost_event):
+						instance._runtime_stats["lost"] += int(event.lost)
 
 	def _thread_code(self, instance):
-		r = self._cmd.re_lookup_compile(instance._sched_lookup)
 		poll = select.poll()
-		# Store the file objects in a local variable so that they don't
-		# go out of scope too soon. This is a workaround for
-		# python3-perf bug rhbz#1659445.
-		fds = instance._evlist.get_pollfd()
-		for fd in fds:
-			poll.register(fd)
+		if instance._proc_connector is not None:
+			poll.register(instance._proc_connector.fileno(), select.POLLIN)
+			read = self._read_proc_connector_events
+		else:
+			# Store the file objects in a local variable so that they don't
+			# go out of scope too soon. This is a workaround for
+			# python3-perf bug rhbz#1659445.
+			fds = instance._evlist.get_pollfd()
+			for fd in fds:
+				poll.register(fd)
+			read = self._read_perf_events
+		batch = PidBatch(self._runtime_batch_limit)
 		while not instance._terminate.is_set():
 			# timeout to poll in milliseconds
-			if len(poll.poll(self._sleep_interval * 1000)) > 0 and not instance._terminate.is_set():
-				read_events = True
-				while read_events:
-					read_events = False
-					for cpu in self._cpus:
-						event = instance._evlist.read_on_cpu(cpu)
-						if event:
-							read_events = True
-							if isinstance(event, perf.comm_event) or (
-								self._perf_process_fork_value
-								and isinstance(event, perf.task_event)
-								and event.type == perf.RECORD_FORK
-							):
-								self._add_pid(instance, int(event.tid), r)
-							elif isinstance(event, perf.task_event) and event.type == perf.RECORD_EXIT:
-								self._remove_pid(instance, int(event.tid))
+			if len(poll.poll(self._sleep_interval * 1000)) == 0:
+				continue
+			# let a burst of forks and execs accumulate, the tasks
+			# which exit meanwhile are not tuned at all
+			if instance._terminate.wait(self._runtime_debounce):
+				break
+			try:
+				read(instance, batch)
+			except OSError as e:
+				log.error("failed to read process events, stopping runtime tuning: %s" % e)
+				return
+			if len(batch) > 0:
+				self._process_batch(instance, batch)
 
 	@command_custom("cgroup_ps_blacklist", per_device = False)
 	def _cgroup_ps_blacklist(self, enabling, value, verify, ignore_missing, instance):
@@ -1229,7 +1532,7 @@ class SchedulerPlugin(base.Plugin):
 		return res
 
 	def _set_affinity(self, pid, affinity):
-		process = procfs.process(pid)
+		process = self._get_task(pid)
 		if self._process_in_blacklisted_cgroup(process):
 			log.debug("Not setting CPU affinity of PID %d, the task belongs to a blacklisted cgroup." % pid)
 			return
@@ -1250,19 +1553,31 @@ class SchedulerPlugin(base.Plugin):
 			return list(aff)
 		return affinity3
 
-	def _set_all_obj_affinity(self, objs, affinity, threads = False):
-		psl = objs
-		if not self._kthread_process:
-			psl = [v for v in psl if not self._is_kthread(v)]
-		psl = [v for v in psl if re.search(self._ps_whitelist,
-				self._get_stat_comm(v)) is not None]
-		if self._ps_blacklist != "":
-			psl = [v for v in psl if re.search(self._ps_blacklist,
-					self._get_stat_comm(v)) is None]
-		psd = dict([(v.pid, v) for v in psl])
-		for pid in psd:
+	# tasks are proc_scanner.Task objects, each process followed by its
+	# threads, the threads are processed only if their process was,
+	# the tasks are looked up in the task cache
+	def _set_all_obj_affinity(self, tasks, affinity):
+		candidates = collections.OrderedDict()
+		skipped_process = None
+		for task in tasks:
+			is_thread = task.process is not task
+			if is_thread and task.process is skipped_process:
+				continue
+			if not is_thread:
+				skipped_process = task
+			pid = task.pid
 			try:
-				cmd = self._get_cmdline(psd[pid])
+				task = self._task_info(task)
+				if not self._kthread_process and self._is_kthread(task):
+					continue
+				comm = self._get_stat_comm(task)
+				if re.search(self._ps_whitelist, comm) is None:
+					continue
+				if self._ps_blacklist != "" and re.search(self._ps_blacklist, comm) is not None:
+					continue
+				if self._process_in_blacklisted_cgroup(task):
+					continue
+				cmd = self._get_cmdline(task)
 			except (OSError, IOError) as e:
 				if e.errno == errno.ENOENT \
 						or e.errno == errno.ESRCH:
@@ -1272,35 +1587,50 @@ class SchedulerPlugin(base.Plugin):
 					log.error("Refusing to set affinity of PID %d, failed to get its cmdline: %s"
 							% (pid, e))
 				continue
-			cont = self._tune_process_affinity(pid, affinity,
-					intersect = True)
-			if not cont:
-				continue
-			if pid in self._scheduler_original:
-				self._scheduler_original[pid].cmdline = cmd
-			# process threads
-			if not threads and "threads" in psd[pid]:
-				self._set_all_obj_affinity(
-						psd[pid]["threads"].values(),
-						affinity, True)
+			candidates[pid] = (task, cmd)
+			if not is_thread:
+				skipped_process = None
+		(is_cgroup, cgroup) = self._parse_cgroup_affinity(affinity)
+		if is_cgroup:
+			for (pid, (task, cmd)) in candidates.items():
+				if self._tune_process_affinity(pid, affinity, intersect = True) \
+						and pid in self._scheduler_original:
+					self._store_orig_process_identity(pid, cmd)
+			return
+		summary = self._set_affinities(((pid, affinity) for pid in candidates),
+				lambda pid: candidates[pid][0], intersect = True)
+		for (pid, previous) in summary.previous.items():
+			self._store_orig_process_affinity(pid, previous)
+			self._store_orig_process_identity(pid, candidates[pid][1])
+		log.info("Setting CPU affinity of %d tasks to '%s': %s"
+				% (len(candidates), self._cmd.cpulist2string(self._cmd.cpulist_pack(affinity)), summary))
+
+	# targets are (pid, affinity), get_task returns the proc_scanner.TaskInfo
+	# of a PID, it is used only to examine the failures
+	def _set_affinities(self, targets, get_task, intersect = False):
+		summary = set_affinities(targets, intersect = intersect,
+				get_affinity = self._scheduler_utils.get_affinity,
+				set_affinity = self._scheduler_utils.set_affinity)
+		for (pid, e) in summary.errors:
+			if not self._ignore_set_affinity_error(get_task(pid)):
+				log.error("Failed to set affinity of PID %d: %s" % (pid, e))
+		return summary
 
 	def _get_stat_cgroup(self, o):
 		try:
-			return o["cgroups"]
-		except (OSError, IOError, KeyError):
+			return o.cgroups
+		except (OSError, IOError):
 			return ""
 
 	def _get_stat_comm(self, o):
 		try:
-			return o["stat"]["comm"]
-		except (OSError, IOError, KeyError):
+			return o.comm
+		except (OSError, IOError):
 			return ""
 
 	def _set_ps_affinity(self, affinity):
 		try:
-			ps = procfs.pidstats()
-			ps.reload_threads()
-			self._set_all_obj_affinity(ps.values(), affinity, False)
+			self._set_all_obj_affinity(self._scan_tasks(), affinity)
 		except (OSError, IOError) as e:
 			log.error("error applying tuning, cannot get information about running processes: %s"
 					% e)
@@ -1313,7 +1643,7 @@ class SchedulerPlugin(base.Plugin):
 			log.debug("Setting SMP affinity of IRQ %s to '%s'"
 					% (irq, affinity_hex))
 			filename = "/proc/irq/%s/smp_affinity" % irq
-			with open(filename, "w") as f:
+			with open(self._cmd.root_path(filename), "w") as f:
 				f.write(affinity_hex)
 			return 0
 		except (OSError, IOError) as e:
@@ -1337,39 +1667,36 @@ class SchedulerPlugin(base.Plugin):
 			affinity_hex = self._cmd.cpulist2hex(affinity)
 			log.debug("Setting default SMP IRQ affinity to '%s'"
 					% affinity_hex)
-			with open("/proc/irq/default_smp_affinity", "w") as f:
+			with open(self._cmd.root_path("/proc/irq/default_smp_affinity"), "w") as f:
 				f.write(affinity_hex)
 		except (OSError, IOError) as e:
 			log.error("Failed to set default SMP IRQ affinity to '%s': %s"
 					% (affinity_hex, e))
 
+	def _get_irq_snapshot(self):
+		return irq_snapshot.IrqSnapshot.read(self._cmd.root_path("/proc"))
+
 	def _set_all_irq_affinity(self, affinity):
 		irq_original = IRQAffinities()
-		irqs = procfs.interrupts()
-		for irq in irqs.keys():
-			try:
-				prev_affinity = irqs[irq]["affinity"]
-				log.debug("Read affinity of IRQ '%s': '%s'"
-						% (irq, prev_affinity))
-			except KeyError:
-				continue
-			_affinity = self._get_intersect_affinity(prev_affinity, affinity, affinity)
-			if set(_affinity) == set(prev_affinity):
-				continue
-			res = self._set_irq_affinity(irq, _affinity, False)
+		snapshot = self._get_irq_snapshot()
+		changes = snapshot.diff(irq_snapshot.cpus_to_mask(affinity),
+				intersect = True, irqs = snapshot.active_irqs())
+		for (irq, mask) in changes.items():
+			res = self._set_irq_affinity(irq, irq_snapshot.mask_to_cpus(mask), False)
 			if res == 0:
-				irq_original.irqs[irq] = prev_affinity
+				irq_original.irqs[irq] = irq_snapshot.mask_to_cpus(snapshot.affinity[irq])
 			elif res == -2:
 				irq_original.unchangeable.append(irq)
+		log.debug("Changed SMP affinity of %d of %d IRQs, %d do not support it"
+				% (len(irq_original.irqs), len(snapshot.active_irqs()), len(irq_original.unchangeable)))
 
 		# default affinity
 		prev_affinity_hex = self._cmd.read_file("/proc/irq/default_smp_affinity")
 		prev_affinity = self._cmd.hex2cpulist(prev_affinity_hex)
-		if self._default_irq_smp_affinity_value == "calc":
-			_affinity = self._get_intersect_affinity(prev_affinity, affinity, affinity)
-		elif self._default_irq_smp_affinity_value != "ignore":
-			_affinity = self._default_irq_smp_affinity_value
 		if self._default_irq_smp_affinity_value != "ignore":
+			_affinity = self._get_intersect_affinity(prev_affinity, affinity, affinity) \
+					if self._default_irq_smp_affinity_value == "calc" \
+					else self._default_irq_smp_affinity_value
 			self._set_default_irq_affinity(_affinity)
 			irq_original.default = prev_affinity
 		self._storage.set(self._irq_storage_key, irq_original)
@@ -1385,6 +1712,20 @@ class SchedulerPlugin(base.Plugin):
 			self._set_default_irq_affinity(affinity)
 		self._storage.unset(self._irq_storage_key)
 
+	def _log_irq_verify_report(self, report, correct_affinity):
+		if report.skipped:
+			description = "IRQs %s do not support changing SMP affinity" % ", ".join(sorted(report.skipped, key = int))
+			log.info(consts.STR_VERIFY_PROFILE_VALUE_MISSING % description)
+		if report.passed:
+			log.info(consts.STR_VERIFY_PROFILE_VALUE_OK
+					% ("SMP affinity of %d IRQs" % len(report.passed),
+					"subset of %s" % irq_snapshot.mask_to_cpulist(irq_snapshot.cpus_to_mask(correct_affinity))))
+		for (irq, current, desired) in report.failed:
+			log.error(consts.STR_VERIFY_PROFILE_VALUE_FAIL
+					% ("SMP affinity of IRQ %s" % irq, irq_snapshot.mask_to_cpulist(current),
+					irq_snapshot.mask_to_cpulist(desired)))
+		return bool(report)
+
 	def _verify_irq_affinity(self, irq_description, correct_affinity,
 			current_affinity):
 		res = set(current_affinity).issubset(set(correct_affinity))
@@ -1399,25 +1740,11 @@ class SchedulerPlugin(base.Plugin):
 
 	def _verify_all_irq_affinity(self, correct_affinity, ignore_missing):
 		irq_original = self._storage.get(self._irq_storage_key, None)
-		irqs = procfs.interrupts()
-		res = True
-		for irq in irqs.keys():
-			if irq in irq_original.unchangeable and ignore_missing:
-				description = "IRQ %s does not support changing SMP affinity" % irq
-				log.info(consts.STR_VERIFY_PROFILE_VALUE_MISSING % description)
-				continue
-			try:
-				current_affinity = irqs[irq]["affinity"]
-				log.debug("Read SMP affinity of IRQ '%s': '%s'"
-						% (irq, current_affinity))
-				irq_description = "SMP affinity of IRQ %s" % irq
-				if not self._verify_irq_affinity(
-						irq_description,
-						correct_affinity,
-						current_affinity):
-					res = False
-			except KeyError:
-				continue
+		unchangeable = irq_original.unchangeable if irq_original is not None and ignore_missing else ()
+		snapshot = self._get_irq_snapshot()
+		report = snapshot.verify(irq_snapshot.cpus_to_mask(correct_affinity),
+				irqs = snapshot.active_irqs(), skip = unchangeable)
+		res = self._log_irq_verify_report(report, correct_affinity)
 
 		current_affinity_hex = self._cmd.read_file(
 				"/proc/irq/default_smp_affinity")
@@ -1444,18 +1771,24 @@ class SchedulerPlugin(base.Plugin):
 						% (value, str_cpus))
 		if (enabling or verify) and affinity is None:
 			return None
-		# currently only IRQ affinity verification is supported
+		# the affinity of the tasks is not verified
 		if verify:
+			ret = True
+			if self._cpuset_isolation is not None:
+				ret = self._cgroup_v2_verify(value)
 			if self._irq_process:
-				return self._verify_all_irq_affinity(affinity, ignore_missing)
-			return True
+				ret = self._verify_all_irq_affinity(affinity, ignore_missing) and ret
+			return ret
 		elif enabling:
-			if self._cgroup:
-				self._cgroup_set_affinity()
-				ps_affinity = "cgroup.%s" % self._cgroup
+			if self._cpuset_isolation is not None:
+				self._cgroup_v2_apply(value)
 			else:
-				ps_affinity = affinity
-			self._set_ps_affinity(ps_affinity)
+				if self._cgroup:
+					self._cgroup_set_affinity()
+					ps_affinity = "cgroup.%s" % self._cgroup
+				else:
+					ps_affinity = affinity
+				self._set_ps_affinity(ps_affinity)
 			if self._irq_process:
 				self._set_all_irq_affinity(affinity)
 		else:
@@ -1490,10 +1823,10 @@ class SchedulerPlugin(base.Plugin):
 		if path or path == "":
 			return path
 		path = "/proc/sys/kernel/%s_%s" % (namespace, knob)
-		if not os.path.exists(path):
+		if not os.path.exists(self._cmd.root_path(path)):
 			path = self._sched_assembly_path(prefix, namespace, knob)
 			# kernel 6.6 drops and renames some knobs
-			if not os.path.exists(path):
+			if not os.path.exists(self._cmd.root_path(path)):
 				path = self._sched_assembly_path2(path, prefix, namespace, knob)
 			if path != "" and self._secure_boot_hint is None:
 				self._secure_boot_hint = True
@@ -46,6 +46,11 @@ class ScriptPlugin(base.Plugin):
 	====
 	"""
 
+	@classmethod
+	def get_dependencies(cls):
+		# scripts can depend on any other tuning
+		return ["*"]
+
 	@classmethod
 	def _get_config_options(self):
 		return {
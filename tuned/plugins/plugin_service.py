@@ -208,6 +208,11 @@ class ServicePlugin(base.Plugin):
 	====
 	"""
 
+	@classmethod
+	def get_dependencies(cls):
+		# services can change any settings
+		return ["*"]
+
 	def __init__(self, *args, **kwargs):
 		super(ServicePlugin, self).__init__(*args, **kwargs)
 		self._has_dynamic_options = True
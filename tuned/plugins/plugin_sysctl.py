@@ -39,6 +39,11 @@ class SysctlPlugin(base.Plugin):
 	====
 	"""
 
+	@classmethod
+	def get_dependencies(cls):
+		# these plugins write to /proc/sys too
+		return ["vm", "scheduler"]
+
 	def __init__(self, *args, **kwargs):
 		super(SysctlPlugin, self).__init__(*args, **kwargs)
 		self._has_dynamic_options = True
@@ -117,7 +122,7 @@ class SysctlPlugin(base.Plugin):
 		files = {}
 		for d in SYSCTL_CONFIG_DIRS:
 			try:
-				flist = os.listdir(d)
+				flist = os.listdir(self._cmd.root_path(d))
 			except OSError:
 				continue
 			for fname in flist:
@@ -139,7 +144,7 @@ class SysctlPlugin(base.Plugin):
 	def _apply_sysctl_config_file(self, path, instance_sysctl, sysctl_settings):
 		log.debug("Applying sysctl settings from file %s" % path)
 		try:
-			with open(path, "r") as f:
+			with open(self._cmd.root_path(path), "r") as f:
 				for lineno, line in enumerate(f, 1):
 					self._apply_sysctl_config_line(path, lineno, line, instance_sysctl, sysctl_settings)
 			log.debug("Finished applying sysctl settings from file %s"
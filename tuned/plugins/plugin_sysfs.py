@@ -32,6 +32,11 @@ class SysfsPlugin(base.Plugin):
 	====
 	"""
 
+	@classmethod
+	def get_dependencies(cls):
+		# arbitrary sysfs files can be written
+		return ["*"]
+
 	# TODO: resolve possible conflicts with sysctl settings from other plugins
 
 	def __init__(self, *args, **kwargs):
@@ -51,6 +51,10 @@ class SystemdPlugin(base.Plugin):
 	def _instance_cleanup(self, instance):
 		pass
 
+	@classmethod
+	def get_dependencies(cls):
+		return ["*"]
+
 	@classmethod
 	def _get_config_options(cls):
 		return {
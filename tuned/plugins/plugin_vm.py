@@ -52,8 +52,33 @@ class VMPlugin(base.Plugin):
 	`defer`, `defer+madvise`, `madvise` and `never`. For a detailed
 	explanation of these values refer to
 	link:https://www.kernel.org/doc/Documentation/vm/transhuge.txt[Transparent Hugepage Support].
+
+	The dirty limits can also follow the memory pressure (Pressure Stall
+	Information). When the stall time of the memory exceeds
+	[option]`memory_pressure_threshold` percent of a second, the values
+	of the [option]`pressure_dirty_bytes` and
+	[option]`pressure_dirty_background_bytes` options (with the same
+	syntax as [option]`dirty_bytes`) are set immediately, so the page
+	cache is written back earlier. The previous limits are restored once
+	the 10 s average of the memory pressure drops below the threshold (or
+	on the next start of *TuneD* if it crashed meanwhile).
+
+	.Lower the dirty limits on memory pressure
+	====
+	----
+	[vm]
+	dirty_bytes=20%
+	memory_pressure_threshold=10
+	pressure_dirty_bytes=5%
+	pressure_dirty_background_bytes=2%
+	----
+	====
 	"""
 
+	@classmethod
+	def get_dependencies(cls):
+		return ["sysctl"]
+
 	@classmethod
 	def _get_config_options(self):
 		return {
@@ -63,7 +88,10 @@ class VMPlugin(base.Plugin):
 			"dirty_bytes" : None,
 			"dirty_ratio" : None,
 			"dirty_background_bytes" : None,
-			"dirty_background_ratio" : None
+			"dirty_background_ratio" : None,
+			"memory_pressure_threshold" : None,
+			"pressure_dirty_bytes" : None,
+			"pressure_dirty_background_bytes" : None,
 		}
 
 	@staticmethod
@@ -77,17 +105,109 @@ class VMPlugin(base.Plugin):
 
 	def _instance_init(self, instance):
 		instance._has_static_tuning = True
-		instance._has_dynamic_tuning = False
+		instance._has_dynamic_tuning = instance.options["memory_pressure_threshold"] is not None
+		instance._pressure_monitor = None
 		self._check_conflicting_dirty_options(instance, "dirty_bytes", "dirty_ratio")
 		self._check_conflicting_dirty_options(instance, "dirty_background_bytes", "dirty_background_ratio")
 
+		# recover the dirty limits lowered on memory pressure in case of crash
+		storage_key = self._pressure_storage_key(instance)
+		saved = self._storage.get(storage_key)
+		if saved is not None:
+			log.info("recovering dirty limits lowered on memory pressure from previous run")
+			self._restore_dirty_limits(saved)
+			self._storage.unset(storage_key)
+
+	def _pressure_storage_key(self, instance):
+		return self._storage_key(instance.name, "pressure_dirty_limits")
+
 	def _instance_cleanup(self, instance):
-		pass
+		self._pressure_unwatch(instance)
+
+	def _instance_init_dynamic(self, instance):
+		instance._pressure_saved = None
+		instance._pressure_dirty = self._pressure_dirty_values(instance)
+		instance._pressure_threshold = self._percentage_option(instance, "memory_pressure_threshold")
+		if not instance._pressure_dirty:
+			log.warning("instance %s: no pressure_dirty_bytes or pressure_dirty_background_bytes set, ignoring memory_pressure_threshold"
+					% instance.name)
+			instance._pressure_threshold = None
+		if instance._pressure_threshold is not None \
+				and not self._pressure_watch(instance, "memory", instance._pressure_threshold):
+			instance._pressure_threshold = None
+
+	def _pressure_dirty_values(self, instance):
+		"""Return list of the (option, value) pairs to set on memory pressure."""
+		res = []
+		for (option, bytes_option, ratio_option, check_fun) in [
+				("pressure_dirty_bytes", "dirty_bytes", "dirty_ratio", self._check_twice_pagesize),
+				("pressure_dirty_background_bytes", "dirty_background_bytes", "dirty_background_ratio", self._check_positive)]:
+			value = self._variables.expand(instance.options[option])
+			if value is None:
+				continue
+			value = value.strip()
+			if value.endswith("%"):
+				(target, value, check_fun) = (ratio_option, value.rstrip("%"), self._check_ratio)
+			else:
+				target = bytes_option
+			try:
+				int_value = int(value)
+			except ValueError:
+				log.error("The value of '%s' must be an integer." % option)
+				continue
+			if check_fun(option, int_value):
+				res.append((target, str(int_value)))
+		return res
+
+	def _instance_apply_dynamic(self, instance, device):
+		self._instance_update_dynamic(instance, device)
+
+	def _instance_update_dynamic(self, instance, device):
+		if instance._pressure_threshold is None:
+			return
+		if self._under_pressure(instance, "memory", instance._pressure_threshold):
+			if instance._pressure_saved is None:
+				log.info("memory pressure above %s%%, lowering the dirty limits" % instance._pressure_threshold)
+				instance._pressure_saved = self._read_dirty_limits()
+				self._storage.set(self._pressure_storage_key(instance), instance._pressure_saved)
+				for (option, value) in instance._pressure_dirty:
+					cmd.write_to_file(self._proc_sys_vm_option_path(option), value)
+				self._record_dynamic_change(instance, "dirty_limits")
+		elif instance._pressure_saved is not None:
+			log.info("memory pressure below %s%%, restoring the dirty limits" % instance._pressure_threshold)
+			self._unapply_pressure_dirty(instance)
+			self._record_dynamic_change(instance, "dirty_limits")
+
+	def _instance_unapply_dynamic(self, instance, device):
+		if instance._pressure_saved is not None:
+			self._unapply_pressure_dirty(instance)
+
+	def _unapply_pressure_dirty(self, instance):
+		self._restore_dirty_limits(instance._pressure_saved)
+		instance._pressure_saved = None
+		self._storage.unset(self._pressure_storage_key(instance))
+
+	def _read_dirty_limits(self):
+		limits = {}
+		for option in ["dirty_bytes", "dirty_ratio", "dirty_background_bytes", "dirty_background_ratio"]:
+			limits[option] = cmd.read_file(self._proc_sys_vm_option_path(option), err_ret = None, no_error = True)
+		return limits
+
+	def _restore_dirty_limits(self, limits):
+		# only one option of a pair is active, the other one reads as 0
+		for (bytes_option, ratio_option) in [("dirty_bytes", "dirty_ratio"),
+				("dirty_background_bytes", "dirty_background_ratio")]:
+			value = limits.get(bytes_option)
+			option = bytes_option
+			if value is None or value.strip() in ["", "0"]:
+				(option, value) = (ratio_option, limits.get(ratio_option))
+			if value is not None:
+				cmd.write_to_file(self._proc_sys_vm_option_path(option), value.strip())
 
 	@classmethod
 	def _thp_path(self):
 		path = "/sys/kernel/mm/transparent_hugepage"
-		if not os.path.exists(path):
+		if not os.path.exists(cmd.root_path(path)):
 			# RHEL-6 support
 			path =  "/sys/kernel/mm/redhat_transparent_hugepage"
 		return path
@@ -106,7 +226,7 @@ class VMPlugin(base.Plugin):
 			return None
 
 		sys_file = os.path.join(self._thp_path(), "enabled")
-		if os.path.exists(sys_file):
+		if os.path.exists(cmd.root_path(sys_file)):
 			if not sim:
 				cmd.write_to_file(sys_file, value, \
 					no_error = [errno.ENOENT] if remove else False)
@@ -124,7 +244,7 @@ class VMPlugin(base.Plugin):
 	@command_get("transparent_hugepages")
 	def _get_transparent_hugepages(self, instance):
 		sys_file = os.path.join(self._thp_path(), "enabled")
-		if os.path.exists(sys_file):
+		if os.path.exists(cmd.root_path(sys_file)):
 			return cmd.get_active_option(cmd.read_file(sys_file))
 		else:
 			return None
@@ -137,7 +257,7 @@ class VMPlugin(base.Plugin):
 	@command_set("transparent_hugepage.defrag")
 	def _set_transparent_hugepage_defrag(self, value, instance, sim, remove):
 		sys_file = os.path.join(self._thp_path(), "defrag")
-		if os.path.exists(sys_file):
+		if os.path.exists(cmd.root_path(sys_file)):
 			if not sim:
 				cmd.write_to_file(sys_file, value, \
 					no_error = [errno.ENOENT] if remove else False)
@@ -150,7 +270,7 @@ class VMPlugin(base.Plugin):
 	@command_get("transparent_hugepage.defrag")
 	def _get_transparent_hugepage_defrag(self, instance):
 		sys_file = os.path.join(self._thp_path(), "defrag")
-		if os.path.exists(sys_file):
+		if os.path.exists(cmd.root_path(sys_file)):
 			return cmd.get_active_option(cmd.read_file(sys_file))
 		else:
 			return None
@@ -201,7 +321,7 @@ class VMPlugin(base.Plugin):
 		counterpart_path = self._proc_sys_vm_option_path(counterpart)
 		option_key = self._storage_key(command_name=option)
 		counterpart_key = self._storage_key(command_name=counterpart)
-		if not os.path.isfile(option_path):
+		if not os.path.isfile(cmd.root_path(option_path)):
 			log.warning("Option '%s' is not supported on the current hardware." % option)
 		current_value = cmd.read_file(option_path).strip()
 		if verify:
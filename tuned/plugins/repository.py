@@ -8,7 +8,7 @@ __all__ = ["Repository"]
 
 class Repository(ClassLoader):
 
-	def __init__(self, monitor_repository, storage_factory, hardware_inventory, device_matcher, device_matcher_udev, plugin_instance_factory, global_cfg, variables):
+	def __init__(self, monitor_repository, storage_factory, hardware_inventory, device_matcher, device_matcher_udev, plugin_instance_factory, global_cfg, variables, timings = None):
 		super(Repository, self).__init__()
 		self._plugins = set()
 		self._monitor_repository = monitor_repository
@@ -19,11 +19,16 @@ class Repository(ClassLoader):
 		self._plugin_instance_factory = plugin_instance_factory
 		self._global_cfg = global_cfg
 		self._variables = variables
+		self._timings = timings
 
 	@property
 	def plugins(self):
 		return self._plugins
 
+	@property
+	def variables(self):
+		return self._variables
+
 	def _set_loader_parameters(self):
 		self._namespace = "tuned.plugins"
 		self._prefix = "plugin_"
@@ -33,7 +38,7 @@ class Repository(ClassLoader):
 		log.debug("creating plugin %s" % plugin_name)
 		plugin_cls = self.load_class(plugin_name)
 		plugin_instance = plugin_cls(self._monitor_repository, self._storage_factory, self._hardware_inventory, self._device_matcher,\
-			self._device_matcher_udev, self._plugin_instance_factory, self._global_cfg, self._variables)
+			self._device_matcher_udev, self._plugin_instance_factory, self._global_cfg, self._variables, self._timings)
 		self._plugins.add(plugin_instance)
 		return plugin_instance
 
@@ -5,4 +5,5 @@ from tuned.profiles.unit import *
 from tuned.profiles.exceptions import *
 from tuned.profiles.factory import *
 from tuned.profiles.merger import *
+from tuned.profiles.cache import *
 from . import functions
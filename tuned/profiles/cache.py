@@ -0,0 +1,141 @@
+import collections
+import hashlib
+import os
+import pickle
+import tempfile
+import tuned.logs
+import tuned.version
+
+log = tuned.logs.get()
+
+class Cache(object):
+	"""
+	On-disk cache of loaded profiles.
+
+	Every entry holds the merged profile with its variables and functions
+	expanded, together with fingerprints of everything it was built from:
+	the contents of the profile files (including the not existing ones
+	which would shadow them), the variables files and the inputs of the
+	executed built-in functions (see Function.cache_key). The entry is
+	used only if all the fingerprints still match.
+	"""
+
+	__slots__ = ["_path", "_max_entries"]
+
+	def __init__(self, path, max_entries = 8):
+		self._path = path
+		self._max_entries = max_entries
+
+	@property
+	def path(self):
+		return self._path
+
+	@staticmethod
+	def file_digest(file_name):
+		try:
+			with open(file_name, "rb") as f:
+				return hashlib.sha256(f.read()).hexdigest()
+		except (OSError, IOError):
+			return None
+
+	def key(self, *parts):
+		"""
+		Create the entry key from the parts the loaded profile
+		depends on (besides the fingerprinted sources).
+		"""
+		parts = (tuned.version.TUNED_VERSION_STR, ) + parts
+		return hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()
+
+	def _load(self):
+		try:
+			with open(self._path, "rb") as f:
+				entries = pickle.load(f)
+		except (OSError, IOError) as e:
+			log.debug("Error loading profile cache '%s': %s" % (self._path, e))
+			return collections.OrderedDict()
+		except Exception as e:
+			log.warning("Ignoring corrupted profile cache '%s': %s" % (self._path, e))
+			return collections.OrderedDict()
+		if not isinstance(entries, collections.OrderedDict):
+			return collections.OrderedDict()
+		return entries
+
+	def _save(self, entries):
+		dir_name = os.path.dirname(self._path)
+		try:
+			if not os.path.isdir(dir_name):
+				os.makedirs(dir_name)
+			(fd, tmp_name) = tempfile.mkstemp(prefix = ".profile_cache", dir = dir_name)
+			try:
+				with os.fdopen(fd, "wb") as f:
+					pickle.dump(entries, f, pickle.HIGHEST_PROTOCOL)
+				os.rename(tmp_name, self._path)
+			except:
+				os.unlink(tmp_name)
+				raise
+		except (OSError, IOError, pickle.PicklingError) as e:
+			log.warning("Error saving profile cache '%s': %s" % (self._path, e))
+
+	def _check_sources(self, files, calls, functions):
+		for file_name, digest in files.items():
+			if self.file_digest(file_name) != digest:
+				log.debug("profile cache: '%s' changed" % file_name)
+				return False
+		for function_name, args, cache_key in calls:
+			try:
+				current = functions.load_func(function_name).cache_key(list(args))
+			except Exception as e:
+				log.debug("profile cache: cannot check function '%s': %s" % (function_name, e))
+				return False
+			if current is None or current != cache_key:
+				log.debug("profile cache: inputs of function '%s' changed" % function_name)
+				return False
+		return True
+
+	def get(self, key, functions):
+		"""
+		Return the cached value for the key, or None if there is no such
+		entry or some of its sources changed.
+
+		functions -- repository of built-in functions used to check the
+		recorded function inputs
+		"""
+		entry = self._load().get(key)
+		if entry is None:
+			return None
+		files, calls, data = entry
+		if not self._check_sources(files, calls, functions):
+			return None
+		try:
+			return pickle.loads(data)
+		except Exception as e:
+			log.warning("Ignoring corrupted profile cache entry: %s" % e)
+			return None
+
+	def put(self, key, file_names, calls, value):
+		"""
+		Store the value with fingerprints of the files and the function
+		calls (as recorded by functions.Repository) it was built from.
+		Values depending on a function which cannot be cached are not stored.
+		"""
+		if any(cache_key is None for _, _, cache_key in calls):
+			log.debug("profile cache: not caching, the profile uses uncacheable functions")
+			return
+		files = collections.OrderedDict((f, self.file_digest(f)) for f in file_names)
+		try:
+			data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+		except (pickle.PicklingError, TypeError, AttributeError) as e:
+			log.warning("Cannot cache the profile: %s" % e)
+			return
+		entries = self._load()
+		entries.pop(key, None)
+		entries[key] = (files, calls, data)
+		while len(entries) > self._max_entries:
+			entries.popitem(last = False)
+		self._save(entries)
+
+	def clear(self):
+		try:
+			os.unlink(self._path)
+		except (OSError, IOError) as e:
+			log.debug("Error removing profile cache '%s': %s" % (self._path, e))
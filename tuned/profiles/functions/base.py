@@ -29,6 +29,16 @@ class Function(object):
 		la = len(args)
 		return (nargs_max == 0 or nargs_max >= la) and (nargs_min is None or nargs_min <= la)
 
+	def cache_key(self, args):
+		"""
+		Return a string describing the system state the result of the
+		function depends on (besides its arguments), "" if the result
+		depends on the arguments only, or None if the result must not
+		be cached (e.g. the function has side effects or its inputs
+		cannot be cheaply checked).
+		"""
+		return ""
+
 	def execute(self, args):
 		if self._check_args(args, self._nargs_max, self._nargs_min):
 			return True
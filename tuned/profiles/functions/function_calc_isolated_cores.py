@@ -25,6 +25,10 @@ class CalcIsolatedCores(base.Function):
 		# max 1 argument
 		super(CalcIsolatedCores, self).__init__(1)
 
+	def cache_key(self, args):
+		# only sysfs is read, the result itself is cheap to compute
+		return str(self.execute(args))
+
 	def execute(self, args):
 		if not super(CalcIsolatedCores, self).execute(args):
 			return None
@@ -1,3 +1,4 @@
+import os
 import tuned.logs
 from . import base
 
@@ -12,6 +13,12 @@ class CheckNetQueueCount(base.Function):
 		# 1 argument
 		super(CheckNetQueueCount, self).__init__(1, 1)
 
+	def cache_key(self, args):
+		if len(args) > 0 and args[0].isdigit():
+			return ""
+		# nproc prints the number of CPUs available to the process
+		return str(len(os.sched_getaffinity(0)))
+
 	def execute(self, args):
 		if not super(CheckNetQueueCount, self).execute(args):
 			return None
@@ -19,6 +19,11 @@ class CPUInfoCheck(base.Function):
 		# unlimited number of arguments, min 2 arguments
 		super(CPUInfoCheck, self).__init__(0, 2)
 
+	def cache_key(self, args):
+		# /proc/cpuinfo contains volatile values (e.g. CPU frequency),
+		# the result itself is cheap to compute and stable
+		return str(self.execute(args))
+
 	def execute(self, args):
 		if not super(CPUInfoCheck, self).execute(args):
 			return None
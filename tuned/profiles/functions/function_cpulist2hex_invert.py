@@ -16,6 +16,9 @@ class CPUList2HexInvert(base.Function):
 		# arbitrary number of arguments
 		super(CPUList2HexInvert, self).__init__(0)
 
+	def cache_key(self, args):
+		return self._cmd.read_file("/sys/devices/system/cpu/online")
+
 	def execute(self, args):
 		if not super(CPUList2HexInvert, self).execute(args):
 			return None
@@ -16,6 +16,9 @@ class CPUListInvert(base.Function):
 		# arbitrary number of arguments
 		super(CPUListInvert, self).__init__(0)
 
+	def cache_key(self, args):
+		return self._cmd.read_file("/sys/devices/system/cpu/online")
+
 	def execute(self, args):
 		if not super(CPUListInvert, self).execute(args):
 			return None
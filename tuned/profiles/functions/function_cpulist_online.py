@@ -16,6 +16,9 @@ class CPUListOnline(base.Function):
 		# arbitrary number of arguments
 		super(CPUListOnline, self).__init__(0)
 
+	def cache_key(self, args):
+		return self._cmd.read_file("/sys/devices/system/cpu/online")
+
 	def execute(self, args):
 		if not super(CPUListOnline, self).execute(args):
 			return None
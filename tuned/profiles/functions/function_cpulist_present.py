@@ -9,6 +9,9 @@ class CPUListPresent(base.Function):
 		# arbitrary number of arguments
 		super(CPUListPresent, self).__init__(0)
 
+	def cache_key(self, args):
+		return self._cmd.read_file("/sys/devices/system/cpu/present")
+
 	def execute(self, args):
 		if not super(CPUListPresent, self).execute(args):
 			return None
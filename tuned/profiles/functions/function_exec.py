@@ -15,6 +15,10 @@ class Exec(base.Function):
 		# unlimited number of arguments, min 1 argument (the name of executable)
 		super(Exec, self).__init__(0, 1)
 
+	def cache_key(self, args):
+		# the executed process may have side effects
+		return None
+
 	def execute(self, args):
 		if not super(Exec, self).execute(args):
 			return None
@@ -25,6 +25,9 @@ class IntelRecommendedPState(base.Function):
     def __init__(self):
         super(IntelRecommendedPState, self).__init__(0)
 
+    def cache_key(self, args):
+        return self._cmd.read_file(PMU_PATH)
+
     def execute(self, args):
         if not super(IntelRecommendedPState, self).execute(args):
             return None
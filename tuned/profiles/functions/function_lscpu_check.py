@@ -22,6 +22,11 @@ class LSCPUCheck(base.Function):
 		# unlimited number of arguments, min 2 arguments
 		super(LSCPUCheck, self).__init__(0, 2)
 
+	def cache_key(self, args):
+		# running lscpu is what the cache should avoid, its output
+		# also contains volatile values
+		return None
+
 	def execute(self, args):
 		if not super(LSCPUCheck, self).execute(args):
 			return None
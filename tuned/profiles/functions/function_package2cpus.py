@@ -27,6 +27,10 @@ class Package2CPUs(base.Function):
 	def __init__(self):
 		super(Package2CPUs, self).__init__(0)
 
+	def cache_key(self, args):
+		# only sysfs is read, the result itself is cheap to compute
+		return str(self.execute(args))
+
 	def execute(self, args):
 		if not super(Package2CPUs, self).execute(args):
 			return None
@@ -1,5 +1,8 @@
+import re
 from . import base
 
+VIRT_FILES = ["/sys/class/dmi/id/sys_vendor", "/sys/class/dmi/id/product_name", "/sys/hypervisor/type"]
+
 class VirtCheck(base.Function):
 	"""
 	Checks whether *TuneD* is running inside a virtual machine (VM) or on bare metal.
@@ -18,6 +21,11 @@ class VirtCheck(base.Function):
 		# 2 arguments
 		super(VirtCheck, self).__init__(2, 2)
 
+	def cache_key(self, args):
+		# the same sources virt-what mostly relies on, cheap to read
+		return "\n".join([self._cmd.read_file(f, no_error = True) for f in VIRT_FILES]
+				+ [str(re.search(r"^flags\s*:.*\bhypervisor\b", self._cmd.read_file("/proc/cpuinfo"), re.MULTILINE) is not None)])
+
 	def execute(self, args):
 		if not super(VirtCheck, self).execute(args):
 			return None
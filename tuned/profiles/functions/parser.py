@@ -51,6 +51,7 @@ class Parser():
 			log.error("function '%s' not implemented" % sl[1])
 			return
 		s = f.execute(sl[2:])
+		self._repository.record(f, sl[2:])
 		log.debug("${f:%s} expands to: '%s'" % (":".join(sl[1:]), s))
 		if s is None:
 			return
@@ -15,6 +15,7 @@ class Repository(ClassLoader):
 	def __init__(self):
 		super(Repository, self).__init__()
 		self._functions = {}
+		self._calls = None
 
 	@property
 	def functions(self):
@@ -46,5 +47,25 @@ class Repository(ClassLoader):
 			if v == function:
 				del self._functions[k]
 
+	def start_recording(self):
+		"""
+		Start recording of executed functions together with the
+		fingerprints of their inputs (see Function.cache_key).
+		"""
+		self._calls = []
+
+	def stop_recording(self):
+		"""
+		Stop recording and return the list of recorded calls,
+		[(function_name, args, cache_key)].
+		"""
+		calls = self._calls
+		self._calls = None
+		return calls
+
+	def record(self, function, args):
+		if self._calls is not None:
+			self._calls.append((function.name, tuple(args), function.cache_key(args)))
+
 	def expand(self, s):
 		return Parser(self).expand(s)
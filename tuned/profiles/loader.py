@@ -15,14 +15,15 @@ class Loader(object):
 	Profiles loader.
 	"""
 
-	__slots__ = ["_profile_locator", "_profile_merger", "_profile_factory", "_global_config", "_variables"]
+	__slots__ = ["_profile_locator", "_profile_merger", "_profile_factory", "_global_config", "_variables", "_cache"]
 
-	def __init__(self, profile_locator, profile_factory, profile_merger, global_config, variables):
+	def __init__(self, profile_locator, profile_factory, profile_merger, global_config, variables, cache = None):
 		self._profile_locator = profile_locator
 		self._profile_factory = profile_factory
 		self._profile_merger = profile_merger
 		self._global_config = global_config
 		self._variables = variables
+		self._cache = cache
 
 	def _create_profile(self, profile_name, config):
 		return tuned.profiles.profile.Profile(profile_name, config)
@@ -47,9 +48,34 @@ class Loader(object):
 			log.info("loading profiles: %s" % ", ".join(profile_names))
 		else:
 			log.info("loading profile: %s" % profile_names[0])
+
+		if self._cache is None:
+			return self._load(profile_names)
+
+		# the result also depends on the variables defined by previously loaded profiles
+		key = self._cache.key(profile_names, self._profile_locator.load_directories, self._variables.get_state())
+		cached = self._cache.get(key, self._variables.functions)
+		if cached is not None:
+			log.debug("using cached profile from '%s'" % self._cache.path)
+			(final_profile, variables_state) = cached
+			self._variables.set_state(variables_state)
+			return final_profile
+
+		profile_lookups = []
+		self._variables.start_recording()
+		try:
+			final_profile = self._load(profile_names, profile_lookups)
+		finally:
+			(variables_files, calls) = self._variables.stop_recording()
+		# not existing candidates are fingerprinted too, they would shadow the used files once created
+		file_names = [f for name in profile_lookups for f in self._profile_locator.get_config_candidates(name)]
+		self._cache.put(key, file_names + variables_files, calls, (final_profile, self._variables.get_state()))
+		return final_profile
+
+	def _load(self, profile_names, profile_lookups = None):
 		profiles = []
 		processed_files = []
-		self._load_profile(profile_names, profiles, processed_files)
+		self._load_profile(profile_names, profiles, processed_files, profile_lookups)
 
 		final_profile = self._profile_merger.merge(profiles)
 		final_profile.name = " ".join(profile_names)
@@ -68,8 +94,10 @@ class Loader(object):
 			profile.units[unit].cpuinfo_regex = self._variables.expand(profile.units[unit].cpuinfo_regex)
 			profile.units[unit].uname_regex = self._variables.expand(profile.units[unit].uname_regex)
 
-	def _load_profile(self, profile_names, profiles, processed_files):
+	def _load_profile(self, profile_names, profiles, processed_files, profile_lookups = None):
 		for name in profile_names:
+			if profile_lookups is not None:
+				profile_lookups.append(name)
 			filename = self._profile_locator.get_config(name, processed_files)
 			if filename == "":
 				continue
@@ -81,7 +109,7 @@ class Loader(object):
 			profile = self._profile_factory.create(name, config)
 			if "include" in profile.options:
 				include_names = re.split(r"\s*[,;]\s*", self._variables.expand(profile.options.pop("include")))
-				self._load_profile(include_names, profiles, processed_files)
+				self._load_profile(include_names, profiles, processed_files, profile_lookups)
 
 			profiles.append(profile)
 
@@ -23,6 +23,15 @@ class Locator(object):
 		config_name = os.path.join(*path_parts)
 		return os.path.normpath(config_name)
 
+	def get_config_candidates(self, profile_name):
+		"""
+		Return all the config file names which can be used for the profile,
+		the most preferred first.
+		"""
+		if profile_name[0:1] == "-":
+			profile_name = profile_name[1:]
+		return [self._get_config_filename(dir_name, os.path.basename(profile_name)) for dir_name in reversed(self._load_directories)]
+
 	def get_config(self, profile_name, skip_files=None):
 		ret = None
 		conditional_load = profile_name[0:1] == "-"
@@ -18,6 +18,11 @@ class Variables():
 		self._lookup_re = {}
 		self._lookup_env = {}
 		self._functions = functions.Repository()
+		self._files = None
+
+	@property
+	def functions(self):
+		return self._functions
 
 	def _add_env_prefix(self, s, prefix):
 		if s.find(prefix) == 0:
@@ -41,6 +46,8 @@ class Variables():
 		self._lookup_env[self._add_env_prefix(s, consts.ENV_PREFIX)] = v
 
 	def add_from_file(self, filename):
+		if self._files is not None:
+			self._files.append(filename)
 		if not os.path.exists(filename):
 			log.error("unable to find variables_file: '%s'" % filename)
 			return
@@ -63,6 +70,32 @@ class Variables():
 			else:
 				self.add_variable(item, cfg[item])
 
+	def start_recording(self):
+		"""
+		Start recording of the inputs (variables files and executed
+		functions) the defined variables depend on.
+		"""
+		self._files = []
+		self._functions.start_recording()
+
+	def stop_recording(self):
+		"""
+		Stop recording and return the recorded inputs as a tuple
+		(variables_files, function_calls).
+		"""
+		files = self._files
+		self._files = None
+		return (files, self._functions.stop_recording())
+
+	def get_state(self):
+		return (dict(self._lookup_re), dict(self._lookup_env))
+
+	def set_state(self, state):
+		self._lookup_re.clear()
+		self._lookup_re.update(state[0])
+		self._lookup_env.clear()
+		self._lookup_env.update(state[1])
+
 	# expand static variables (no functions)
 	def expand_static(self, value):
 		return re.sub(r'\\(\${\w+})', r'\1', self._cmd.multiple_re_replace(self._lookup_re, value))
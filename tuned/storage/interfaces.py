@@ -12,6 +12,15 @@ class Provider(object):
 	def unset(self, namespace, option):
 		raise NotImplementedError()
 
+	def set_item(self, namespace, option, key, value):
+		raise NotImplementedError()
+
+	def unset_item(self, namespace, option, key):
+		raise NotImplementedError()
+
+	def update_items(self, namespace, option, items, removed_keys):
+		raise NotImplementedError()
+
 	def clear(self):
 		raise NotImplementedError()
 
@@ -0,0 +1,283 @@
+from . import interfaces
+import tuned.logs
+import tuned.consts as consts
+import os
+import pickle
+import struct
+import tempfile
+import threading
+import zlib
+
+log = tuned.logs.get()
+
+# record header: length and CRC32 of the pickled record
+_HEADER = struct.Struct("<II")
+
+class JournalProvider(interfaces.Provider):
+	"""
+	Storage provider persisting every change as a record appended to a
+	journal file, so the rollback data survive a crash of the daemon.
+
+	A record costs one write() of the pickled change, the journal is
+	fsync-ed in batches by a background thread at most every
+	'sync_interval' seconds (and by save()). The same thread compacts the
+	journal (replaces it by a snapshot of the current data) when it grows
+	much larger than the data. The journal is replayed by load(), a torn
+	or corrupted tail (e.g. after a power loss) is dropped.
+
+	Besides the values of the options, items of the options holding a
+	dictionary can be set and unset individually (set_item, unset_item),
+	so large dictionaries updated often (e.g. the original scheduling
+	parameters of the processes) are not rewritten as a whole.
+	"""
+
+	__slots__ = ["_path", "_data", "_fd", "_lock", "_cond", "_thread", "_dirty",
+			"_records", "_closed", "_sync_interval", "_compact_records"]
+
+	def __init__(self, path = None, sync_interval = 1.0, compact_records = 1024):
+		if path is None:
+			path = consts.DEFAULT_STORAGE_JOURNAL_FILE
+		self._path = path
+		self._data = {}
+		self._fd = None
+		self._lock = threading.Lock()
+		self._cond = threading.Condition(self._lock)
+		self._thread = None
+		self._dirty = False
+		self._records = 0
+		self._closed = False
+		self._sync_interval = sync_interval
+		self._compact_records = compact_records
+
+	@property
+	def path(self):
+		return self._path
+
+	def _apply(self, record):
+		op = record[0]
+		if op == "set":
+			self._data.setdefault(record[1], {})[record[2]] = record[3]
+		elif op == "unset":
+			self._data.get(record[1], {}).pop(record[2], None)
+		elif op == "set_item":
+			namespace = self._data.setdefault(record[1], {})
+			value = namespace.get(record[2])
+			if not isinstance(value, dict):
+				value = namespace[record[2]] = {}
+			value[record[3]] = record[4]
+		elif op == "unset_item":
+			value = self._data.get(record[1], {}).get(record[2])
+			if isinstance(value, dict):
+				value.pop(record[3], None)
+		elif op == "update_items":
+			namespace = self._data.setdefault(record[1], {})
+			value = namespace.get(record[2])
+			if not isinstance(value, dict):
+				value = namespace[record[2]] = {}
+			value.update(record[3])
+			for key in record[4]:
+				value.pop(key, None)
+		elif op == "clear":
+			self._data = {}
+		elif op == "snapshot":
+			self._data = record[1]
+		else:
+			log.warning("Ignoring unknown record '%s' in storage journal '%s'" % (op, self._path))
+
+	@staticmethod
+	def _encode(record):
+		data = pickle.dumps(record, pickle.HIGHEST_PROTOCOL)
+		return _HEADER.pack(len(data), zlib.crc32(data) & 0xffffffff) + data
+
+	def _open(self, truncate_at = None):
+		dir_name = os.path.dirname(self._path)
+		if dir_name and not os.path.isdir(dir_name):
+			os.makedirs(dir_name)
+		self._fd = os.open(self._path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o600)
+		if truncate_at is not None:
+			os.ftruncate(self._fd, truncate_at)
+
+	def _ensure_open(self):
+		if self._fd is None:
+			try:
+				self._open()
+			except (OSError, IOError) as e:
+				log.error("Error opening storage journal '%s': %s" % (self._path, e))
+				return False
+		if self._thread is None:
+			self._thread = threading.Thread(target = self._thread_code, name = "tuned-storage")
+			self._thread.daemon = True
+			self._thread.start()
+		return True
+
+	def _append(self, record):
+		"""Apply the record to the data and append it to the journal, the lock must be held."""
+		self._apply(record)
+		if self._closed or not self._ensure_open():
+			return
+		try:
+			os.write(self._fd, self._encode(record))
+		except (OSError, IOError) as e:
+			log.error("Error writing storage journal '%s': %s" % (self._path, e))
+			return
+		except (pickle.PicklingError, TypeError, AttributeError) as e:
+			log.error("Cannot store value in storage journal '%s': %s" % (self._path, e))
+			return
+		self._dirty = True
+		self._records += 1
+		if self._needs_compaction():
+			self._cond.notify()
+
+	def _needs_compaction(self):
+		entries = sum(len(options) for options in self._data.values())
+		return self._records > max(self._compact_records, 4 * entries)
+
+	def _sync(self):
+		if self._dirty and self._fd is not None:
+			try:
+				os.fsync(self._fd)
+			except (OSError, IOError) as e:
+				log.error("Error syncing storage journal '%s': %s" % (self._path, e))
+			self._dirty = False
+
+	def _compact(self):
+		"""Replace the journal by a snapshot of the data, the lock must be held."""
+		dir_name = os.path.dirname(self._path) or "."
+		try:
+			(fd, tmp_name) = tempfile.mkstemp(prefix = ".save", dir = dir_name)
+			try:
+				os.write(fd, self._encode(("snapshot", self._data)))
+				os.fsync(fd)
+				os.close(fd)
+				fd = None
+				os.rename(tmp_name, self._path)
+			except:
+				if fd is not None:
+					os.close(fd)
+				os.unlink(tmp_name)
+				raise
+			# persist the rename
+			dir_fd = os.open(dir_name, os.O_RDONLY)
+			try:
+				os.fsync(dir_fd)
+			finally:
+				os.close(dir_fd)
+		except (OSError, IOError, pickle.PicklingError, TypeError, AttributeError) as e:
+			log.error("Error compacting storage journal '%s': %s" % (self._path, e))
+			return
+		if self._fd is not None:
+			os.close(self._fd)
+			self._fd = None
+		try:
+			self._open()
+		except (OSError, IOError) as e:
+			log.error("Error opening storage journal '%s': %s" % (self._path, e))
+		self._records = 1
+		self._dirty = False
+
+	def _thread_code(self):
+		with self._cond:
+			while not self._closed:
+				self._cond.wait(self._sync_interval)
+				if self._needs_compaction():
+					self._compact()
+				self._sync()
+
+	def set(self, namespace, option, value):
+		with self._lock:
+			self._append(("set", namespace, option, value))
+
+	def get(self, namespace, option, default=None):
+		with self._lock:
+			return self._data.get(namespace, {}).get(option, default)
+
+	def unset(self, namespace, option):
+		with self._lock:
+			if option in self._data.get(namespace, {}):
+				self._append(("unset", namespace, option))
+
+	def set_item(self, namespace, option, key, value):
+		with self._lock:
+			self._append(("set_item", namespace, option, key, value))
+
+	def unset_item(self, namespace, option, key):
+		with self._lock:
+			value = self._data.get(namespace, {}).get(option)
+			if isinstance(value, dict) and key in value:
+				self._append(("unset_item", namespace, option, key))
+
+	def update_items(self, namespace, option, items, removed_keys):
+		removed_keys = list(removed_keys)
+		if not items and not removed_keys:
+			return
+		with self._lock:
+			self._append(("update_items", namespace, option, dict(items), removed_keys))
+
+	def save(self):
+		with self._lock:
+			self._sync()
+
+	def load(self):
+		"""Replay the journal, drop its corrupted tail if there is any."""
+		with self._lock:
+			self._data = {}
+			self._records = 0
+			try:
+				with open(self._path, "rb") as f:
+					journal = f.read()
+			except (OSError, IOError) as e:
+				log.debug("Error loading storage journal '%s': %s" % (self._path, e))
+				return
+			offset = 0
+			while offset < len(journal):
+				if offset + _HEADER.size > len(journal):
+					break
+				(length, crc) = _HEADER.unpack_from(journal, offset)
+				data = journal[offset + _HEADER.size:offset + _HEADER.size + length]
+				if len(data) != length or zlib.crc32(data) & 0xffffffff != crc:
+					break
+				try:
+					record = pickle.loads(data)
+				except Exception as e:
+					log.warning("Error decoding record of storage journal '%s': %s" % (self._path, e))
+					break
+				self._apply(record)
+				self._records += 1
+				offset += _HEADER.size + length
+			if offset < len(journal):
+				log.warning("Dropping corrupted tail of storage journal '%s'" % self._path)
+				if self._fd is not None:
+					os.close(self._fd)
+					self._fd = None
+				try:
+					self._open(truncate_at = offset)
+				except (OSError, IOError) as e:
+					log.error("Error truncating storage journal '%s': %s" % (self._path, e))
+
+	def clear(self):
+		with self._lock:
+			self._data = {}
+			self._records = 0
+			self._dirty = False
+			if self._fd is not None:
+				os.close(self._fd)
+				self._fd = None
+			try:
+				os.unlink(self._path)
+			except (OSError, IOError) as e:
+				log.debug("Error removing storage journal '%s': %s" % (self._path, e))
+
+	def close(self):
+		"""Sync (and compact if needed) the journal and stop the background thread."""
+		with self._cond:
+			if self._fd is not None and self._needs_compaction():
+				self._compact()
+			self._sync()
+			self._closed = True
+			self._cond.notify()
+			if self._fd is not None:
+				os.close(self._fd)
+				self._fd = None
+		if self._thread is not None:
+			self._thread.join()
+			self._thread = None
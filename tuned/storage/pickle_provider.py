@@ -28,6 +28,26 @@ class PickleProvider(interfaces.Provider):
 		if option in self._data[namespace]:
 			del self._data[namespace][option]
 
+	def set_item(self, namespace, option, key, value):
+		self._data.setdefault(namespace, {})
+		if not isinstance(self._data[namespace].get(option), dict):
+			self._data[namespace][option] = {}
+		self._data[namespace][option][key] = value
+
+	def unset_item(self, namespace, option, key):
+		value = self._data.get(namespace, {}).get(option)
+		if isinstance(value, dict) and key in value:
+			del value[key]
+
+	def update_items(self, namespace, option, items, removed_keys):
+		self._data.setdefault(namespace, {})
+		if not isinstance(self._data[namespace].get(option), dict):
+			self._data[namespace][option] = {}
+		value = self._data[namespace][option]
+		value.update(items)
+		for key in removed_keys:
+			value.pop(key, None)
+
 	def save(self):
 		try:
 			log.debug("Saving %s" % str(self._data))
@@ -13,3 +13,14 @@ class Storage(object):
 
 	def unset(self, option):
 		self._storage_provider.unset(self._namespace, option)
+
+	def set_item(self, option, key, value):
+		"""Set item 'key' of the dictionary stored in the option."""
+		self._storage_provider.set_item(self._namespace, option, key, value)
+
+	def unset_item(self, option, key):
+		self._storage_provider.unset_item(self._namespace, option, key)
+
+	def update_items(self, option, items, removed_keys):
+		"""Set the items and unset the removed_keys of the dictionary stored in the option at once."""
+		self._storage_provider.update_items(self._namespace, option, items, removed_keys)
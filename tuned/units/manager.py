@@ -1,4 +1,5 @@
 import collections
+import concurrent.futures
 import os
 import re
 import traceback
@@ -8,6 +9,8 @@ import tuned.plugins.exceptions
 import tuned.consts as consts
 from tuned.utils.global_config import GlobalConfig
 from tuned.utils.commands import commands
+from tuned.utils.timings import no_measure
+from .scheduler import UpdateScheduler
 
 log = tuned.logs.get()
 
@@ -19,7 +22,7 @@ class Manager(object):
 	"""
 
 	def __init__(self, plugins_repository, monitors_repository,
-			def_instance_priority, hardware_inventory, config = None):
+			def_instance_priority, hardware_inventory, config = None, timings = None):
 		super(Manager, self).__init__()
 		self._plugins_repository = plugins_repository
 		self._monitors_repository = monitors_repository
@@ -29,6 +32,11 @@ class Manager(object):
 		self._plugins = []
 		self._config = config or GlobalConfig()
 		self._cmd = commands()
+		self._update_scheduler = UpdateScheduler()
+		self._instance_signatures = {}
+		self._timings = timings
+		self._update_waker = None
+		self._event_notifier = None
 
 	@property
 	def plugins(self):
@@ -60,7 +68,7 @@ class Manager(object):
 		return re.search(unit.uname_regex, uname_string,
 				re.MULTILINE) is not None
 
-	def create(self, instances_config):
+	def _filter_units(self, instances_config):
 		instance_info_list = []
 		for instance_name, instance_info in list(instances_config.items()):
 			if not instance_info.enabled:
@@ -77,17 +85,22 @@ class Manager(object):
 				instance_info.priority = int(self._def_instance_priority)
 			else:
 				instance_info.priority = int(instance_info.priority)
+			instance_info.update_interval = self._parse_update_interval(instance_name, instance_info.update_interval)
 			instance_info_list.append(instance_info)
 
 		instance_info_list.sort(key=lambda x: x.priority)
-		plugins_by_name = collections.OrderedDict()
-		for instance_info in instance_info_list:
-			plugins_by_name[instance_info.type] = None
+		return instance_info_list
 
-		for plugin_name, none in list(plugins_by_name.items()):
+	def _create_plugins(self, plugin_names, plugins_by_name):
+		for plugin_name in plugin_names:
+			if plugin_name in plugins_by_name:
+				continue
+			plugins_by_name[plugin_name] = None
 			try:
 				plugin = self._plugins_repository.create(plugin_name)
 				plugins_by_name[plugin_name] = plugin
+				plugin.update_requester = self.request_update
+				plugin.event_notifier = self._notify_event
 				self._plugins.append(plugin)
 			except tuned.plugins.exceptions.NotSupportedPluginException as e:
 				log.info("skipping plugin '%s', not supported on your system: %s" % (plugin_name, e))
@@ -97,6 +110,7 @@ class Manager(object):
 				log.exception(e)
 				continue
 
+	def _create_instances(self, instance_info_list, plugins_by_name):
 		instances = []
 		for instance_info in instance_info_list:
 			plugin = plugins_by_name[instance_info.type]
@@ -105,26 +119,216 @@ class Manager(object):
 			log.debug("creating '%s' (%s)" % (instance_info.name, instance_info.type))
 			new_instance = plugin.create_instance(instance_info.name, instance_info.priority, \
 				instance_info.devices, instance_info.devices_udev_regex, \
-				instance_info.script_pre, instance_info.script_post, instance_info.options)
+				instance_info.script_pre, instance_info.script_post, instance_info.options, \
+				update_interval = instance_info.update_interval)
+			self._instance_signatures[new_instance.name] = self._unit_signature(instance_info)
 			instances.append(new_instance)
 		for instance in instances:
 			instance.plugin.init_devices()
 			instance.plugin.assign_free_devices(instance)
 			instance.plugin.initialize_instance(instance)
+		return instances
+
+	def create(self, instances_config):
+		instance_info_list = self._filter_units(instances_config)
+		plugins_by_name = collections.OrderedDict()
+		self._create_plugins([i.type for i in instance_info_list], plugins_by_name)
+		instances = self._create_instances(instance_info_list, plugins_by_name)
 		# At this point we should be able to start the HW events
 		# monitoring/processing thread, without risking race conditions
 		self._hardware_inventory.start_processing_events()
 		self._instances.extend(instances)
 
-	def _try_call(self, caller, exc_ret, f, *args, **kwargs):
+	def _expand(self, value):
+		return self._plugins_repository.variables.expand(value)
+
+	def _unit_signature(self, unit):
+		"""
+		Return the part of the unit configuration which affects the instance
+		itself (i.e. everything except the plugin options) and the expanded
+		options. The variables are expanded, because their values can differ
+		between the profiles.
+		"""
+		attrs = (unit.type, self._expand(unit.devices), unit.devices_udev_regex,
+				self._expand(unit.script_pre), self._expand(unit.script_post),
+				unit.priority, unit.update_interval)
+		options = collections.OrderedDict((k, self._expand(v)) for (k, v) in unit.options.items())
+		return (attrs, options)
+
+	def _options_changes(self, old_options, new_options):
+		"""Return {option: (old_value, new_value)} of the options which differ."""
+		changes = {}
+		for name in set(old_options) | set(new_options):
+			if old_options.get(name) != new_options.get(name):
+				changes[name] = (old_options.get(name), new_options.get(name))
+		return changes
+
+	def _plan_switch(self, instance_info_list):
+		"""
+		Compare the running instances with the new units. Return tuple
+		(keep, update, remove, create), where 'keep' and 'remove' are lists of
+		the running instances, 'update' is a list of (instance, unit) pairs
+		where only the plugin options changed and 'create' is a list of units
+		to create new instances from.
+		"""
+		units = collections.OrderedDict((i.name, i) for i in instance_info_list)
+		keep = []
+		update = []
+		remove = []
+		for instance in self._instances:
+			unit = units.get(instance.name)
+			old_sig = self._instance_signatures.get(instance.name)
+			if unit is None or old_sig is None or unit.type != instance.plugin.name:
+				remove.append(instance)
+				continue
+			new_sig = self._unit_signature(unit)
+			if new_sig == old_sig:
+				keep.append(instance)
+			elif new_sig[0] == old_sig[0] and not instance.has_dynamic_tuning \
+					and instance.plugin.supports_options_update(instance,
+						self._options_changes(old_sig[1], new_sig[1])):
+				update.append((instance, unit))
+			else:
+				remove.append(instance)
+		# Devices are distributed among the instances of a plugin according to
+		# their priorities, so if there is any instance of the plugin created or
+		# removed, recreate all instances of such plugin.
+		running = set(i.name for i in self._instances)
+		changed_plugins = set(i.plugin.name for i in remove if i.plugin._devices_supported) \
+				| set(u.type for u in instance_info_list if u.name not in running)
+		for instance in keep + [i for (i, u) in update]:
+			if instance.plugin.name in changed_plugins and instance.plugin._devices_supported:
+				remove.append(instance)
+		keep = [i for i in keep if i not in remove]
+		update = [(i, u) for (i, u) in update if i not in remove]
+		reused = set(i.name for i in keep) | set(i.name for (i, u) in update)
+		create = [u for u in instance_info_list if u.name not in reused]
+		return (keep, update, remove, create)
+
+	def switch(self, instances_config, rollback = consts.ROLLBACK_FULL):
+		"""
+		Switch the running instances to the new units. Instances whose
+		configuration didn't change are kept untouched including their
+		rollback data, instances where only some plugin options changed are
+		updated in place if the plugin supports it, all the others are
+		unapplied and recreated from the new units.
+		"""
+		instance_info_list = self._filter_units(instances_config)
+		self._hardware_inventory.stop_processing_events()
+		(keep, update, remove, create) = self._plan_switch(instance_info_list)
+		log.info("switching profile: %d instance(s) kept, %d updated, %d removed, %d created"
+				% (len(keep), len(update), len(remove), len(create)))
+
+		self._call_instances("switch", None, "unapply_tuning", list(reversed(remove)), rollback)
+		for instance in reversed(remove):
+			log.debug("removing instance %s" % instance.name)
+			self._try_call("switch", None, instance.plugin.destroy_instance, instance)
+			self._instances.remove(instance)
+			self._instance_signatures.pop(instance.name, None)
+
+		for (instance, unit) in update:
+			log.debug("updating options of instance %s" % instance.name)
+			sig = self._unit_signature(unit)
+			changes = self._options_changes(self._instance_signatures[instance.name][1], sig[1])
+			self._try_call("switch", None, instance.plugin.instance_update_options,
+					instance, changes, unit.options)
+			self._instance_signatures[instance.name] = sig
+
+		plugins_by_name = collections.OrderedDict()
+		wanted_plugins = set(u.type for u in instance_info_list)
+		for plugin in list(self._plugins):
+			if plugin.name in wanted_plugins:
+				plugins_by_name[plugin.name] = plugin
+			else:
+				log.debug("cleaning plugin '%s'" % plugin.name)
+				self._try_call("switch", None, self._plugins_repository.delete, plugin)
+				self._plugins.remove(plugin)
+		self._create_plugins([u.type for u in create], plugins_by_name)
+		instances = self._create_instances(create, plugins_by_name)
+		self._hardware_inventory.start_processing_events()
+		self._call_instances("switch", None, "apply_tuning", instances)
+		self._instances.extend(instances)
+		self._instances.sort(key=lambda x: x.priority)
+
+	def _parse_update_interval(self, instance_name, value):
+		if value is None:
+			return None
 		try:
-			return f(*args, **kwargs)
-		except Exception as e:
-			trace = traceback.format_exc()
-			log.error("BUG: Unhandled exception in %s: %s"
-					% (caller, str(e)))
-			log.error(trace)
-			return exc_ret
+			interval = float(value)
+		except ValueError:
+			log.error("instance '%s': invalid update_interval '%s', using the global one" % (instance_name, value))
+			return None
+		if interval <= 0:
+			log.error("instance '%s': update_interval must be positive, using the global one" % instance_name)
+			return None
+		return interval
+
+	def _measure(self, caller, f):
+		if self._timings is None:
+			return no_measure()
+		# f is usually a method of an instance, plugin or monitor
+		owner = getattr(f, "__self__", None)
+		if owner is None:
+			unit = ""
+		else:
+			unit = getattr(owner, "name", None) or "monitor:%s" % self._monitor_name(owner)
+		return self._timings.measure(unit, caller)
+
+	def _try_call(self, caller, exc_ret, f, *args, **kwargs):
+		with self._measure(caller, f):
+			try:
+				return f(*args, **kwargs)
+			except Exception as e:
+				trace = traceback.format_exc()
+				log.error("BUG: Unhandled exception in %s: %s"
+						% (caller, str(e)))
+				log.error(trace)
+				return exc_ret
+
+	def get_timings(self):
+		"""
+		Return durations of the tuning operations, see Timings.get,
+		empty list if the timings are not collected.
+		"""
+		if self._timings is None:
+			return []
+		return self._timings.get()
+
+	def get_verify_results(self):
+		"""Return results of the last verification, see Plugin.get_verify_results."""
+		res = []
+		for plugin in list(self._plugins):
+			res.extend(plugin.get_verify_results())
+		return res
+
+	def get_dynamic_changes(self):
+		"""Return counts of the dynamic tuning changes, see Plugin.get_dynamic_changes."""
+		res = []
+		for plugin in list(self._plugins):
+			res.extend(plugin.get_dynamic_changes())
+		return res
+
+	def get_monitor_data(self):
+		"""
+		Return list of tuples (monitor, device, field, value) with the
+		last sample of every monitored device. Fields without names are
+		numbered from 0.
+		"""
+		res = []
+		seen = set()
+		for monitor in list(self._monitors_repository.monitors):
+			name = self._monitor_name(monitor)
+			fields = monitor.get_fields() or []
+			for (device, load) in monitor.get_load().items():
+				if (name, device) in seen or load is None:
+					continue
+				seen.add((name, device))
+				if not isinstance(load, (list, tuple)):
+					load = [load]
+				for (i, value) in enumerate(load):
+					field = fields[i] if i < len(fields) else str(i)
+					res.append((name, device, field, float(value)))
+		return res
 
 	def destroy_all(self):
 		for instance in self._instances:
@@ -136,24 +340,166 @@ class Manager(object):
 			log.debug("cleaning plugin '%s'" % plugin.name)
 			self._try_call("destroy_all", None, plugin.cleanup)
 		self._plugins_repository.plugins.clear()
+		self._update_scheduler.clear()
+		self._instance_signatures.clear()
 		del self._plugins[:]
 		del self._instances[:]
 
+	def _monitor_name(self, monitor):
+		cls = monitor if isinstance(monitor, type) else type(monitor)
+		return cls.__module__.split(".")[-1].split("_", 1)[-1]
+
+	def schedule_updates(self, default_interval):
+		"""
+		Synchronize the update scheduler with the current monitors and
+		instances with dynamic tuning. Monitors of the same type share the
+		data, so they are updated together with the shortest period any of
+		them requested.
+		"""
+		jobs = {}
+		for monitor in self._monitors_repository.monitors:
+			key = "monitor:%s" % self._monitor_name(monitor)
+			interval = monitor.update_interval or default_interval
+			if key in jobs:
+				interval = min(interval, jobs[key][0])
+			jobs[key] = (interval, lambda monitor=monitor: self._update_monitor(monitor), 0)
+		for instance in self._instances:
+			if not instance.has_dynamic_tuning:
+				continue
+			key = "instance:%s" % instance.name
+			interval = instance.update_interval or default_interval
+			jobs[key] = (interval, lambda instance=instance: self._update_instance(instance), 1)
+		for key in self._update_scheduler.keys():
+			if key not in jobs:
+				self._update_scheduler.remove(key)
+		for key, (interval, callback, order) in jobs.items():
+			self._update_scheduler.add(key, interval, callback, order)
+
+	def run_due_updates(self):
+		"""Run updates which are due, return number of seconds till the next one or None."""
+		self._update_scheduler.run_due()
+		return self._update_scheduler.time_to_next()
+
+	def set_update_waker(self, waker):
+		"""Set function waking up the thread which runs the due updates."""
+		self._update_waker = waker
+
+	def set_event_notifier(self, notifier):
+		"""Set function called with (event, instance, device, detail) on the tuning events."""
+		self._event_notifier = notifier
+
+	def _notify_event(self, event, instance, device, detail):
+		if self._event_notifier is not None:
+			self._event_notifier(event, instance, device, detail)
+
+	def request_update(self, instance, monitors = ()):
+		"""
+		Run the dynamic tuning of the instance (after updating the given
+		monitors) as soon as possible, instead of waiting for its period.
+		It is safe to call from any thread, e.g. on a monitor event.
+		"""
+		expedited = False
+		for monitor in monitors:
+			expedited |= self._update_scheduler.expedite("monitor:%s" % self._monitor_name(monitor))
+		expedited |= self._update_scheduler.expedite("instance:%s" % instance.name)
+		if expedited and self._update_waker is not None:
+			self._update_waker()
+
+	def time_to_next_update(self):
+		return self._update_scheduler.time_to_next()
+
+	def update_stats(self):
+		return self._update_scheduler.stats()
+
+	def _update_monitor(self, monitor):
+		log.debug("updating monitor %s" % monitor)
+		self._try_call("update_monitors", None, monitor.sample)
+
+	def _update_instance(self, instance):
+		log.debug("performing tunings of instance %s" % instance.name)
+		self._try_call("update_tuning", None, instance.update_tuning)
+
 	def update_monitors(self):
+		# monitors of the same type share the data, sample each type once
+		sampled = set()
 		for monitor in self._monitors_repository.monitors:
+			if type(monitor) in sampled:
+				continue
+			sampled.add(type(monitor))
 			log.debug("updating monitor %s" % monitor)
-			self._try_call("update_monitors", None, monitor.update)
+			self._try_call("update_monitors", None, monitor.sample)
+
+	def _tuning_threads(self):
+		threads = self._config.get_int(consts.CFG_TUNING_THREADS, consts.CFG_DEF_TUNING_THREADS)
+		if threads <= 0:
+			threads = min(32, (os.cpu_count() or 1) + 4)
+		return threads
+
+	def _plugins_conflict(self, plugin_a, plugin_b):
+		if plugin_a.name == plugin_b.name:
+			return False
+		deps_a = plugin_a.get_dependencies()
+		deps_b = plugin_b.get_dependencies()
+		return "*" in deps_a or "*" in deps_b \
+				or plugin_b.name in deps_a or plugin_a.name in deps_b
+
+	def _split_stages(self, instances):
+		"""
+		Split the list of instances into stages. Stages are processed one
+		after another, within a stage the instances of different plugins are
+		processed concurrently and the instances of the same plugin
+		sequentially. A new stage is started whenever an instance's plugin
+		conflicts with a plugin already in the current stage, so the order
+		given by the priorities is kept for the plugins which declared
+		dependencies.
+		"""
+		stages = []
+		groups = collections.OrderedDict()
+		for instance in instances:
+			plugin = instance.plugin
+			if plugin.name not in groups and any(self._plugins_conflict(plugin, group[0].plugin)
+					for group in groups.values()):
+				stages.append(list(groups.values()))
+				groups = collections.OrderedDict()
+			groups.setdefault(plugin.name, []).append(instance)
+		if groups:
+			stages.append(list(groups.values()))
+		return stages
+
+	def _call_instances(self, caller, exc_ret, method, instances, *args):
+		"""
+		Call 'method' of each instance through _try_call, independent
+		plugins concurrently. Return list of the results in the order of
+		'instances'.
+		"""
+		results = {}
+		def run_group(group):
+			for instance in group:
+				results[id(instance)] = self._try_call(caller, exc_ret,
+						getattr(instance, method), *args)
+		stages = self._split_stages(instances)
+		threads = self._tuning_threads()
+		if threads <= 1 or all(len(stage) <= 1 for stage in stages):
+			for stage in stages:
+				for group in stage:
+					run_group(group)
+		else:
+			with concurrent.futures.ThreadPoolExecutor(max_workers = threads) as executor:
+				for stage in stages:
+					if len(stage) == 1:
+						run_group(stage[0])
+					else:
+						# exceptions are already handled by _try_call
+						list(executor.map(run_group, stage))
+		return [results.get(id(instance), exc_ret) for instance in instances]
 
 	def start_tuning(self):
-		for instance in self._instances:
-			self._try_call("start_tuning", None,
-					instance.apply_tuning)
+		self._call_instances("start_tuning", None, "apply_tuning", self._instances)
 
 	def verify_tuning(self, ignore_missing):
 		ret = True
-		for instance in self._instances:
-			res = self._try_call("verify_tuning", False,
-					instance.verify_tuning, ignore_missing)
+		for res in self._call_instances("verify_tuning", False,
+				"verify_tuning", self._instances, ignore_missing):
 			if res == False:
 				ret = False
 		return ret
@@ -173,6 +519,5 @@ class Manager(object):
 	# or helper files, unpatch third party config files, etc.
 	def stop_tuning(self, rollback = consts.ROLLBACK_SOFT):
 		self._hardware_inventory.stop_processing_events()
-		for instance in reversed(self._instances):
-			self._try_call("stop_tuning", None,
-					instance.unapply_tuning, rollback)
+		self._call_instances("stop_tuning", None, "unapply_tuning",
+				list(reversed(self._instances)), rollback)
@@ -0,0 +1,174 @@
+import heapq
+import itertools
+import threading
+import time
+import tuned.logs
+
+log = tuned.logs.get()
+
+__all__ = ["UpdateScheduler"]
+
+class _Job(object):
+	__slots__ = ["key", "interval", "callback", "order", "deadline", "seq",
+			"runs", "late", "missed", "last_duration", "max_duration", "total_duration"]
+
+	def __init__(self, key, interval, callback, order):
+		self.key = key
+		self.interval = interval
+		self.callback = callback
+		self.order = order
+		self.deadline = None
+		self.seq = None
+		self.runs = 0
+		self.late = 0
+		self.missed = 0
+		self.last_duration = 0.0
+		self.max_duration = 0.0
+		self.total_duration = 0.0
+
+class UpdateScheduler(object):
+	"""
+	Deadline scheduler for periodic updates of monitors and dynamic
+	plugin instances.
+
+	Every job has its own period. Jobs are kept in a heap ordered by their
+	next deadline, so the caller can sleep exactly until the next job is due
+	instead of polling in fixed ticks. Jobs due at the same time are run
+	in the order given by their 'order' value (e.g. monitors before the
+	instances consuming their data).
+	"""
+
+	def __init__(self, clock = time.monotonic):
+		self._clock = clock
+		self._heap = []
+		self._jobs = {}
+		self._seq = itertools.count()
+		self._lock = threading.Lock()
+
+	def _push(self, job):
+		job.seq = next(self._seq)
+		heapq.heappush(self._heap, (job.deadline, job.order, job.seq, job.key))
+
+	def add(self, key, interval, callback, order = 0):
+		"""Add a new job or change the period of an existing one."""
+		with self._lock:
+			job = self._jobs.get(key)
+			if job is not None:
+				job.callback = callback
+				job.order = order
+				if job.interval == interval:
+					return
+				# reschedule the job according to the new period
+				job.deadline = job.deadline - job.interval + interval
+				job.interval = interval
+			else:
+				job = _Job(key, interval, callback, order)
+				job.deadline = self._clock() + interval
+				self._jobs[key] = job
+			self._push(job)
+
+	def remove(self, key):
+		with self._lock:
+			# the stale heap entry is dropped lazily
+			self._jobs.pop(key, None)
+
+	def clear(self):
+		with self._lock:
+			self._jobs.clear()
+			del self._heap[:]
+
+	def expedite(self, key):
+		"""Make the job due now, keep its period. Return False if there is no such job."""
+		with self._lock:
+			job = self._jobs.get(key)
+			if job is None:
+				return False
+			now = self._clock()
+			if job.deadline > now:
+				job.deadline = now
+				self._push(job)
+			return True
+
+	def keys(self):
+		with self._lock:
+			return list(self._jobs.keys())
+
+	def _valid_top(self):
+		while self._heap:
+			deadline, order, seq, key = self._heap[0]
+			job = self._jobs.get(key)
+			if job is not None and job.seq == seq:
+				return job
+			heapq.heappop(self._heap)
+		return None
+
+	def next_deadline(self):
+		"""Return monotonic time of the next deadline or None if there is no job."""
+		with self._lock:
+			job = self._valid_top()
+			return None if job is None else job.deadline
+
+	def time_to_next(self):
+		"""Return number of seconds till the next deadline or None if there is no job."""
+		deadline = self.next_deadline()
+		if deadline is None:
+			return None
+		return max(0.0, deadline - self._clock())
+
+	def run_due(self):
+		"""Run all jobs whose deadline has passed. Return number of jobs run."""
+		now = self._clock()
+		due = []
+		with self._lock:
+			while True:
+				job = self._valid_top()
+				if job is None or job.deadline > now:
+					break
+				heapq.heappop(self._heap)
+				due.append(job)
+				job.deadline += job.interval
+				if job.deadline <= now:
+					# we overslept whole periods, do not try to catch up
+					missed = int((now - job.deadline) // job.interval) + 1
+					job.missed += missed
+					job.late += 1
+					job.deadline += missed * job.interval
+					if job.deadline <= now:
+						job.deadline = now + job.interval
+				self._push(job)
+		for job in due:
+			start = self._clock()
+			try:
+				job.callback()
+			finally:
+				duration = self._clock() - start
+				with self._lock:
+					job.runs += 1
+					job.last_duration = duration
+					job.total_duration += duration
+					if duration > job.max_duration:
+						job.max_duration = duration
+		return len(due)
+
+	def stats(self):
+		"""
+		Return scheduling statistics of all jobs.
+
+		Return:
+		dictionary -- {job_key: {statistic_name: value}}
+		"""
+		now = self._clock()
+		res = {}
+		with self._lock:
+			for key, job in self._jobs.items():
+				res[key] = {
+					"interval": float(job.interval),
+					"runs": float(job.runs),
+					"late": float(job.late),
+					"missed": float(job.missed),
+					"last_duration": job.last_duration,
+					"max_duration": job.max_duration,
+					"avg_duration": job.total_duration / job.runs if job.runs else 0.0,
+					"next_due": max(0.0, job.deadline - now),
+				}
+		return res
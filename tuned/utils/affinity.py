@@ -0,0 +1,70 @@
+import errno
+import os
+
+__all__ = ["AffinitySummary", "set_affinities"]
+
+class AffinitySummary(object):
+	"""
+	Result of set_affinities: the numbers of the tasks whose affinity was
+	changed (applied), already matched (skipped) and which exited
+	meanwhile (vanished), the original affinities of the changed tasks
+	and the errors of the failed ones.
+	"""
+
+	__slots__ = ["applied", "skipped", "vanished", "previous", "errors"]
+
+	def __init__(self):
+		self.applied = 0
+		self.skipped = 0
+		self.vanished = 0
+		# pid -> original affinity (set of CPUs) of the changed tasks
+		self.previous = {}
+		# [(pid, OSError)]
+		self.errors = []
+
+	@property
+	def failed(self):
+		return len(self.errors)
+
+	def __str__(self):
+		return "applied %d, skipped %d, vanished %d, failed %d" \
+				% (self.applied, self.skipped, self.vanished, self.failed)
+
+def set_affinities(targets, intersect = False,
+		get_affinity = os.sched_getaffinity, set_affinity = os.sched_setaffinity):
+	"""
+	Set the CPU affinity of many tasks by sched_setaffinity, without any
+	per-task logging. The tasks are expected to be already filtered by
+	the caller.
+
+	Parameters:
+	targets -- iterable of (pid, affinity), affinity is a list of CPUs
+	intersect -- if True, the new affinity of a task is the intersection
+	             of its current affinity and the requested one (or the
+	             requested one if they do not intersect)
+
+	Return:
+	AffinitySummary -- ESRCH counts the task as vanished, the other
+	                   errors are collected for the caller to examine
+	"""
+	summary = AffinitySummary()
+	for (pid, affinity) in targets:
+		affinity = set(affinity)
+		try:
+			previous = set(get_affinity(pid))
+			if intersect:
+				affinity = (previous & affinity) or affinity
+			if previous == affinity:
+				summary.skipped += 1
+				continue
+			set_affinity(pid, affinity)
+		# old python-schedutils (pre-0.4) raised SystemError instead of OSError
+		except (SystemError, OSError) as e:
+			if getattr(e, "errno", None) == errno.ESRCH:
+				summary.vanished += 1
+			else:
+				summary.errors.append((pid, e))
+			continue
+		summary.previous[pid] = previous
+		summary.applied += 1
+	return summary
@@ -0,0 +1,140 @@
+import errno
+import os
+
+import tuned.logs
+import tuned.consts as consts
+from tuned.utils.commands import commands
+
+__all__ = ["CpusetIsolation"]
+
+log = tuned.logs.get()
+
+class CpusetIsolation(object):
+	"""
+	Isolation of CPUs by the cgroup v2 cpuset controller.
+
+	The top-level slices (e.g. 'system.slice', 'user.slice') are
+	restricted to the housekeeping CPUs by their cpuset.cpus, so all the
+	tasks in them (including the ones forked later) follow without
+	touching the individual tasks. Unless partition is None, a cgroup
+	holding the isolated CPUs is created under the root and turned into
+	a partition of the given type ('isolated' or 'root') by its
+	cpuset.cpus.partition, which removes the CPUs from the scheduler
+	load balancing of the rest of the system.
+
+	apply returns the original state, which is needed by restore and can
+	be stored to recover from a crash.
+	"""
+
+	def __init__(self, mount_point = consts.DEF_CGROUP_V2_MOUNT_POINT,
+			slices = consts.DEF_CGROUP_V2_SLICES, partition = "isolated",
+			partition_group = consts.CGROUP_V2_ISOLATED_GROUP):
+		self._cmd = commands()
+		self._mount_point = mount_point
+		self._slices = list(slices)
+		self._partition = partition
+		self._partition_group = partition_group
+
+	def _path(self, *names):
+		return "/".join([self._mount_point] + list(names))
+
+	def _read(self, *names):
+		return self._cmd.read_file(self._path(*names), err_ret = None, no_error = True)
+
+	def _write(self, value, *names):
+		return self._cmd.write_to_file(self._path(*names), value, no_error = True)
+
+	def _normalize(self, cpus):
+		return self._cmd.cpulist2string(self._cmd.cpulist_pack(cpus))
+
+	def available(self):
+		"""Return whether the cpuset controller of cgroup v2 is available."""
+		controllers = self._read("cgroup.controllers")
+		return controllers is not None and "cpuset" in controllers.split()
+
+	def _existing_slices(self):
+		return [s for s in self._slices
+				if os.path.isdir(self._cmd.root_path(self._path(s)))]
+
+	def apply(self, housekeeping, isolated):
+		"""
+		Restrict the slices to the housekeeping CPUs and create the
+		partition of the isolated CPUs.
+
+		Return:
+		dict -- the original state for restore
+		"""
+		original = {"subtree_control": False, "slices": {}, "partition": None}
+		subtree = self._read("cgroup.subtree_control")
+		if subtree is not None and "cpuset" not in subtree.split():
+			if self._write("+cpuset", "cgroup.subtree_control"):
+				original["subtree_control"] = True
+			else:
+				log.error("Unable to enable the cpuset controller in '%s'" % self._mount_point)
+		for s in self._existing_slices():
+			cpus = self._read(s, "cpuset.cpus")
+			if cpus is None:
+				log.error("Refusing to set affinity of '%s', reading original affinity failed" % s)
+				continue
+			original["slices"][s] = cpus.strip()
+			log.debug("Setting cpuset of '%s' to '%s'" % (s, housekeeping))
+			if not self._write(housekeeping, s, "cpuset.cpus"):
+				log.error("Unable to set affinity '%s' of '%s'" % (housekeeping, s))
+		if self._partition is not None:
+			self._create_partition(isolated, original)
+		return original
+
+	def _create_partition(self, isolated, original):
+		path = self._cmd.root_path(self._path(self._partition_group))
+		try:
+			os.mkdir(path, consts.DEF_CGROUP_MODE)
+		except OSError as e:
+			if e.errno != errno.EEXIST:
+				log.error("Unable to create cgroup '%s': %s" % (path, e))
+				return
+		original["partition"] = self._partition_group
+		if not self._write(isolated, self._partition_group, "cpuset.cpus") \
+				or not self._write(self._partition, self._partition_group, "cpuset.cpus.partition"):
+			log.error("Unable to create '%s' partition of CPUs '%s'" % (self._partition, isolated))
+			return
+		state = (self._read(self._partition_group, "cpuset.cpus.partition") or "").strip()
+		if state != self._partition:
+			log.error("Partition of CPUs '%s' is not valid: '%s'" % (isolated, state))
+
+	def restore(self, original):
+		group = original.get("partition")
+		if group is not None:
+			self._write("member", group, "cpuset.cpus.partition")
+			path = self._cmd.root_path(self._path(group))
+			try:
+				os.rmdir(path)
+			except OSError as e:
+				if e.errno != errno.ENOENT:
+					log.error("Unable to remove cgroup '%s': %s" % (path, e))
+		for (s, cpus) in original.get("slices", {}).items():
+			log.debug("Restoring cpuset of '%s' to '%s'" % (s, cpus))
+			if not self._write(cpus, s, "cpuset.cpus"):
+				log.error("Unable to restore affinity '%s' of '%s'" % (cpus, s))
+		if original.get("subtree_control"):
+			self._write("-cpuset", "cgroup.subtree_control")
+
+	def verify(self, housekeeping, isolated):
+		"""
+		Return:
+		list -- [(description, current, expected)] of all the checked values
+		"""
+		checks = []
+		housekeeping = self._normalize(housekeeping)
+		for s in self._existing_slices():
+			cpus = self._read(s, "cpuset.cpus")
+			current = self._normalize(cpus) if cpus is not None else None
+			checks.append(("cpuset of '%s'" % s, current, housekeeping))
+		if self._partition is not None:
+			cpus = self._read(self._partition_group, "cpuset.cpus")
+			checks.append(("cpuset of '%s'" % self._partition_group,
+					self._normalize(cpus) if cpus is not None else None,
+					self._normalize(isolated)))
+			state = self._read(self._partition_group, "cpuset.cpus.partition")
+			checks.append(("partition of '%s'" % self._partition_group,
+					state.strip() if state is not None else None, self._partition))
+		return checks
@@ -47,6 +47,18 @@ class ClassLoader(object):
 
 		raise ImportError("Cannot find the class %s." % module_name)
 
+	def get_class_names(self):
+		"""Return names of all the available classes without importing them."""
+		package = __import__(self._namespace)
+		for part in self._namespace.split(".")[1:]:
+			package = getattr(package, part)
+		names = set()
+		for file_name in os.listdir(package.__path__[0]):
+			(module_name, ext) = os.path.splitext(file_name)
+			if ext == ".py" and module_name.startswith(self._prefix):
+				names.add(module_name[len(self._prefix):])
+		return sorted(names)
+
 	def load_all_classes(self):
 		package = __import__(self._namespace)
 		basename = self._namespace.split(".")[-1]
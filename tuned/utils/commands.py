@@ -1,20 +1,48 @@
+import contextlib
 import errno
 import hashlib
 import tuned.logs
 import copy
 import os
 import shutil
+import threading
 import tuned.consts as consts
 import re
 from subprocess import *
 from tuned.exceptions import TunedException
+from tuned.utils.file_transaction import FileTransaction
 
 log = tuned.logs.get()
 
+# directory used as the root of the file system by read_file, write_to_file
+# and root_path, it allows running the tuning against a fake sysfs/procfs
+# tree (e.g. in benchmarks), empty string means the real root
+_root_prefix = ""
+
 class commands:
 
 	def __init__(self, logging = True):
 		self._logging = logging
+		# the open transaction is per thread
+		self._local = threading.local()
+
+	@staticmethod
+	def set_root_prefix(prefix):
+		global _root_prefix
+		_root_prefix = os.path.normpath(prefix) if prefix else ""
+		if _root_prefix == "/":
+			_root_prefix = ""
+
+	@staticmethod
+	def get_root_prefix():
+		return _root_prefix
+
+	def root_path(self, path):
+		"""Return the path of the file within the root prefix."""
+		if not _root_prefix or not os.path.isabs(path) \
+				or path == _root_prefix or path.startswith(_root_prefix + "/"):
+			return path
+		return _root_prefix + path
 
 	def _error(self, msg):
 		if self._logging:
@@ -90,6 +118,30 @@ class commands:
 			return list(d.values())[mo.lastindex - 1]
 		return None
 
+	@contextlib.contextmanager
+	def transaction(self, deferred = False):
+		"""
+		Open a transaction (see FileTransaction) for the file accesses done
+		by read_file and write_to_file of this object in the current thread.
+		Nested calls join the already open transaction. The deferred writes
+		are done when the outermost transaction is closed.
+		"""
+		transaction = self.get_transaction()
+		if transaction is not None:
+			yield transaction
+			return
+		transaction = FileTransaction(self, deferred)
+		self._local.transaction = transaction
+		try:
+			yield transaction
+		finally:
+			self._local.transaction = None
+			transaction.flush()
+
+	def get_transaction(self):
+		"""Return the transaction open in the current thread or None."""
+		return getattr(self._local, "transaction", None)
+
 	def write_to_file(self, f, data, makedir = False, no_error = False, ignore_same = False):
 		"""Write data to a file.
 
@@ -103,6 +155,13 @@ class commands:
 		Return:
 		bool -- True on success
 		"""
+		transaction = self.get_transaction()
+		if transaction is not None:
+			return transaction.write(f, data, makedir, no_error, ignore_same)
+		return self._write_to_file(f, data, makedir, no_error, ignore_same)
+
+	def _write_to_file(self, f, data, makedir, no_error, ignore_same):
+		f = self.root_path(f)
 		self._debug("Writing to file: '%s' < '%s'" % (f, data))
 		if makedir:
 			d = os.path.dirname(f)
@@ -132,7 +191,14 @@ class commands:
 		return rc
 
 	def read_file(self, f, err_ret = "", no_error = False):
+		transaction = self.get_transaction()
+		if transaction is not None:
+			return transaction.read(f, err_ret, no_error)
+		return self._read_file(f, err_ret, no_error)
+
+	def _read_file(self, f, err_ret, no_error):
 		old_value = err_ret
+		f = self.root_path(f)
 		try:
 			fd = open(f, "r")
 			old_value = fd.read()
@@ -0,0 +1,117 @@
+import collections
+import os
+
+__all__ = ["FileTransaction"]
+
+class FileTransaction(object):
+	"""
+	Cache of the file accesses done by commands.read_file and
+	commands.write_to_file while a transaction is open, see
+	commands.transaction().
+
+	Every file is read at most once, unless it (or another file in the same
+	directory, sysfs attributes of one object often depend on each other) is
+	written in the meantime. The writes with ignore_same are skipped without
+	reading the file if its content is already known to match. Failed reads
+	are not cached.
+
+	In the deferred mode the writes are only queued, repeated writes to the
+	same path are merged (the last one wins) and flush() does them sorted by
+	path. Use it only if the order of the writes does not matter.
+	"""
+
+	__slots__ = ["_cmd", "_deferred", "_reads", "_written", "_pending", "_stats"]
+
+	def __init__(self, cmd, deferred = False):
+		self._cmd = cmd
+		self._deferred = deferred
+		# directory -> {path: content}
+		self._reads = {}
+		self._written = {}
+		self._pending = collections.OrderedDict()
+		self._stats = {"reads": 0, "cached_reads": 0, "writes": 0, "skipped_writes": 0}
+
+	@property
+	def deferred(self):
+		return self._deferred
+
+	@property
+	def stats(self):
+		"""
+		Dictionary with numbers of the real reads and writes and of the
+		reads served from the cache and the skipped writes.
+		"""
+		return dict(self._stats)
+
+	def _cached(self, path):
+		return self._reads.get(os.path.dirname(path), {}).get(path)
+
+	def invalidate(self, path = None):
+		"""
+		Forget the cached content of the files in the directory of the
+		path, or of all files if the path is None.
+		"""
+		if path is None:
+			self._reads.clear()
+			self._written.clear()
+			return
+		path = self._cmd.root_path(path)
+		d = os.path.dirname(path)
+		self._reads.pop(d, None)
+		self._written.pop(path, None)
+
+	def read(self, f, err_ret = "", no_error = False):
+		path = self._cmd.root_path(f)
+		pending = self._pending.get(path)
+		if pending is not None:
+			self._stats["cached_reads"] += 1
+			return pending[0]
+		value = self._cached(path)
+		if value is not None:
+			self._stats["cached_reads"] += 1
+			return value
+		self._stats["reads"] += 1
+		value = self._cmd._read_file(path, None, no_error)
+		if value is None:
+			return err_ret
+		self._reads.setdefault(os.path.dirname(path), {})[path] = value
+		return value
+
+	def write(self, f, data, makedir = False, no_error = False, ignore_same = False):
+		path = self._cmd.root_path(f)
+		data = str(data)
+		if ignore_same:
+			known = self._cached(path)
+			if known is None:
+				known = self._written.get(path)
+			if known is not None and known.strip() == data:
+				self._stats["skipped_writes"] += 1
+				return True
+		if self._deferred:
+			self._pending.pop(path, None)
+			self._pending[path] = (data, makedir, no_error, ignore_same)
+			return True
+		return self._write(path, data, makedir, no_error, ignore_same)
+
+	def _write(self, path, data, makedir, no_error, ignore_same):
+		self._stats["writes"] += 1
+		# the content of the file (if not known yet) is read for the
+		# ignore_same check through this transaction
+		rc = self._cmd._write_to_file(path, data, makedir, no_error, ignore_same)
+		self.invalidate(path)
+		if rc:
+			self._written[path] = data
+		return rc
+
+	def flush(self):
+		"""
+		Do the queued writes sorted by path. Return True if all of them
+		succeeded.
+		"""
+		pending = sorted(self._pending.items())
+		self._pending.clear()
+		ret = True
+		for path, (data, makedir, no_error, ignore_same) in pending:
+			if not self._write(path, data, makedir, no_error, ignore_same):
+				ret = False
+		return ret
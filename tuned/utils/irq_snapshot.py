@@ -0,0 +1,170 @@
+import os
+
+__all__ = ["IrqSnapshot", "IrqVerifyReport", "cpulist_to_mask", "mask_to_cpulist",
+		"cpus_to_mask", "mask_to_cpus"]
+
+def cpulist_to_mask(cpulist):
+	"""Convert a cpulist (e.g. '0-3,8' as in smp_affinity_list) to an integer bitmask."""
+	mask = 0
+	for item in cpulist.strip().split(","):
+		if not item:
+			continue
+		(first, sep, last) = item.partition("-")
+		first = int(first)
+		last = int(last) if sep else first
+		mask |= ((1 << (last - first + 1)) - 1) << first
+	return mask
+
+def mask_to_cpus(mask):
+	cpus = []
+	cpu = 0
+	while mask:
+		if mask & 1:
+			cpus.append(cpu)
+		mask >>= 1
+		cpu += 1
+	return cpus
+
+def cpus_to_mask(cpus):
+	mask = 0
+	for cpu in cpus:
+		mask |= 1 << int(cpu)
+	return mask
+
+def mask_to_cpulist(mask):
+	"""Convert an integer bitmask to a packed cpulist, e.g. '0-3,8'."""
+	ranges = []
+	for cpu in mask_to_cpus(mask):
+		if ranges and ranges[-1][1] == cpu - 1:
+			ranges[-1][1] = cpu
+		else:
+			ranges.append([cpu, cpu])
+	return ",".join(str(first) if first == last else "%d-%d" % (first, last)
+			for (first, last) in ranges)
+
+class IrqVerifyReport(object):
+	"""
+	Result of the verification of the IRQ affinities: the passed IRQs,
+	the failed ones as (irq, current mask, desired mask) and the skipped
+	ones (e.g. the IRQs whose affinity cannot be changed).
+	"""
+
+	__slots__ = ["passed", "failed", "skipped"]
+
+	def __init__(self):
+		self.passed = []
+		self.failed = []
+		self.skipped = []
+
+	def __bool__(self):
+		return not self.failed
+
+class IrqSnapshot(object):
+	"""
+	Affinities of all the IRQs read in one pass.
+
+	affinity and effective map the IRQ numbers (strings) to the integer
+	bitmasks of their smp_affinity_list and effective_affinity_list
+	(missing on some architectures and kernels), owners maps the IRQs
+	listed in /proc/interrupts to the rest of their line after the
+	per-CPU counters (chip, hardware IRQ, type and the actions), default
+	is the mask of /proc/irq/default_smp_affinity or None. The IRQs whose
+	affinity cannot be read are left out.
+	"""
+
+	__slots__ = ["affinity", "effective", "owners", "default"]
+
+	def __init__(self):
+		self.affinity = {}
+		self.effective = {}
+		self.owners = {}
+		self.default = None
+
+	@staticmethod
+	def _read(path):
+		with open(path, "rb") as f:
+			return f.read().decode("ascii", "replace")
+
+	@classmethod
+	def read(cls, proc_dir = "/proc", owners = True):
+		snapshot = cls()
+		irq_dir = os.path.join(proc_dir, "irq")
+		try:
+			irqs = [name for name in os.listdir(irq_dir) if name.isdigit()]
+		except OSError:
+			irqs = []
+		for irq in irqs:
+			path = os.path.join(irq_dir, irq)
+			try:
+				snapshot.affinity[irq] = cpulist_to_mask(cls._read(path + "/smp_affinity_list"))
+			except (OSError, IOError, ValueError):
+				continue
+			try:
+				snapshot.effective[irq] = cpulist_to_mask(cls._read(path + "/effective_affinity_list"))
+			except (OSError, IOError, ValueError):
+				pass
+		try:
+			snapshot.default = int(cls._read(os.path.join(irq_dir, "default_smp_affinity")).strip().replace(",", ""), 16)
+		except (OSError, IOError, ValueError):
+			pass
+		if owners:
+			snapshot._read_owners(os.path.join(proc_dir, "interrupts"))
+		return snapshot
+
+	def _read_owners(self, path):
+		try:
+			lines = self._read(path).splitlines()
+		except (OSError, IOError):
+			return
+		if not lines:
+			return
+		cpus = len(lines[0].split())
+		for line in lines[1:]:
+			fields = line.split()
+			if not fields or not fields[0].endswith(":"):
+				continue
+			irq = fields[0][:-1]
+			if irq.isdigit():
+				self.owners[irq] = " ".join(fields[1 + cpus:])
+
+	def active_irqs(self):
+		"""IRQs listed in /proc/interrupts, i.e. with a handler, whose affinity is known."""
+		return [irq for irq in self.owners if irq in self.affinity]
+
+	def diff(self, desired, intersect = False, irqs = None):
+		"""
+		Return {irq: mask} of the IRQs whose affinity differs from the
+		desired mask. With intersect the new mask is the intersection of
+		the current and the desired one, or the desired one if they do not
+		intersect.
+		"""
+		changes = {}
+		for irq in (self.affinity if irqs is None else irqs):
+			current = self.affinity.get(irq)
+			if current is None:
+				continue
+			new = (current & desired or desired) if intersect else desired
+			if new != current:
+				changes[irq] = new
+		return changes
+
+	def verify(self, desired, subset = True, irqs = None, skip = ()):
+		"""
+		Check that the affinity of the IRQs is a subset of (or with subset
+		False equal to) the desired mask.
+
+		Return:
+		IrqVerifyReport
+		"""
+		report = IrqVerifyReport()
+		for irq in (self.affinity if irqs is None else irqs):
+			current = self.affinity.get(irq)
+			if current is None:
+				continue
+			if irq in skip:
+				report.skipped.append(irq)
+			elif (current & ~desired == 0) if subset else (current == desired):
+				report.passed.append(irq)
+			else:
+				report.failed.append((irq, current, desired))
+		return report
@@ -0,0 +1,33 @@
+import importlib.util
+import sys
+
+__all__ = ["lazy_import"]
+
+def lazy_import(name):
+	"""
+	Import module lazily, the module is executed when its attribute
+	is accessed for the first time. It is intended for heavy modules
+	(e.g. perf, procfs, pyudev) which are needed only when the tuning
+	actually uses them.
+
+	As with the regular import, ImportError is raised immediately if
+	the module cannot be found, so optional modules can still be
+	detected by 'try: ... except ImportError:'. The parent packages
+	of the module are imported immediately.
+	"""
+	module = sys.modules.get(name)
+	if module is not None:
+		return module
+	spec = importlib.util.find_spec(name)
+	if spec is None or spec.loader is None:
+		raise ImportError("No module named '%s'" % name, name = name)
+	try:
+		loader = importlib.util.LazyLoader(spec.loader)
+	except TypeError:
+		# the loader does not support lazy loading
+		return importlib.import_module(name)
+	spec.loader = loader
+	module = importlib.util.module_from_spec(spec)
+	sys.modules[name] = module
+	loader.exec_module(module)
+	return module
@@ -0,0 +1,68 @@
+import collections
+import time
+
+__all__ = ["PidBatch"]
+
+class PidBatch(object):
+	"""
+	Process events collected by the runtime tuning since the last pass.
+
+	Only the final state of a PID matters: the repeated events of a task
+	(e.g. its fork, exec and comm) are handled once and a task which
+	started and exited within the batch is dropped without any work.
+	new_pids are the PIDs to tune in the order of their first event,
+	exited_pids the PIDs to remove from the rollback data. A PID may be
+	in both if it was reused within the batch, the exit is handled
+	first.
+
+	The batch is full when it holds limit distinct PIDs, the caller stops
+	reading the events then, so they stay queued in the kernel.
+	"""
+
+	def __init__(self, limit = 4096):
+		self.limit = limit
+		self._new = collections.OrderedDict()
+		self._exited = set()
+		self.clear()
+
+	def clear(self):
+		self._new.clear()
+		self._exited.clear()
+		# time.monotonic() of the first event of the batch
+		self.started = None
+		self.events = 0
+		# tasks which exited before they were tuned
+		self.skipped = 0
+
+	def _event(self):
+		self.events += 1
+		if self.started is None:
+			self.started = time.monotonic()
+
+	def add(self, pid):
+		self._event()
+		self._new[pid] = True
+
+	def exit(self, pid):
+		self._event()
+		if self._new.pop(pid, None) is not None:
+			self.skipped += 1
+		self._exited.add(pid)
+
+	def remaining(self):
+		"""Number of distinct PIDs the batch can still take."""
+		return max(self.limit - len(self._new) - len(self._exited), 0)
+
+	def full(self):
+		return self.remaining() == 0
+
+	def __len__(self):
+		return self.events
+
+	@property
+	def new_pids(self):
+		return list(self._new)
+
+	@property
+	def exited_pids(self):
+		return list(self._exited)
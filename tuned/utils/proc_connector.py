@@ -0,0 +1,146 @@
+import errno
+import socket
+import struct
+
+__all__ = ["ProcConnector", "parse_events",
+		"PROC_EVENT_FORK", "PROC_EVENT_EXEC", "PROC_EVENT_COMM", "PROC_EVENT_EXIT"]
+
+NETLINK_CONNECTOR = 11
+CN_IDX_PROC = 1
+CN_VAL_PROC = 1
+NLMSG_DONE = 3
+PROC_CN_MCAST_LISTEN = 1
+PROC_CN_MCAST_IGNORE = 2
+
+PROC_EVENT_FORK = 0x00000001
+PROC_EVENT_EXEC = 0x00000002
+PROC_EVENT_COMM = 0x00000200
+PROC_EVENT_EXIT = 0x80000000
+
+_NLMSGHDR = struct.Struct("=IHHII")
+# struct cn_msg: struct cb_id id (idx, val), seq, ack, len, flags
+_CN_MSG = struct.Struct("=IIIIHH")
+# struct proc_event: what, cpu, timestamp_ns
+_PROC_EVENT = struct.Struct("=IIQ")
+# the first members of the event data: fork has parent pid and tgid
+# followed by child pid and tgid, the others process pid and tgid
+_PIDS = struct.Struct("=II")
+_FORK = struct.Struct("=IIII")
+
+def _align(length):
+	return (length + 3) & ~3
+
+def parse_events(data):
+	"""
+	Parse the netlink messages of the proc connector received by one read.
+
+	Return:
+	list -- [(what, pid, tgid)], what is one of PROC_EVENT_*, pid and tgid
+	        of the process (the child for fork), the other events are skipped
+	"""
+	events = []
+	offset = 0
+	while offset + _NLMSGHDR.size <= len(data):
+		msg_len = _NLMSGHDR.unpack_from(data, offset)[0]
+		if msg_len < _NLMSGHDR.size:
+			break
+		start = offset + _NLMSGHDR.size
+		end = min(offset + msg_len, len(data))
+		offset += _align(msg_len)
+		if end - start < _CN_MSG.size + _PROC_EVENT.size:
+			continue
+		(idx, val, seq, ack, length, flags) = _CN_MSG.unpack_from(data, start)
+		if idx != CN_IDX_PROC or val != CN_VAL_PROC:
+			continue
+		start += _CN_MSG.size
+		what = _PROC_EVENT.unpack_from(data, start)[0]
+		start += _PROC_EVENT.size
+		if what == PROC_EVENT_FORK:
+			if end - start >= _FORK.size:
+				(parent_pid, parent_tgid, pid, tgid) = _FORK.unpack_from(data, start)
+				events.append((what, pid, tgid))
+		elif what in (PROC_EVENT_EXEC, PROC_EVENT_COMM, PROC_EVENT_EXIT):
+			if end - start >= _PIDS.size:
+				(pid, tgid) = _PIDS.unpack_from(data, start)
+				events.append((what, pid, tgid))
+	return events
+
+class ProcConnector(object):
+	"""
+	Source of the process events (fork, exec, comm change, exit) of the
+	kernel proc connector. A single netlink socket receives the events of
+	all the CPUs, so it is much cheaper than a perf event ring per CPU.
+	Needs CAP_NET_ADMIN.
+	"""
+
+	def __init__(self, buffer_size = 4 * 1024 * 1024):
+		self._buffer_size = buffer_size
+		self._sock = None
+		# set if some events were lost because the socket buffer overflowed
+		self.overflow = False
+
+	def _control(self, op):
+		payload = struct.pack("=I", op)
+		cn_msg = _CN_MSG.pack(CN_IDX_PROC, CN_VAL_PROC, 0, 0, len(payload), 0)
+		header = _NLMSGHDR.pack(_NLMSGHDR.size + len(cn_msg) + len(payload), NLMSG_DONE, 0, 0, 0)
+		self._sock.send(header + cn_msg + payload)
+
+	def open(self):
+		"""Subscribe to the events, raise OSError on failure."""
+		sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_CONNECTOR)
+		try:
+			try:
+				sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self._buffer_size)
+			except OSError:
+				pass
+			sock.bind((0, CN_IDX_PROC))
+			self._sock = sock
+			self._control(PROC_CN_MCAST_LISTEN)
+			sock.setblocking(False)
+		except:
+			self._sock = None
+			sock.close()
+			raise
+
+	def close(self):
+		if self._sock is None:
+			return
+		try:
+			self._sock.setblocking(True)
+			self._control(PROC_CN_MCAST_IGNORE)
+		except OSError:
+			pass
+		self._sock.close()
+		self._sock = None
+
+	def fileno(self):
+		return self._sock.fileno()
+
+	def read_events(self, max_events = None):
+		"""
+		Read the pending events without blocking, stop after max_events
+		(if given) so the rest stays queued in the socket.
+
+		Return:
+		list -- [(what, pid, tgid)], see parse_events
+
+		Sets overflow if some events were lost meanwhile, raise OSError
+		if the socket cannot be read.
+		"""
+		events = []
+		while max_events is None or len(events) < max_events:
+			try:
+				data = self._sock.recv(65536)
+			except (BlockingIOError, InterruptedError):
+				return events
+			except OSError as e:
+				if e.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+					return events
+				if e.errno == errno.ENOBUFS:
+					self.overflow = True
+					continue
+				raise
+			if not data:
+				return events
+			events.extend(parse_events(data))
+		return events
@@ -0,0 +1,233 @@
+import collections
+import os
+import threading
+
+__all__ = ["Task", "TaskCache", "scan"]
+
+# flags of the task in /proc/<pid>/stat
+PF_KTHREAD = 0x00200000
+PF_NO_SETAFFINITY = 0x04000000
+
+class Task(object):
+	"""
+	A task (process or thread) in /proc.
+
+	Only the pid is known upfront, the other attributes are read on the
+	first access and cached, so the callers pay only for the files they
+	need. A thread shares the command line (read once) of its process.
+	Accessing an attribute raises OSError or IOError if the task vanished.
+	"""
+
+	__slots__ = ["pid", "_path", "_process", "_stat", "_cmdline", "_cgroups"]
+
+	def __init__(self, pid, proc_dir = "/proc", process = None):
+		self.pid = pid
+		self._process = process
+		if process is None:
+			self._path = "%s/%d" % (proc_dir, pid)
+		else:
+			self._path = "%s/%d/task/%d" % (proc_dir, process.pid, pid)
+		self._stat = None
+		self._cmdline = None
+		self._cgroups = None
+
+	@property
+	def process(self):
+		"""The process of the thread, the task itself for a process."""
+		return self if self._process is None else self._process
+
+	def _read(self, name):
+		with open("%s/%s" % (self._path, name), "rb") as f:
+			return f.read()
+
+	def _get_stat(self):
+		if self._stat is None:
+			data = self._read("stat").decode("utf-8", "replace")
+			# the comm can contain spaces and parentheses
+			start = data.index("(")
+			end = data.rindex(")")
+			fields = data[end + 2:].split()
+			# fields from the state (3rd field of the stat) on, flags are
+			# the 9th, starttime the 22nd
+			self._stat = (data[start + 1:end], fields[0], int(fields[6]), int(fields[19]))
+		return self._stat
+
+	@property
+	def comm(self):
+		return self._get_stat()[0]
+
+	@property
+	def state(self):
+		return self._get_stat()[1]
+
+	@property
+	def flags(self):
+		return self._get_stat()[2]
+
+	@property
+	def starttime(self):
+		"""Start time of the task after the boot in clock ticks, (pid, starttime) identifies the task."""
+		return self._get_stat()[3]
+
+	@property
+	def is_kthread(self):
+		return self.flags & PF_KTHREAD != 0
+
+	@property
+	def is_bound_to_cpu(self):
+		return self.flags & PF_NO_SETAFFINITY != 0
+
+	@property
+	def cmdline(self):
+		"""Arguments of the process separated by spaces, comm if there are none (e.g. kernel threads)."""
+		if self._process is not None:
+			return self._process.cmdline
+		if self._cmdline is None:
+			args = self._read("cmdline").split(b"\0")
+			if args and args[-1] == b"":
+				args.pop()
+			cmdline = b" ".join(args).decode("utf-8", "replace").strip()
+			self._cmdline = cmdline if cmdline else self.comm
+		return self._cmdline
+
+	@property
+	def cgroups(self):
+		"""Lines of /proc/<pid>/cgroup in the reversed order separated by commas."""
+		if self._cgroups is None:
+			lines = self._read("cgroup").decode("utf-8", "replace").splitlines()
+			self._cgroups = ",".join(reversed(lines))
+		return self._cgroups
+
+class TaskInfo(object):
+	"""
+	Parsed data of a task kept by TaskCache, it has the attributes of
+	Task. The stat fields are refreshed on every lookup, the command
+	line and the cgroups are read once per task. decision is free for
+	the caller to memoize e.g. the matching rule of the task.
+	"""
+
+	__slots__ = ["pid", "starttime", "comm", "state", "flags", "decision",
+			"_task", "_process", "_cmdline", "_cgroups"]
+
+	def __init__(self, task, process = None):
+		self.pid = task.pid
+		self.starttime = task.starttime
+		self._process = process
+		self._task = task
+		self._cmdline = None
+		self._cgroups = None
+		self.decision = None
+		self._update(task)
+
+	def _update(self, task):
+		self.comm = task.comm
+		self.state = task.state
+		self.flags = task.flags
+
+	@property
+	def process(self):
+		return self if self._process is None else self._process
+
+	@property
+	def is_kthread(self):
+		return self.flags & PF_KTHREAD != 0
+
+	@property
+	def is_bound_to_cpu(self):
+		return self.flags & PF_NO_SETAFFINITY != 0
+
+	@property
+	def cmdline(self):
+		if self._process is not None:
+			return self._process.cmdline
+		if self._cmdline is None:
+			self._cmdline = self._task.cmdline
+		return self._cmdline
+
+	@property
+	def cgroups(self):
+		if self._cgroups is None:
+			self._cgroups = self._task.cgroups
+		return self._cgroups
+
+class TaskCache(object):
+	"""
+	LRU memo of the tasks keyed by (pid, starttime).
+
+	get reads only the stat of the task to find out its identity, so a
+	reused PID is never mistaken for the previous task, while the
+	command line and the cgroups of a known task are not read again.
+	The entries of the exited tasks should be invalidated, the least
+	recently used ones are evicted when there are more than size.
+	"""
+
+	def __init__(self, size = 65536):
+		self._size = size
+		self._entries = collections.OrderedDict()
+		self._lock = threading.Lock()
+		self.hits = 0
+		self.misses = 0
+
+	def get(self, task):
+		"""
+		Return the TaskInfo of the Task, raise OSError or IOError if the
+		task vanished.
+		"""
+		process = None
+		if task.process is not task:
+			process = self.get(task.process)
+		starttime = task.starttime
+		with self._lock:
+			info = self._entries.get(task.pid)
+			if info is not None and info.starttime == starttime \
+					and (process is None or info._process is process):
+				self._entries.move_to_end(task.pid)
+				self.hits += 1
+				info._update(task)
+				return info
+		info = TaskInfo(task, process)
+		with self._lock:
+			self.misses += 1
+			self._entries[task.pid] = info
+			self._entries.move_to_end(task.pid)
+			while len(self._entries) > self._size:
+				self._entries.popitem(last = False)
+		return info
+
+	def peek(self, pid):
+		"""Return the cached TaskInfo of the PID without reading anything, None if unknown."""
+		with self._lock:
+			return self._entries.get(pid)
+
+	def invalidate(self, pid):
+		with self._lock:
+			self._entries.pop(pid, None)
+
+	def clear(self):
+		with self._lock:
+			self._entries.clear()
+
+	def __len__(self):
+		return len(self._entries)
+
+def _scandir_pids(path):
+	try:
+		with os.scandir(path) as entries:
+			return [int(entry.name) for entry in entries if entry.name.isdigit()]
+	except OSError:
+		return []
+
+def scan(proc_dir = "/proc", threads = True):
+	"""
+	Generate Task objects of all the processes, each process followed by
+	its threads (other than the main one) if threads is True. Nothing is
+	read from the tasks during the scan besides the directory listings.
+	"""
+	for pid in _scandir_pids(proc_dir):
+		process = Task(pid, proc_dir)
+		yield process
+		if not threads:
+			continue
+		for tid in _scandir_pids("%s/%d/task" % (proc_dir, pid)):
+			if tid != pid:
+				yield Task(tid, proc_dir, process)
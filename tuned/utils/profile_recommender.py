@@ -1,7 +1,6 @@
 import os
 import re
 import errno
-import procfs
 import subprocess
 from tuned.utils.config_parser import ConfigParser, Error
 
@@ -14,6 +13,9 @@ except:
 import tuned.consts as consts
 import tuned.logs
 from tuned.utils.commands import commands
+from tuned.utils.lazy_import import lazy_import
+
+procfs = lazy_import("procfs")
 
 log = tuned.logs.get()
 
@@ -0,0 +1,92 @@
+import os
+import socket
+import struct
+
+__all__ = ["link_stats"]
+
+NETLINK_ROUTE = 0
+RTM_NEWLINK = 16
+RTM_GETLINK = 18
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+NLM_F_REQUEST = 0x1
+NLM_F_DUMP = 0x300
+IFLA_IFNAME = 3
+IFLA_STATS = 7
+IFLA_STATS64 = 23
+
+_NLMSGHDR = struct.Struct("=IHHII")
+_IFINFOMSG = struct.Struct("=BxHiII")
+_RTATTR = struct.Struct("=HH")
+# rx_packets, tx_packets, rx_bytes, tx_bytes are the first members of
+# both rtnl_link_stats64 and (32-bit) rtnl_link_stats
+_STATS64 = struct.Struct("=4Q")
+_STATS32 = struct.Struct("=4I")
+
+def _align(length):
+	return (length + 3) & ~3
+
+def _parse_link(msg, offset, end):
+	offset += _IFINFOMSG.size
+	name = None
+	stats = None
+	while offset + _RTATTR.size <= end:
+		(attr_len, attr_type) = _RTATTR.unpack_from(msg, offset)
+		if attr_len < _RTATTR.size:
+			break
+		data = offset + _RTATTR.size
+		if attr_type == IFLA_IFNAME:
+			name = msg[data:offset + attr_len].split(b"\0", 1)[0].decode("utf-8", "replace")
+		elif attr_type == IFLA_STATS64 and attr_len - _RTATTR.size >= _STATS64.size:
+			stats = _STATS64.unpack_from(msg, data)
+		elif attr_type == IFLA_STATS and stats is None \
+				and attr_len - _RTATTR.size >= _STATS32.size:
+			stats = _STATS32.unpack_from(msg, data)
+		offset += _align(attr_len)
+	if name is None or stats is None:
+		return None, None
+	(rx_packets, tx_packets, rx_bytes, tx_bytes) = stats
+	return name, (rx_bytes, rx_packets, tx_bytes, tx_packets)
+
+def link_stats(sock = None):
+	"""
+	Dump the counters of all the network interfaces by a single
+	RTM_GETLINK request.
+
+	Return:
+	dictionary -- {interface name: (rx_bytes, rx_packets, tx_bytes, tx_packets)}
+
+	Raise OSError if the netlink socket cannot be used.
+	"""
+	own_sock = sock is None
+	if own_sock:
+		sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, NETLINK_ROUTE)
+	try:
+		seq = 1
+		request = _NLMSGHDR.pack(_NLMSGHDR.size + _IFINFOMSG.size, RTM_GETLINK,
+				NLM_F_REQUEST | NLM_F_DUMP, seq, 0) + _IFINFOMSG.pack(socket.AF_UNSPEC, 0, 0, 0, 0)
+		sock.sendto(request, (0, 0))
+		links = {}
+		while True:
+			msg = sock.recv(65536)
+			offset = 0
+			while offset + _NLMSGHDR.size <= len(msg):
+				(msg_len, msg_type, flags, msg_seq, pid) = _NLMSGHDR.unpack_from(msg, offset)
+				if msg_len < _NLMSGHDR.size:
+					return links
+				if msg_seq == seq:
+					if msg_type == NLMSG_DONE:
+						return links
+					if msg_type == NLMSG_ERROR:
+						error = -struct.unpack_from("=i", msg, offset + _NLMSGHDR.size)[0]
+						if error:
+							raise OSError(error, os.strerror(error))
+						return links
+					if msg_type == RTM_NEWLINK:
+						name, stats = _parse_link(msg, offset + _NLMSGHDR.size, offset + msg_len)
+						if name is not None:
+							links[name] = stats
+				offset += _align(msg_len)
+	finally:
+		if own_sock:
+			sock.close()
@@ -0,0 +1,70 @@
+import re
+
+__all__ = ["RuleMatcher"]
+
+# backreferences and conditionals refer to the groups by numbers, which
+# change when the regexes are combined
+_GROUP_REFERENCE = re.compile(r"\\[1-9]|\(\?P=|\(\?\(")
+# global inline flags apply to the whole combined regex (Python < 3.11
+# only warns about them in the middle of a pattern)
+_GLOBAL_FLAGS = re.compile(r"\(\?[aiLmsux]+\)")
+
+class RuleMatcher(object):
+	"""
+	Ordered list of rules (regex, value), match returns the value of the
+	last rule whose regex is found in the string (as by re.search), None
+	if no rule matches.
+
+	The rules are compiled into a single regex with an alternative per
+	rule in the reversed order. Each alternative looks ahead for the rule
+	anywhere in the string and is followed by an empty named group
+	identifying the rule, so a string is scanned by a single re.match
+	and the first matching alternative is the winning rule. The regexes
+	which cannot be combined (e.g. with backreferences or global inline
+	flags) are searched one by one. The results are memoized per string,
+	as many processes (e.g. threads of a process) share one command line.
+
+	Raise re.error if a regex is invalid.
+	"""
+
+	def __init__(self, rules, cache_size = 4096):
+		rules = list(rules)
+		self._values = [value for (regex, value) in rules]
+		self._regexes = [re.compile(regex) for (regex, value) in rules]
+		self._combined = None
+		if rules and not any(_GROUP_REFERENCE.search(regex) or _GLOBAL_FLAGS.search(regex)
+				for (regex, value) in rules):
+			alternatives = ["(?=(?s:.*?)(?:%s))(?P<_rule%d>)" % (regex, i)
+					for (i, (regex, value)) in reversed(list(enumerate(rules)))]
+			try:
+				self._combined = re.compile("|".join(alternatives))
+			except (re.error, OverflowError, RecursionError):
+				self._combined = None
+		self._cache = {}
+		self._cache_size = cache_size
+
+	def __len__(self):
+		return len(self._values)
+
+	def _match_index(self, s):
+		if self._combined is not None:
+			mo = self._combined.match(s)
+			return None if mo is None else int(mo.lastgroup[5:])
+		for i in range(len(self._regexes) - 1, -1, -1):
+			if self._regexes[i].search(s) is not None:
+				return i
+		return None
+
+	def match(self, s):
+		if s is None or not self._values:
+			return None
+		try:
+			return self._cache[s]
+		except KeyError:
+			pass
+		i = self._match_index(s)
+		value = None if i is None else self._values[i]
+		if len(self._cache) >= self._cache_size:
+			self._cache.clear()
+		self._cache[s] = value
+		return value
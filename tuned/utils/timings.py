@@ -0,0 +1,72 @@
+import collections
+import contextlib
+import threading
+import time
+
+__all__ = ["Timings", "no_measure"]
+
+@contextlib.contextmanager
+def no_measure():
+	"""No-op replacement of Timings.measure (contextlib.nullcontext needs Python 3.7)."""
+	yield
+
+class _Entry(object):
+	__slots__ = ["count", "total", "max", "last"]
+
+	def __init__(self):
+		self.count = 0
+		self.total = 0.0
+		self.max = 0.0
+		self.last = 0.0
+
+class Timings(object):
+	"""
+	Bounded in-memory table of durations of the tuning operations.
+
+	Entries are keyed by (instance, operation, command, device), e.g.
+	("cpu", "start_tuning", "", "") for the whole apply of an instance or
+	("disk", "apply", "readahead", "sda") for a single command. When the
+	table is full, the least recently updated entry is dropped.
+	"""
+
+	def __init__(self, max_entries = 4096, clock = time.monotonic):
+		self._max_entries = max_entries
+		self._clock = clock
+		self._entries = collections.OrderedDict()
+		self._lock = threading.Lock()
+
+	def record(self, instance, operation, command, device, duration):
+		key = (str(instance), str(operation), str(command), str(device))
+		with self._lock:
+			entry = self._entries.pop(key, None)
+			if entry is None:
+				entry = _Entry()
+				if len(self._entries) >= self._max_entries:
+					self._entries.popitem(last = False)
+			self._entries[key] = entry
+			entry.count += 1
+			entry.total += duration
+			entry.last = duration
+			if duration > entry.max:
+				entry.max = duration
+
+	@contextlib.contextmanager
+	def measure(self, instance, operation, command = "", device = ""):
+		start = self._clock()
+		try:
+			yield
+		finally:
+			self.record(instance, operation, command, device, self._clock() - start)
+
+	def get(self):
+		"""
+		Return list of tuples (instance, operation, command, device, count,
+		total, max, last), durations are in seconds.
+		"""
+		with self._lock:
+			return [key + (float(entry.count), entry.total, entry.max, entry.last)
+					for key, entry in self._entries.items()]
+
+	def clear(self):
+		with self._lock:
+			self._entries.clear()